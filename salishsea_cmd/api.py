@@ -25,17 +25,18 @@ for use in other sub-command processor modules,
 and by other software.
 """
 
+import functools
+import importlib.metadata
 import logging
 import os
 import subprocess
 
-import cliff.commandmanager
 import yaml
-from nemo_cmd import combine as combine_plugin
-from nemo_cmd import deflate as deflate_plugin
-from nemo_cmd import gather as gather_plugin
 
-from salishsea_cmd import prepare as prepare_plugin
+from salishsea_cmd import backfill, timing
+
+# The sub-command plug-in modules are imported in the functions that use them
+# so that importing this module doesn't pull in all of their dependencies
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
@@ -56,6 +57,8 @@ def combine(run_desc_file):
     :param run_desc_file: File path/name of the run description YAML file.
     :type run_desc_file: :py:class:`pathlib.Path`
     """
+    from nemo_cmd import combine as combine_plugin
+
     return combine_plugin.combine(run_desc_file)
 
 
@@ -71,6 +74,8 @@ def deflate(filepaths, max_concurrent_jobs):
     :param int max_concurrent_jobs: Maximum number of concurrent deflation
                                     processes allowed.
     """
+    from nemo_cmd import deflate as deflate_plugin
+
     return deflate_plugin.deflate(filepaths, max_concurrent_jobs)
 
 
@@ -86,10 +91,12 @@ def gather(results_dir):
                         results.
     :type results_dir: :py:class:`pathlib.Path`
     """
+    from nemo_cmd import gather as gather_plugin
+
     return gather_plugin.gather(results_dir)
 
 
-def prepare(run_desc_file, nocheck_init=False):
+def prepare(run_desc_file, nocheck_init=False, run_desc=None, context=None):
     """Prepare a SalishSeaCast NEMO run.
 
     A UUID named temporary run directory is created and symbolic links
@@ -106,10 +113,95 @@ def prepare(run_desc_file, nocheck_init=False):
                        default is to check
     :type nocheck_init: boolean
 
+    :arg dict run_desc: Run description dictionary that has already been loaded
+                        from run_desc_file;
+                        the default is to load it from run_desc_file.
+
+    :arg context: Results of the checks that are the same for all of the runs
+                  prepared from a run description,
+                  from :py:func:`prepare_context`;
+                  the default is to do the checks.
+    :type context: :py:class:`salishsea_cmd.prepare.PrepareContext`
+
     :returns: Path of the temporary run directory
     :rtype: :py:class:`pathlib.Path`
     """
-    return prepare_plugin.prepare(run_desc_file, nocheck_init)
+    from salishsea_cmd import prepare as prepare_plugin
+
+    return prepare_plugin.prepare(
+        run_desc_file, nocheck_init, run_desc=run_desc, context=context
+    )
+
+
+def prepare_context(run_desc):
+    """Check the NEMO and XIOS executables and the :program:`rebuild_nemo` script,
+    and resolve the code repository paths for runs prepared from run_desc.
+
+    The result can be passed to :py:func:`prepare` for each of several runs that
+    are prepared from the same run description
+    (e.g. the segments of a segmented run)
+    so that those checks are only done once.
+
+    :arg dict run_desc: Run description dictionary.
+
+    :rtype: :py:class:`salishsea_cmd.prepare.PrepareContext`
+    """
+    from salishsea_cmd import prepare as prepare_plugin
+
+    return prepare_plugin.prepare_context(run_desc)
+
+
+def split_results(source_dir, quiet=False):
+    """Split the results of a multi-day SalishSeaCast NEMO model run
+    (e.g. a hindcast run) into daily results directories.
+
+    :param source_dir: Multi-day results directory to split into daily directories.
+    :type source_dir: :py:class:`pathlib.Path`
+
+    :param boolean quiet: Don't show progress messages.
+                          The default is to show progress messages.
+    """
+    from salishsea_cmd import split_results as split_results_plugin
+
+    return split_results_plugin.split_results(source_dir, quiet)
+
+
+def dispatch(cmd_name, *args, **kwargs):
+    """Call the Python function of the sub-command named cmd_name with args and kwargs.
+
+    This is a fast path for software that runs sub-commands by name many times
+    from a long-lived process;
+    no command-line parsing or plug-in lookup is done.
+    Only the :kbd:`combine`,
+    :kbd:`deflate`,
+    :kbd:`gather`,
+    :kbd:`prepare`,
+    and :kbd:`split-results` sub-commands are available.
+
+    :arg str cmd_name: Sub-command name.
+
+    :returns: Return value of the sub-command function.
+
+    :raises: :py:exc:`ValueError` if cmd_name is not one of the sub-commands
+             that are available.
+    """
+    try:
+        function = _SUBCOMMAND_FUNCTIONS[cmd_name]
+    except KeyError:
+        raise ValueError(
+            f"unknown sub-command function: {cmd_name}; "
+            f"expected one of {sorted(_SUBCOMMAND_FUNCTIONS)}"
+        )
+    return function(*args, **kwargs)
+
+
+_SUBCOMMAND_FUNCTIONS = {
+    "combine": combine,
+    "deflate": deflate,
+    "gather": gather,
+    "prepare": prepare,
+    "split-results": split_results,
+}
 
 
 def run_description(
@@ -273,11 +365,88 @@ def run_in_subprocess(run_id, run_desc, results_dir):
     os.unlink(yaml_file)
 
 
+def register_timing_callback(callback):
+    """Register a function to be called with the elapsed time of each phase of the
+    :command:`salishsea prepare` and :command:`salishsea run` sub-commands.
+
+    The callback is called with 2 arguments when each phase finishes:
+    the phase name,
+    and its elapsed wall-clock time in seconds.
+    Phases inside other phases are named with the names of their enclosing phases
+    as a :kbd:`/` separated prefix;
+    e.g. :kbd:`run/build_tmp_run_dir/prepare/make_namelists`.
+    Exceptions raised by the callback are logged and otherwise ignored.
+
+    :arg callback: Function to call with the name and elapsed time of each phase.
+    :type callback: callable
+    """
+    timing._callbacks.append(callback)
+
+
+def unregister_timing_callback(callback):
+    """Remove a function that was registered with :py:func:`register_timing_callback`.
+
+    :arg callback: Function to remove from the timing callbacks.
+    :type callback: callable
+    """
+    timing._callbacks.remove(callback)
+
+
+def register_scheduler_adapter(queue_job_cmd, adapter):
+    """Register the object that :command:`salishsea run` uses to estimate the start
+    times of jobs when it chooses job resources from the :kbd:`backfill` section of
+    a run description.
+
+    The adapter must have a :py:meth:`start_time` method that is called with a
+    :py:obj:`dict` of :command:`sbatch` option names and values,
+    and returns the expected start time of a job with those options as an
+    :py:class:`arrow.Arrow` object,
+    or :py:obj:`None` if the start time can't be estimated.
+    An adapter that uses :command:`sbatch --test-only` is registered for
+    :command:`sbatch` by default.
+    Backfill job resource selection is only available on systems that use Slurm.
+
+    :arg str queue_job_cmd: Command that the adapter estimates start times for;
+                            i.e. :kbd:`sbatch`.
+
+    :arg adapter: Scheduler adapter.
+    """
+    backfill._adapters[queue_job_cmd] = adapter
+
+
+def invalidate_command_cache():
+    """Clear the cached sub-command registry and parsers used by
+    :py:func:`_run_subcommand`.
+
+    Call this if plug-in packages are installed or removed while a process that
+    runs sub-commands is running.
+    """
+    _command_manager.cache_clear()
+    _cmd_parsers.clear()
+
+
+@functools.cache
+def _command_manager():
+    # Imported here to avoid a circular import
+    from salishsea_cmd.main import SalishSeaCommandManager
+
+    return SalishSeaCommandManager(
+        "salishsea", importlib.metadata.distribution("SalishSeaCmd")
+    )
+
+
+# Sub-command parsers used by _run_subcommand(), keyed by command name
+_cmd_parsers = {}
+
+
 def _run_subcommand(app, app_args, argv):
     """Run a sub-command with argv as arguments via its plug-in
     interface.
 
     Based on :py:meth:`cliff.app.run_subcommand`.
+    The sub-command registry and the parser for each sub-command are cached for
+    the life of the process;
+    use :py:func:`invalidate_command_cache` to clear them.
 
     :arg app: Application instance invoking the command.
     :type app: :py:class:`cliff.app.App`
@@ -288,11 +457,8 @@ def _run_subcommand(app, app_args, argv):
     :arg argv: Sub-command arguments.
     :type argv: list
     """
-    command_manager = cliff.commandmanager.CommandManager(
-        "salishsea.app", convert_underscores=False
-    )
     try:
-        subcommand = command_manager.find_command(argv)
+        subcommand = _command_manager().find_command(argv)
     except ValueError as err:
         if app_args.debug:
             raise
@@ -302,7 +468,10 @@ def _run_subcommand(app, app_args, argv):
     cmd_factory, cmd_name, sub_argv = subcommand
     cmd = cmd_factory(app, app_args)
     try:
-        cmd_parser = cmd.get_parser(cmd_name)
+        try:
+            cmd_parser = _cmd_parsers[cmd_name]
+        except KeyError:
+            cmd_parser = _cmd_parsers[cmd_name] = cmd.get_parser(cmd_name)
         parsed_args = cmd_parser.parse_args(sub_argv)
         result = cmd.take_action(parsed_args)
     except Exception as err:
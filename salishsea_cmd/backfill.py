@@ -0,0 +1,83 @@
+#  Copyright 2013 – present by the SalishSeaCast Project Contributors
+#  and The University of British Columbia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# SPDX-License-Identifier: Apache-2.0
+
+
+"""SalishSeaCmd scheduler adapters that estimate when a job with particular resources
+would start, so that the run sub-command can choose the resources that can start
+soonest in a scheduler backfill window.
+
+Adapters are registered for queue manager commands via
+:py:func:`salishsea_cmd.api.register_scheduler_adapter`.
+"""
+
+import logging
+import shlex
+import subprocess
+
+import arrow
+
+log = logging.getLogger(__name__)
+
+
+class SlurmTestOnly:
+    """Scheduler adapter that asks Slurm when a job would start via
+    :command:`sbatch --test-only`.
+    """
+
+    def start_time(self, options):
+        """Estimate the start time of a job.
+
+        :param dict options: :command:`sbatch` option names without their leading
+                             :kbd:`--`, and their values;
+                             e.g. :kbd:`{"nodes": 2, "time": "6:00:00"}`.
+
+        :returns: Expected start time of the job;
+                  :py:obj:`None` if it can't be estimated.
+        :rtype: :py:class:`arrow.Arrow` or None
+        """
+        cmd = [
+            "sbatch",
+            "--test-only",
+            *(f"--{name}={value}" for name, value in options.items()),
+            "--wrap=true",
+        ]
+        try:
+            proc = subprocess.run(
+                cmd, capture_output=True, check=True, text=True, timeout=60
+            )
+        except subprocess.CalledProcessError as exc:
+            log.warning(f"{shlex.join(cmd)} failed: {(exc.stderr or str(exc)).strip()}")
+            return None
+        except (OSError, subprocess.SubprocessError) as exc:
+            log.warning(f"{shlex.join(cmd)} failed: {exc}")
+            return None
+        # sbatch reports the estimate on stderr like:
+        #   sbatch: Job 1234 to start at 2026-10-17T10:31:24 using 384 processors
+        #   on nodes fc[10101-10102] in partition compute
+        for line in f"{proc.stderr}\n{proc.stdout}".splitlines():
+            if " to start at " in line:
+                start = line.split(" to start at ", 1)[1].split()[0]
+                try:
+                    return arrow.get(start, tzinfo="local")
+                except (arrow.parser.ParserError, ValueError):
+                    return None
+        return None
+
+
+_adapters = {
+    "sbatch": SlurmTestOnly(),
+}
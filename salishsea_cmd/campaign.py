@@ -0,0 +1,388 @@
+#  Copyright 2013 – present by the SalishSeaCast Project Contributors
+#  and The University of British Columbia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# SPDX-License-Identifier: Apache-2.0
+
+
+"""SalishSeaCmd command plug-in for campaign sub-command.
+
+Submit the segments of a campaign of segmented SalishSeaCast NEMO runs
+(e.g. the years of a multi-year hindcast) via the run sub-command,
+keeping the number of the campaign's jobs that are queued or running
+below a limit, and topping the queue up as jobs finish.
+"""
+
+import contextlib
+import fcntl
+import logging
+import os
+import time
+from pathlib import Path
+
+import cliff.command
+import nemo_cmd
+import yaml
+
+from salishsea_cmd import run
+
+log = logging.getLogger(__name__)
+
+# Campaign description run options, and the run.run() arguments that they are passed as
+RUN_OPTIONS = {
+    "cores per node": "cores_per_node",
+    "cpu arch": "cpu_arch",
+    "deflate": "deflate",
+    "max deflate jobs": "max_deflate_jobs",
+    "nocheck initial conditions": "nocheck_init",
+    "per rank restarts": "per_rank_restarts",
+    "prepare jobs": "prepare_jobs",
+    "restart handoff": "restart_handoff",
+    "separate deflate": "separate_deflate",
+    "worker": "worker",
+}
+
+
+class Campaign(cliff.command.Command):
+    """Submit a campaign of segmented SalishSeaCast NEMO runs with a cap on jobs in flight."""
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.description = """
+            Submit segments of the segmented runs described in CAMPAIGN_FILE
+            until the campaign's limit on queued and running jobs is reached.
+            The progress of the campaign is stored in a state file so that
+            the queue can be topped up as jobs finish by running the command
+            again, or by using the --interval option.
+        """
+        parser.add_argument(
+            "campaign_file",
+            metavar="CAMPAIGN_FILE",
+            type=Path,
+            help="campaign description YAML file",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="""
+            Keep running, and top the queue up every INTERVAL minutes until
+            all of the runs have completed or failed.
+            The default is to top the queue up once.
+            """,
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="""
+            Resubmit the failed segments of runs that the campaign state file
+            records as failed.
+            """,
+        )
+        parser.add_argument(
+            "--state-file",
+            type=Path,
+            default=None,
+            help="""
+            YAML file in which to store the progress of the campaign.
+            The default is CAMPAIGN_FILE with _state appended to its stem.
+            """,
+        )
+        return parser
+
+    def take_action(self, parsed_args):
+        """Execute the `salishsea campaign` sub-command.
+
+        :param parsed_args: Arguments and options parsed from the command-line.
+        :type parsed_args: :class:`argparse.Namespace` instance
+        """
+        campaign(
+            parsed_args.campaign_file,
+            interval=parsed_args.interval,
+            retry_failed=parsed_args.retry_failed,
+            state_file=parsed_args.state_file,
+        )
+
+
+def campaign(campaign_file, interval=None, retry_failed=False, state_file=None):
+    """Submit segments of the segmented runs of a campaign until the campaign's
+    limit on queued and running jobs is reached.
+
+    The runs are fed to :py:func:`salishsea_cmd.run.run` in the order that they
+    are listed in the campaign description file,
+    each one starting at the segment that :kbd:`salishsea run --resume` would
+    start it at.
+
+    :param campaign_file: File path/name of the campaign description YAML file.
+    :type campaign_file: :py:class:`pathlib.Path`
+
+    :param float interval: Number of minutes to wait between top-ups of the queue
+                           until all of the runs have completed or failed;
+                           the default is to top the queue up once.
+
+    :param boolean retry_failed: Resubmit the failed segments of the runs that
+                                 are recorded as failed in the state file.
+
+    :param state_file: File path/name of the YAML file in which to store the
+                       progress of the campaign;
+                       the default is the campaign file path with :kbd:`_state`
+                       appended to its stem.
+    :type state_file: :py:class:`pathlib.Path`
+
+    :returns: Run statuses keyed by results directory path.
+    :rtype: dict
+    """
+    campaign_file = nemo_cmd.resolved_path(campaign_file)
+    state_file = (
+        campaign_file.with_name(f"{campaign_file.stem}_state.yaml")
+        if state_file is None
+        else nemo_cmd.resolved_path(state_file)
+    )
+    queue_job_cmd = run.queue_job_command()
+    if queue_job_cmd == "bash":
+        log.error(
+            f"campaigns are not available for systems that launch jobs with "
+            f"{queue_job_cmd}"
+        )
+        raise SystemExit(2)
+    max_jobs, runs, run_options = _load_campaign_desc(campaign_file)
+    with _lock_state_file(state_file):
+        state = _read_state(state_file)
+        if retry_failed:
+            for run_state in state.values():
+                if run_state["status"] == "failed":
+                    run_state.update(status="active", retry=True)
+        while True:
+            in_flight = _top_up(
+                runs, run_options, max_jobs, state, state_file, queue_job_cmd
+            )
+            statuses = [
+                state[os.fspath(results_dir)]["status"] for _, results_dir in runs
+            ]
+            log.info(
+                f"{statuses.count('active')} runs active, "
+                f"{statuses.count('completed')} completed, "
+                f"{statuses.count('failed')} failed; "
+                f"{in_flight} of {max_jobs} jobs in flight"
+            )
+            if interval is None or "active" not in statuses:
+                break
+            time.sleep(interval * 60)
+    return {
+        os.fspath(results_dir): state[os.fspath(results_dir)]["status"]
+        for _, results_dir in runs
+    }
+
+
+def _load_campaign_desc(campaign_file):
+    """
+    :param campaign_file: File path/name of the campaign description YAML file.
+    :type campaign_file: :py:class:`pathlib.Path`
+
+    :return: Maximum number of jobs in flight,
+             List of run description file, results directory path 2-tuples,
+             Keyword arguments for :py:func:`salishsea_cmd.run.run`.
+    :rtype: 3-tuple
+    """
+    with campaign_file.open("rt") as f:
+        campaign_desc = yaml.safe_load(f)
+
+    def campaign_path(path):
+        # Relative paths are relative to the directory containing the campaign file
+        return (campaign_file.parent / nemo_cmd.expanded_path(path)).resolve()
+
+    try:
+        max_jobs = int(campaign_desc["max jobs"])
+        runs = [
+            (
+                campaign_path(run_item["run description"]),
+                campaign_path(run_item["results dir"]),
+            )
+            for run_item in campaign_desc["runs"]
+        ]
+    except (KeyError, TypeError) as exc:
+        log.error(
+            f"{campaign_file} must have a max jobs item, and a runs list with "
+            f"run description and results dir items for each run: {exc!r}"
+        )
+        raise SystemExit(2)
+    run_options = campaign_desc.get("run options") or {}
+    unknown_options = set(run_options) - set(RUN_OPTIONS)
+    if unknown_options:
+        log.error(
+            f"unknown run options in {campaign_file}: {sorted(unknown_options)}; "
+            f"available options are {sorted(RUN_OPTIONS)}"
+        )
+        raise SystemExit(2)
+    run_kwargs = {RUN_OPTIONS[option]: value for option, value in run_options.items()}
+    return max_jobs, runs, run_kwargs
+
+
+@contextlib.contextmanager
+def _lock_state_file(state_file):
+    """Hold an exclusive lock on the campaign state file for the body of the
+    :kbd:`with` statement so that overlapping invocations can't submit the same
+    segments.
+
+    :param state_file: File path/name of the campaign state YAML file.
+    :type state_file: :py:class:`pathlib.Path`
+    """
+    with state_file.with_suffix(".lock").open("w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            log.error(f"{state_file} is in use by another campaign sub-command")
+            raise SystemExit(2)
+        yield
+
+
+def _read_state(state_file):
+    """
+    :param state_file: File path/name of the campaign state YAML file.
+    :type state_file: :py:class:`pathlib.Path`
+
+    :return: Run states keyed by results directory path;
+             empty if the campaign hasn't been started.
+    :rtype: dict
+    """
+    try:
+        with state_file.open("rt") as f:
+            return yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return {}
+
+
+def _write_state(state_file, state):
+    """
+    :param state_file: File path/name of the campaign state YAML file.
+    :type state_file: :py:class:`pathlib.Path`
+
+    :param dict state: Run states keyed by results directory path.
+    """
+    tmp_state_file = state_file.with_suffix(".yaml.tmp")
+    # Replace the state file in one step so that an interrupted write can't leave
+    # it incomplete
+    with tmp_state_file.open("wt") as f:
+        yaml.safe_dump(state, f, default_flow_style=False)
+    tmp_state_file.replace(state_file)
+
+
+def _jobs_per_segment(run_kwargs):
+    """
+    :param dict run_kwargs: Keyword arguments for :py:func:`salishsea_cmd.run.run`.
+
+    :return: Number of jobs that are submitted for each segment.
+    :rtype: int
+    """
+    n_jobs = 1
+    if run_kwargs.get("restart_handoff"):
+        n_jobs += 1
+    if run_kwargs.get("separate_deflate"):
+        n_jobs += len(run.SEPARATE_DEFLATE_JOBS)
+    return n_jobs
+
+
+def _top_up(runs, run_kwargs, max_jobs, state, state_file, queue_job_cmd):
+    """Update the states of the runs of a campaign and submit segments of the
+    active runs until the campaign's limit on jobs in flight is reached.
+
+    :param list runs: Run description file, results directory path 2-tuples.
+
+    :param dict run_kwargs: Keyword arguments for :py:func:`salishsea_cmd.run.run`.
+
+    :param int max_jobs: Maximum number of the campaign's jobs to have queued or
+                         running.
+
+    :param dict state: Run states keyed by results directory path;
+                       it is updated in place.
+
+    :param state_file: File path/name of the campaign state YAML file.
+    :type state_file: :py:class:`pathlib.Path`
+
+    :param str queue_job_cmd: Command to submit jobs to the queue manager.
+
+    :return: Number of the campaign's jobs in flight.
+    :rtype: int
+    """
+    # The post-processing jobs of a segment are not tracked; they are counted
+    # as being in flight for as long as its NEMO job
+    jobs_per_segment = _jobs_per_segment(run_kwargs)
+    for run_state in state.values():
+        run_state["jobs"] = run.active_jobs(run_state["jobs"], queue_job_cmd)
+    in_flight = jobs_per_segment * sum(
+        len(run_state["jobs"]) for run_state in state.values()
+    )
+    for desc_file, results_dir in runs:
+        run_state = state.setdefault(
+            os.fspath(results_dir), {"status": "active", "jobs": []}
+        )
+        if run_state["status"] != "active":
+            continue
+        plan = run.plan_submission(desc_file, results_dir, queue_job_cmd)
+        if plan.start_segment is None:
+            if not run_state["jobs"]:
+                run_state["status"] = "completed"
+                log.info(plan.message)
+            continue
+        seg_no = plan.start_segment
+        if plan.failed_job is not None and not run_state.get("retry"):
+            run_state["status"] = "failed"
+            log.error(
+                f"segment {seg_no} of {results_dir.name} failed in job "
+                f"{plan.failed_job}; "
+                f"use --retry-failed to resubmit it after fixing the problem"
+            )
+            if run_state["jobs"]:
+                log.error(
+                    f"jobs {', '.join(run_state['jobs'])} that wait for it "
+                    f"should be cancelled"
+                )
+            continue
+        free_segments = (max_jobs - in_flight) // jobs_per_segment
+        if free_segments < 1:
+            continue
+        submit_job_msg = run.run(
+            desc_file,
+            results_dir,
+            max_segments=free_segments,
+            start_segment=seg_no,
+            waitjob=plan.waitjob,
+            quiet=True,
+            **run_kwargs,
+        )
+        job_ids = _submitted_job_ids(submit_job_msg)
+        log.info(
+            f"submitted segments {seg_no} to {seg_no + len(job_ids) - 1} of "
+            f"{results_dir.name} as jobs {', '.join(job_ids)}"
+        )
+        run_state["jobs"].extend(job_ids)
+        run_state.pop("retry", None)
+        in_flight += jobs_per_segment * len(job_ids)
+        # The state is stored after each submission so that an interruption can't
+        # lose track of submitted jobs
+        _write_state(state_file, state)
+    _write_state(state_file, state)
+    return in_flight
+
+
+def _submitted_job_ids(submit_job_msg):
+    """
+    :param str submit_job_msg: Message returned by :py:func:`salishsea_cmd.run.run`.
+
+    :return: Job numbers of the submitted segments.
+    :rtype: list
+    """
+    if submit_job_msg.startswith("Submitted jobs"):
+        return submit_job_msg.split()[2:]
+    return submit_job_msg.split()[-1:]
@@ -0,0 +1,107 @@
+#  Copyright 2013 – present by the SalishSeaCast Project Contributors
+#  and The University of British Columbia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# SPDX-License-Identifier: Apache-2.0
+
+
+"""SalishSeaCmd command plug-in for combine-restarts sub-command.
+
+Combine the per-processor restart files that a segment of a segmented
+SalishSeaCast NEMO run kept in its results directory
+(see the run sub-command --per-rank-restarts option)
+into restart files for the whole domain.
+"""
+
+import logging
+from pathlib import Path
+
+import cliff.command
+import nemo_cmd.api
+import nemo_cmd.prepare
+
+from salishsea_cmd import run
+
+log = logging.getLogger(__name__)
+
+
+class CombineRestarts(cliff.command.Command):
+    """Combine the per-processor restart files in a SalishSeaCast NEMO results directory."""
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.description = """
+            Combine the per-processor restart files in RESULTS_DIR into restart
+            files for the whole domain.
+            The per-processor restart files are deleted after they have been
+            combined.
+        """
+        parser.add_argument(
+            "desc_file",
+            metavar="DESC_FILE",
+            type=Path,
+            help="run description YAML file of the run that produced the restart files",
+        )
+        parser.add_argument(
+            "results_dir",
+            metavar="RESULTS_DIR",
+            type=Path,
+            help="directory that contains the per-processor restart files",
+        )
+        parser.add_argument(
+            "-q", "--quiet", action="store_true", help="Don't show progress messages."
+        )
+        return parser
+
+    def take_action(self, parsed_args):
+        """Execute the `salishsea combine-restarts` sub-command.
+
+        :param parsed_args: Arguments and options parsed from the command-line.
+        :type parsed_args: :class:`argparse.Namespace` instance
+        """
+        combine_restarts(
+            parsed_args.desc_file, parsed_args.results_dir, parsed_args.quiet
+        )
+
+
+def combine_restarts(desc_file, results_dir, quiet=False):
+    """Combine the per-processor restart files in results_dir into restart files
+    for the whole domain.
+
+    :param desc_file: File path/name of the YAML run description file of the run
+                      that produced the restart files.
+    :type desc_file: :py:class:`pathlib.Path`
+
+    :param results_dir: Directory that contains the per-processor restart files.
+    :type results_dir: :py:class:`pathlib.Path`
+
+    :param boolean quiet: Don't show progress messages.
+                          The default is to show progress messages.
+
+    :return: Combined restart file paths.
+    :rtype: list
+    """
+    if not results_dir.is_dir():
+        log.error(f"results directory not found: {results_dir}")
+        raise SystemExit(2)
+    run_desc = nemo_cmd.prepare.load_run_desc(desc_file)
+    rebuild_nemo = nemo_cmd.api.find_rebuild_nemo_script(run_desc)
+    combined = run.combine_rank_restarts(rebuild_nemo, results_dir.resolve())
+    if not quiet:
+        if combined:
+            for restart_file in combined:
+                log.info(f"Combined per-processor restart files into {restart_file}")
+        else:
+            log.info(f"No per-processor restart files found in {results_dir}")
+    return combined
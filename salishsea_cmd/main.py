@@ -24,25 +24,187 @@ This module is connected to the :command:`salishsea` command via a scripts and
 entry-points configuration in :file:`pyproject.toml`.
 """
 
+import functools
 import importlib.metadata
+import logging
 import sys
 
 import cliff.app
 import cliff.commandmanager
 
+log = logging.getLogger(__name__)
+
+# Number of allocation sites to include in --profile-memory reports
+PROFILE_MEMORY_TOP = 25
+
+
+class SalishSeaCommandManager(cliff.commandmanager.CommandManager):
+    """Command manager that registers the sub-commands declared in the
+    :kbd:`SalishSeaCmd` package metadata instead of scanning the entry points of
+    every installed distribution.
+
+    The entry points are stored unloaded,
+    so only the module of the sub-command that is invoked
+    (and its dependencies)
+    is imported.
+    Sub-commands that other distributions register in the same entry point group
+    are found by falling back to a full entry point scan the first time that a
+    command name is not recognized,
+    or when all of the commands are listed
+    (e.g. by :command:`salishsea help`).
+    """
+
+    def __init__(self, namespace, distribution, convert_underscores=False):
+        self._distribution = distribution
+        self._all_entry_points_loaded = False
+        super().__init__(namespace, convert_underscores=convert_underscores)
+
+    def load_commands(self, namespace):
+        """Load the commands declared in the distribution's entry points for namespace."""
+        self.group_list.append(namespace)
+        for ep in self._distribution.entry_points.select(group=namespace):
+            self.commands[self._cmd_name(ep)] = ep
+
+    def load_all_commands(self):
+        """Load the commands declared by all installed distributions for the
+        namespaces that have been loaded.
+        """
+        if self._all_entry_points_loaded:
+            return
+        for namespace in self.group_list:
+            for ep in importlib.metadata.entry_points(group=namespace):
+                self.commands.setdefault(self._cmd_name(ep), ep)
+        self._all_entry_points_loaded = True
+
+    def find_command(self, argv):
+        try:
+            return super().find_command(argv)
+        except ValueError:
+            if self._all_entry_points_loaded:
+                raise
+            self.load_all_commands()
+            return super().find_command(argv)
+
+    def __iter__(self):
+        self.load_all_commands()
+        return super().__iter__()
+
+    def _cmd_name(self, ep):
+        return ep.name.replace("_", " ") if self.convert_underscores else ep.name
+
 
 class SalishSeaApp(cliff.app.App):
     CONSOLE_MESSAGE_FORMAT = "%(name)s %(levelname)s: %(message)s"
 
     def __init__(self):
+        distribution = importlib.metadata.distribution("SalishSeaCmd")
         super().__init__(
             description="SalishSeaCast NEMO Command Processor",
-            version=importlib.metadata.version("SalishSeaCmd"),
-            command_manager=cliff.commandmanager.CommandManager(
-                "salishsea", convert_underscores=False
-            ),
+            version=distribution.version,
+            command_manager=SalishSeaCommandManager("salishsea", distribution),
             stderr=sys.stdout,
         )
+        self._profiling = False
+
+    def build_option_parser(self, description, version, argparse_kwargs=None):
+        parser = super().build_option_parser(description, version, argparse_kwargs)
+        parser.add_argument(
+            "--profile",
+            metavar="PATH",
+            help="Profile the sub-command with cProfile and write the stats to PATH.",
+        )
+        parser.add_argument(
+            "--profile-memory",
+            metavar="PATH",
+            help=(
+                f"Trace the sub-command's memory allocations with tracemalloc and write "
+                f"a report of the top {PROFILE_MEMORY_TOP} allocation sites to PATH."
+            ),
+        )
+        return parser
+
+    def prepare_to_run_command(self, cmd):
+        """Wrap the sub-command's :py:meth:`take_action` method in the profilers
+        requested by the :kbd:`--profile` and :kbd:`--profile-memory` options.
+
+        Sub-commands that are run while profiling is already in progress
+        (e.g. by :command:`salishsea worker`) are not wrapped again.
+        """
+        if self._profiling:
+            return
+        if self.options.profile or self.options.profile_memory:
+            cmd.take_action = self._profiled(cmd.take_action)
+
+    def _profiled(self, take_action):
+        @functools.wraps(take_action)
+        def profiled_take_action(parsed_args):
+            self._profiling = True
+            try:
+                return _profile(
+                    take_action,
+                    parsed_args,
+                    self.options.profile,
+                    self.options.profile_memory,
+                )
+            finally:
+                self._profiling = False
+
+        return profiled_take_action
+
+
+def _profile(take_action, parsed_args, profile_path, profile_memory_path):
+    """Call take_action with cProfile and/or tracemalloc enabled and write their
+    results to profile_path and profile_memory_path.
+
+    :param take_action: Sub-command method to profile.
+    :type take_action: callable
+
+    :param parsed_args: Arguments and options parsed from the command-line.
+    :type parsed_args: :class:`argparse.Namespace` instance
+
+    :param profile_path: File path to write the cProfile stats to,
+                         or :py:obj:`None` to skip cProfile.
+    :type profile_path: str or None
+
+    :param profile_memory_path: File path to write the tracemalloc report to,
+                                or :py:obj:`None` to skip tracemalloc.
+    :type profile_memory_path: str or None
+
+    :returns: take_action return value.
+    """
+    # Profilers are imported here so that they don't add to the command start-up time
+    # when they aren't used
+    if profile_memory_path:
+        import tracemalloc
+
+        tracemalloc.start()
+    if profile_path:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        return take_action(parsed_args)
+    finally:
+        if profile_path:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            log.info(f"cProfile stats written to {profile_path}")
+        if profile_memory_path:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            _write_memory_report(snapshot, profile_memory_path)
+            log.info(f"tracemalloc report written to {profile_memory_path}")
+
+
+def _write_memory_report(snapshot, report_path):
+    stats = snapshot.statistics("lineno")
+    total = sum(stat.size for stat in stats)
+    with open(report_path, "wt") as f:
+        f.write(f"Top {PROFILE_MEMORY_TOP} allocation sites by size\n")
+        for i, stat in enumerate(stats[:PROFILE_MEMORY_TOP], start=1):
+            f.write(f"#{i}: {stat}\n")
+        f.write(f"Total allocated size: {total / 1024:.1f} KiB\n")
 
 
 def main(argv=sys.argv[1:]):
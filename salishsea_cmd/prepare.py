@@ -25,12 +25,15 @@ in a specified directory and changes the pwd to that directory.
 import logging
 from pathlib import Path
 
+import attrs
 import cliff.command
 import nemo_cmd
 import nemo_cmd.api
 import nemo_cmd.prepare
 from nemo_cmd.prepare import get_run_desc_value
 
+from salishsea_cmd import timing
+
 logger = logging.getLogger(__name__)
 
 
@@ -64,6 +67,11 @@ class Prepare(cliff.command.Command):
             action="store_true",
             help="don't show the run directory path on completion",
         )
+        parser.add_argument(
+            "--timings",
+            action="store_true",
+            help="show a breakdown of the time taken by each preparation step",
+        )
         return parser
 
     def take_action(self, parsed_args):
@@ -76,13 +84,14 @@ class Prepare(cliff.command.Command):
         The path to the run directory is logged to the console on completion
         of the set-up.
         """
-        run_dir = prepare(parsed_args.desc_file, parsed_args.nocheck_init)
+        with timing.collect_timings(parsed_args.timings):
+            run_dir = prepare(parsed_args.desc_file, parsed_args.nocheck_init)
         if not parsed_args.quiet:
             logger.info(f"Created run directory {run_dir}")
         return run_dir
 
 
-def prepare(desc_file, nocheck_init):
+def prepare(desc_file, nocheck_init, run_desc=None, context=None):
     """Create and prepare the temporary run directory.
 
     The temporary run directory is created with a UUID as its name.
@@ -99,36 +108,104 @@ def prepare(desc_file, nocheck_init):
                        default is to check
     :type nocheck_init: boolean
 
+    :param dict run_desc: Run description dictionary that has already been loaded
+                          from desc_file;
+                          the default is to load it from desc_file.
+
+    :param context: Results of the checks that are the same for all of the runs
+                    prepared from a run description;
+                    the default is to do the checks.
+    :type context: :py:class:`PrepareContext`
+
     :returns: Path of the temporary run directory
     :rtype: :py:class:`pathlib.Path`
     """
-    run_desc = nemo_cmd.prepare.load_run_desc(desc_file)
-    nemo_bin_dir = nemo_cmd.prepare.check_nemo_exec(run_desc)
-    xios_bin_dir = nemo_cmd.prepare.check_xios_exec(run_desc)
-    nemo_cmd.api.find_rebuild_nemo_script(run_desc)
-    run_set_dir = nemo_cmd.resolved_path(desc_file).parent
-    run_dir = nemo_cmd.prepare.make_run_dir(run_desc)
-    nemo_cmd.prepare.make_namelists(run_set_dir, run_desc, run_dir)
-    nemo_cmd.prepare.copy_run_set_files(run_desc, desc_file, run_set_dir, run_dir)
-    nemo_cmd.prepare.make_executable_links(nemo_bin_dir, run_dir, xios_bin_dir)
-    nemo_cmd.prepare.make_grid_links(run_desc, run_dir)
-    nemo_cmd.prepare.make_forcing_links(run_desc, run_dir)
-    nemo_cmd.prepare.make_restart_links(run_desc, run_dir, nocheck_init)
-    _record_vcs_revisions(run_desc, run_dir)
-    nemo_cmd.prepare.add_agrif_files(
-        run_desc, desc_file, run_set_dir, run_dir, nocheck_init
-    )
+    with timing.span("prepare"):
+        if run_desc is None:
+            with timing.span("load_run_desc"):
+                run_desc = nemo_cmd.prepare.load_run_desc(desc_file)
+        if context is None:
+            context = prepare_context(run_desc)
+        run_set_dir = nemo_cmd.resolved_path(desc_file).parent
+        with timing.span("make_run_dir"):
+            run_dir = nemo_cmd.prepare.make_run_dir(run_desc)
+        with timing.span("make_namelists"):
+            nemo_cmd.prepare.make_namelists(run_set_dir, run_desc, run_dir)
+        with timing.span("copy_run_set_files"):
+            nemo_cmd.prepare.copy_run_set_files(
+                run_desc, desc_file, run_set_dir, run_dir
+            )
+        with timing.span("make_executable_links"):
+            nemo_cmd.prepare.make_executable_links(
+                context.nemo_bin_dir, run_dir, context.xios_bin_dir
+            )
+        with timing.span("make_grid_links"):
+            nemo_cmd.prepare.make_grid_links(run_desc, run_dir)
+        with timing.span("make_forcing_links"):
+            nemo_cmd.prepare.make_forcing_links(run_desc, run_dir)
+        with timing.span("make_restart_links"):
+            nemo_cmd.prepare.make_restart_links(run_desc, run_dir, nocheck_init)
+        with timing.span("record_vcs_revisions"):
+            _record_vcs_revisions(
+                run_desc,
+                run_dir,
+                code_repos=(context.nemo_code_repo, context.xios_code_repo),
+            )
+        with timing.span("add_agrif_files"):
+            nemo_cmd.prepare.add_agrif_files(
+                run_desc, desc_file, run_set_dir, run_dir, nocheck_init
+            )
     return run_dir
 
 
-def _record_vcs_revisions(run_desc, run_dir):
-    """Record revision and status information from version control system
-    repositories in files in the temporary run directory.
+@attrs.frozen
+class PrepareContext:
+    """Results of the checks and path resolutions that give the same answers for
+    every run that is prepared from a run description.
+
+    They are done once and shared by all of the segments of a segmented run.
+    """
+
+    #: Directory containing the NEMO executable
+    nemo_bin_dir: Path
+    #: Directory containing the XIOS executable
+    xios_bin_dir: Path
+    #: NEMO code repository
+    nemo_code_repo: Path
+    #: XIOS code repository
+    xios_code_repo: Path
+
+
+def prepare_context(run_desc):
+    """Check the NEMO and XIOS executables and the :program:`rebuild_nemo` script,
+    and resolve the code repository paths for runs prepared from run_desc.
 
     :param dict run_desc: Run description dictionary.
 
+    :rtype: :py:class:`PrepareContext`
+    """
+    with timing.span("check_execs"):
+        nemo_bin_dir = nemo_cmd.prepare.check_nemo_exec(run_desc)
+        xios_bin_dir = nemo_cmd.prepare.check_xios_exec(run_desc)
+        nemo_cmd.api.find_rebuild_nemo_script(run_desc)
+    nemo_code_repo, xios_code_repo = _code_repos(run_desc)
+    return PrepareContext(
+        nemo_bin_dir=nemo_bin_dir,
+        xios_bin_dir=xios_bin_dir,
+        nemo_code_repo=nemo_code_repo,
+        xios_code_repo=xios_code_repo,
+    )
+
+
+def _code_repos(run_desc, run_dir=None):
+    """
+    :param dict run_desc: Run description dictionary.
+
     :param run_dir: Path of the temporary run directory.
     :type run_dir: :py:class:`pathlib.Path`
+
+    :return: NEMO code repository path, XIOS code repository path
+    :rtype: 2-tuple
     """
     try:
         nemo_code_config = get_run_desc_value(
@@ -142,7 +219,25 @@ def _record_vcs_revisions(run_desc, run_dir):
     xios_code_repo = get_run_desc_value(
         run_desc, ("paths", "XIOS"), resolve_path=True, run_dir=run_dir
     )
-    for repo in (nemo_code_config.parent.parent, xios_code_repo):
+    return nemo_code_config.parent.parent, xios_code_repo
+
+
+def _record_vcs_revisions(run_desc, run_dir, code_repos=None):
+    """Record revision and status information from version control system
+    repositories in files in the temporary run directory.
+
+    :param dict run_desc: Run description dictionary.
+
+    :param run_dir: Path of the temporary run directory.
+    :type run_dir: :py:class:`pathlib.Path`
+
+    :param tuple code_repos: NEMO code and XIOS code repository paths that have
+                             already been resolved;
+                             the default is to resolve them from run_desc.
+    """
+    if code_repos is None:
+        code_repos = _code_repos(run_desc, run_dir)
+    for repo in code_repos:
         nemo_cmd.prepare.write_repo_rev_file(
             repo, run_dir, nemo_cmd.prepare.get_git_revision
         )
@@ -158,7 +253,7 @@ def _record_vcs_revisions(run_desc, run_dir):
             run_desc, ("vcs revisions", vcs_tool), run_dir=run_dir
         )
         for repo in repos:
-            if not Path(repo) in (nemo_code_config.parent.parent, xios_code_repo):
+            if not Path(repo) in code_repos:
                 nemo_cmd.prepare.write_repo_rev_file(
                     Path(repo), run_dir, vcs_funcs[vcs_tool]
                 )
@@ -21,26 +21,36 @@
 Prepare for, execute, and gather the results of a run of the SalishSeaCast NEMO model.
 """
 
-import copy
+import collections
+import collections.abc
+import concurrent.futures
+import contextvars
 import datetime
+import io
+import itertools
 import logging
 import math
 import os
 import shlex
 import socket
 import subprocess
+import sys
 import tempfile
 import textwrap
+import threading
+import warnings
 from pathlib import Path
 
 import arrow
+import attrs
 import cliff.command
 import f90nml
 import nemo_cmd
+import nemo_cmd.api
 import yaml
 from nemo_cmd.prepare import get_n_processors, get_run_desc_value, load_run_desc
 
-from salishsea_cmd import api
+from salishsea_cmd import api, backfill, timing
 
 log = logging.getLogger(__name__)
 
@@ -55,6 +65,14 @@ if SYSTEM in {"seawolf1", "seawolf2", "seawolf3"}:
 if SYSTEM in {"delta", "omega", "sigma"}:
     SYSTEM = "optimum"
 
+# Serializes the updates of the walltime history file by the threads that prepare
+# and submit the segments of a run
+_walltime_history_lock = threading.Lock()
+
+# File in which the MPI decomposition of the per-processor restart files that are kept
+# in a segment's results directory is recorded
+RANK_RESTARTS_RECORD = "rank_restarts.yaml"
+
 SEPARATE_DEFLATE_JOBS = {
     # deflate job type: file pattern
     "grid": "*_grid_[TUVW]*.nc",
@@ -62,6 +80,38 @@ SEPARATE_DEFLATE_JOBS = {
     "dia": "*_dia[12]_T*.nc",
 }
 
+# Coefficients of the per-processor memory estimates for runs that have a memory section
+# in their run description.
+# They are not fitted to measurements; they are deliberately generous counts from the
+# NEMO-3.6 allocations, and the estimates that they give for the SalishSeaCast
+# configuration (398x898x40 grid on 8x18 processors) are checked in the test suite
+# against the fixed pmem=2000mb per processor that SalishSeaCast runs were submitted
+# with on the TORQUE clusters before memory estimates were added.
+# Compare an estimate with the MaxRSS that sacct reports for a job of the run when
+# changing them.
+MEMORY_ESTIMATE = {
+    # 8 byte 3d arrays per grid point of a NEMO processor's sub-domain;
+    # the ocean state at 3 time levels, the domain scale factors and masks,
+    # the vertical mixing and lateral diffusion coefficients, and work arrays
+    "nemo 3d arrays": 150,
+    # Additional 8 byte 3d arrays per passive tracer;
+    # the tracer at 3 time levels, its trends, and advection work arrays
+    "tracer 3d arrays": 8,
+    # MiB per NEMO processor for the executable, MPI buffers, and 2d fields
+    "nemo base MiB": 300,
+    # MiB per XIOS server processor
+    "xios server MiB": 2000,
+}
+
+# MPI process placement profiles for the systems where placement is not left to mpirun;
+# they are overridden by the mpi placement section of the run description
+MPI_PLACEMENT = {
+    # MOAD development machine
+    "salish": {"nemo": {"bind to": "none"}, "xios": {"bind to": "none"}},
+    # EOAS optimum cluster
+    "optimum": {"nemo": {"bind to": "core"}, "xios": {"bind to": "core"}},
+}
+
 
 class Run(cliff.command.Command):
     """Prepare, execute, and gather results from a SalishSeaCast NEMO model run."""
@@ -122,6 +172,16 @@ class Run(cliff.command.Command):
             the file_group definitions in your file_def.xml file.
             """,
         )
+        parser.add_argument(
+            "--job-array",
+            dest="job_array",
+            action="store_true",
+            help="""
+            Submit the segments of a segmented run as a single Slurm job array
+            that runs one segment at a time, in order,
+            instead of submitting one job per segment.
+            """,
+        )
         parser.add_argument(
             "--max-deflate-jobs",
             dest="max_deflate_jobs",
@@ -152,6 +212,81 @@ class Run(cliff.command.Command):
             once.
             """,
         )
+        parser.add_argument(
+            "--per-rank-restarts",
+            dest="per_rank_restarts",
+            action="store_true",
+            help="""
+            Keep the per-processor restart files of the segments of a segmented run
+            instead of combining them, and link them into the run directory of the
+            next segment. Only the restart files of the last segment are combined.
+            """,
+        )
+        parser.add_argument(
+            "--prepare-jobs",
+            dest="prepare_jobs",
+            type=int,
+            default=1,
+            help="""
+            Maximum number of segment run directories of a segmented run to
+            prepare concurrently. The segment jobs are still submitted in order.
+            Defaults to 1.""",
+        )
+        parser.add_argument(
+            "--restart-handoff",
+            dest="restart_handoff",
+            action="store_true",
+            help="""
+            Move the restart files to the results directory right after the NEMO
+            run and do the combine, deflate, and gather steps in a separate job,
+            so that the next segment of a segmented run only waits for the restart
+            files.
+            """,
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="""
+            Resume a segmented run after a failure or an interrupted submission.
+            The segment results directories are scanned for the last segment with
+            complete restart files, and only the segments after it are prepared
+            and submitted; segments whose jobs are still queued or running are
+            skipped.
+            """,
+        )
+        parser.add_argument(
+            "--segments-per-job",
+            dest="segments_per_job",
+            type=int,
+            default=1,
+            help="""
+            Number of consecutive segments of a segmented run to execute one after
+            another in each job, so that they don't wait in the queue between them.
+            Defaults to 1.
+            """,
+        )
+        parser.add_argument(
+            "--recovery-attempt",
+            dest="recovery_attempt",
+            type=int,
+            default=0,
+            help="""
+            Number of the attempt to recover the --start-segment segment of a
+            self-chaining segmented run from the newest intermediate restart files
+            in its results directory. Used by the segment jobs of runs that have
+            failure recovery in their run descriptions to resubmit failed segments.
+            """,
+        )
+        parser.add_argument(
+            "--self-chain",
+            dest="self_chain",
+            action="store_true",
+            help="""
+            Submit only the 1st segment of a segmented run. Each segment's job
+            prepares and submits the next segment when its NEMO run succeeds,
+            so only 1 job of the run is queued at a time.
+            """,
+        )
         parser.add_argument(
             "--separate-deflate",
             dest="separate_deflate",
@@ -162,6 +297,25 @@ class Run(cliff.command.Command):
             queue manager's job chaining feature.
             """,
         )
+        parser.add_argument(
+            "--start-segment",
+            dest="start_segment",
+            type=int,
+            default=None,
+            help="""
+            Segment number to start a segmented run at, using the restart files
+            from the results of the preceding segment. Used by the --self-chain
+            jobs to submit their next segments.
+            """,
+        )
+        parser.add_argument(
+            "--timings",
+            action="store_true",
+            help="""
+            Show a breakdown of the time taken by each step of preparing and
+            submitting the run.
+            """,
+        )
         parser.add_argument(
             "--waitjob",
             default="0",
@@ -170,6 +324,15 @@ class Run(cliff.command.Command):
             WAITJOB.  WAITJOB is the queue job number of the job to wait for.
             """,
         )
+        parser.add_argument(
+            "--worker",
+            action="store_true",
+            help="""
+            Start a resident "salishsea worker" process in the job and send the
+            combine, deflate, and gather steps to it so that the interpreter start-up
+            and imports are done once per job instead of once per step.
+            """,
+        )
         parser.add_argument(
             "-q",
             "--quiet",
@@ -187,19 +350,30 @@ class Run(cliff.command.Command):
         :param parsed_args: Arguments and options parsed from the command-line.
         :type parsed_args: :class:`argparse.Namespace` instance
         """
-        qsub_msg = run(
-            parsed_args.desc_file,
-            parsed_args.results_dir,
-            cores_per_node=parsed_args.cores_per_node,
-            cpu_arch=parsed_args.cpu_arch,
-            deflate=parsed_args.deflate,
-            max_deflate_jobs=parsed_args.max_deflate_jobs,
-            nocheck_init=parsed_args.nocheck_init,
-            no_submit=parsed_args.no_submit,
-            separate_deflate=parsed_args.separate_deflate,
-            waitjob=parsed_args.waitjob,
-            quiet=parsed_args.quiet,
-        )
+        with timing.collect_timings(parsed_args.timings):
+            qsub_msg = run(
+                parsed_args.desc_file,
+                parsed_args.results_dir,
+                cores_per_node=parsed_args.cores_per_node,
+                cpu_arch=parsed_args.cpu_arch,
+                deflate=parsed_args.deflate,
+                job_array=parsed_args.job_array,
+                max_deflate_jobs=parsed_args.max_deflate_jobs,
+                nocheck_init=parsed_args.nocheck_init,
+                no_submit=parsed_args.no_submit,
+                per_rank_restarts=parsed_args.per_rank_restarts,
+                prepare_jobs=parsed_args.prepare_jobs,
+                recovery_attempt=parsed_args.recovery_attempt,
+                restart_handoff=parsed_args.restart_handoff,
+                resume=parsed_args.resume,
+                segments_per_job=parsed_args.segments_per_job,
+                self_chain=parsed_args.self_chain,
+                separate_deflate=parsed_args.separate_deflate,
+                start_segment=parsed_args.start_segment,
+                waitjob=parsed_args.waitjob,
+                worker=parsed_args.worker,
+                quiet=parsed_args.quiet,
+            )
         if not parsed_args.quiet and not parsed_args.separate_deflate:
             log.info(qsub_msg)
 
@@ -210,11 +384,22 @@ def run(
     cores_per_node="",
     cpu_arch="",
     deflate=False,
+    job_array=False,
     max_deflate_jobs=4,
+    max_segments=None,
     nocheck_init=False,
     no_submit=False,
+    per_rank_restarts=False,
+    prepare_jobs=1,
+    recovery_attempt=0,
+    restart_handoff=False,
+    resume=False,
+    segments_per_job=1,
+    self_chain=False,
     separate_deflate=False,
+    start_segment=None,
     waitjob="0",
+    worker=False,
     quiet=False,
 ):
     """Create and populate a temporary run directory, and a run script,
@@ -246,9 +431,17 @@ def run(
     :param boolean deflate: Include "salishsea deflate" command in the bash
                             script.
 
+    :param boolean job_array: Submit the segments of a segmented run as a single
+                              Slurm job array that runs the segments one at a time.
+
     :param int max_deflate_jobs: Maximum number of concurrent sub-processes to
                                  use for netCDF deflating.
 
+    :param int max_segments: Maximum number of segments of a segmented run to
+                             submit, starting at start_segment;
+                             the default is to submit all of the remaining
+                             segments.
+
     :param boolean nocheck_init: Suppress initial condition link check
                                  the default is to check
 
@@ -256,13 +449,52 @@ def run(
                               and the bash script to execute the NEMO run,
                               but don't submit the run to the queue.
 
+    :param boolean per_rank_restarts: Keep the per-processor restart files of the
+                                      segments of a segmented run instead of
+                                      combining them, and link them into the run
+                                      directory of the next segment;
+                                      the restart files of the last segment are
+                                      combined.
+
+    :param int prepare_jobs: Maximum number of segment run directories of a
+                             segmented run to prepare concurrently.
+                             The segment jobs are submitted in order.
+
+    :param int recovery_attempt: Number of the attempt to recover the start_segment
+                                 segment of a self-chaining segmented run from the
+                                 newest intermediate restart files in its results
+                                 directory;
+                                 the default is to run the segment from its start.
+
+    :param boolean restart_handoff: Move the restart files to the results directory
+                                    right after the NEMO run and do the combine,
+                                    deflate, and gather steps in a separate job.
+
+    :param boolean resume: Start a segmented run after its last segment that has
+                           complete restart files, skipping segments whose jobs
+                           are still queued or running.
+
+    :param int segments_per_job: Number of consecutive segments of a segmented run
+                                 to execute one after another in each job.
+
+    :param boolean self_chain: Submit only the 1st segment of a segmented run;
+                               each segment's job prepares and submits the next
+                               segment when its NEMO run succeeds.
+
     :param boolean separate_deflate: Produce separate bash scripts to deflate
                                      the run results and qsub them to run as
                                      serial jobs after the NEMO run finishes.
 
+    :param int start_segment: Segment number to start a segmented run at;
+                              the default is the first segment number in the
+                              run description.
+
     :param str waitjob: Job number of the job to wait for successful completion
                         of before starting this job.
 
+    :param boolean worker: Execute the combine, deflate, and gather steps in the
+                           job via a resident :command:`salishsea worker` process.
+
     :param boolean quiet: Don't show the run directory path message;
                           the default is to show the temporary run directory
                           path.
@@ -271,8 +503,343 @@ def run(
               run script.
     :rtype: str
     """
+    queue_job_cmd = queue_job_command()
+    _check_run_options(
+        queue_job_cmd,
+        job_array,
+        max_segments,
+        recovery_attempt,
+        restart_handoff,
+        resume,
+        segments_per_job,
+        self_chain,
+        start_segment,
+    )
+    results_dir = nemo_cmd.resolved_path(results_dir)
+    if resume:
+        with timing.span("plan_submission"):
+            plan = plan_submission(desc_file, results_dir, queue_job_cmd)
+        if plan.start_segment is None:
+            return plan.message
+        start_segment = plan.start_segment
+        if plan.waitjob != "0":
+            waitjob = plan.waitjob
+    if self_chain:
+        # Options that the segment jobs use to prepare and submit their next segments
+        chain_args = _self_chain_args(
+            desc_file,
+            results_dir,
+            cores_per_node,
+            cpu_arch,
+            deflate,
+            max_deflate_jobs,
+            nocheck_init,
+            per_rank_restarts,
+            restart_handoff,
+            separate_deflate,
+            worker,
+            quiet,
+        )
+    with timing.span("run"), tempfile.TemporaryDirectory() as tmp_run_desc_dir:
+        # Segmented runs require construction of segment YAML files & namelist files
+        # in temporary storage; namelist templates are read once per invocation
+        tmp_run_desc_dir = Path(tmp_run_desc_dir)
+        namelist_texts = {}
+        with timing.span("calc_run_segments"):
+            run_segments = _calc_run_segments(
+                desc_file, results_dir, start_seg_no=start_segment
+            )
+        if recovery_attempt:
+            with timing.span("recover_segment"):
+                run_segments = _recover_first_segment(run_segments, recovery_attempt)
+        if self_chain or segments_per_job > 1 or per_rank_restarts:
+            last_seg_no = run_segments.first_seg_no + len(run_segments) - 1
+        if max_segments is not None and len(run_segments) > max_segments:
+            # The rest of the segments are submitted by a later invocation,
+            # so they are still counted in last_seg_no
+            all_segments = run_segments
+            run_segments = attrs.evolve(
+                run_segments,
+                n_segments=max_segments,
+                segments=lambda: itertools.islice(all_segments, max_segments),
+            )
+        # The executables checks and code repo paths are the same for all segments,
+        # so they are done once for the invocation rather than once per segment
+        first_segment = next(iter(run_segments))
+        if "backfill" in first_segment.run_desc and queue_job_cmd != "sbatch":
+            log.error(
+                f"backfill job resource selection is not available for systems "
+                f"that launch jobs with {queue_job_cmd}"
+            )
+            raise SystemExit(2)
+        if (
+            first_segment.segmented
+            and not self_chain
+            and _max_recovery_attempts(first_segment.run_desc)
+        ):
+            log.warning(
+                "failure recovery requires --self-chain, so failed segments of "
+                "this run will not be resubmitted from their intermediate restart "
+                "files"
+            )
+        prepare_context = api.prepare_context(first_segment.run_desc)
+
+        def prepare_segment(segment, restart_dir, nocheck_init):
+            run_desc, segment_desc_file = segment.run_desc, segment.desc_file
+            rank_restarts = {}
+            if segment.segmented:
+                # Each segment's files are written in a directory of their own so
+                # that segments can be prepared concurrently
+                segment_dir = tmp_run_desc_dir / f"{segment.seg_no}"
+                segment_dir.mkdir()
+                with timing.span("write_segment_files"):
+                    segment_namrun = _write_segment_namrun_namelist(
+                        run_desc,
+                        segment.namelist_namrun_patch,
+                        segment_dir,
+                        namelist_texts=namelist_texts,
+                    )
+                    run_desc, segment_desc_file, rank_restarts = (
+                        _write_segment_desc_file(
+                            run_desc,
+                            segment.desc_file,
+                            restart_dir,
+                            segment_namrun,
+                            segment_dir,
+                            restart_timestep=segment.nn_it000 - 1,
+                            per_rank_restarts=per_rank_restarts,
+                        )
+                    )
+                if (
+                    segments_per_job > 1
+                    and (segment.seg_no - run_segments.first_seg_no) % segments_per_job
+                    == 0
+                ):
+                    # The 1st segment's scheduler directives are used for the job
+                    # that executes the segments, so its walltime is for them all
+                    n_job_segments = min(
+                        segments_per_job, last_seg_no - segment.seg_no + 1
+                    )
+                    run_desc = {
+                        **run_desc,
+                        "walltime": n_job_segments
+                        * _walltime_seconds(
+                            get_run_desc_value(run_desc, ("walltime",))
+                        ),
+                    }
+            chain_cmd = (
+                f"{chain_args} --start-segment {segment.seg_no + 1}"
+                if self_chain and segment.segmented and segment.seg_no < last_seg_no
+                else None
+            )
+            # A failed segment is resubmitted by its own job, so the recovery
+            # attempts are counted by the jobs of the segment
+            recovery_cmd = (
+                f"{chain_args} --start-segment {segment.seg_no} "
+                f"--recovery-attempt {recovery_attempt + 1}"
+                if self_chain
+                and segment.segmented
+                and recovery_attempt < _max_recovery_attempts(segment.run_desc)
+                else None
+            )
+            # Only a job that doesn't wait for another job can start in a backfill
+            # window when it is submitted
+            backfill = (
+                "backfill" in run_desc
+                and waitjob == "0"
+                and segment.seg_no == first_segment.seg_no
+            )
+            # The walltime of a job that executes several segments is left as the
+            # sum of their segment walltimes
+            predict_walltime = (
+                "walltime prediction" in run_desc and segments_per_job == 1
+            )
+            # The restart files of the last segment are combined for use outside of
+            # the run
+            keep_rank_restarts = (
+                per_rank_restarts and segment.segmented and segment.seg_no < last_seg_no
+            )
+            run_dir, batch_file = _build_tmp_run_dir(
+                run_desc,
+                segment_desc_file,
+                segment.results_dir,
+                cores_per_node,
+                cpu_arch,
+                deflate,
+                max_deflate_jobs,
+                separate_deflate,
+                nocheck_init,
+                quiet,
+                worker=worker,
+                prepare_context=prepare_context,
+                chain_cmd=chain_cmd,
+                recovery_cmd=recovery_cmd,
+                recovery_attempt=recovery_attempt,
+                keep_rank_restarts=keep_rank_restarts,
+                restart_handoff=restart_handoff,
+                backfill=backfill,
+                predict_walltime=predict_walltime,
+                rank_restarts=rank_restarts,
+            )
+            return batch_file
+
+        submit_job_msg = "Submitted jobs"
+        prepared_segments = _prepare_segments(
+            run_segments,
+            prepare_segment,
+            nocheck_init,
+            # Only the 1st segment is prepared when the run is not submitted,
+            # or when the segment jobs submit their successors
+            1 if no_submit or self_chain else prepare_jobs,
+        )
+        array_segments = []
+        job_segments = []
+        for segment, batch_file in prepared_segments:
+            segment.results_dir.mkdir(parents=True, exist_ok=True)
+            if no_submit:
+                return
+            if job_array and len(run_segments) != 1:
+                array_segments.append((segment, batch_file))
+                continue
+            job_segments.append((segment, batch_file))
+            if segments_per_job > 1 and segment.segmented:
+                if (
+                    len(job_segments) < segments_per_job
+                    and segment.seg_no < last_seg_no
+                ):
+                    continue
+                with timing.span("build_segments_script"):
+                    batch_file = _write_segments_script(job_segments)
+            with timing.span("submit_job"):
+                msg = _submit_job(batch_file, queue_job_cmd, waitjob=waitjob)
+            if segment.segmented and queue_job_cmd != "bash":
+                _record_submitted_segments(
+                    results_dir,
+                    [(job_segment, msg.split()[-1]) for job_segment, _ in job_segments],
+                )
+            if "walltime prediction" in segment.run_desc and queue_job_cmd != "bash":
+                _record_walltime_history(
+                    segment.run_desc,
+                    [job_segment.results_dir for job_segment, _ in job_segments],
+                )
+            # The results are deflated after they have been gathered
+            deflate_after_msg = msg
+            if restart_handoff:
+                with timing.span("submit_post_job"):
+                    deflate_after_msg = _submit_post_job(batch_file, msg, queue_job_cmd)
+            if separate_deflate:
+                with timing.span("submit_separate_deflate_jobs"):
+                    for _, segment_batch_file in job_segments:
+                        _submit_separate_deflate_jobs(
+                            segment_batch_file, deflate_after_msg, queue_job_cmd
+                        )
+            job_segments = []
+            if len(run_segments) != 1:
+                submit_job_msg = f"{submit_job_msg} {msg.split()[-1]}"
+                waitjob = msg
+            else:
+                submit_job_msg = msg
+            if self_chain:
+                # The rest of the segments are submitted by the segment jobs
+                break
+        if array_segments:
+            with timing.span("submit_job_array"):
+                submit_job_msg, task_jobs = _submit_job_array(
+                    array_segments, waitjob, separate_deflate
+                )
+            _record_submitted_segments(
+                results_dir,
+                [
+                    (segment, task_job)
+                    for (segment, _), task_job in zip(array_segments, task_jobs)
+                ],
+            )
+            if "walltime prediction" in first_segment.run_desc:
+                _record_walltime_history(
+                    first_segment.run_desc,
+                    [segment.results_dir for segment, _ in array_segments],
+                )
+    return submit_job_msg
+
+
+def _check_run_options(
+    queue_job_cmd,
+    job_array,
+    max_segments,
+    recovery_attempt,
+    restart_handoff,
+    resume,
+    segments_per_job,
+    self_chain,
+    start_segment,
+):
+    """Check that the combination of :py:func:`run` options can be used together
+    on the system that we are running on.
+
+    :param str queue_job_cmd: Command to submit jobs to the queue manager.
+
+    :param boolean job_array: Submit the segments as a Slurm job array.
+
+    :param int max_segments: Maximum number of segments to submit.
+
+    :param int recovery_attempt: Number of the attempt to recover the start segment.
+
+    :param boolean restart_handoff: Do the combine, deflate, and gather steps in
+                                    a separate job.
+
+    :param boolean resume: Start a segmented run after its last completed segment.
+
+    :param int segments_per_job: Number of consecutive segments to execute in each job.
+
+    :param boolean self_chain: Submit only the 1st segment of a segmented run.
+
+    :param int start_segment: Segment number to start a segmented run at.
+    """
+    if job_array and queue_job_cmd != "sbatch":
+        log.error(
+            f"job arrays are not available for systems that launch jobs with "
+            f"{queue_job_cmd}"
+        )
+        raise SystemExit(2)
+    if restart_handoff and queue_job_cmd == "bash":
+        log.error(
+            f"restart hand-off is not available for systems that launch jobs with "
+            f"{queue_job_cmd}"
+        )
+        raise SystemExit(2)
+    if restart_handoff and (job_array or segments_per_job > 1):
+        log.error(
+            "--restart-handoff can't be used with --job-array or --segments-per-job"
+        )
+        raise SystemExit(2)
+    if sum((job_array, self_chain, segments_per_job > 1)) > 1:
+        log.error(
+            "only one of --job-array, --self-chain, and --segments-per-job "
+            "can be used"
+        )
+        raise SystemExit(2)
+    if max_segments is not None and (job_array or self_chain or segments_per_job > 1):
+        log.error(
+            "max_segments can't be used with --job-array, --self-chain, "
+            "or --segments-per-job"
+        )
+        raise SystemExit(2)
+    if resume and start_segment is not None:
+        log.error("--resume can't be used with --start-segment")
+        raise SystemExit(2)
+    if recovery_attempt and (start_segment is None or not self_chain):
+        log.error("--recovery-attempt requires --start-segment and --self-chain")
+        raise SystemExit(2)
+
+
+def queue_job_command():
+    """
+    :return: Command to submit jobs to the queue manager on the system
+             that we are running on.
+    :rtype: str
+    """
     try:
-        queue_job_cmd = {
+        return {
             # Alliance Canada clusters
             "fir": "sbatch",
             "narval": "sbatch",
@@ -294,196 +861,928 @@ def run(
             f"If you are working on sockeye, please load the gcc module"
         )
         raise SystemExit(2)
-    results_dir = nemo_cmd.resolved_path(results_dir)
-    run_segments, first_seg_no = _calc_run_segments(desc_file, results_dir)
-    submit_job_msg = "Submitted jobs"
-    for seg_no, (run_desc, desc_file, results_dir, namelist_namrun_patch) in enumerate(
-        run_segments, start=first_seg_no
-    ):
-        with tempfile.TemporaryDirectory() as tmp_run_desc_dir:
-            if isinstance(desc_file, str):
-                # Segmented run requires construction of segment YAML files & namelist files
-                # in temporary storage
-                segment_namrun = _write_segment_namrun_namelist(
-                    run_desc, namelist_namrun_patch, Path(tmp_run_desc_dir)
-                )
-                restart_dir = (
-                    None
-                    if seg_no == first_seg_no
-                    else run_segments[seg_no - first_seg_no - 1][2]
-                )
-                run_desc, segment_desc_file = _write_segment_desc_file(
-                    run_desc,
-                    desc_file,
-                    restart_dir,
-                    segment_namrun,
-                    Path(tmp_run_desc_dir),
-                )
-            else:
-                segment_desc_file = desc_file
-            run_dir, batch_file = _build_tmp_run_dir(
-                run_desc,
-                segment_desc_file,
-                results_dir,
-                cores_per_node,
-                cpu_arch,
-                deflate,
-                max_deflate_jobs,
-                separate_deflate,
-                nocheck_init,
-                quiet,
-            )
-        results_dir.mkdir(parents=True, exist_ok=True)
-        if no_submit:
-            return
-        msg = _submit_job(batch_file, queue_job_cmd, waitjob=waitjob)
-        if separate_deflate:
-            _submit_separate_deflate_jobs(batch_file, msg, queue_job_cmd)
-        if len(run_segments) != 1:
-            submit_job_msg = f"{submit_job_msg} {msg.split()[-1]}"
-            nocheck_init = True
-            waitjob = msg
-        else:
-            submit_job_msg = msg
-    return submit_job_msg
 
 
-def _calc_run_segments(desc_file, results_dir):
+@attrs.frozen
+class RunSegment:
+    """Description of one segment of a run.
+
+    A run that is not segmented is a single segment that has no namrun namelist values.
+    """
+
+    #: Run description dict for the segment;
+    #: for segmented runs it is a shallow copy of the base run description
+    #: with only the :kbd:`run_id` replaced.
+    run_desc: dict
+    #: Run description YAML file for the segment;
+    #: a file name for segmented runs.
+    desc_file: Path | str
+    #: Results directory for the segment
+    results_dir: Path
+    seg_no: int = 0
+    nn_it000: int | None = None
+    nn_itend: int | None = None
+    nn_date0: int | None = None
+    #: Directory in which to find the restart file(s) for the segment;
+    #: :py:obj:`None` to use those in the run description.
+    restart_dir: Path | None = None
+    #: Time of day that the segment starts at, formatted as :kbd:`HHMM`,
+    #: for runs with sub-daily segments;
+    #: :py:obj:`None` for segments that start at midnight.
+    nn_time0: int | None = None
+    #: Number of time steps between the intermediate restart files that are written
+    #: during the segment for failure recovery;
+    #: :py:obj:`None` to use the value in the namrun namelist.
+    nn_stock: int | None = None
+
+    @property
+    def segmented(self):
+        return self.nn_it000 is not None
+
+    @property
+    def namelist_namrun_patch(self):
+        """f90nml namelist patch for the segment for the namelist containing namrun."""
+        if not self.segmented:
+            return {}
+        namrun = {
+            "nn_it000": self.nn_it000,
+            "nn_itend": self.nn_itend,
+            "nn_date0": self.nn_date0,
+        }
+        if self.nn_time0 is not None:
+            namrun["nn_time0"] = self.nn_time0
+        if self.nn_stock is not None:
+            namrun["nn_stock"] = self.nn_stock
+        return {"namrun": namrun}
+
+
+@attrs.frozen
+class RunSegments:
+    """Sequence of the segments of a run that generates them when it is iterated over."""
+
+    first_seg_no: int
+    n_segments: int
+    _segments: collections.abc.Callable[[], collections.abc.Iterator[RunSegment]]
+
+    def __len__(self):
+        return self.n_segments
+
+    def __iter__(self):
+        return self._segments()
+
+
+def _calc_run_segments(desc_file, results_dir, start_seg_no=None):
+    """
+    :param desc_file: File path/name of the run description YAML file.
+    :type desc_file: :py:class:`pathlib.Path`
+
+    :param results_dir: Path of the directory in which to store the run results.
+    :type results_dir: :py:class:`pathlib.Path`
+
+    :param int start_seg_no: Segment number to start the run at;
+                             the default is the first segment number in the
+                             run description.
+
+    :return: Segments of the run.
+    :rtype: :py:class:`RunSegments`
+    """
     run_desc = load_run_desc(desc_file)
     if "segmented run" not in run_desc:
-        first_seg_no = 0
-        return [(run_desc, desc_file, results_dir, {})], first_seg_no
+        segment = RunSegment(run_desc, desc_file, results_dir)
+        return RunSegments(
+            first_seg_no=0, n_segments=1, segments=lambda: iter([segment])
+        )
     base_run_id = get_run_desc_value(run_desc, ("run_id",))
     start_date = arrow.get(
         get_run_desc_value(run_desc, ("segmented run", "start date"))
     )
     start_timestep = get_run_desc_value(run_desc, ("segmented run", "start time step"))
     end_date = arrow.get(get_run_desc_value(run_desc, ("segmented run", "end date")))
-    days_per_segment = get_run_desc_value(
-        run_desc, ("segmented run", "days per segment")
-    )
+    segment_seconds = _segment_seconds(run_desc)
+    sub_daily = segment_seconds % (24 * 60 * 60) != 0
     namelist_namdom = get_run_desc_value(
         run_desc, ("segmented run", "namelists", "namdom"), expand_path=True
     )
     rn_rdt = f90nml.read(namelist_namdom)["namdom"]["rn_rdt"]
-    timesteps_per_day = 24 * 60 * 60 / rn_rdt
+    # The run ends at the end of the end date
+    end_timestep = start_timestep + _seconds_to_timesteps(
+        (end_date.shift(days=+1) - start_date).total_seconds(), rn_rdt
+    )
     n_segments = _calc_n_segments(run_desc)
-    run_segments = []
     first_seg_no = get_run_desc_value(
         run_desc, ("segmented run", "first segment number")
     )
-    for i, seg_no in enumerate(range(first_seg_no, first_seg_no + n_segments)):
-        segment_run_id = f"{seg_no}_{base_run_id}"
-        segment_run_desc = copy.deepcopy(run_desc)
-        segment_run_desc["run_id"] = segment_run_id
-        nn_it000 = int(start_timestep + i * days_per_segment * timesteps_per_day)
-        date0 = min(start_date.shift(days=+i * days_per_segment), end_date)
-        segment_days = min(
-            days_per_segment,
-            (end_date - start_date.shift(days=+i * days_per_segment)).days + 1,
-        )
-        nn_itend = int(nn_it000 + segment_days * timesteps_per_day - 1)
-        run_segments.append(
-            (
-                # Run description dict for the segment
-                segment_run_desc,
-                # Run description YAML file name for the segment
-                f"{desc_file.stem}_{seg_no}{desc_file.suffix}",
-                # Results directory for the segment
-                results_dir.parent / f"{results_dir.name}_{seg_no}",
-                # f90nml namelist patch for the segment for the namelist containing namrum
-                {
-                    "namrun": {
-                        "nn_it000": nn_it000,
-                        "nn_itend": nn_itend,
-                        "nn_date0": int(date0.format("YYYYMMDD")),
-                    }
-                },
-            )
+    start_seg_no = first_seg_no if start_seg_no is None else start_seg_no
+    # Segments are planned from the start of the run unless the remaining segments
+    # are re-planned from the measured throughput of the completed ones
+    plan_seg_no, plan_timestep = first_seg_no, start_timestep
+    if start_seg_no > first_seg_no and _adaptive_days_per_segment(run_desc):
+        plan_timestep, segment_seconds = _replan_segments(
+            run_desc,
+            [
+                results_dir.parent / f"{results_dir.name}_{seg_no}"
+                for seg_no in range(first_seg_no, start_seg_no)
+            ],
+            start_timestep,
+            rn_rdt,
+        )
+        plan_seg_no = start_seg_no
+        n_segments = (start_seg_no - first_seg_no) + math.ceil(
+            (end_timestep - plan_timestep)
+            / _seconds_to_timesteps(segment_seconds, rn_rdt)
         )
-    return run_segments, first_seg_no
+    if not first_seg_no <= start_seg_no < first_seg_no + n_segments:
+        log.error(
+            f"start segment number {start_seg_no} is not in the range of segment "
+            f"numbers of the run: {first_seg_no} to {first_seg_no + n_segments - 1}"
+        )
+        raise SystemExit(2)
+    timesteps_per_segment = _seconds_to_timesteps(segment_seconds, rn_rdt)
+    nn_stock = (
+        _restart_interval_timesteps(run_desc, timesteps_per_segment, rn_rdt)
+        if "failure recovery" in run_desc["segmented run"]
+        else None
+    )
 
+    def segments():
+        for seg_no in range(start_seg_no, first_seg_no + n_segments):
+            nn_it000 = plan_timestep + (seg_no - plan_seg_no) * timesteps_per_segment
+            date0 = start_date.shift(seconds=+(nn_it000 - start_timestep) * rn_rdt)
+            yield RunSegment(
+                run_desc={**run_desc, "run_id": f"{seg_no}_{base_run_id}"},
+                desc_file=f"{desc_file.stem}_{seg_no}{desc_file.suffix}",
+                results_dir=results_dir.parent / f"{results_dir.name}_{seg_no}",
+                seg_no=seg_no,
+                nn_it000=nn_it000,
+                nn_itend=min(nn_it000 + timesteps_per_segment, end_timestep) - 1,
+                nn_date0=int(date0.format("YYYYMMDD")),
+                restart_dir=(
+                    results_dir.parent / f"{results_dir.name}_{seg_no - 1}"
+                    if seg_no > first_seg_no
+                    else None
+                ),
+                nn_time0=int(date0.format("HHmm")) if sub_daily else None,
+                nn_stock=nn_stock,
+            )
 
-def _calc_n_segments(run_desc):
-    run_start_date = arrow.get(
-        get_run_desc_value(run_desc, ("segmented run", "start date"))
-    )
-    run_end_date = arrow.get(
-        get_run_desc_value(run_desc, ("segmented run", "end date"))
-    )
-    days_per_segment = get_run_desc_value(
-        run_desc, ("segmented run", "days per segment")
+    return RunSegments(
+        first_seg_no=start_seg_no,
+        n_segments=n_segments - (start_seg_no - first_seg_no),
+        segments=segments,
     )
 
-    n_segments_delta = (run_end_date.shift(days=+1) - run_start_date) / days_per_segment
-    n_segments = n_segments_delta.days + math.ceil(
-        n_segments_delta.seconds / (60 * 60 * 24)
-    )
-    return n_segments
 
+def _adaptive_days_per_segment(run_desc):
+    """
+    :param dict run_desc: Run description dictionary.
 
-def _write_segment_namrun_namelist(run_desc, namelist_namrun_patch, tmp_run_desc_dir):
+    :return: Re-plan the segments after the completed ones of a segmented run
+             from their measured throughput.
+    :rtype: boolean
     """
+    try:
+        return bool(
+            get_run_desc_value(
+                run_desc, ("segmented run", "adaptive days per segment"), fatal=False
+            )
+        )
+    except KeyError:
+        return False
+
+
+def _replan_segments(run_desc, completed_results_dirs, start_timestep, rn_rdt):
+    """Calculate the starting time step and the segment length
+    for the segments that follow the completed segments of a segmented run.
+
+    The segments are delimited by the time steps of the restart files in their
+    results directories.
+    The segment length is the largest number of days
+    (or hours for runs with :kbd:`hours per segment`)
+    that fits in the :kbd:`segment walltime` at the throughput of the completed
+    segments,
+    reduced by the :kbd:`walltime safety factor`.
+    The segment length from the run description is used if there are no throughput
+    measurements.
+
     :param dict run_desc: Run description dictionary.
 
-    :param dict namelist_namrun_patch: f90nml patch for namrun namelist for the segment.
+    :param list completed_results_dirs: Results directories of the completed
+                                        segments in segment order.
 
-    :param tmp_run_desc_dir: Temporary directory where the namelists and run description
-                             files for segments are stored.
-    :type tmp_run_desc_dir: :py:class:`pathlib.Path`
+    :param int start_timestep: Time step number that the run started on.
 
-    :return: File path and name of namelist section file containing namrun namelist
-             for the segment.
-    :rtype: :py:class:`pathlib.Path`
+    :param float rn_rdt: Model time step in seconds.
+
+    :return: Starting time step, segment length in seconds
+    :rtype: 2-tuple
     """
-    namelist_namrun = get_run_desc_value(
-        run_desc, ("segmented run", "namelists", "namrun"), expand_path=True
+    try:
+        safety_factor = get_run_desc_value(
+            run_desc, ("segmented run", "walltime safety factor"), fatal=False
+        )
+    except KeyError:
+        safety_factor = 0.9
+    model_seconds, run_hours = 0, 0
+    prev_restart_timestep = start_timestep - 1
+    for results_dir in completed_results_dirs:
+        restart_timestep = _restart_timestep(run_desc, results_dir)
+        if restart_timestep is None:
+            log.error(
+                f"can't re-plan segments because there are no restart files in "
+                f"{results_dir}"
+            )
+            raise SystemExit(2)
+        segment_run_hours = _segment_run_hours(results_dir)
+        if segment_run_hours is not None:
+            model_seconds += (restart_timestep - prev_restart_timestep) * rn_rdt
+            run_hours += segment_run_hours
+        prev_restart_timestep = restart_timestep
+    if not run_hours:
+        log.warning(
+            "no throughput measurements for the completed segments; "
+            "re-planned remaining segments with segment length from run description"
+        )
+        return prev_restart_timestep + 1, _segment_seconds(run_desc)
+    units, unit_seconds = (
+        ("hours", 60 * 60)
+        if "hours per segment" in run_desc["segmented run"]
+        else ("days", 24 * 60 * 60)
     )
-    f90nml.patch(
-        namelist_namrun, namelist_namrun_patch, tmp_run_desc_dir / namelist_namrun.name
+    walltime_hours = _walltime_seconds(
+        get_run_desc_value(run_desc, ("segmented run", "segment walltime"))
+    ) / (60 * 60)
+    units_per_segment = max(
+        1,
+        math.floor(
+            model_seconds / unit_seconds / run_hours * walltime_hours * safety_factor
+        ),
     )
-    return tmp_run_desc_dir / namelist_namrun.name
+    log.info(
+        f"measured throughput of completed segments is "
+        f"{model_seconds / (24 * 60 * 60) / run_hours:.2f} model days per hour; "
+        f"re-planned remaining segments to {units_per_segment} {units} per segment"
+    )
+    return prev_restart_timestep + 1, units_per_segment * unit_seconds
 
 
-def _write_segment_desc_file(
-    run_desc, desc_file, restart_dir, segment_namrun, tmp_run_desc_dir
-):
+def _restart_timestep(run_desc, results_dir):
     """
     :param dict run_desc: Run description dictionary.
 
-    :param str desc_file: Name of the run description YAML file for segment.
+    :param results_dir: Results directory of a segment.
+    :type results_dir: :py:class:`pathlib.Path`
 
-    :param restart_dir: Directory path in which to find the restart file(s)
-                        for the segments.
-                        Use :py:obj:`None` for segment 0 to avoid replacing the
-                        restart directory path in the base run description YAML file.
-    :type restart_dir: :py:class:`pathlib.Path` or None
+    :return: Time step number of the latest restart file in results_dir
+             that has the same name pattern as the 1st restart file in the
+             run description;
+             :py:obj:`None` if there are no restart files.
+    :rtype: int or None
+    """
+    return max(_restart_timesteps(run_desc, results_dir), default=None)
 
-    :param segment_namrun: File path and name of namelist section file containing
-                           namrun for the segment.
-    :type segment_namrun: :py:class:`pathlib.Path`
 
-    :param tmp_run_desc_dir: Temporary directory where the namelists and run description
-                             files for segments are stored.
-    :type tmp_run_desc_dir: :py:class:`pathlib.Path`
+def _restart_timesteps(run_desc, results_dir):
+    """
+    :param dict run_desc: Run description dictionary.
 
-    :return: Run description dict updated with namrun namelist section and
-             restart file(s) paths,
-             File path and name of temporary run description file for the segment.
-    :rtype: 2-tuple
+    :param results_dir: Results directory of a segment.
+    :type results_dir: :py:class:`pathlib.Path`
+
+    :return: Time step numbers of the restart files in results_dir
+             that have the same name pattern as the 1st restart file in the
+             run description;
+             per-processor restart files are represented by those of processor 0.
+    :rtype: list
+    """
+    restart_path = Path(next(iter(get_run_desc_value(run_desc, ("restart",)).values())))
+    name_head = restart_path.name.split("_")[0]
+    name_tail = restart_path.name.split("_", 2)[-1]
+    restart_files = itertools.chain(
+        results_dir.glob(f"{name_head}_*_{name_tail}"),
+        results_dir.glob(f"{name_head}_*_{Path(name_tail).stem}_0000.nc"),
+    )
+    restart_timesteps = set()
+    for restart_file in restart_files:
+        timestep = restart_file.name.removeprefix(f"{name_head}_").split("_")[0]
+        if timestep.isdigit():
+            restart_timesteps.add(int(timestep))
+    return list(restart_timesteps)
+
+
+def _segment_run_hours(results_dir):
+    """Measure the duration of the NEMO run of a completed segment from the
+    :kbd:`Starting run at` and :kbd:`Ended run at` lines in its :file:`stdout` file.
+
+    :param results_dir: Results directory of the segment.
+    :type results_dir: :py:class:`pathlib.Path`
+
+    :return: Run duration in hours;
+             :py:obj:`None` if the segment's :file:`stdout` file doesn't contain
+             the measurements.
+    :rtype: float or None
+    """
+    try:
+        stdout = (results_dir / "stdout").read_text()
+    except OSError:
+        return None
+    run_start = run_end = None
+    for line in stdout.splitlines():
+        if line.startswith("Starting run at "):
+            run_start = _parse_date_output(line.removeprefix("Starting run at "))
+        elif line.startswith("Ended run at "):
+            run_end = _parse_date_output(line.removeprefix("Ended run at "))
+    if run_start is None or run_end is None or run_end <= run_start:
+        return None
+    return (run_end - run_start).total_seconds() / (60 * 60)
+
+
+def _parse_date_output(date_output):
+    """
+    :param str date_output: Output of the :command:`date` command;
+                            e.g. :kbd:`Fri Oct 16 12:34:56 PDT 2026`.
+
+    :return: Date/time with the time zone name ignored;
+             :py:obj:`None` if date_output can't be parsed.
+    :rtype: :py:class:`arrow.Arrow` or None
+    """
+    fields = date_output.split()
+    if len(fields) == 6:
+        del fields[4]
+    try:
+        return arrow.get(" ".join(fields), "ddd MMM D HH:mm:ss YYYY")
+    except (arrow.parser.ParserError, ValueError):
+        return None
+
+
+@attrs.frozen
+class SubmissionPlan:
+    """Where to submit the next segments of a segmented run from."""
+
+    #: Segment number to submit the run from;
+    #: :py:obj:`None` when there are no segments to submit.
+    start_segment: int | None = None
+    #: Job number of a queued or running segment job for the 1st submitted segment
+    #: to wait for;
+    #: :kbd:`0` when there is no job to wait for.
+    waitjob: str = "0"
+    #: Job number of the start segment's job when it finished without producing the
+    #: segment's restart files.
+    failed_job: str | None = None
+    #: Message about why there are no segments to submit.
+    message: str | None = None
+
+
+def plan_submission(desc_file, results_dir, queue_job_cmd=None):
+    """Plan the next submission of the segments of a segmented run from the restart
+    files in its segment results directories and its segments manifest.
+
+    :param desc_file: File path/name of the run description YAML file.
+    :type desc_file: :py:class:`pathlib.Path`
+
+    :param results_dir: Path of the directory in which to store the run results.
+    :type results_dir: :py:class:`pathlib.Path`
+
+    :param str queue_job_cmd: Command that jobs are submitted with;
+                              the default is the command for the system that we
+                              are running on.
+
+    :return: Submission plan for the run.
+    :rtype: :py:class:`SubmissionPlan`
+    """
+    if queue_job_cmd is None:
+        queue_job_cmd = queue_job_command()
+    start_segment, waitjob, message = _find_resume_segment(
+        desc_file, results_dir, queue_job_cmd
+    )
+    if start_segment is None:
+        return SubmissionPlan(message=message)
+    if waitjob is not None:
+        return SubmissionPlan(start_segment, waitjob)
+    manifest = _read_segments_manifest(results_dir)
+    return SubmissionPlan(
+        start_segment,
+        failed_job=(
+            manifest[start_segment]["job"] if start_segment in manifest else None
+        ),
+    )
+
+
+def active_jobs(job_ids, queue_job_cmd=None):
+    """
+    :param list job_ids: Job numbers.
+
+    :param str queue_job_cmd: Command that the jobs were submitted with;
+                              the default is the command for the system that we
+                              are running on.
+
+    :return: Job numbers of the jobs that are queued or running.
+    :rtype: list
+    """
+    if queue_job_cmd is None:
+        queue_job_cmd = queue_job_command()
+    return [job_id for job_id in job_ids if _job_active(job_id, queue_job_cmd)]
+
+
+def _find_resume_segment(desc_file, results_dir, queue_job_cmd):
+    """Find the segment to resume a segmented run at.
+
+    That is the segment after the last one in an unbroken sequence from the
+    first segment that have complete restart files in their results directories,
+    and whose jobs are not queued or running according to the segments manifest.
+
+    :param desc_file: File path/name of the run description YAML file.
+    :type desc_file: :py:class:`pathlib.Path`
+
+    :param results_dir: Path of the directory in which to store the run results.
+    :type results_dir: :py:class:`pathlib.Path`
+
+    :param str queue_job_cmd: Command that jobs are submitted with.
+
+    :return: Segment number to resume the run at,
+             Job number of a queued or running segment job for it to wait for,
+             Message about why there are no segments to resume;
+             the segment number is :py:obj:`None` when there are no segments
+             to resume.
+    :rtype: 3-tuple
+    """
+    run_segments = _calc_run_segments(desc_file, results_dir)
+    segments = {segment.seg_no: segment for segment in run_segments}
+    run_desc = segments[run_segments.first_seg_no].run_desc
+    if not segments[run_segments.first_seg_no].segmented:
+        log.error("--resume can only be used for segmented runs")
+        raise SystemExit(2)
+    manifest = _read_segments_manifest(results_dir)
+    # The run ends at the same time step however its segments have been planned
+    end_timestep = segments[max(segments)].nn_itend
+    seg_no = run_segments.first_seg_no
+    while seg_no in segments or seg_no in manifest:
+        nn_itend = (
+            manifest[seg_no]["nn_itend"]
+            if seg_no in manifest
+            else segments[seg_no].nn_itend
+        )
+        segment_results_dir = results_dir.parent / f"{results_dir.name}_{seg_no}"
+        if not _restart_files_exist(run_desc, segment_results_dir, nn_itend):
+            break
+        if nn_itend >= end_timestep:
+            return None, None, f"All segments of {results_dir.name} have completed"
+        seg_no += 1
+    waitjob = None
+    while seg_no in manifest and _job_active(manifest[seg_no]["job"], queue_job_cmd):
+        waitjob = manifest[seg_no]["job"]
+        if manifest[seg_no]["nn_itend"] >= end_timestep:
+            return (
+                None,
+                None,
+                f"Job {waitjob} for the last segment of {results_dir.name} "
+                f"is queued or running",
+            )
+        seg_no += 1
+    if waitjob is not None and _adaptive_days_per_segment(run_desc):
+        # Re-planning needs the restart files of all of the preceding segments
+        return (
+            None,
+            None,
+            f"Job {waitjob} for segment {seg_no - 1} of {results_dir.name} is "
+            f"queued or running, so the segments after it can't be re-planned yet",
+        )
+    log.info(f"resuming {results_dir.name} at segment {seg_no}")
+    return seg_no, waitjob, None
+
+
+def _restart_files_exist(run_desc, results_dir, restart_timestep):
+    """
+    :param dict run_desc: Run description dictionary.
+
+    :param results_dir: Results directory of a segment.
+    :type results_dir: :py:class:`pathlib.Path`
+
+    :param int restart_timestep: Time step number of the restart files.
+
+    :return: All of the restart files in the run description are present in
+             results_dir for restart_timestep,
+             either combined, or as per-processor files.
+    :rtype: boolean
+    """
+    for path in get_run_desc_value(run_desc, ("restart",)).values():
+        path = Path(path)
+        name_head = path.name.split("_")[0]
+        name_tail = path.name.split("_", 2)[-1]
+        restart_file = results_dir / f"{name_head}_{restart_timestep:08d}_{name_tail}"
+        rank_restart_file = restart_file.with_name(f"{restart_file.stem}_0000.nc")
+        if not restart_file.exists() and not rank_restart_file.exists():
+            return False
+    return True
+
+
+def _job_active(job_id, queue_job_cmd):
+    """
+    :param str job_id: Job number.
+
+    :param str queue_job_cmd: Command that the job was submitted with.
+
+    :return: The job is queued or running.
+    :rtype: boolean
+    """
+    match queue_job_cmd.split(" ")[0]:
+        case "sbatch":
+            cmd = ["squeue", "--noheader", "--format=%i", f"--jobs={job_id}"]
+        case "qsub":
+            cmd = ["qstat", job_id]
+        case _:
+            return False
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+    except OSError:
+        return False
+    return proc.returncode == 0 and bool(proc.stdout.strip())
+
+
+def _segments_manifest_path(results_dir):
+    """
+    :param results_dir: Path of the directory in which to store the run results.
+    :type results_dir: :py:class:`pathlib.Path`
+
+    :return: Path of the YAML file in which the submitted segments of a segmented
+             run are recorded;
+             it is beside the segment results directories.
+    :rtype: :py:class:`pathlib.Path`
+    """
+    return results_dir.parent / f"{results_dir.name}_segments.yaml"
+
+
+def _read_segments_manifest(results_dir):
+    """
+    :param results_dir: Path of the directory in which to store the run results.
+    :type results_dir: :py:class:`pathlib.Path`
+
+    :return: Submitted segments of a segmented run keyed by segment number;
+             empty if no segments have been recorded.
+    :rtype: dict
+    """
+    try:
+        with _segments_manifest_path(results_dir).open("rt") as f:
+            return yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return {}
+
+
+def _record_submitted_segments(results_dir, submitted_segments):
+    """Record the job numbers and time steps of submitted segments in the
+    segments manifest of a segmented run.
+
+    :param results_dir: Path of the directory in which to store the run results.
+    :type results_dir: :py:class:`pathlib.Path`
+
+    :param list submitted_segments: :py:class:`RunSegment`, job number 2-tuples.
+    """
+    manifest = _read_segments_manifest(results_dir)
+    for segment, job_id in submitted_segments:
+        manifest[segment.seg_no] = {
+            "job": job_id,
+            "nn_it000": segment.nn_it000,
+            "nn_itend": segment.nn_itend,
+        }
+    manifest_path = _segments_manifest_path(results_dir)
+    tmp_manifest_path = manifest_path.with_suffix(".yaml.tmp")
+    # Replace the manifest in one step so that an interrupted write can't leave
+    # it incomplete
+    with tmp_manifest_path.open("wt") as f:
+        yaml.safe_dump(manifest, f, default_flow_style=False)
+    tmp_manifest_path.replace(manifest_path)
+
+
+def _restart_interval_timesteps(run_desc, timesteps_per_segment, rn_rdt):
+    """Calculate the number of time steps between the intermediate restart files
+    that are written during segments for failure recovery.
+
+    The expected throughput is the segment length in the :kbd:`segment walltime`,
+    so that the restart files are written about every :kbd:`hours between restarts`
+    wall-clock hours.
+    The interval is rounded down to a whole number of minutes of model time so that
+    the segment recovered from the restart files starts at a time of day that can
+    be set by :kbd:`nn_time0`.
+
+    :param dict run_desc: Run description dictionary.
+
+    :param int timesteps_per_segment: Number of time steps in a full length segment.
+
+    :param float rn_rdt: Model time step in seconds.
+
+    :return: Restart file interval for the :kbd:`nn_stock` namrun namelist item.
+    :rtype: int
+    """
+    hours_between_restarts = get_run_desc_value(
+        run_desc, ("segmented run", "failure recovery", "hours between restarts")
+    )
+    walltime_hours = _walltime_seconds(
+        get_run_desc_value(run_desc, ("segmented run", "segment walltime"))
+    ) / (60 * 60)
+    nn_stock = int(timesteps_per_segment * hours_between_restarts / walltime_hours)
+    minute_timesteps = math.lcm(round(rn_rdt), 60) // round(rn_rdt)
+    return max(minute_timesteps, nn_stock - nn_stock % minute_timesteps)
+
+
+def _max_recovery_attempts(run_desc):
+    """
+    :param dict run_desc: Run description dictionary.
+
+    :return: Number of times that a failed segment of a self-chaining segmented run
+             is resubmitted from its intermediate restart files;
+             0 for runs that don't have failure recovery in their run descriptions.
+    :rtype: int
+    """
+    try:
+        return get_run_desc_value(
+            run_desc, ("segmented run", "failure recovery", "max retries"), fatal=False
+        )
+    except KeyError:
+        return 0
+
+
+def _recover_first_segment(run_segments, recovery_attempt):
+    """Replace the 1st of the run segments with the remainder of it that starts from
+    the newest complete set of intermediate restart files in its results directory.
+
+    The :file:`stdout` and :file:`stderr` files of the failed attempt are renamed
+    so that they are not overwritten by those of the recovery job
+    if the failed job hasn't renamed them itself;
+    e.g. because it was ended by the scheduler.
+
+    :param run_segments: Segments of the run.
+    :type run_segments: :py:class:`RunSegments`
+
+    :param int recovery_attempt: Number of the recovery attempt.
+
+    :return: Segments of the run.
+    :rtype: :py:class:`RunSegments`
+    """
+    segment = next(iter(run_segments))
+    run_desc, results_dir = segment.run_desc, segment.results_dir
+    for name in ("stdout", "stderr"):
+        if (results_dir / name).exists():
+            (results_dir / name).rename(
+                results_dir / f"{name}_attempt_{recovery_attempt - 1}"
+            )
+    restart_timestep = max(
+        (
+            timestep
+            for timestep in _restart_timesteps(run_desc, results_dir)
+            if segment.nn_it000 <= timestep < segment.nn_itend
+            and _restart_files_exist(run_desc, results_dir, timestep)
+        ),
+        default=None,
+    )
+    if restart_timestep is None:
+        log.warning(
+            f"no intermediate restart files found in {results_dir}, "
+            f"so re-running segment {segment.seg_no} from its start"
+        )
+        recovery_segment = segment
+    else:
+        namelist_namdom = get_run_desc_value(
+            run_desc, ("segmented run", "namelists", "namdom"), expand_path=True
+        )
+        rn_rdt = f90nml.read(namelist_namdom)["namdom"]["rn_rdt"]
+        date0 = arrow.get(
+            f"{segment.nn_date0}{segment.nn_time0 or 0:04d}", "YYYYMMDDHHmm"
+        ).shift(seconds=+(restart_timestep + 1 - segment.nn_it000) * rn_rdt)
+        recovery_segment = attrs.evolve(
+            segment,
+            nn_it000=restart_timestep + 1,
+            nn_date0=int(date0.format("YYYYMMDD")),
+            nn_time0=int(date0.format("HHmm")),
+            restart_dir=results_dir,
+        )
+        log.info(
+            f"recovering segment {segment.seg_no} from restart files for "
+            f"time step {restart_timestep} in {results_dir}"
+        )
+    return attrs.evolve(
+        run_segments,
+        segments=lambda: itertools.chain(
+            [recovery_segment], itertools.islice(run_segments, 1, None)
+        ),
+    )
+
+
+def _prepare_segments(run_segments, prepare_segment, nocheck_init, prepare_jobs):
+    """Prepare the segments of a run,
+    up to prepare_jobs of them concurrently in a thread pool,
+    and yield them in segment order as they become ready to submit.
+
+    :param run_segments: Segments of the run.
+    :type run_segments: :py:class:`RunSegments`
+
+    :param prepare_segment: Function to prepare a segment;
+                            it is called with the segment,
+                            the directory in which to find its restart file(s),
+                            and whether to suppress the initial conditions link check,
+                            and returns the path of the segment's batch script.
+    :type prepare_segment: callable
+
+    :param boolean nocheck_init: Suppress initial condition link check for the
+                                 1st segment.
+
+    :param int prepare_jobs: Maximum number of segments to prepare concurrently.
+
+    :return: Generator of 2-tuples of segment and batch script path.
+    """
+
+    def segment_args():
+        restart_dir = None
+        for i, segment in enumerate(run_segments):
+            if i == 0:
+                # Restart file(s) for the 1st segment are those in the base run
+                # description unless the run starts after its first segment
+                restart_dir = segment.restart_dir
+            # Initial conditions of the segments after the 1st are produced by the
+            # jobs of the preceding segments, so they can't be checked
+            yield segment, restart_dir, nocheck_init or i > 0
+            restart_dir = segment.results_dir
+
+    if prepare_jobs <= 1:
+        for args in segment_args():
+            yield args[0], prepare_segment(*args)
+        return
+    with concurrent.futures.ThreadPoolExecutor(max_workers=prepare_jobs) as executor:
+        pending = collections.deque()
+        try:
+            for args in segment_args():
+                # Run in a copy of the current context so that timing spans nest
+                # under the run span
+                context = contextvars.copy_context()
+                future = executor.submit(context.run, prepare_segment, *args)
+                pending.append((args[0], future))
+                if len(pending) > prepare_jobs:
+                    segment, future = pending.popleft()
+                    yield segment, future.result()
+            while pending:
+                segment, future = pending.popleft()
+                yield segment, future.result()
+        finally:
+            for segment, future in pending:
+                future.cancel()
+
+
+def _calc_n_segments(run_desc):
+    run_start_date = arrow.get(
+        get_run_desc_value(run_desc, ("segmented run", "start date"))
+    )
+    run_end_date = arrow.get(
+        get_run_desc_value(run_desc, ("segmented run", "end date"))
+    )
+    segment_seconds = _segment_seconds(run_desc)
+
+    n_segments = math.ceil(
+        (run_end_date.shift(days=+1) - run_start_date).total_seconds() / segment_seconds
+    )
+    return n_segments
+
+
+def _segment_seconds(run_desc):
+    """
+    :param dict run_desc: Run description dictionary.
+
+    :return: Length of the segments of a segmented run in seconds,
+             from the :kbd:`hours per segment` value if it is present,
+             otherwise from the :kbd:`days per segment` value.
+    :rtype: int
+    """
+    try:
+        hours_per_segment = get_run_desc_value(
+            run_desc, ("segmented run", "hours per segment"), fatal=False
+        )
+    except KeyError:
+        days_per_segment = get_run_desc_value(
+            run_desc, ("segmented run", "days per segment")
+        )
+        return days_per_segment * 24 * 60 * 60
+    return hours_per_segment * 60 * 60
+
+
+def _seconds_to_timesteps(seconds, rn_rdt):
+    """
+    :param seconds: Model time span in seconds.
+    :type seconds: int or float
+
+    :param float rn_rdt: Model time step in seconds.
+
+    :return: Number of time steps in the time span.
+    :rtype: int
+    """
+    timesteps = seconds / rn_rdt
+    if not timesteps.is_integer():
+        log.error(
+            f"{seconds / (60 * 60):g} hours is not a whole number of "
+            f"{rn_rdt:g} second time steps"
+        )
+        raise SystemExit(2)
+    return int(timesteps)
+
+
+def _write_segment_namrun_namelist(
+    run_desc, namelist_namrun_patch, tmp_run_desc_dir, namelist_texts=None
+):
+    """
+    :param dict run_desc: Run description dictionary.
+
+    :param dict namelist_namrun_patch: f90nml patch for namrun namelist for the segment.
+
+    :param tmp_run_desc_dir: Temporary directory where the namelists and run description
+                             files for segments are stored.
+    :type tmp_run_desc_dir: :py:class:`pathlib.Path`
+
+    :param dict namelist_texts: Contents of namelist template files that have already
+                                been read, keyed by file path;
+                                the namrun namelist template is added to it when it
+                                is read so that it is only read once for all of the
+                                segments of a run.
+
+    :return: File path and name of namelist section file containing namrun namelist
+             for the segment.
+    :rtype: :py:class:`pathlib.Path`
     """
-    # namrun namelist for segment
     namelist_namrun = get_run_desc_value(
-        run_desc, ("segmented run", "namelists", "namrun")
+        run_desc, ("segmented run", "namelists", "namrun"), expand_path=True
     )
-    namelist_namrun_index = run_desc["namelists"]["namelist_cfg"].index(namelist_namrun)
-    run_desc["namelists"]["namelist_cfg"][namelist_namrun_index] = os.fspath(
-        segment_namrun
+    namelist_texts = {} if namelist_texts is None else namelist_texts
+    try:
+        namrun_text = namelist_texts[namelist_namrun]
+    except KeyError:
+        namrun_text = namelist_texts[namelist_namrun] = namelist_namrun.read_text()
+    # Patching from the in-memory template preserves its comments and formatting
+    f90nml.patch(
+        io.StringIO(namrun_text),
+        namelist_namrun_patch,
+        tmp_run_desc_dir / namelist_namrun.name,
+    )
+    return tmp_run_desc_dir / namelist_namrun.name
+
+
+def _write_segment_desc_file(
+    run_desc,
+    desc_file,
+    restart_dir,
+    segment_namrun,
+    tmp_run_desc_dir,
+    restart_timestep=None,
+    per_rank_restarts=False,
+):
+    """
+    :param dict run_desc: Run description dictionary.
+
+    :param str desc_file: Name of the run description YAML file for segment.
+
+    :param restart_dir: Directory path in which to find the restart file(s)
+                        for the segments.
+                        Use :py:obj:`None` for segment 0 to avoid replacing the
+                        restart directory path in the base run description YAML file.
+    :type restart_dir: :py:class:`pathlib.Path` or None
+
+    :param segment_namrun: File path and name of namelist section file containing
+                           namrun for the segment.
+    :type segment_namrun: :py:class:`pathlib.Path`
+
+    :param tmp_run_desc_dir: Temporary directory where the namelists and run description
+                             files for segments are stored.
+    :type tmp_run_desc_dir: :py:class:`pathlib.Path`
+
+    :param int restart_timestep: Time step number of the restart file(s) for the segment.
+                                 Use :py:obj:`None` to calculate it from the
+                                 :kbd:`nn_it000` value in segment_namrun.
+
+    :param boolean per_rank_restarts: Use the per-processor restart files in
+                                      restart_dir when the combined restart file(s)
+                                      are not there.
+
+    :return: Run description dict updated with namrun namelist section and
+             restart file(s) paths,
+             File path and name of temporary run description file for the segment,
+             Dict of the restart file names and combined restart file paths for
+             which the per-processor restart files are to be linked in the
+             run directory.
+    :rtype: 3-tuple
+    """
+    # Copy-on-write: only the items that change for the segment are replaced so that
+    # the rest of the run description is shared with the base run description
+    # namrun namelist for segment
+    namelist_namrun = get_run_desc_value(
+        run_desc, ("segmented run", "namelists", "namrun")
     )
+    namelist_cfg = list(run_desc["namelists"]["namelist_cfg"])
+    namelist_cfg[namelist_cfg.index(namelist_namrun)] = os.fspath(segment_namrun)
+    run_desc = {
+        **run_desc,
+        "namelists": {**run_desc["namelists"], "namelist_cfg": namelist_cfg},
+    }
     # restart file(s) for segment
+    rank_restarts = {}
     if restart_dir is not None:
-        nml = f90nml.read(segment_namrun)
-        restart_timestep = nml["namrun"]["nn_it000"] - 1
+        if restart_timestep is None:
+            nml = f90nml.read(segment_namrun)
+            restart_timestep = nml["namrun"]["nn_it000"] - 1
+        restart = {}
         for name, path in get_run_desc_value(run_desc, ("restart",)).items():
             path = Path(path)
             name_head = path.name.split("_")[0]
@@ -491,7 +1790,15 @@ def _write_segment_desc_file(
             restart_path = (
                 restart_dir / f"{name_head}_{restart_timestep:08d}_{name_tail}"
             )
-            run_desc["restart"][name] = os.fspath(restart_path)
+            if per_rank_restarts and not restart_path.exists():
+                # NEMO reads the restart file for each processor from the file
+                # that has the processor number appended to the restart file name;
+                # they are linked once the number of processors is known from the
+                # run directory
+                rank_restarts[name] = restart_path
+            else:
+                restart[name] = os.fspath(restart_path)
+        run_desc["restart"] = restart
     # walltime for segment
     segment_walltime = get_run_desc_value(
         run_desc, ("segmented run", "segment walltime")
@@ -500,7 +1807,118 @@ def _write_segment_desc_file(
     # write temporary run description file for segment
     with (tmp_run_desc_dir / desc_file).open("wt") as f:
         yaml.safe_dump(run_desc, f, default_flow_style=False)
-    return run_desc, tmp_run_desc_dir / desc_file
+    return run_desc, tmp_run_desc_dir / desc_file, rank_restarts
+
+
+def _rank_decomposition(run_desc, n_processors):
+    """
+    :param dict run_desc: Run description dictionary.
+
+    :param int n_processors: Number of NEMO processors for the run.
+
+    :return: MPI decomposition record for per-processor restart files.
+    :rtype: dict
+    """
+    return {
+        "MPI decomposition": get_run_desc_value(run_desc, ("MPI decomposition",)),
+        "processors": n_processors,
+    }
+
+
+def _link_rank_restarts(run_desc, rank_restarts, run_dir, nocheck_init):
+    """Symlink the per-processor restart files of the previous segment into the
+    run directory.
+
+    If the MPI decomposition recorded with the per-processor restart files differs
+    from that of the run, the files are combined, and the combined restart files are
+    linked instead.
+
+    :param dict run_desc: Run description dictionary.
+
+    :param dict rank_restarts: Restart file names and combined restart file paths
+                               for which to link the per-processor restart files.
+
+    :param run_dir: Path of the temporary run directory.
+    :type run_dir: :py:class:`pathlib.Path`
+
+    :param boolean nocheck_init: Suppress the check for the existence of the
+                                 per-processor restart files.
+    """
+    if not rank_restarts:
+        return
+    n_processors = get_n_processors(run_desc, run_dir)
+    decomposition = _rank_decomposition(run_desc, n_processors)
+    restart_dir = next(iter(rank_restarts.values())).parent
+    try:
+        with (restart_dir / RANK_RESTARTS_RECORD).open("rt") as f:
+            recorded = yaml.safe_load(f)
+    except FileNotFoundError:
+        # Per-processor restart files from an earlier segment of this run have
+        # the run's MPI decomposition
+        recorded = decomposition
+    if recorded != decomposition:
+        log.warning(
+            f"per-processor restart files in {restart_dir} are for "
+            f"{recorded['processors']} processors with MPI decomposition "
+            f"{recorded['MPI decomposition']}, so they are combined for "
+            f"{n_processors} processors with MPI decomposition "
+            f"{decomposition['MPI decomposition']}"
+        )
+        combine_rank_restarts(
+            nemo_cmd.api.find_rebuild_nemo_script(run_desc), restart_dir
+        )
+        for name, restart_path in rank_restarts.items():
+            (run_dir / name).symlink_to(restart_path)
+        return
+    for name, restart_path in rank_restarts.items():
+        for rank in range(n_processors):
+            rank_path = restart_path.with_name(f"{restart_path.stem}_{rank:04d}.nc")
+            if not nocheck_init and not rank_path.exists():
+                log.error(
+                    f"{rank_path} not found; did you mean to use the "
+                    f"--nocheck-initial-conditions flag?"
+                )
+                raise SystemExit(2)
+            (run_dir / f"{Path(name).stem}_{rank:04d}.nc").symlink_to(rank_path)
+
+
+def combine_rank_restarts(rebuild_nemo, restart_dir):
+    """Combine the per-processor restart files in restart_dir into restart files
+    for the whole domain.
+
+    The per-processor restart files and their MPI decomposition record are deleted
+    after they have been combined.
+
+    :param rebuild_nemo: Path of the NEMO rebuild_nemo script.
+    :type rebuild_nemo: :py:class:`pathlib.Path` or str
+
+    :param restart_dir: Directory path in which to find the per-processor restart
+                        files.
+    :type restart_dir: :py:class:`pathlib.Path`
+
+    :return: Combined restart file paths.
+    :rtype: list
+    """
+    combined = []
+    for rank_0 in sorted(restart_dir.glob("*_restart*_0000.nc")):
+        restart = rank_0.name.removesuffix("_0000.nc")
+        rank_files = sorted(restart_dir.glob(f"{restart}_[0-9][0-9][0-9][0-9].nc"))
+        cmd = [os.fspath(rebuild_nemo), restart, str(len(rank_files))]
+        try:
+            subprocess.run(
+                cmd, cwd=restart_dir, check=True, capture_output=True, text=True
+            )
+        except subprocess.CalledProcessError as exc:
+            log.error(
+                f"{shlex.join(cmd)} failed in {restart_dir}: "
+                f"{(exc.stderr or str(exc)).strip()}"
+            )
+            raise SystemExit(2)
+        for rank_file in rank_files:
+            rank_file.unlink()
+        combined.append(restart_dir / f"{restart}.nc")
+    (restart_dir / RANK_RESTARTS_RECORD).unlink(missing_ok=True)
+    return combined
 
 
 def _build_tmp_run_dir(
@@ -514,52 +1932,102 @@ def _build_tmp_run_dir(
     separate_deflate,
     nocheck_init,
     quiet,
+    worker=False,
+    prepare_context=None,
+    chain_cmd=None,
+    recovery_cmd=None,
+    recovery_attempt=0,
+    keep_rank_restarts=False,
+    restart_handoff=False,
+    backfill=False,
+    predict_walltime=False,
+    rank_restarts=None,
 ):
-    run_dir = api.prepare(desc_file, nocheck_init)
-    if not quiet:
-        log.info(f"Created run directory {run_dir}")
-    nemo_processors = get_n_processors(run_desc, run_dir)
-    separate_xios_server = get_run_desc_value(
-        run_desc, ("output", "separate XIOS server")
-    )
-    if separate_xios_server:
-        xios_processors = get_run_desc_value(run_desc, ("output", "XIOS servers"))
-    else:
-        xios_processors = 0
-    batch_script = _build_batch_script(
-        run_desc,
-        desc_file,
-        nemo_processors,
-        xios_processors,
-        max_deflate_jobs,
-        results_dir,
-        run_dir,
-        deflate,
-        separate_deflate,
-        cores_per_node,
-        cpu_arch,
-    )
-    batch_file = run_dir / "SalishSeaNEMO.sh"
-    with batch_file.open("wt") as f:
-        f.write(batch_script)
-    if separate_deflate:
-        for deflate_job, pattern in SEPARATE_DEFLATE_JOBS.items():
-            deflate_script = _build_deflate_script(
-                run_desc, pattern, deflate_job, results_dir
+    with timing.span("build_tmp_run_dir"):
+        run_dir = api.prepare(
+            desc_file, nocheck_init, run_desc=run_desc, context=prepare_context
+        )
+        if not quiet:
+            log.info(f"Created run directory {run_dir}")
+        _link_rank_restarts(run_desc, rank_restarts, run_dir, nocheck_init)
+        if predict_walltime:
+            with timing.span("predict_walltime"):
+                run_desc = _predict_walltime(run_desc, run_dir)
+        with timing.span("build_batch_script"):
+            nemo_processors = get_n_processors(run_desc, run_dir)
+            if keep_rank_restarts:
+                # The MPI decomposition is moved to the results directory with the
+                # per-processor restart files so that the run that uses them can
+                # check that it has the same decomposition
+                with (run_dir / RANK_RESTARTS_RECORD).open("wt") as f:
+                    yaml.safe_dump(
+                        _rank_decomposition(run_desc, nemo_processors),
+                        f,
+                        default_flow_style=False,
+                    )
+            separate_xios_server = get_run_desc_value(
+                run_desc, ("output", "separate XIOS server")
+            )
+            if separate_xios_server:
+                xios_processors = get_run_desc_value(
+                    run_desc, ("output", "XIOS servers")
+                )
+            else:
+                xios_processors = 0
+            batch_script = _build_batch_script(
+                run_desc,
+                desc_file,
+                nemo_processors,
+                xios_processors,
+                max_deflate_jobs,
+                results_dir,
+                run_dir,
+                deflate,
+                separate_deflate,
+                cores_per_node,
+                cpu_arch,
+                worker=worker,
+                chain_cmd=chain_cmd,
+                recovery_cmd=recovery_cmd,
+                recovery_attempt=recovery_attempt,
+                keep_rank_restarts=keep_rank_restarts,
+                restart_handoff=restart_handoff,
+                backfill=backfill,
             )
-            script_file = run_dir / f"deflate_{deflate_job}.sh"
-            with script_file.open("wt") as f:
-                f.write(deflate_script)
+            batch_file = run_dir / "SalishSeaNEMO.sh"
+            with batch_file.open("wt") as f:
+                f.write(batch_script)
+            if restart_handoff:
+                post_script = _build_post_script(
+                    run_desc,
+                    desc_file,
+                    batch_file,
+                    results_dir,
+                    run_dir,
+                    deflate,
+                    max_deflate_jobs,
+                    separate_deflate,
+                )
+                with batch_file.with_name("SalishSeaNEMO_post.sh").open("wt") as f:
+                    f.write(post_script)
+            if separate_deflate:
+                for deflate_job, pattern in SEPARATE_DEFLATE_JOBS.items():
+                    deflate_script = _build_deflate_script(
+                        run_desc, pattern, deflate_job, results_dir
+                    )
+                    script_file = run_dir / f"deflate_{deflate_job}.sh"
+                    with script_file.open("wt") as f:
+                        f.write(deflate_script)
     return run_dir, batch_file
 
 
-def _submit_job(batch_file, queue_job_cmd, waitjob):
+def _submit_job(batch_file, queue_job_cmd, waitjob, dependency="afterok"):
     if waitjob != "0":
         match queue_job_cmd.split(" ")[0]:
             case "qsub":
-                depend_opt = "-W depend=afterok"
+                depend_opt = f"-W depend={dependency}"
             case "sbatch":
-                depend_opt = "-d afterok"
+                depend_opt = f"-d {dependency}"
             case _:
                 log.error(
                     f"dependent jobs are not available for systems that launch jobs with "
@@ -581,11 +2049,26 @@ def _submit_job(batch_file, queue_job_cmd, waitjob):
 def _submit_separate_deflate_jobs(batch_file, submit_job_msg, queue_job_cmd):
     nemo_job_no = submit_job_msg.split()[-1]
     log.info(f"{batch_file} queued as job {nemo_job_no}")
-    run_dir = batch_file.parent
+    _submit_deflate_jobs([(batch_file.parent, nemo_job_no)], queue_job_cmd)
+
+
+def _submit_deflate_jobs(run_dir_jobs, queue_job_cmd):
+    """Submit the separate deflate jobs of one or more NEMO jobs.
+
+    The deflate jobs only depend on their NEMO jobs,
+    so all of them are submitted concurrently.
+
+    :param list run_dir_jobs: Temporary run directory path, NEMO job number 2-tuples;
+                              the deflate job scripts are in the run directories.
+
+    :param str queue_job_cmd: Command to submit jobs to the queue manager.
+    """
     depend_opt = (
         "-W depend=afterok" if queue_job_cmd.startswith("qsub") else "-d afterok"
     )
-    for deflate_job in SEPARATE_DEFLATE_JOBS:
+
+    def submit_deflate_job(run_dir_job_deflate_job):
+        run_dir, nemo_job_no, deflate_job = run_dir_job_deflate_job
         deflate_script = f"{run_dir}/deflate_{deflate_job}.sh"
         cmd = f"{queue_job_cmd} {depend_opt}:{nemo_job_no} {deflate_script}"
         deflate_job_msg = subprocess.run(
@@ -594,11 +2077,254 @@ def _submit_separate_deflate_jobs(batch_file, submit_job_msg, queue_job_cmd):
             universal_newlines=True,
             stdout=subprocess.PIPE,
         ).stdout
-        deflate_job_no = deflate_job_msg.split()[-1]
-        log.info(
-            f"{run_dir}/{deflate_script} queued after job {nemo_job_no} "
-            f"as job {deflate_job_no}"
+        return deflate_script, nemo_job_no, deflate_job_msg.split()[-1]
+
+    deflate_jobs = [
+        (run_dir, nemo_job_no, deflate_job)
+        for run_dir, nemo_job_no in run_dir_jobs
+        for deflate_job in SEPARATE_DEFLATE_JOBS
+    ]
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=len(SEPARATE_DEFLATE_JOBS)
+    ) as executor:
+        for deflate_script, nemo_job_no, deflate_job_no in executor.map(
+            submit_deflate_job, deflate_jobs
+        ):
+            log.info(
+                f"{deflate_script} queued after job {nemo_job_no} "
+                f"as job {deflate_job_no}"
+            )
+
+
+def _submit_post_job(batch_file, submit_job_msg, queue_job_cmd):
+    """Submit the post-processing job of a run that uses restart hand-off
+    to run after its NEMO job.
+
+    The post-processing job runs whether or not the NEMO job succeeds
+    so that the results of failed runs are gathered and their run directories
+    are deleted.
+
+    :param batch_file: Path of the NEMO job batch script;
+                       the post-processing job script is in the same directory.
+    :type batch_file: :py:class:`pathlib.Path`
+
+    :param str submit_job_msg: Message generated by the queue manager upon
+                               submission of the NEMO job.
+
+    :param str queue_job_cmd: Command to submit jobs to the queue manager.
+
+    :returns: Message generated by the queue manager upon submission of the
+              post-processing job.
+    :rtype: str
+    """
+    nemo_job_no = submit_job_msg.split()[-1]
+    post_script = batch_file.with_name("SalishSeaNEMO_post.sh")
+    post_job_msg = _submit_job(
+        post_script, queue_job_cmd, waitjob=nemo_job_no, dependency="afterany"
+    )
+    log.info(
+        f"{post_script} queued after job {nemo_job_no} "
+        f"as job {post_job_msg.split()[-1]}"
+    )
+    return post_job_msg
+
+
+def _submit_job_array(array_segments, waitjob, separate_deflate):
+    """Submit the segments of a segmented run as a Slurm job array with one task
+    per segment that are run one at a time.
+
+    The job array indices of the tasks start from 0,
+    so that they don't exceed the cluster's :kbd:`MaxArraySize`
+    for runs with large segment numbers.
+
+    :param list array_segments: :py:class:`RunSegment`, batch script path 2-tuples
+                                for the segments of the run.
+
+    :param str waitjob: Job number of the job to wait for successful completion
+                        of before starting the 1st segment.
+
+    :param boolean separate_deflate: Submit the separate deflate jobs of each
+                                     segment to run after its job array task;
+                                     the deflate jobs of all of the segments are
+                                     submitted concurrently.
+
+    :returns: Message generated by :command:`sbatch` upon submission of the
+              job array script,
+              Job numbers of the job array tasks of the segments.
+    :rtype: 2-tuple
+    """
+    first_batch_file = array_segments[0][1]
+    array_script = _build_job_array_script(array_segments)
+    array_file = first_batch_file.with_name("SalishSeaNEMO_array.sh")
+    with array_file.open("wt") as f:
+        f.write(array_script)
+    submit_job_msg = _submit_job(array_file, "sbatch", waitjob=waitjob)
+    array_job_no = submit_job_msg.split()[-1]
+    # Slurm job ids of array tasks are the array job id and the task index
+    task_jobs = [f"{array_job_no}_{index}" for index in range(len(array_segments))]
+    if separate_deflate:
+        log.info(f"{array_file} queued as job {array_job_no}")
+        _submit_deflate_jobs(
+            [
+                (batch_file.parent, task_job)
+                for (_, batch_file), task_job in zip(array_segments, task_jobs)
+            ],
+            "sbatch",
         )
+    return submit_job_msg, task_jobs
+
+
+def _build_job_array_script(array_segments):
+    """Build the Bash script for a Slurm job array that runs the segment batch
+    scripts one at a time.
+
+    The SBATCH directives are those of the 1st segment's batch script
+    with the job name, array, and stdout and stderr file directives replaced.
+    The job array indices start from 0 and are mapped to the segments in the script.
+    Each segment's output goes to the :file:`stdout` and :file:`stderr` files in
+    its results directory;
+    the scheduler's output for the tasks goes to :file:`stdout_array_{index}` and
+    :file:`stderr_array_{index}` files in the 1st segment's results directory.
+    Each task checks that the preceding task completed successfully before it
+    runs its segment,
+    and when a segment fails the rest of the job array is cancelled.
+
+    :param list array_segments: :py:class:`RunSegment`, batch script path 2-tuples
+                                for the segments of the run.
+
+    :returns: Bash script to submit as the job array.
+    :rtype: str
+    """
+    segment, batch_file = array_segments[0]
+    # Segment run ids are the segment number prefixed to the run id
+    run_id = get_run_desc_value(segment.run_desc, ("run_id",)).split("_", 1)[1]
+    first_results_dir = segment.results_dir
+    directives = _batch_script_directives(
+        batch_file, replaced=("--job-name=", "--output=", "--error=")
+    )
+    seg_nos = " ".join(f"{segment.seg_no}" for segment, _ in array_segments)
+    run_dirs = "".join(f'  "{batch_file.parent}"\n' for _, batch_file in array_segments)
+    results_dirs = "".join(
+        f'  "{segment.results_dir}"\n' for segment, _ in array_segments
+    )
+    script = (
+        f"#!/bin/bash\n"
+        f"\n"
+        f"#SBATCH --job-name={run_id}\n"
+        f"#SBATCH --array=0-{len(array_segments) - 1}%1\n"
+        f"{directives}"
+        f"# stdout and stderr file paths/names\n"
+        f"#SBATCH --output={first_results_dir / 'stdout_array_%a'}\n"
+        f"#SBATCH --error={first_results_dir / 'stderr_array_%a'}\n"
+        f"\n"
+        f"SEG_NOS=({seg_nos})\n"
+        f"RUN_DIRS=(\n"
+        f"{run_dirs}"
+        f")\n"
+        f"RESULTS_DIRS=(\n"
+        f"{results_dirs}"
+        f")\n"
+        f"\n"
+    )
+    script += textwrap.dedent("""\
+        INDEX=${SLURM_ARRAY_TASK_ID}
+        SEG_NO=${SEG_NOS[${INDEX}]}
+        STDOUT="${RESULTS_DIRS[${INDEX}]}/stdout"
+        STDERR="${RESULTS_DIRS[${INDEX}]}/stderr"
+        if [ ${INDEX} -gt 0 ]; then
+          PREV_STATE=$(sacct --jobs ${SLURM_ARRAY_JOB_ID}_$((INDEX - 1)) \\
+            --allocations --noheader --format State | xargs)
+          if [ "${PREV_STATE}" != "COMPLETED" ]; then
+            echo "Segment ${SEG_NOS[$((INDEX - 1))]} did not complete (${PREV_STATE}); cancelling the rest of the job array" >>"${STDERR}"
+            scancel ${SLURM_ARRAY_JOB_ID}
+            exit 1
+          fi
+        fi
+        bash "${RUN_DIRS[${INDEX}]}/SalishSeaNEMO.sh" >>"${STDOUT}" 2>>"${STDERR}"
+        SEGMENT_EXIT_CODE=$?
+        if [ ${SEGMENT_EXIT_CODE} -ne 0 ]; then
+          echo "Segment ${SEG_NO} failed; cancelling the rest of the job array" >>"${STDERR}"
+          scancel ${SLURM_ARRAY_JOB_ID}
+        fi
+        exit ${SEGMENT_EXIT_CODE}
+        """)
+    return script
+
+
+def _write_segments_script(job_segments):
+    """Write the Bash script for a job that executes several consecutive segments of
+    a segmented run one after another.
+
+    The script is stored in :file:`SalishSeaNEMO_segments.sh` in the 1st segment's
+    temporary run directory.
+    Each segment's batch script is executed in turn,
+    and the job stops at the 1st one that fails.
+    The restart file(s) for each segment after the 1st are gathered into the
+    preceding segment's results directory by its batch script.
+
+    :param list job_segments: :py:class:`RunSegment`, batch script path 2-tuples
+                              for the segments to execute in the job.
+
+    :returns: Path of the script.
+    :rtype: :py:class:`pathlib.Path`
+    """
+    first_batch_file = job_segments[0][1]
+    script = f"#!/bin/bash\n\n{_batch_script_directives(first_batch_file)}\n"
+    for i, (segment, batch_file) in enumerate(job_segments):
+        # The 1st segment's stdout and stderr are the job's
+        redirect = (
+            ""
+            if i == 0
+            else (
+                f' >>"{segment.results_dir}/stdout"'
+                f' 2>>"{segment.results_dir}/stderr"'
+            )
+        )
+        script += f'bash "{batch_file}"{redirect} || exit $?\n'
+    segments_file = first_batch_file.with_name("SalishSeaNEMO_segments.sh")
+    with segments_file.open("wt") as f:
+        f.write(script)
+    return segments_file
+
+
+def _batch_script_directives(batch_file, replaced=()):
+    """Return the scheduler directive lines of a batch script.
+
+    :param batch_file: Path of the batch script.
+    :type batch_file: :py:class:`pathlib.Path`
+
+    :param tuple replaced: Options of the directives to leave out because they are
+                           replaced by the caller; e.g. :kbd:`("--job-name=",)`.
+
+    :returns: SBATCH or PBS directive lines of the batch script.
+    :rtype: str
+    """
+    directives = ""
+    for line in batch_file.read_text().splitlines():
+        prefix = next(
+            (prefix for prefix in ("#SBATCH ", "#PBS ") if line.startswith(prefix)),
+            None,
+        )
+        if prefix is None or line.removeprefix(prefix).startswith(replaced):
+            continue
+        directives += f"{line}\n"
+    return directives
+
+
+def _walltime_seconds(walltime):
+    """
+    :param walltime: Walltime from a run description;
+                     seconds, or a :kbd:`HH:MM:SS` string.
+    :type walltime: int or str
+
+    :returns: Walltime in seconds.
+    :rtype: int
+    """
+    try:
+        return int(datetime.timedelta(seconds=walltime).total_seconds())
+    except TypeError:
+        t = datetime.datetime.strptime(walltime, "%H:%M:%S").time()
+        return t.hour * 60 * 60 + t.minute * 60 + t.second
 
 
 def _build_batch_script(
@@ -613,116 +2339,802 @@ def _build_batch_script(
     separate_deflate,
     cores_per_node,
     cpu_arch,
+    worker=False,
+    chain_cmd=None,
+    recovery_cmd=None,
+    recovery_attempt=0,
+    keep_rank_restarts=False,
+    restart_handoff=False,
+    backfill=False,
 ):
     """Build the Bash script that will execute the run.
 
-    :param dict run_desc: Run description dictionary.
+    :param dict run_desc: Run description dictionary.
+
+    :param desc_file: File path/name of the YAML run description file.
+    :type desc_file: :py:class:`pathlib.Path`
+
+    :param int nemo_processors: Number of processors that NEMO will be executed
+                                on.
+
+    :param int xios_processors: Number of processors that XIOS will be executed
+                                on.
+
+    :param int max_deflate_jobs: Maximum number of concurrent sub-processes to
+                                 use for netCDF deflating.
+
+    :param results_dir: Path of the directory in which to store the run
+                        results;
+                        it will be created if it does not exist.
+    :type results_dir: :py:class:`pathlib.Path`
+
+    :param run_dir: Path of the temporary run directory.
+    :type run_dir: :py:class:`pathlib.Path`
+
+    :param boolean deflate: Include "salishsea deflate" command in the bash
+                            script.
+
+    :param boolean separate_deflate: Produce separate bash scripts to deflate
+                                     the run results and qsub them to run as
+                                     serial jobs after the NEMO run finishes.
+
+    :param str cores_per_node: Number of cores/node to use in PBS or SBATCH directives.
+
+    :param str cpu_arch: CPU architecture to use in PBS or SBATCH directives.
+
+    :param boolean worker: Execute the combine, deflate, and gather steps via a
+                           resident :command:`salishsea worker` process.
+
+    :param str chain_cmd: Command to prepare and submit the next segment of a
+                          self-chaining segmented run when the NEMO run succeeds.
+
+    :param str recovery_cmd: Command to prepare and submit the remainder of the
+                             segment of a self-chaining segmented run from its
+                             intermediate restart files when the NEMO run fails.
+
+    :param int recovery_attempt: Number of the recovery attempt of the segment
+                                 that the script executes;
+                                 0 for its first attempt.
+
+    :param boolean keep_rank_restarts: Move the per-processor restart files to the
+                                       results directory instead of combining them.
+
+    :param boolean restart_handoff: End the script after the restart files have been
+                                    rebuilt and moved to the results directory;
+                                    the combine, deflate, and gather steps are done
+                                    by a separate post-processing job.
+
+    :param boolean backfill: Choose the job resources that are expected to finish
+                             soonest from the :kbd:`backfill` section of the run
+                             description;
+                             only available on systems that use Slurm.
+
+    :returns: Bash script to execute the run.
+    :rtype: str
+    """
+    script = "#!/bin/bash\n"
+    try:
+        email = get_run_desc_value(run_desc, ("email",), fatal=False)
+    except KeyError:
+        email = f"{os.getenv('USER')}@eoas.ubc.ca"
+    if SYSTEM == "salish":
+        # salish doesn't use a scheduler, so no sbatch or PBS directives in its script
+        pass
+    elif SYSTEM in {
+        # Alliance Canada clusters
+        "fir",
+        "narval",
+        "nibi",
+        "rorqual",
+        "trillium",
+        # UBC ARC sockeye cluster
+        "sockeye",
+    }:
+        procs_per_node = {
+            # Alliance Canada clusters
+            "fir": 192 if not cores_per_node else int(cores_per_node),
+            "narval": 64 if not cores_per_node else int(cores_per_node),
+            "nibi": 192 if not cores_per_node else int(cores_per_node),
+            "rorqual": 192 if not cores_per_node else int(cores_per_node),
+            "trillium": 192 if not cores_per_node else int(cores_per_node),
+            # UBC ARC sockeye cluster
+            "sockeye": 40 if not cores_per_node else int(cores_per_node),
+        }[SYSTEM]
+        mem_per_cpu, shared_nodes = _memory_resources(
+            run_desc, run_dir, nemo_processors, xios_processors
+        )
+        if backfill:
+            run_desc, procs_per_node = _select_backfill_resources(
+                run_desc,
+                nemo_processors + xios_processors,
+                procs_per_node,
+                cpu_arch,
+                mem_per_cpu=mem_per_cpu,
+                shared_nodes=shared_nodes,
+            )
+        script = "\n".join(
+            (
+                script,
+                f"{_sbatch_directives(run_desc, nemo_processors + xios_processors, procs_per_node, cpu_arch, email, results_dir, mem_per_cpu=mem_per_cpu, shared_nodes=shared_nodes, )}\n",
+            )
+        )
+    else:
+        try:
+            procs_per_node = {
+                # UBC Chemistry orcinus cluster
+                "orcinus": 12 if not cores_per_node else int(cores_per_node),
+                # EOAS optimum cluster
+                "optimum": 20 if not cores_per_node else int(cores_per_node),
+            }[SYSTEM]
+        except KeyError:
+            log.error(f"unknown system: {SYSTEM}")
+            raise SystemExit(2)
+        mem_per_cpu, shared_nodes = _memory_resources(
+            run_desc, run_dir, nemo_processors, xios_processors
+        )
+        if shared_nodes:
+            # Let the scheduler place the processes wherever there are free cores
+            procs_per_node = 0
+        pmem = "2000mb" if mem_per_cpu is None else f"{mem_per_cpu}mb"
+        script = "\n".join(
+            (
+                script,
+                f"{_pbs_directives(run_desc, nemo_processors + xios_processors, email, results_dir, procs_per_node, cpu_arch, pmem, )}\n",
+            )
+        )
+    redirect_stdout_stderr = True if SYSTEM == "salish" else False
+    if restart_handoff:
+        # The results are combined by the post-processing job,
+        # so there is nothing for a worker to do in the NEMO job
+        worker = False
+    execute_section = _execute(
+        nemo_processors,
+        xios_processors,
+        deflate,
+        max_deflate_jobs,
+        separate_deflate,
+        redirect_stdout_stderr,
+        worker=worker,
+        keep_rank_restarts=keep_rank_restarts,
+        restart_handoff=restart_handoff,
+        mpi_placement=_mpi_placement(run_desc),
+    )
+    if restart_handoff:
+        # The post-processing job fixes the results permissions
+        # and deletes the run directory
+        script_end = ""
+    else:
+        script_end = f"{_fix_permissions()}\n"
+    if chain_cmd:
+        script_end += _self_chain(chain_cmd, redirect_stdout_stderr)
+    # The recovery job is submitted after the last write to this attempt's
+    # stdout and stderr files so that they can be renamed out of its way
+    recovery = (
+        _recovery(recovery_cmd, redirect_stdout_stderr, recovery_attempt)
+        if recovery_cmd
+        else ""
+    )
+    script_end += (
+        f"{recovery}exit ${{MPIRUN_EXIT_CODE}}\n"
+        if restart_handoff
+        else _cleanup(recovery)
+    )
+    script = "\n".join(
+        (
+            script,
+            f"{_definitions(run_desc, desc_file, run_dir, results_dir, deflate, worker=worker, restart_handoff=restart_handoff)}\n"
+            f"{_modules()}\n"
+            f"{execute_section}\n"
+            f"{script_end}",
+        )
+    )
+    return script
+
+
+def _build_post_script(
+    run_desc,
+    desc_file,
+    batch_file,
+    results_dir,
+    run_dir,
+    deflate,
+    max_deflate_jobs,
+    separate_deflate,
+):
+    """Build the Bash script for the post-processing job of a run that uses
+    restart hand-off.
+
+    The job combines, deflates (when requested), and gathers the run results
+    after the NEMO job has moved the restart files to the results directory.
+    It runs whether or not the NEMO run succeeded,
+    and exits with the exit code that the NEMO job recorded in the run directory.
+    Its scheduler directives are those of the NEMO job for a single node,
+    with 1 processor,
+    or max_deflate_jobs processors when the results are deflated.
+
+    :param dict run_desc: Run description dictionary.
+
+    :param desc_file: File path/name of the YAML run description file.
+    :type desc_file: :py:class:`pathlib.Path`
+
+    :param batch_file: Path of the NEMO job batch script.
+    :type batch_file: :py:class:`pathlib.Path`
+
+    :param results_dir: Path of the directory in which to store the run results.
+    :type results_dir: :py:class:`pathlib.Path`
+
+    :param run_dir: Path of the temporary run directory.
+    :type run_dir: :py:class:`pathlib.Path`
+
+    :param boolean deflate: Include "salishsea deflate" command in the script.
+
+    :param int max_deflate_jobs: Maximum number of concurrent sub-processes to
+                                 use for netCDF deflating.
+
+    :param boolean separate_deflate: The results are deflated by separate jobs.
+
+    :returns: Bash script for the post-processing job.
+    :rtype: str
+    """
+    run_id = get_run_desc_value(run_desc, ("run_id",))
+    n_processors = max_deflate_jobs if deflate and not separate_deflate else 1
+    if _batch_script_directives(batch_file).startswith("#SBATCH"):
+        nemo_directives = _batch_script_directives(
+            batch_file,
+            replaced=(
+                "--job-name=",
+                "--nodes=",
+                "--ntasks=",
+                "--ntasks-per-node=",
+                "--output=",
+                "--error=",
+            ),
+        )
+        directives = (
+            f"#SBATCH --job-name=post_{run_id}\n"
+            f"#SBATCH --nodes=1\n"
+            f"#SBATCH --ntasks-per-node={n_processors}\n"
+            f"{nemo_directives}"
+            f"# stdout and stderr file paths/names\n"
+            f"#SBATCH --output={results_dir / 'stdout_post'}\n"
+            f"#SBATCH --error={results_dir / 'stderr_post'}\n"
+        )
+    else:
+        nemo_directives = _batch_script_directives(
+            batch_file, replaced=("-N ", "-l nodes=", "-l procs=", "-o ", "-e ")
+        )
+        directives = (
+            f"#PBS -N post_{run_id}\n"
+            f"#PBS -l procs={n_processors}\n"
+            f"{nemo_directives}"
+            f"# stdout and stderr file paths/names\n"
+            f"#PBS -o {results_dir}/stdout_post\n"
+            f"#PBS -e {results_dir}/stderr_post\n"
+        )
+    script = "\n".join(
+        (
+            "#!/bin/bash\n",
+            f"{directives}\n"
+            f"{_definitions(run_desc, desc_file, run_dir, results_dir, deflate)}\n"
+            f"{_modules()}\n"
+            f"cd ${{WORK_DIR}}\n"
+            f'echo "working dir: $(pwd)"\n'
+            f"\n"
+            f"# The exit code of the NEMO run is recorded by the NEMO job;\n"
+            f"# it is missing if the NEMO job was killed before the run ended\n"
+            f"MPIRUN_EXIT_CODE=$(cat mpirun_exit_code 2>/dev/null || echo 1)\n"
+            f"rm -f mpirun_exit_code\n"
+            f"\n"
+            f'echo "Results combining started at $(date)"\n'
+            f"{_combine('')}"
+            f"{_deflate_and_gather(deflate, max_deflate_jobs, separate_deflate, '')}\n"
+            f"{_fix_permissions()}\n"
+            f"{_cleanup()}",
+        )
+    )
+    return script
+
+
+def _select_backfill_resources(
+    run_desc,
+    n_processors,
+    procs_per_node,
+    cpu_arch="",
+    mem_per_cpu=None,
+    shared_nodes=False,
+):
+    """Choose the job resources that are expected to finish soonest from the
+    :kbd:`candidates` list in the :kbd:`backfill` section of the run description.
+
+    Each candidate may replace the :kbd:`walltime`,
+    the number of cores per node,
+    and the :kbd:`partition` of the job;
+    the resources in the run description are always a candidate.
+    A candidate's walltime is only used when it is shorter than the walltime in the
+    run description,
+    so it can't lengthen a predicted walltime.
+    The start times of the candidates are estimated by the scheduler adapter
+    that is registered for :command:`sbatch` from the options of the SBATCH
+    directives that the job would be submitted with,
+    and the candidate with the earliest start time plus walltime is chosen.
+    Ties are resolved in favour of the earlier candidate.
+
+    :param dict run_desc: Run description dictionary.
+
+    :param int n_processors: Number of processors that the run will be
+                             executed on; the sum of NEMO and XIOS processors.
+
+    :param int procs_per_node: Number of processors per node.
+
+    :param str cpu_arch: CPU architecture to use in SBATCH directives.
+
+    :param int mem_per_cpu: Memory per processor in MiB;
+                            the default is to use the system's memory per node.
+
+    :param boolean shared_nodes: The job's processors may share nodes with other jobs.
+
+    :returns: Run description dict with the chosen walltime and partition,
+              Number of processors per node.
+    :rtype: 2-tuple
+    """
+    try:
+        adapter = backfill._adapters["sbatch"]
+    except KeyError:
+        log.warning(
+            "no scheduler adapter to estimate job start times with for sbatch, "
+            "so using job resources from run description"
+        )
+        return run_desc, procs_per_node
+    candidates = get_run_desc_value(run_desc, ("backfill", "candidates"))
+    run_id = get_run_desc_value(run_desc, ("run_id",))
+    run_desc_walltime = _walltime_seconds(get_run_desc_value(run_desc, ("walltime",)))
+    selected = None
+    with timing.span("select_backfill_resources"):
+        for candidate in ({}, *candidates):
+            candidate_run_desc = {
+                **run_desc,
+                **{key: candidate[key] for key in ("partition",) if key in candidate},
+            }
+            if (
+                "walltime" in candidate
+                and _walltime_seconds(candidate["walltime"]) < run_desc_walltime
+            ):
+                candidate_run_desc["walltime"] = candidate["walltime"]
+            candidate_procs_per_node = int(
+                candidate.get("cores per node", procs_per_node)
+            )
+            walltime = _walltime_seconds(
+                get_run_desc_value(candidate_run_desc, ("walltime",))
+            )
+            options = _sbatch_options(
+                _sbatch_directives(
+                    candidate_run_desc,
+                    n_processors,
+                    candidate_procs_per_node,
+                    cpu_arch,
+                    email="",
+                    results_dir=Path(),
+                    mem_per_cpu=mem_per_cpu,
+                    shared_nodes=shared_nodes,
+                )
+            )
+            start_time = adapter.start_time(options)
+            if start_time is None:
+                continue
+            end_time = start_time.shift(seconds=+walltime)
+            if selected is None or end_time < selected[0]:
+                selected = (
+                    end_time,
+                    start_time,
+                    options,
+                    candidate_run_desc,
+                    candidate_procs_per_node,
+                )
+    if selected is None:
+        log.warning(
+            f"job start times could not be estimated for {run_id}, "
+            f"so using job resources from run description"
+        )
+        return run_desc, procs_per_node
+    _, start_time, options, run_desc, procs_per_node = selected
+    resources = ", ".join(
+        f"{option}={value}"
+        for option, value in options.items()
+        if option not in {"account", "mem", "mem-per-cpu"}
+    )
+    log.info(
+        f"{run_id} job resources chosen for earliest expected completion: "
+        f"{resources}; expected start at {start_time.format('YYYY-MM-DD HH:mm:ss')}"
+    )
+    return run_desc, procs_per_node
+
+
+def _sbatch_options(sbatch_directives):
+    """Return the job resource options of SBATCH directives.
+
+    The job name, email notification, and stdout and stderr file options
+    are left out because they don't affect when the job can start.
+
+    :param str sbatch_directives: SBATCH directive lines.
+
+    :returns: :command:`sbatch` option names without their leading :kbd:`--`,
+              and their values.
+    :rtype: dict
+    """
+    options = {}
+    for line in sbatch_directives.splitlines():
+        if not line.startswith("#SBATCH --"):
+            continue
+        name, _, value = line.removeprefix("#SBATCH --").partition("=")
+        if name in {"job-name", "mail-user", "mail-type", "output", "error"}:
+            continue
+        options[name] = value
+    return options
+
+
+def _predict_walltime(run_desc, run_dir):
+    """Predict the smallest walltime that is safe for the run in run_dir from the
+    durations of previous runs with the same configuration, MPI decomposition,
+    and system that are recorded in the walltime history file.
+
+    The NEMO run hours per model day,
+    and the job hours before and after the NEMO run,
+    of the most recent recorded runs are scaled to the length of the run,
+    increased by the :kbd:`margin` fraction from the :kbd:`walltime prediction`
+    section of the run description,
+    and rounded up to a whole minute.
+    The largest rate and overhead of the recorded runs are used.
+    The predicted walltime is only used when it is shorter than the walltime in the
+    run description.
+
+    :param dict run_desc: Run description dictionary.
+
+    :param run_dir: Path of the temporary run directory.
+    :type run_dir: :py:class:`pathlib.Path`
+
+    :returns: Run description dict with the predicted walltime.
+    :rtype: dict
+    """
+    run_id = get_run_desc_value(run_desc, ("run_id",))
+    margin = float(get_run_desc_value(run_desc, ("walltime prediction", "margin")))
+    history_file = _walltime_history_path(run_desc)
+    history_key = _walltime_history_key(run_desc)
+    with _walltime_history_lock:
+        history = _read_walltime_history(history_file)
+        if _measure_walltime_history(history):
+            _write_walltime_history(history_file, history)
+    measured_runs = [
+        entry
+        for entry in history
+        if "model days" in entry
+        and all(entry.get(key) == value for key, value in history_key.items())
+    ]
+    # Only the most recent runs are used so that the prediction follows changes
+    # in the code and the cluster
+    measured_runs = measured_runs[-10:]
+    if not measured_runs:
+        log.info(
+            f"no recorded runs to predict walltime of {run_id} from, "
+            f"so using walltime from run description"
+        )
+        return run_desc
+    nn_it000, nn_itend, rn_rdt = _namrun_timesteps(run_dir / "namelist_cfg")
+    model_days = (nn_itend - nn_it000 + 1) * rn_rdt / (60 * 60 * 24)
+    hours_per_model_day = max(
+        entry["run hours"] / entry["model days"] for entry in measured_runs
+    )
+    overhead_hours = max(
+        entry["job hours"] - entry["run hours"] for entry in measured_runs
+    )
+    predicted_walltime = 60 * math.ceil(
+        (hours_per_model_day * model_days + overhead_hours) * (1 + margin) * 60
+    )
+    walltime = _walltime_seconds(get_run_desc_value(run_desc, ("walltime",)))
+    if predicted_walltime >= walltime:
+        log.warning(
+            f"predicted walltime of {run_id} "
+            f"{_td2hms(datetime.timedelta(seconds=predicted_walltime))} is not "
+            f"shorter than walltime from run description, so using it"
+        )
+        return run_desc
+    log.info(
+        f"{run_id} walltime predicted from {len(measured_runs)} recorded runs: "
+        f"{_td2hms(datetime.timedelta(seconds=predicted_walltime))}"
+    )
+    return {**run_desc, "walltime": predicted_walltime}
+
+
+def _walltime_history_path(run_desc):
+    """
+    :param dict run_desc: Run description dictionary.
+
+    :return: Path of the walltime history file from the :kbd:`history file` item
+             in the :kbd:`walltime prediction` section of the run description;
+             the default is :file:`$HOME/.local/state/salishsea-cmd/walltime_history.yaml`.
+    :rtype: :py:class:`pathlib.Path`
+    """
+    try:
+        return get_run_desc_value(
+            run_desc,
+            ("walltime prediction", "history file"),
+            expand_path=True,
+            fatal=False,
+        )
+    except KeyError:
+        return Path.home() / ".local/state/salishsea-cmd/walltime_history.yaml"
+
+
+def _walltime_history_key(run_desc):
+    """
+    :param dict run_desc: Run description dictionary.
+
+    :return: Walltime history items that identify the runs whose durations can be
+             used to predict the walltime of a run.
+    :rtype: dict
+    """
+    return {
+        "config": get_run_desc_value(run_desc, ("config_name",)),
+        "decomposition": get_run_desc_value(run_desc, ("MPI decomposition",)),
+        "system": SYSTEM,
+    }
+
+
+def _read_walltime_history(history_file):
+    """
+    :param history_file: Path of the walltime history file.
+    :type history_file: :py:class:`pathlib.Path`
+
+    :return: Recorded runs in the order that they were submitted.
+    :rtype: list
+    """
+    try:
+        with history_file.open("rt") as f:
+            return yaml.safe_load(f) or []
+    except FileNotFoundError:
+        return []
+
+
+def _write_walltime_history(history_file, history):
+    """
+    :param history_file: Path of the walltime history file.
+    :type history_file: :py:class:`pathlib.Path`
+
+    :param list history: Recorded runs.
+    """
+    history_file.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file and replace the history file with it so that
+    # concurrent readers never see a partially written history
+    tmp_history_file = history_file.with_suffix(".yaml.tmp")
+    with tmp_history_file.open("wt") as f:
+        yaml.safe_dump(history, f, default_flow_style=False, sort_keys=False)
+    tmp_history_file.replace(history_file)
+
+
+def _record_walltime_history(run_desc, results_dirs):
+    """Record submitted runs in the walltime history file so that their durations
+    can be measured after they have finished.
+
+    :param dict run_desc: Run description dictionary.
+
+    :param list results_dirs: Results directories of the submitted runs.
+    """
+    history_file = _walltime_history_path(run_desc)
+    submitted = arrow.now().format("YYYY-MM-DDTHH:mm:ssZZ")
+    with _walltime_history_lock:
+        history = _read_walltime_history(history_file)
+        history.extend(
+            {
+                **_walltime_history_key(run_desc),
+                "results dir": os.fspath(results_dir),
+                "submitted": submitted,
+            }
+            for results_dir in results_dirs
+        )
+        _write_walltime_history(history_file, history)
+
+
+def _measure_walltime_history(history):
+    """Add the model days, NEMO run hours, and job hours of the recorded runs that
+    have finished to their walltime history items.
+
+    Runs that have not run to their last time step can't be measured,
+    and are dropped from the history 30 days after they were submitted.
+
+    :param list history: Recorded runs.
 
-    :param desc_file: File path/name of the YAML run description file.
-    :type desc_file: :py:class:`pathlib.Path`
+    :return: The history was changed.
+    :rtype: boolean
+    """
+    changed = False
+    expired = arrow.now().shift(days=-30)
+    for entry in list(history):
+        if "model days" in entry:
+            continue
+        results_dir = Path(entry["results dir"])
+        run_hours = _segment_run_hours(results_dir)
+        job_hours = _job_hours(results_dir)
+        try:
+            nn_it000, nn_itend, rn_rdt = _namrun_timesteps(results_dir / "namelist_cfg")
+            # NEMO writes the number of the last time step that it ran to time.step
+            completed = int((results_dir / "time.step").read_text()) == nn_itend
+        except (OSError, KeyError, ValueError):
+            completed = False
+        if run_hours is None or job_hours is None or not completed:
+            if arrow.get(entry["submitted"]) < expired:
+                history.remove(entry)
+                changed = True
+            continue
+        entry.update(
+            {
+                "model days": (nn_itend - nn_it000 + 1) * rn_rdt / (60 * 60 * 24),
+                "run hours": round(run_hours, 4),
+                "job hours": round(job_hours, 4),
+            }
+        )
+        changed = True
+    return changed
 
-    :param int nemo_processors: Number of processors that NEMO will be executed
-                                on.
 
-    :param int xios_processors: Number of processors that XIOS will be executed
-                                on.
+def _namrun_timesteps(namelist_cfg):
+    """
+    :param namelist_cfg: Path of the namelist file that contains the namrun and
+                         namdom namelists of a run.
+    :type namelist_cfg: :py:class:`pathlib.Path`
 
-    :param int max_deflate_jobs: Maximum number of concurrent sub-processes to
-                                 use for netCDF deflating.
+    :return: nn_it000, nn_itend, rn_rdt
+    :rtype: 3-tuple
+    """
+    namelist = f90nml.read(namelist_cfg)
+    return (
+        namelist["namrun"]["nn_it000"],
+        namelist["namrun"]["nn_itend"],
+        namelist["namdom"]["rn_rdt"],
+    )
 
-    :param results_dir: Path of the directory in which to store the run
-                        results;
-                        it will be created if it does not exist.
+
+def _job_hours(results_dir):
+    """Measure the duration of a finished job from the first and last
+    :kbd:`... at` :command:`date` output lines in its :file:`stdout` file.
+
+    :param results_dir: Results directory of the job.
     :type results_dir: :py:class:`pathlib.Path`
 
+    :return: Job duration in hours;
+             :py:obj:`None` if the job's :file:`stdout` file doesn't contain
+             the measurements.
+    :rtype: float or None
+    """
+    try:
+        stdout = (results_dir / "stdout").read_text()
+    except OSError:
+        return None
+    times = [
+        date_time
+        for line in stdout.splitlines()
+        if " at " in line
+        and (date_time := _parse_date_output(line.rsplit(" at ", 1)[1])) is not None
+    ]
+    if len(times) < 2 or times[-1] <= times[0]:
+        return None
+    return (times[-1] - times[0]).total_seconds() / (60 * 60)
+
+
+def _memory_resources(run_desc, run_dir, nemo_processors, xios_processors):
+    """Estimate the memory per processor to request for a run that has a
+    :kbd:`memory` section in its run description.
+
+    :param dict run_desc: Run description dictionary.
+
     :param run_dir: Path of the temporary run directory.
     :type run_dir: :py:class:`pathlib.Path`
 
-    :param boolean deflate: Include "salishsea deflate" command in the bash
-                            script.
+    :param int nemo_processors: Number of processors that NEMO will be executed on.
 
-    :param boolean separate_deflate: Produce separate bash scripts to deflate
-                                     the run results and qsub them to run as
-                                     serial jobs after the NEMO run finishes.
+    :param int xios_processors: Number of processors that XIOS will be executed on.
 
-    :param str cores_per_node: Number of cores/node to use in PBS or SBATCH directives.
+    :return: Memory to request per processor in MiB,
+             or :py:obj:`None` to use the system's default memory directives,
+             and whether to request processors with that memory instead of
+             whole nodes.
+    :rtype: 2-tuple of (int or None, boolean)
+    """
+    if "memory" not in run_desc:
+        return None, False
+    try:
+        margin = float(get_run_desc_value(run_desc, ("memory", "margin"), fatal=False))
+    except KeyError:
+        margin = 0.25
+    try:
+        shared_nodes = bool(
+            get_run_desc_value(run_desc, ("memory", "shared nodes"), fatal=False)
+        )
+    except KeyError:
+        shared_nodes = False
+    nemo_mib = _estimate_nemo_memory(run_desc, run_dir)
+    if nemo_mib is None:
+        return None, False
+    # Every processor gets the same memory, so the XIOS servers' memory is shared
+    # out among all of them
+    total_mib = (
+        nemo_processors * nemo_mib
+        + xios_processors * MEMORY_ESTIMATE["xios server MiB"]
+    )
+    mem_per_cpu = math.ceil(
+        total_mib * (1 + margin) / (nemo_processors + xios_processors)
+    )
+    log.info(
+        f"estimated memory for {get_run_desc_value(run_desc, ('run_id',))} is "
+        f"{mem_per_cpu} MiB per processor"
+    )
+    return mem_per_cpu, shared_nodes
 
-    :param str cpu_arch: CPU architecture to use in PBS or SBATCH directives.
 
-    :returns: Bash script to execute the run.
-    :rtype: str
+def _estimate_nemo_memory(run_desc, run_dir):
+    """Estimate the memory that a NEMO processor needs from the size of its
+    sub-domain of the grid and the number of passive tracers.
+
+    :param dict run_desc: Run description dictionary.
+
+    :param run_dir: Path of the temporary run directory.
+    :type run_dir: :py:class:`pathlib.Path`
+
+    :return: Memory per NEMO processor in MiB;
+             :py:obj:`None` if the grid size is not in the :kbd:`namcfg` namelist.
+    :rtype: int or None
     """
-    script = "#!/bin/bash\n"
+    namcfg = f90nml.read(run_dir / "namelist_cfg").get("namcfg", {})
     try:
-        email = get_run_desc_value(run_desc, ("email",), fatal=False)
+        jpiglo, jpjglo, jpk = (namcfg[key] for key in ("jpidta", "jpjdta", "jpkdta"))
     except KeyError:
-        email = f"{os.getenv('USER')}@eoas.ubc.ca"
-    if SYSTEM == "salish":
-        # salish doesn't use a scheduler, so no sbatch or PBS directives in its script
-        pass
-    elif SYSTEM in {
-        # Alliance Canada clusters
-        "fir",
-        "narval",
-        "nibi",
-        "rorqual",
-        "trillium",
-        # UBC ARC sockeye cluster
-        "sockeye",
-    }:
-        procs_per_node = {
-            # Alliance Canada clusters
-            "fir": 192 if not cores_per_node else int(cores_per_node),
-            "narval": 64 if not cores_per_node else int(cores_per_node),
-            "nibi": 192 if not cores_per_node else int(cores_per_node),
-            "rorqual": 192 if not cores_per_node else int(cores_per_node),
-            "trillium": 192 if not cores_per_node else int(cores_per_node),
-            # UBC ARC sockeye cluster
-            "sockeye": 40 if not cores_per_node else int(cores_per_node),
-        }[SYSTEM]
-        script = "\n".join(
-            (
-                script,
-                f"{_sbatch_directives(run_desc, nemo_processors + xios_processors, procs_per_node, cpu_arch, email, results_dir, )}\n",
-            )
-        )
-    else:
-        try:
-            procs_per_node = {
-                # UBC Chemistry orcinus cluster
-                "orcinus": 12 if not cores_per_node else int(cores_per_node),
-                # EOAS optimum cluster
-                "optimum": 20 if not cores_per_node else int(cores_per_node),
-            }[SYSTEM]
-        except KeyError:
-            log.error(f"unknown system: {SYSTEM}")
-            raise SystemExit(2)
-        script = "\n".join(
-            (
-                script,
-                f"{_pbs_directives(run_desc, nemo_processors + xios_processors, email, results_dir, procs_per_node, cpu_arch, )}\n",
-            )
+        log.warning(
+            f"grid size not found in namcfg namelist in {run_dir / 'namelist_cfg'}, "
+            f"so using the system's default memory directives"
         )
-    redirect_stdout_stderr = True if SYSTEM == "salish" else False
-    execute_section = _execute(
-        nemo_processors,
-        xios_processors,
-        deflate,
-        max_deflate_jobs,
-        separate_deflate,
-        redirect_stdout_stderr,
+        return None
+    jpni, jpnj = map(
+        int, get_run_desc_value(run_desc, ("MPI decomposition",)).split("x")
     )
-    script = "\n".join(
-        (
-            script,
-            f"{_definitions(run_desc, desc_file, run_dir, results_dir, deflate)}\n"
-            f"{_modules()}\n"
-            f"{execute_section}\n"
-            f"{_fix_permissions()}\n"
-            f"{_cleanup()}",
-        )
+    # Sub-domains have a 1 grid point halo on each side
+    sub_domain_points = (
+        (math.ceil((jpiglo - 2) / jpni) + 2)
+        * (math.ceil((jpjglo - 2) / jpnj) + 2)
+        * jpk
     )
-    return script
+    n_tracers = 0
+    namelist_top = run_dir / "namelist_top_cfg"
+    if namelist_top.exists():
+        with warnings.catch_warnings():
+            # The other fields of the sn_tracer derived type items are dropped with
+            # a warning when they are not assigned by name
+            warnings.simplefilter("ignore")
+            namtrc = f90nml.read(namelist_top).get("namtrc", {})
+        n_tracers = len(namtrc.get("sn_tracer", []))
+    n_3d_arrays = (
+        MEMORY_ESTIMATE["nemo 3d arrays"]
+        + n_tracers * MEMORY_ESTIMATE["tracer 3d arrays"]
+    )
+    return math.ceil(
+        sub_domain_points * n_3d_arrays * 8 / 2**20 + MEMORY_ESTIMATE["nemo base MiB"]
+    )
+
+
+def _node_layout(n_processors, procs_per_node):
+    """Spread the processes of a job evenly across the fewest nodes that they fit on.
+
+    NEMO is memory bandwidth bound,
+    so a job that packs its 1st node full and leaves its last node nearly empty
+    runs at the pace of the ranks that share the full node's memory bandwidth.
+
+    :param int n_processors: Number of processors that the job will be
+                             executed on.
+
+    :param int procs_per_node: Maximum number of processors per node.
+
+    :return: Number of nodes, Number of processors per node.
+    :rtype: 2-tuple
+    """
+    nodes = math.ceil(n_processors / procs_per_node)
+    return nodes, math.ceil(n_processors / nodes)
 
 
 def _sbatch_directives(
@@ -735,6 +3147,8 @@ def _sbatch_directives(
     mem="0",
     deflate=False,
     result_type="",
+    mem_per_cpu=None,
+    shared_nodes=False,
 ):
     """Return the SBATCH directives used to run NEMO on a cluster that uses the
     Slurm Workload Manager for job scheduling.
@@ -748,7 +3162,8 @@ def _sbatch_directives(
     :param int n_processors: Number of processors that the run will be
                              executed on; the sum of NEMO and XIOS processors.
 
-    :param int procs_per_node: Number of processors per node.
+    :param int procs_per_node: Maximum number of processors per node;
+                               the processors are spread evenly across the nodes.
 
     :param str cpu_arch: CPU architecture to use in PBS or SBATCH directives.
 
@@ -766,21 +3181,31 @@ def _sbatch_directives(
     :param str result_type: Run result type ('grid', 'ptrc', or 'dia') for
                             deflation job.
 
+    :param int mem_per_cpu: Memory per processor in MiB;
+                            the default is to use the system's memory per node.
+
+    :param boolean shared_nodes: Request n_processors processors with mem_per_cpu
+                                 memory each that may share nodes with other jobs,
+                                 instead of whole nodes.
+
     :returns: SBATCH directives for run script.
     :rtype: Unicode str
     """
     run_id = get_run_desc_value(run_desc, ("run_id",))
-    nodes = math.ceil(n_processors / procs_per_node)
-    mem = {
-        # Alliance Canada clusters
-        "fir": "0",
-        "narval": "0",
-        "nibi": "0",
-        "rorqual": "0",
-        # Not used on trillium
-        # UBC ARC sockeye cluster
-        "sockeye": "186gb",
-    }.get(SYSTEM, mem)
+    nodes, tasks_per_node = _node_layout(n_processors, procs_per_node)
+    if mem_per_cpu is None:
+        mem = {
+            # Alliance Canada clusters
+            "fir": "0",
+            "narval": "0",
+            "nibi": "0",
+            "rorqual": "0",
+            # Not used on trillium
+            # UBC ARC sockeye cluster
+            "sockeye": "186gb",
+        }.get(SYSTEM, mem)
+    else:
+        mem = f"{tasks_per_node * mem_per_cpu}M"
     if deflate:
         run_id = f"{result_type}_{run_id}_deflate"
     try:
@@ -797,12 +3222,22 @@ def _sbatch_directives(
         )
     else:
         sbatch_directives = f"#SBATCH --job-name={run_id}\n"
-    sbatch_directives += (
-        f"#SBATCH --nodes={int(nodes)}\n"
-        f"#SBATCH --ntasks-per-node={procs_per_node}\n"
-    )
-    if SYSTEM != "trillium":
-        sbatch_directives += f"#SBATCH --mem={mem}\n"
+    try:
+        partition = get_run_desc_value(run_desc, ("partition",), fatal=False)
+        sbatch_directives += f"#SBATCH --partition={partition}\n"
+    except KeyError:
+        # Use the cluster's default partition
+        pass
+    if shared_nodes:
+        sbatch_directives += f"#SBATCH --ntasks={n_processors}\n"
+        if SYSTEM != "trillium":
+            sbatch_directives += f"#SBATCH --mem-per-cpu={mem_per_cpu}M\n"
+    else:
+        sbatch_directives += (
+            f"#SBATCH --nodes={nodes}\n" f"#SBATCH --ntasks-per-node={tasks_per_node}\n"
+        )
+        if SYSTEM != "trillium":
+            sbatch_directives += f"#SBATCH --mem={mem}\n"
     sbatch_directives += (
         f"#SBATCH --time={walltime}\n"
         f"#SBATCH --mail-user={email}\n"
@@ -867,11 +3302,12 @@ def _pbs_directives(
     :param results_dir: Directory to store results into.
     :type results_dir: :py:class:`pathlib.Path`
 
-    :param int procs_per_node: Number of processors per node.
+    :param int procs_per_node: Maximum number of processors per node.
                                Defaults to 0 to produce
                                :kbd:`#PBS -l procs=n_processors` directive.
-                               Otherwise produces
-                               :kbd:`#PBS -l nodes=n:ppn=procs_per_node` directive.
+                               Otherwise produces a
+                               :kbd:`#PBS -l nodes=n:ppn=m` directive with the
+                               processors spread evenly across the nodes.
 
     :param str cpu_arch: CPU architecture to use in PBS or SBATCH directives.
 
@@ -896,8 +3332,8 @@ def _pbs_directives(
     if not procs_per_node:
         procs_directive = f"#PBS -l procs={n_processors}"
     else:
-        nodes = math.ceil(n_processors / procs_per_node)
-        procs_directive = f"#PBS -l nodes={nodes}:ppn={procs_per_node}"
+        nodes, ppn = _node_layout(n_processors, procs_per_node)
+        procs_directive = f"#PBS -l nodes={nodes}:ppn={ppn}"
     if deflate:
         run_id = f"{result_type}_{run_id}_deflate"
     try:
@@ -960,19 +3396,51 @@ def _td2hms(timedelta):
     return f"{hms[0]}:{hms[1]:02d}:{hms[2]:02d}"
 
 
-def _definitions(run_desc, run_desc_file, run_dir, results_dir, deflate):
-    salishsea_cmd_dir = Path(__file__).parent.parent
-    salishsea_cmd = f"pixi run -m {os.fspath(salishsea_cmd_dir)} salishsea"
+def _salishsea_exec():
+    """Return the path of the :command:`salishsea` command in the environment that
+    the present process is running in.
+
+    The environment is resolved once,
+    when the run is submitted,
+    so that the job scripts can execute the command directly instead of
+    re-resolving and re-activating the environment via :command:`pixi run`
+    for each post-processing step.
+
+    :rtype: :py:class:`pathlib.Path`
+    """
+    return Path(sys.executable).with_name("salishsea")
+
+
+def _definitions(
+    run_desc,
+    run_desc_file,
+    run_dir,
+    results_dir,
+    deflate,
+    worker=False,
+    restart_handoff=False,
+):
+    salishsea_cmd = os.fspath(_salishsea_exec())
     defns = (
         f'RUN_ID="{get_run_desc_value(run_desc, ("run_id",))}"\n'
         f'RUN_DESC="{run_dir}/{run_desc_file.name}"\n'
         f'WORK_DIR="{run_dir}"\n'
         f'RESULTS_DIR="{results_dir}"\n'
-        f'COMBINE="{salishsea_cmd} combine"\n'
     )
+    if worker:
+        defns += (
+            f'WORKER="{salishsea_cmd} worker"\n'
+            f'WORKER_SOCKET="${{TMPDIR:-/tmp}}/salishsea_worker_${{RUN_ID}}_$$.sock"\n'
+            f'WORKER_CLIENT="{sys.executable} -m salishsea_cmd.worker_client ${{WORKER_SOCKET}}"\n'
+        )
+        salishsea_cmd = "${WORKER_CLIENT}"
+    defns += f'COMBINE="{salishsea_cmd} combine"\n'
     if deflate:
         defns += f'DEFLATE="{salishsea_cmd} deflate"\n'
     defns += f'GATHER="{salishsea_cmd} gather"\n'
+    if restart_handoff:
+        # The restart files are rebuilt in the NEMO job before they are handed off
+        defns += f'REBUILD_NEMO="{nemo_cmd.api.find_rebuild_nemo_script(run_desc)}"\n'
     return defns
 
 
@@ -1027,6 +3495,60 @@ def _modules():
     return modules
 
 
+def _mpi_placement(run_desc):
+    """Return the MPI process placement profiles for the NEMO and XIOS server
+    processes of a run on the system that we are running on.
+
+    The profiles in the :kbd:`mpi placement` section of the run description for the
+    system are merged over the default profiles for the system.
+
+    :param dict run_desc: Run description dictionary.
+
+    :return: Placement profile dicts keyed by :kbd:`nemo` and :kbd:`xios`.
+    :rtype: dict
+    """
+    defaults = MPI_PLACEMENT.get(SYSTEM, {})
+    try:
+        profiles = get_run_desc_value(run_desc, ("mpi placement", SYSTEM), fatal=False)
+    except KeyError:
+        profiles = {}
+    return {
+        exe: {**defaults.get(exe, {}), **(profiles.get(exe) or {})}
+        for exe in ("nemo", "xios")
+    }
+
+
+def _mpirun_placement_options(profile):
+    """Render an MPI process placement profile as :program:`mpirun` options.
+
+    :param dict profile: Placement profile;
+                         :kbd:`ranks per socket`,
+                         :kbd:`map by`,
+                         :kbd:`bind to`,
+                         and :kbd:`hardware threads` items are rendered.
+
+    :return: :program:`mpirun` options followed by a space;
+             empty if the profile is empty.
+    :rtype: str
+    """
+    if "ranks per socket" in profile and "map by" in profile:
+        log.error(
+            "only one of ranks per socket and map by can be used in an "
+            "mpi placement profile"
+        )
+        raise SystemExit(2)
+    options = []
+    if "ranks per socket" in profile:
+        options.append(f"--map-by ppr:{profile['ranks per socket']}:socket")
+    if "map by" in profile:
+        options.append(f"--map-by {profile['map by']}")
+    if "bind to" in profile:
+        options.append(f"--bind-to {profile['bind to']}")
+    if profile.get("hardware threads"):
+        options.append("--use-hwthread-cpus")
+    return "".join(f"{option} " for option in options)
+
+
 def _execute(
     nemo_processors,
     xios_processors,
@@ -1034,7 +3556,13 @@ def _execute(
     max_deflate_jobs,
     separate_deflate,
     redirect_stdout_stderr,
+    worker=False,
+    keep_rank_restarts=False,
+    restart_handoff=False,
+    mpi_placement=None,
 ):
+    if mpi_placement is None:
+        mpi_placement = _mpi_placement({})
     redirect = (
         ""
         if not redirect_stdout_stderr
@@ -1056,41 +3584,13 @@ def _execute(
         # EOAS optimum cluster
         "optimum": "mpiexec -hostfile $(openmpi_nodefile)",
     }.get(SYSTEM, "mpirun")
-    mpirun = {
-        # Alliance Canada clusters
-        "fir": f"{mpirun} -np {nemo_processors} ./nemo.exe",
-        "narval": f"{mpirun} -np {nemo_processors} ./nemo.exe",
-        "nibi": f"{mpirun} -np {nemo_processors} ./nemo.exe",
-        "rorqual": f"{mpirun} -np {nemo_processors} ./nemo.exe",
-        "trillium": f"{mpirun} -np {nemo_processors} ./nemo.exe",
-        # UBC ARC sockeye cluster
-        "sockeye": f"{mpirun} -np {nemo_processors} ./nemo.exe",
-        # MOAD development machine
-        "salish": f"{mpirun} --bind-to none -np {nemo_processors} ./nemo.exe",
-        # UBC Chemistry orcinus cluster
-        "orcinus": f"{mpirun} -np {nemo_processors} ./nemo.exe",
-        # EOAS optimum cluster
-        "optimum": f"{mpirun} --bind-to core -np {nemo_processors} ./nemo.exe",
-    }.get(SYSTEM, f"{mpirun} -np {nemo_processors} ./nemo.exe")
+    nemo_options = _mpirun_placement_options(mpi_placement["nemo"])
+    mpirun = f"{mpirun} {nemo_options}-np {nemo_processors} ./nemo.exe"
     if xios_processors:
-        mpirun = {
-            # Alliance Canada clusters
-            "fir": f"{mpirun} : -np {xios_processors} ./xios_server.exe{redirect}",
-            "narval": f"{mpirun} : -np {xios_processors} ./xios_server.exe{redirect}",
-            "nibi": f"{mpirun} : -np {xios_processors} ./xios_server.exe{redirect}",
-            "rorqual": f"{mpirun} : -np {xios_processors} ./xios_server.exe{redirect}",
-            "trillium": f"{mpirun} : -np {xios_processors} ./xios_server.exe{redirect}",
-            # UBC ARC sockeye cluster
-            "sockeye": f"{mpirun} : -np {xios_processors} ./xios_server.exe{redirect}",
-            # MOAD development machine
-            "salish": f"{mpirun} : --bind-to none -np {xios_processors} ./xios_server.exe{redirect}",
-            # UBC Chemistry orcinus cluster
-            "orcinus": f"{mpirun} : -np {xios_processors} ./xios_server.exe{redirect}",
-            # EOAS optimum cluster
-            "optimum": f"{mpirun} : --bind-to core -np {xios_processors} ./xios_server.exe{redirect}",
-        }.get(
-            SYSTEM,
-            f"{mpirun} : -np {xios_processors} ./xios_server.exe{redirect}",
+        xios_options = _mpirun_placement_options(mpi_placement["xios"])
+        mpirun = (
+            f"{mpirun} : {xios_options}-np {xios_processors} ./xios_server.exe"
+            f"{redirect}"
         )
     redirect = "" if not redirect_stdout_stderr else " >>${RESULTS_DIR}/stdout"
     script = textwrap.dedent(f"""\
@@ -1098,18 +3598,54 @@ def _execute(
         cd ${{WORK_DIR}}
         echo "working dir: $(pwd)"{redirect}
 
+        """)
+    if worker:
+        # Start the worker before the run so that its start-up is hidden behind NEMO
+        script += textwrap.dedent(f"""\
+            ${{WORKER}} ${{WORKER_SOCKET}} --debug{redirect} &
+            WORKER_PID=$!
+
+            """)
+    script += textwrap.dedent(f"""\
         echo "Starting run at $(date)"{redirect}
         {mpirun}
         MPIRUN_EXIT_CODE=$?
         echo "Ended run at $(date)"{redirect}
 
-        echo "Results combining started at $(date)"{redirect}
         """)
+    if restart_handoff:
+        # The next segment can start as soon as the restart files are in the results
+        # directory; the combine, deflate, and gather steps are done by
+        # the post-processing job
+        script += _restart_handoff(keep_rank_restarts, redirect)
+    else:
+        script += textwrap.dedent(f"""\
+            echo "Results combining started at $(date)"{redirect}
+            """)
+        if keep_rank_restarts:
+            # The next segment reads the per-processor restart files,
+            # so they are moved out of the way of the combine step
+            script += textwrap.dedent(f"""\
+                mv *_restart*_[0-9][0-9][0-9][0-9].nc {RANK_RESTARTS_RECORD} ${{RESULTS_DIR}}/
+                """)
+        script += _combine(redirect)
+        script += _deflate_and_gather(
+            deflate, max_deflate_jobs, separate_deflate, redirect
+        )
+    if worker:
+        script += textwrap.dedent("""\
+            ${WORKER_CLIENT} --shutdown
+            wait ${WORKER_PID}
+            """)
+    return script
+
+
+def _rebuild_modules():
     if SYSTEM == "optimum":
         # Load GCC-8.3 modules just before combining because rebuild_nemo on optimum
         # is built with them, in contrast to XIOS and NEMO which are built with
         # the system GCC-4.4.7
-        script += textwrap.dedent("""\
+        return textwrap.dedent("""\
             module load GCC/8.3
             module load OpenMPI/2.1.6/GCC/8.3
             module load ZLIB/1.2/11
@@ -1117,10 +3653,65 @@ def _execute(
             module load HDF5/1.08/20
             module load NETCDF/4.6/1
             """)
+    return ""
+
+
+def _combine(redirect):
+    script = _rebuild_modules()
     script += textwrap.dedent(f"""\
         ${{COMBINE}} ${{RUN_DESC}} --debug{redirect}
         echo "Results combining ended at $(date)"{redirect}
         """)
+    return script
+
+
+def _restart_handoff(keep_rank_restarts, redirect):
+    """Return the part of the NEMO job script of a run that uses restart hand-off
+    that moves the restart files to the results directory.
+
+    The exit code of the NEMO run is recorded in the run directory
+    for the post-processing job.
+    Only the restart files are rebuilt from their per-processor files before they
+    are moved,
+    unless the per-processor restart files are kept,
+    so the combine step of the rest of the results stays out of the way
+    of the next segment.
+
+    :param boolean keep_rank_restarts: Move the per-processor restart files to the
+                                       results directory instead of rebuilding them.
+
+    :param str redirect: Redirection of the stdout of the commands.
+
+    :rtype: str
+    """
+    script = textwrap.dedent(f"""\
+        echo "Restart hand-off started at $(date)"{redirect}
+        echo ${{MPIRUN_EXIT_CODE}} >mpirun_exit_code
+        """)
+    if keep_rank_restarts:
+        script += textwrap.dedent(f"""\
+            mv *_restart*_[0-9][0-9][0-9][0-9].nc {RANK_RESTARTS_RECORD} ${{RESULTS_DIR}}/
+            """)
+    else:
+        script += _rebuild_modules()
+        script += textwrap.dedent(f"""\
+            for RANK_0 in *_restart*_0000.nc; do
+              [ -e "${{RANK_0}}" ] || continue
+              RESTART=${{RANK_0%_0000.nc}}
+              N_RANKS=$(ls ${{RESTART}}_[0-9][0-9][0-9][0-9].nc | wc -l)
+              ${{REBUILD_NEMO}} ${{RESTART}} ${{N_RANKS}}{redirect} \\
+                && rm ${{RESTART}}_[0-9][0-9][0-9][0-9].nc
+            done
+            mv *_restart*.nc ${{RESULTS_DIR}}/
+            """)
+    script += textwrap.dedent(f"""\
+        echo "Restart hand-off ended at $(date)"{redirect}
+        """)
+    return script
+
+
+def _deflate_and_gather(deflate, max_deflate_jobs, separate_deflate, redirect):
+    script = ""
     if deflate and not separate_deflate:
         script += textwrap.dedent(f"""\
 
@@ -1157,13 +3748,100 @@ def _fix_permissions():
     return script
 
 
-def _cleanup():
+def _self_chain_args(
+    desc_file,
+    results_dir,
+    cores_per_node,
+    cpu_arch,
+    deflate,
+    max_deflate_jobs,
+    nocheck_init,
+    per_rank_restarts,
+    restart_handoff,
+    separate_deflate,
+    worker,
+    quiet,
+):
+    """Return the :command:`salishsea run` command line,
+    without the :kbd:`--start-segment` option,
+    that segment jobs use to prepare and submit their next segments.
+
+    The command changes to the present working directory first so that relative paths
+    in the run description are resolved the same way that they are for this run.
+
+    :rtype: str
+    """
+    args = [
+        os.fspath(_salishsea_exec()),
+        "run",
+        os.fspath(nemo_cmd.resolved_path(desc_file)),
+        os.fspath(results_dir),
+        "--self-chain",
+    ]
+    if cores_per_node:
+        args.extend(("--cores-per-node", f"{cores_per_node}"))
+    if cpu_arch:
+        args.extend(("--cpu-arch", cpu_arch))
+    if deflate:
+        args.append("--deflate")
+    args.extend(("--max-deflate-jobs", f"{max_deflate_jobs}"))
+    if nocheck_init:
+        args.append("--nocheck-initial-conditions")
+    if per_rank_restarts:
+        args.append("--per-rank-restarts")
+    if restart_handoff:
+        args.append("--restart-handoff")
+    if separate_deflate:
+        args.append("--separate-deflate")
+    if worker:
+        args.append("--worker")
+    if quiet:
+        args.append("--quiet")
+    return f"cd {shlex.quote(os.getcwd())} && {shlex.join(args)}"
+
+
+def _self_chain(chain_cmd, redirect_stdout_stderr):
+    redirect = (
+        ""
+        if not redirect_stdout_stderr
+        else " >>${RESULTS_DIR}/stdout 2>>${RESULTS_DIR}/stderr"
+    )
+    script = textwrap.dedent(f"""\
+        if [ ${{MPIRUN_EXIT_CODE}} -eq 0 ]; then
+          echo "Submitting next segment at $(date)"{redirect}
+          ({chain_cmd}){redirect}
+        fi
+
+        """)
+    return script
+
+
+def _recovery(recovery_cmd, redirect_stdout_stderr, recovery_attempt=0):
+    # The output of the rest of the failed attempt goes to its renamed files;
+    # the scheduler keeps writing to them via its open file handles
+    stdout = f"${{RESULTS_DIR}}/stdout_attempt_{recovery_attempt}"
+    stderr = f"${{RESULTS_DIR}}/stderr_attempt_{recovery_attempt}"
+    redirect = "" if not redirect_stdout_stderr else f" >>{stdout} 2>>{stderr}"
+    script = textwrap.dedent(f"""\
+        if [ ${{MPIRUN_EXIT_CODE}} -ne 0 ]; then
+          mv ${{RESULTS_DIR}}/stdout {stdout}
+          mv ${{RESULTS_DIR}}/stderr {stderr}
+          echo "Submitting segment recovery at $(date)"{redirect}
+          ({recovery_cmd}){redirect}
+        fi
+
+        """)
+    return script
+
+
+def _cleanup(recovery=""):
     script = textwrap.dedent("""\
         echo "Deleting run directory" >>${RESULTS_DIR}/stdout
         rmdir $(pwd)
         echo "Finished at $(date)" >>${RESULTS_DIR}/stdout
-        exit ${MPIRUN_EXIT_CODE}
         """)
+    script += recovery
+    script += "exit ${MPIRUN_EXIT_CODE}\n"
     return script
 
 
@@ -1182,7 +3860,7 @@ def _build_deflate_script(run_desc, pattern, result_type, results_dir):
     )
     script += (
         f'RESULTS_DIR="{results_dir}"\n'
-        f'DEFLATE="${{PBS_O_HOME}}/.local/bin/salishsea deflate"\n'
+        f'DEFLATE="{_salishsea_exec()} deflate"\n'
         f"\n"
         f"{_modules()}\n"
         f"cd ${{RESULTS_DIR}}\n"
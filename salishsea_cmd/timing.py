@@ -0,0 +1,100 @@
+#  Copyright 2013 – present by the SalishSeaCast Project Contributors
+#  and The University of British Columbia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# SPDX-License-Identifier: Apache-2.0
+
+
+"""SalishSeaCmd timing spans for the phases of the prepare and run sub-commands.
+
+Callbacks are registered via :py:func:`salishsea_cmd.api.register_timing_callback`.
+"""
+
+import contextlib
+import contextvars
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+_callbacks = []
+_span_path = contextvars.ContextVar("span_path", default=())
+
+
+@contextlib.contextmanager
+def span(name):
+    """Time the body of the :kbd:`with` statement and report it to the registered
+    callbacks.
+
+    Spans that are opened inside other spans are reported with the names of their
+    enclosing spans as a :kbd:`/` separated prefix;
+    e.g. :kbd:`run/build_tmp_run_dir/prepare/make_run_dir`.
+
+    :param str name: Name of the span.
+    """
+    path = (*_span_path.get(), name)
+    token = _span_path.set(path)
+    t_start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t_start
+        _span_path.reset(token)
+        span_name = "/".join(path)
+        for callback in tuple(_callbacks):
+            try:
+                callback(span_name, elapsed)
+            except Exception:
+                log.exception(f"timing callback {callback} failed for {span_name}")
+
+
+class Timings:
+    """Timing callback that collects spans for a per-step breakdown report."""
+
+    def __init__(self):
+        self.spans = []
+
+    def __call__(self, name, elapsed):
+        self.spans.append((name, elapsed))
+
+    def report(self):
+        """Return the collected spans formatted as a multi-line report
+        in the order in which they finished.
+
+        :rtype: str
+        """
+        width = max((len(name) for name, _ in self.spans), default=0)
+        lines = [f"{name:<{width}}  {elapsed:9.3f}s" for name, elapsed in self.spans]
+        return "\n".join(["step timings:", *lines])
+
+
+@contextlib.contextmanager
+def collect_timings(enabled=True):
+    """Collect the timings of the spans in the body of the :kbd:`with` statement
+    and log a per-step breakdown report at its end.
+
+    :param boolean enabled: Collect and report timings;
+                            the default is :py:obj:`True` so that the
+                            :kbd:`--timings` option value can be passed.
+    """
+    if not enabled:
+        yield
+        return
+    timings = Timings()
+    _callbacks.append(timings)
+    try:
+        yield timings
+    finally:
+        _callbacks.remove(timings)
+        log.info(timings.report())
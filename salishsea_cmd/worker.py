@@ -0,0 +1,150 @@
+#  Copyright 2013 – present by the SalishSeaCast Project Contributors
+#  and The University of British Columbia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# SPDX-License-Identifier: Apache-2.0
+
+
+"""SalishSeaCmd command plug-in for worker sub-command.
+
+Serve post-processing sub-command requests for a run's job from a resident process
+so that the interpreter start-up, imports, and environment set-up are done once per
+job instead of once per post-processing step.
+Requests are sent by :py:mod:`salishsea_cmd.worker_client`.
+"""
+
+import json
+import logging
+import os
+import socketserver
+from pathlib import Path
+
+import cliff.command
+
+log = logging.getLogger(__name__)
+
+# Sub-commands that the worker will execute
+WORKER_COMMANDS = {"combine", "deflate", "gather"}
+
+
+class Worker(cliff.command.Command):
+    """Serve post-processing sub-commands for a run from a resident process."""
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.description = """
+            Listen on the Unix domain socket SOCKET for combine, deflate, and gather
+            sub-command requests, and execute them in this process until a shutdown
+            request is received.
+        """
+        parser.add_argument(
+            "socket_path",
+            metavar="SOCKET",
+            type=Path,
+            help="Unix domain socket path to listen on",
+        )
+        return parser
+
+    def take_action(self, parsed_args):
+        """Execute the `salishsea worker` sub-command.
+
+        :param parsed_args: Arguments and options parsed from the command-line.
+        :type parsed_args: :class:`argparse.Namespace` instance
+        """
+        serve(parsed_args.socket_path, self.app)
+
+
+def serve(socket_path, app):
+    """Execute sub-command requests received on socket_path until a shutdown
+    request is received.
+
+    Requests are handled one at a time because each of them is executed in the
+    working directory and environment of the client that sent it.
+
+    :param socket_path: Unix domain socket path to listen on.
+    :type socket_path: :py:class:`pathlib.Path`
+
+    :param app: Application instance to execute the sub-commands with.
+    :type app: :py:class:`cliff.app.App`
+    """
+    socket_path.unlink(missing_ok=True)
+    umask = os.umask(0o077)
+    try:
+        server = _WorkerServer(os.fspath(socket_path), _RequestHandler)
+    finally:
+        os.umask(umask)
+    server.app = app
+    log.info(f"listening for requests on {socket_path}")
+    with server:
+        while not server.shutdown_requested:
+            server.handle_request()
+    socket_path.unlink(missing_ok=True)
+    log.info("worker shut down")
+
+
+class _WorkerServer(socketserver.UnixStreamServer):
+    app = None
+    shutdown_requested = False
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+        if request.get("shutdown"):
+            self.server.shutdown_requested = True
+            returncode = 0
+        else:
+            returncode = _run_request(
+                self.server.app, request["argv"], request["cwd"], request["env"]
+            )
+        self.wfile.write(f"{json.dumps({'returncode': returncode})}\n".encode())
+
+
+def _run_request(app, argv, cwd, env):
+    """Execute a sub-command in the client's working directory and environment.
+
+    :param app: Application instance to execute the sub-command with.
+    :type app: :py:class:`cliff.app.App`
+
+    :param list argv: Command-line arguments of the sub-command;
+                      application-level options like :kbd:`--debug` are ignored
+                      because the worker's options apply.
+
+    :param str cwd: Working directory to execute the sub-command in.
+
+    :param dict env: Environment variables to execute the sub-command with;
+                     e.g. :envvar:`PATH` changes from :command:`module load`
+                     commands in the job script.
+
+    :returns: Sub-command return code.
+    :rtype: int
+    """
+    worker_cwd, worker_env = os.getcwd(), os.environ.copy()
+    try:
+        _, sub_argv = app.parser.parse_known_args(argv)
+        if not sub_argv or sub_argv[0] not in WORKER_COMMANDS:
+            log.error(f"worker can only execute {sorted(WORKER_COMMANDS)}: {argv}")
+            return 2
+        os.chdir(cwd)
+        os.environ.clear()
+        os.environ.update(env)
+        result = app.run_subcommand(sub_argv)
+    except SystemExit as exc:
+        # argparse exits on argument errors
+        result = exc.code
+    finally:
+        os.environ.clear()
+        os.environ.update(worker_env)
+        os.chdir(worker_cwd)
+    return result or 0
@@ -0,0 +1,106 @@
+#  Copyright 2013 – present by the SalishSeaCast Project Contributors
+#  and The University of British Columbia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# SPDX-License-Identifier: Apache-2.0
+
+
+"""Thin client for the :command:`salishsea worker` resident post-processing process.
+
+Usage::
+
+    python -m salishsea_cmd.worker_client SOCKET SUB-COMMAND [ARGS...]
+    python -m salishsea_cmd.worker_client SOCKET --shutdown
+
+Only standard library modules are imported so that the client starts quickly.
+If the worker can't be reached the sub-command is executed by the
+:command:`salishsea` command instead.
+If the worker accepted the request but didn't reply, the sub-command may have been
+partly done, so it is reported as failed rather than executed again.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Seconds to keep trying to connect to a worker that is still starting up
+CONNECT_TIMEOUT = 30
+
+
+def send(socket_path, request, connect_timeout=CONNECT_TIMEOUT):
+    """Send a request to the worker listening on socket_path and wait for its reply.
+
+    :param str socket_path: Unix domain socket path that the worker listens on.
+
+    :param dict request: Request to send.
+
+    :param float connect_timeout: Seconds to keep trying to connect.
+
+    :returns: Sub-command return code from the worker.
+    :rtype: int
+
+    :raises: :py:exc:`OSError` if the worker can't be reached.
+    """
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(os.fspath(socket_path))
+                with sock.makefile("rwb") as stream:
+                    stream.write(f"{json.dumps(request)}\n".encode())
+                    stream.flush()
+                    reply = stream.readline()
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+    if not reply:
+        raise ConnectionError(f"no reply from worker on {socket_path}")
+    return json.loads(reply)["returncode"]
+
+
+def main(argv):
+    socket_path, *cmd_argv = argv
+    if cmd_argv == ["--shutdown"]:
+        try:
+            return send(socket_path, {"shutdown": True}, connect_timeout=0)
+        except OSError:
+            return 0
+    request = {"argv": cmd_argv, "cwd": os.getcwd(), "env": dict(os.environ)}
+    try:
+        return send(socket_path, request)
+    except (FileNotFoundError, ConnectionRefusedError) as exc:
+        salishsea = Path(sys.executable).with_name("salishsea")
+        print(
+            f"salishsea worker not available ({exc}); running {salishsea} instead",
+            file=sys.stderr,
+        )
+        return subprocess.call([os.fspath(salishsea), *cmd_argv])
+    except OSError as exc:
+        # The worker may have died part way through the sub-command, so running it
+        # again could operate on partly processed files
+        print(
+            f"salishsea worker failed during {' '.join(cmd_argv)}: {exc}",
+            file=sys.stderr,
+        )
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
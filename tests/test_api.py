@@ -18,6 +18,7 @@
 
 """SalishSeaCmd combine sub-command plug-in unit tests"""
 
+from pathlib import Path
 from unittest.mock import Mock, patch
 
 import cliff.app
@@ -109,6 +110,31 @@ class TestRunDescription:
         assert run_desc == expected
 
 
+@pytest.fixture(autouse=True)
+def clear_command_cache():
+    salishsea_cmd.api.invalidate_command_cache()
+    yield
+    salishsea_cmd.api.invalidate_command_cache()
+
+
+class TestSplitResults:
+    @patch("salishsea_cmd.split_results.split_results")
+    def test_split_results(self, m_split_results):
+        salishsea_cmd.api.split_results(Path("01jan07"))
+        m_split_results.assert_called_once_with(Path("01jan07"), False)
+
+
+class TestDispatch:
+    @patch("salishsea_cmd.split_results.split_results")
+    def test_dispatch(self, m_split_results):
+        salishsea_cmd.api.dispatch("split-results", Path("01jan07"), quiet=True)
+        m_split_results.assert_called_once_with(Path("01jan07"), True)
+
+    def test_unknown_sub_command(self):
+        with pytest.raises(ValueError):
+            salishsea_cmd.api.dispatch("run", "SalishSea.yaml", "results_dir")
+
+
 class TestRunSubcommand(object):
     def test_command_not_found_raised(self):
         app = Mock(spec=cliff.app.App)
@@ -125,7 +151,7 @@ class TestRunSubcommand(object):
         assert m_log.called
         assert return_code == 2
 
-    @patch("salishsea_cmd.api.cliff.commandmanager.CommandManager")
+    @patch("salishsea_cmd.api._command_manager")
     @patch("salishsea_cmd.api.log.exception")
     def test_command_exception_logged(self, m_log, m_cmd_mgr):
         app = Mock(spec=cliff.app.App)
@@ -136,7 +162,7 @@ class TestRunSubcommand(object):
         salishsea_cmd.api._run_subcommand(app, app_args, ["foo"])
         assert m_log.called
 
-    @patch("salishsea_cmd.api.cliff.commandmanager.CommandManager")
+    @patch("salishsea_cmd.api._command_manager")
     @patch("salishsea_cmd.api.log.error")
     def test_command_exception_logged_as_error(self, m_log, m_cmd_mgr):
         app = Mock(spec=cliff.app.App)
@@ -146,3 +172,26 @@ class TestRunSubcommand(object):
         m_cmd_mgr().find_command.return_value = (cmd_factory, "bar", "baz")
         salishsea_cmd.api._run_subcommand(app, app_args, ["foo"])
         assert m_log.called
+
+    @patch("salishsea_cmd.api.importlib.metadata.distribution")
+    def test_command_manager_cached(self, m_distribution):
+        cmd_mgr = salishsea_cmd.api._command_manager()
+        assert salishsea_cmd.api._command_manager() is cmd_mgr
+        assert m_distribution.call_count == 1
+
+        salishsea_cmd.api.invalidate_command_cache()
+
+        assert salishsea_cmd.api._command_manager() is not cmd_mgr
+
+    @patch("salishsea_cmd.api._command_manager")
+    def test_parser_cached(self, m_cmd_mgr):
+        app = Mock(spec=cliff.app.App)
+        app_args = Mock(debug=False)
+        cmd_factory = Mock(spec=cliff.command.Command)
+        m_cmd_mgr().find_command.return_value = (cmd_factory, "bar", ["baz"])
+
+        salishsea_cmd.api._run_subcommand(app, app_args, ["bar", "baz"])
+        salishsea_cmd.api._run_subcommand(app, app_args, ["bar", "baz"])
+
+        cmd_factory().get_parser.assert_called_once_with("bar")
+        assert cmd_factory().take_action.call_count == 2
@@ -0,0 +1,109 @@
+#  Copyright 2013 – present by the SalishSeaCast Project Contributors
+#  and The University of British Columbia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# SPDX-License-Identifier: Apache-2.0
+
+
+"""SalishSeaCmd scheduler adapters unit tests"""
+
+import logging
+import subprocess
+from unittest.mock import Mock
+
+import arrow
+
+import salishsea_cmd.api
+import salishsea_cmd.backfill
+
+
+class TestSlurmTestOnly:
+    """Unit tests for SlurmTestOnly scheduler adapter."""
+
+    def test_start_time(self, monkeypatch):
+        m_run = Mock(
+            name="subprocess.run",
+            return_value=subprocess.CompletedProcess(
+                [],
+                0,
+                stdout="",
+                stderr=(
+                    "sbatch: Job 1234 to start at 2026-10-17T10:31:24 using 384 "
+                    "processors on nodes fc[10101-10102] in partition compute\n"
+                ),
+            ),
+        )
+        monkeypatch.setattr(salishsea_cmd.backfill.subprocess, "run", m_run)
+
+        start_time = salishsea_cmd.backfill.SlurmTestOnly().start_time(
+            {"nodes": 2, "ntasks-per-node": 192, "time": "6:00:00"}
+        )
+
+        m_run.assert_called_once_with(
+            [
+                "sbatch",
+                "--test-only",
+                "--nodes=2",
+                "--ntasks-per-node=192",
+                "--time=6:00:00",
+                "--wrap=true",
+            ],
+            capture_output=True,
+            check=True,
+            text=True,
+            timeout=60,
+        )
+        assert start_time == arrow.get("2026-10-17T10:31:24", tzinfo="local")
+
+    def test_sbatch_error(self, caplog, monkeypatch):
+        m_run = Mock(
+            name="subprocess.run",
+            side_effect=subprocess.CalledProcessError(
+                1, ["sbatch"], stderr="sbatch: error: Invalid account\n"
+            ),
+        )
+        monkeypatch.setattr(salishsea_cmd.backfill.subprocess, "run", m_run)
+        caplog.set_level(logging.DEBUG)
+
+        start_time = salishsea_cmd.backfill.SlurmTestOnly().start_time({"nodes": 2})
+
+        assert start_time is None
+        assert caplog.records[0].levelname == "WARNING"
+        assert caplog.records[0].message == (
+            "sbatch --test-only --nodes=2 --wrap=true failed: "
+            "sbatch: error: Invalid account"
+        )
+
+    def test_no_start_time(self, monkeypatch):
+        m_run = Mock(
+            name="subprocess.run",
+            return_value=subprocess.CompletedProcess([], 0, stdout="", stderr=""),
+        )
+        monkeypatch.setattr(salishsea_cmd.backfill.subprocess, "run", m_run)
+
+        start_time = salishsea_cmd.backfill.SlurmTestOnly().start_time({"nodes": 2})
+
+        assert start_time is None
+
+
+class TestRegisterSchedulerAdapter:
+    """Unit test for api.register_scheduler_adapter() function."""
+
+    def test_register_scheduler_adapter(self, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.backfill, "_adapters", {})
+        adapter = Mock(name="adapter")
+
+        salishsea_cmd.api.register_scheduler_adapter("qsub", adapter)
+
+        assert salishsea_cmd.backfill._adapters == {"qsub": adapter}
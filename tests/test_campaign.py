@@ -0,0 +1,464 @@
+#  Copyright 2013 – present by the SalishSeaCast Project Contributors
+#  and The University of British Columbia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# SPDX-License-Identifier: Apache-2.0
+
+
+"""SalishSeaCmd campaign sub-command plug-in unit tests"""
+
+import logging
+import textwrap
+from pathlib import Path
+from unittest.mock import Mock, call, patch
+
+import cliff.app
+import pytest
+import yaml
+
+import salishsea_cmd.campaign
+
+
+@pytest.fixture
+def campaign_cmd():
+    return salishsea_cmd.campaign.Campaign(Mock(spec=cliff.app.App), [])
+
+
+@pytest.fixture
+def campaign_file(tmp_path):
+    campaign_file = tmp_path / "hindcast.yaml"
+    campaign_file.write_text(textwrap.dedent("""\
+            max jobs: 4
+            runs:
+              - run description: SalishSea_2016.yaml
+                results dir: results/2016
+              - run description: SalishSea_2017.yaml
+                results dir: results/2017
+            """))
+    return campaign_file
+
+
+class TestParser:
+    """Unit tests for `salishsea campaign` sub-command command-line parser."""
+
+    def test_get_parser(self, campaign_cmd):
+        parser = campaign_cmd.get_parser("salishsea campaign")
+        assert parser.prog == "salishsea campaign"
+
+    def test_parsed_args_defaults(self, campaign_cmd):
+        parser = campaign_cmd.get_parser("salishsea campaign")
+        parsed_args = parser.parse_args(["hindcast.yaml"])
+        assert parsed_args.campaign_file == Path("hindcast.yaml")
+        assert parsed_args.interval is None
+        assert not parsed_args.retry_failed
+        assert parsed_args.state_file is None
+
+    def test_parsed_args_options(self, campaign_cmd):
+        parser = campaign_cmd.get_parser("salishsea campaign")
+        parsed_args = parser.parse_args(
+            [
+                "hindcast.yaml",
+                "--interval",
+                "15",
+                "--retry-failed",
+                "--state-file",
+                "state.yaml",
+            ]
+        )
+        assert parsed_args.interval == 15
+        assert parsed_args.retry_failed
+        assert parsed_args.state_file == Path("state.yaml")
+
+
+@patch("salishsea_cmd.campaign.campaign", autospec=True)
+class TestTakeAction:
+    """Unit tests for `salishsea campaign` sub-command take_action() method."""
+
+    def test_take_action(self, m_campaign, campaign_cmd):
+        parsed_args = Mock(
+            campaign_file=Path("hindcast.yaml"),
+            interval=None,
+            retry_failed=False,
+            state_file=None,
+        )
+        campaign_cmd.take_action(parsed_args)
+        m_campaign.assert_called_once_with(
+            Path("hindcast.yaml"), interval=None, retry_failed=False, state_file=None
+        )
+
+
+@patch("salishsea_cmd.campaign._top_up", autospec=True, return_value=2)
+class TestCampaign:
+    """Unit tests for campaign() function."""
+
+    def test_bash_system(self, m_top_up, campaign_file, caplog, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.campaign.run, "SYSTEM", "salish")
+        caplog.set_level(logging.DEBUG)
+
+        with pytest.raises(SystemExit) as excinfo:
+            salishsea_cmd.campaign.campaign(campaign_file)
+
+        assert excinfo.value.code == 2
+        assert caplog.records[0].levelname == "ERROR"
+        assert not m_top_up.called
+
+    def test_default_state_file(self, m_top_up, campaign_file, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.campaign.run, "SYSTEM", "fir")
+
+        def top_up(runs, run_kwargs, max_jobs, state, state_file, queue_job_cmd):
+            for _, results_dir in runs:
+                state[str(results_dir)] = {"status": "active", "jobs": ["43"]}
+            return 2
+
+        m_top_up.side_effect = top_up
+
+        statuses = salishsea_cmd.campaign.campaign(campaign_file)
+
+        runs = [
+            (
+                campaign_file.parent / "SalishSea_2016.yaml",
+                campaign_file.parent / "results/2016",
+            ),
+            (
+                campaign_file.parent / "SalishSea_2017.yaml",
+                campaign_file.parent / "results/2017",
+            ),
+        ]
+        m_top_up.assert_called_once_with(
+            runs,
+            {},
+            4,
+            {
+                str(runs[0][1]): {"status": "active", "jobs": ["43"]},
+                str(runs[1][1]): {"status": "active", "jobs": ["43"]},
+            },
+            campaign_file.parent / "hindcast_state.yaml",
+            "sbatch",
+        )
+        assert statuses == {str(runs[0][1]): "active", str(runs[1][1]): "active"}
+
+    def test_retry_failed(self, m_top_up, campaign_file, tmp_path, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.campaign.run, "SYSTEM", "fir")
+        state_file = tmp_path / "state.yaml"
+        state = {
+            str(tmp_path / "results/2016"): {"status": "completed", "jobs": []},
+            str(tmp_path / "results/2017"): {"status": "failed", "jobs": []},
+        }
+        state_file.write_text(yaml.safe_dump(state))
+
+        salishsea_cmd.campaign.campaign(
+            campaign_file, retry_failed=True, state_file=state_file
+        )
+
+        state = m_top_up.call_args.args[3]
+        assert state[str(tmp_path / "results/2016")] == {
+            "status": "completed",
+            "jobs": [],
+        }
+        assert state[str(tmp_path / "results/2017")] == {
+            "status": "active",
+            "jobs": [],
+            "retry": True,
+        }
+
+    @patch("salishsea_cmd.campaign.time.sleep", autospec=True)
+    def test_interval(self, m_sleep, m_top_up, campaign_file, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.campaign.run, "SYSTEM", "fir")
+        statuses = iter(("active", "completed"))
+
+        def top_up(runs, run_kwargs, max_jobs, state, state_file, queue_job_cmd):
+            status = next(statuses)
+            for _, results_dir in runs:
+                state[str(results_dir)] = {"status": status, "jobs": []}
+            return 0
+
+        m_top_up.side_effect = top_up
+
+        salishsea_cmd.campaign.campaign(campaign_file, interval=15)
+
+        assert m_top_up.call_count == 2
+        m_sleep.assert_called_once_with(900)
+
+    def test_state_file_in_use(self, m_top_up, campaign_file, caplog, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.campaign.run, "SYSTEM", "fir")
+        caplog.set_level(logging.DEBUG)
+        state_file = campaign_file.parent / "hindcast_state.yaml"
+
+        with salishsea_cmd.campaign._lock_state_file(state_file):
+            with pytest.raises(SystemExit) as excinfo:
+                salishsea_cmd.campaign.campaign(campaign_file)
+
+        assert excinfo.value.code == 2
+        assert caplog.records[0].levelname == "ERROR"
+        assert not m_top_up.called
+
+
+class TestLoadCampaignDesc:
+    """Unit tests for _load_campaign_desc() function."""
+
+    def test_load_campaign_desc(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("SCRATCH", "/scratch/me")
+        campaign_file = tmp_path / "hindcast.yaml"
+        campaign_file.write_text(textwrap.dedent("""\
+                max jobs: 20
+                runs:
+                  - run description: 2016/SalishSea.yaml
+                    results dir: $SCRATCH/hindcast/2016
+                run options:
+                  deflate: True
+                  max deflate jobs: 8
+                  nocheck initial conditions: True
+                """))
+
+        max_jobs, runs, run_kwargs = salishsea_cmd.campaign._load_campaign_desc(
+            campaign_file
+        )
+
+        assert max_jobs == 20
+        assert runs == [
+            (tmp_path / "2016/SalishSea.yaml", Path("/scratch/me/hindcast/2016"))
+        ]
+        assert run_kwargs == {
+            "deflate": True,
+            "max_deflate_jobs": 8,
+            "nocheck_init": True,
+        }
+
+    @pytest.mark.parametrize(
+        "campaign_desc",
+        (
+            "runs: []\n",
+            "max jobs: 20\n",
+            "max jobs: 20\nruns:\n  - run description: SalishSea.yaml\n",
+        ),
+    )
+    def test_missing_item(self, campaign_desc, caplog, tmp_path):
+        campaign_file = tmp_path / "hindcast.yaml"
+        campaign_file.write_text(campaign_desc)
+        caplog.set_level(logging.DEBUG)
+
+        with pytest.raises(SystemExit) as excinfo:
+            salishsea_cmd.campaign._load_campaign_desc(campaign_file)
+
+        assert excinfo.value.code == 2
+        assert caplog.records[0].levelname == "ERROR"
+
+    def test_unknown_run_option(self, caplog, tmp_path):
+        campaign_file = tmp_path / "hindcast.yaml"
+        campaign_file.write_text(
+            "max jobs: 20\nruns: []\nrun options:\n  self chain: True\n"
+        )
+        caplog.set_level(logging.DEBUG)
+
+        with pytest.raises(SystemExit) as excinfo:
+            salishsea_cmd.campaign._load_campaign_desc(campaign_file)
+
+        assert excinfo.value.code == 2
+        assert caplog.records[0].levelname == "ERROR"
+
+
+class TestJobsPerSegment:
+    """Unit tests for _jobs_per_segment() function."""
+
+    @pytest.mark.parametrize(
+        "run_kwargs, expected",
+        (
+            ({}, 1),
+            ({"restart_handoff": True}, 2),
+            ({"separate_deflate": True}, 4),
+            ({"restart_handoff": True, "separate_deflate": True}, 5),
+        ),
+    )
+    def test_jobs_per_segment(self, run_kwargs, expected):
+        assert salishsea_cmd.campaign._jobs_per_segment(run_kwargs) == expected
+
+
+@patch("salishsea_cmd.campaign.run.run", autospec=True)
+@patch("salishsea_cmd.campaign.run.plan_submission", autospec=True)
+@patch("salishsea_cmd.campaign.run._job_active", autospec=True)
+class TestTopUp:
+    """Unit tests for _top_up() function."""
+
+    def test_submit_to_cap(self, m_job_active, m_ps, m_run, tmp_path):
+        runs = [
+            (tmp_path / "SalishSea_2016.yaml", tmp_path / "results_2016"),
+            (tmp_path / "SalishSea_2017.yaml", tmp_path / "results_2017"),
+        ]
+        state = {str(tmp_path / "results_2016"): {"status": "active", "jobs": ["41"]}}
+        m_job_active.return_value = True
+        m_ps.side_effect = [
+            salishsea_cmd.campaign.run.SubmissionPlan(3, "41"),
+            salishsea_cmd.campaign.run.SubmissionPlan(1),
+        ]
+        m_run.side_effect = ["Submitted jobs 43 44", "Submitted batch job 45"]
+        state_file = tmp_path / "state.yaml"
+
+        in_flight = salishsea_cmd.campaign._top_up(
+            runs, {"deflate": True}, 4, state, state_file, "sbatch"
+        )
+
+        assert in_flight == 4
+        assert m_run.call_args_list == [
+            call(
+                tmp_path / "SalishSea_2016.yaml",
+                tmp_path / "results_2016",
+                max_segments=3,
+                start_segment=3,
+                waitjob="41",
+                quiet=True,
+                deflate=True,
+            ),
+            call(
+                tmp_path / "SalishSea_2017.yaml",
+                tmp_path / "results_2017",
+                max_segments=1,
+                start_segment=1,
+                waitjob="0",
+                quiet=True,
+                deflate=True,
+            ),
+        ]
+        expected = {
+            str(tmp_path / "results_2016"): {
+                "status": "active",
+                "jobs": ["41", "43", "44"],
+            },
+            str(tmp_path / "results_2017"): {"status": "active", "jobs": ["45"]},
+        }
+        assert state == expected
+        assert yaml.safe_load(state_file.read_text()) == expected
+
+    def test_queue_full(self, m_job_active, m_ps, m_run, tmp_path):
+        runs = [(tmp_path / "SalishSea_2016.yaml", tmp_path / "results_2016")]
+        state = {
+            str(tmp_path / "results_2016"): {"status": "active", "jobs": ["41", "42"]}
+        }
+        m_job_active.return_value = True
+        m_ps.return_value = salishsea_cmd.campaign.run.SubmissionPlan(3, "42")
+
+        in_flight = salishsea_cmd.campaign._top_up(
+            runs, {}, 2, state, tmp_path / "state.yaml", "sbatch"
+        )
+
+        assert in_flight == 2
+        assert not m_run.called
+
+    def test_finished_jobs_leave_queue(self, m_job_active, m_ps, m_run, tmp_path):
+        runs = [(tmp_path / "SalishSea_2016.yaml", tmp_path / "results_2016")]
+        state = {
+            str(tmp_path / "results_2016"): {"status": "active", "jobs": ["41", "42"]}
+        }
+        m_job_active.side_effect = [False, True]
+        m_ps.return_value = salishsea_cmd.campaign.run.SubmissionPlan(3, "42")
+        m_run.return_value = "Submitted batch job 43"
+
+        in_flight = salishsea_cmd.campaign._top_up(
+            runs, {}, 2, state, tmp_path / "state.yaml", "sbatch"
+        )
+
+        assert in_flight == 2
+        assert state[str(tmp_path / "results_2016")]["jobs"] == ["42", "43"]
+
+    def test_completed(self, m_job_active, m_ps, m_run, tmp_path):
+        runs = [(tmp_path / "SalishSea_2016.yaml", tmp_path / "results_2016")]
+        state = {str(tmp_path / "results_2016"): {"status": "active", "jobs": ["42"]}}
+        m_job_active.return_value = False
+        m_ps.return_value = salishsea_cmd.campaign.run.SubmissionPlan(
+            message="All segments of results_2016 have completed"
+        )
+
+        in_flight = salishsea_cmd.campaign._top_up(
+            runs, {}, 2, state, tmp_path / "state.yaml", "sbatch"
+        )
+
+        assert in_flight == 0
+        assert state[str(tmp_path / "results_2016")] == {
+            "status": "completed",
+            "jobs": [],
+        }
+        assert not m_run.called
+
+    def test_last_segment_in_flight(self, m_job_active, m_ps, m_run, tmp_path):
+        runs = [(tmp_path / "SalishSea_2016.yaml", tmp_path / "results_2016")]
+        state = {str(tmp_path / "results_2016"): {"status": "active", "jobs": ["42"]}}
+        m_job_active.return_value = True
+        m_ps.return_value = salishsea_cmd.campaign.run.SubmissionPlan(
+            message="Job 42 for the last segment of results_2016 is queued or running"
+        )
+
+        salishsea_cmd.campaign._top_up(
+            runs, {}, 2, state, tmp_path / "state.yaml", "sbatch"
+        )
+
+        assert state[str(tmp_path / "results_2016")]["status"] == "active"
+        assert not m_run.called
+
+    @pytest.mark.parametrize(
+        "run_state, expected_status",
+        (
+            ({"status": "active", "jobs": []}, "failed"),
+            ({"status": "active", "jobs": [], "retry": True}, "active"),
+        ),
+    )
+    def test_failed_segment(
+        self, m_job_active, m_ps, m_run, run_state, expected_status, caplog, tmp_path
+    ):
+        runs = [(tmp_path / "SalishSea_2016.yaml", tmp_path / "results_2016")]
+        state = {str(tmp_path / "results_2016"): run_state}
+        m_ps.return_value = salishsea_cmd.campaign.run.SubmissionPlan(
+            2, failed_job="42"
+        )
+        m_run.return_value = "Submitted batch job 43"
+        caplog.set_level(logging.DEBUG)
+
+        salishsea_cmd.campaign._top_up(
+            runs, {}, 1, state, tmp_path / "state.yaml", "sbatch"
+        )
+
+        run_state = state[str(tmp_path / "results_2016")]
+        assert run_state["status"] == expected_status
+        assert "retry" not in run_state
+        assert m_run.called == (expected_status == "active")
+
+    def test_skips_finished_runs(self, m_job_active, m_ps, m_run, tmp_path):
+        runs = [
+            (tmp_path / "SalishSea_2016.yaml", tmp_path / "results_2016"),
+            (tmp_path / "SalishSea_2017.yaml", tmp_path / "results_2017"),
+        ]
+        state = {
+            str(tmp_path / "results_2016"): {"status": "completed", "jobs": []},
+            str(tmp_path / "results_2017"): {"status": "failed", "jobs": []},
+        }
+
+        salishsea_cmd.campaign._top_up(
+            runs, {}, 2, state, tmp_path / "state.yaml", "sbatch"
+        )
+
+        assert not m_ps.called
+        assert not m_run.called
+
+
+class TestSubmittedJobIds:
+    """Unit tests for _submitted_job_ids() function."""
+
+    @pytest.mark.parametrize(
+        "submit_job_msg, expected",
+        (
+            ("Submitted batch job 43", ["43"]),
+            ("Submitted jobs 43 44 45", ["43", "44", "45"]),
+            ("1234.orca2.ibb", ["1234.orca2.ibb"]),
+        ),
+    )
+    def test_submitted_job_ids(self, submit_job_msg, expected):
+        assert salishsea_cmd.campaign._submitted_job_ids(submit_job_msg) == expected
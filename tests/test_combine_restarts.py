@@ -0,0 +1,138 @@
+#  Copyright 2013 – present by the SalishSeaCast Project Contributors
+#  and The University of British Columbia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# SPDX-License-Identifier: Apache-2.0
+
+
+"""SalishSeaCmd combine-restarts sub-command plug-in unit tests"""
+
+import logging
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import cliff.app
+import pytest
+
+import salishsea_cmd.combine_restarts
+
+
+@pytest.fixture
+def combine_restarts_cmd():
+    return salishsea_cmd.combine_restarts.CombineRestarts(Mock(spec=cliff.app.App), [])
+
+
+class TestParser:
+    """Unit tests for `salishsea combine-restarts` sub-command command-line parser."""
+
+    def test_get_parser(self, combine_restarts_cmd):
+        parser = combine_restarts_cmd.get_parser("salishsea combine-restarts")
+        assert parser.prog == "salishsea combine-restarts"
+
+    def test_parsed_args_defaults(self, combine_restarts_cmd):
+        parser = combine_restarts_cmd.get_parser("salishsea combine-restarts")
+        parsed_args = parser.parse_args(["SalishSea.yaml", "results/01jan16"])
+        assert parsed_args.desc_file == Path("SalishSea.yaml")
+        assert parsed_args.results_dir == Path("results/01jan16")
+        assert not parsed_args.quiet
+
+    def test_parsed_args_quiet(self, combine_restarts_cmd):
+        parser = combine_restarts_cmd.get_parser("salishsea combine-restarts")
+        parsed_args = parser.parse_args(
+            ["SalishSea.yaml", "results/01jan16", "--quiet"]
+        )
+        assert parsed_args.quiet
+
+
+@patch("salishsea_cmd.combine_restarts.combine_restarts", autospec=True)
+class TestTakeAction:
+    """Unit test for `salishsea combine-restarts` sub-command take_action() method."""
+
+    def test_take_action(self, m_combine_restarts, combine_restarts_cmd):
+        parsed_args = Mock(
+            desc_file=Path("SalishSea.yaml"),
+            results_dir=Path("results/01jan16"),
+            quiet=False,
+        )
+
+        combine_restarts_cmd.take_action(parsed_args)
+
+        m_combine_restarts.assert_called_once_with(
+            Path("SalishSea.yaml"), Path("results/01jan16"), False
+        )
+
+
+@patch(
+    "salishsea_cmd.combine_restarts.nemo_cmd.api.find_rebuild_nemo_script",
+    return_value="REBUILD_NEMO/rebuild_nemo",
+)
+@patch("salishsea_cmd.combine_restarts.nemo_cmd.prepare.load_run_desc")
+@patch("salishsea_cmd.combine_restarts.run.combine_rank_restarts", autospec=True)
+class TestCombineRestarts:
+    """Unit tests for combine_restarts() function."""
+
+    def test_combine_restarts(self, m_crr, m_lrd, m_frns, tmp_path, caplog):
+        m_crr.return_value = [tmp_path / "SalishSea_00174233_restart.nc"]
+        caplog.set_level(logging.DEBUG)
+
+        combined = salishsea_cmd.combine_restarts.combine_restarts(
+            Path("SalishSea.yaml"), tmp_path
+        )
+
+        m_lrd.assert_called_once_with(Path("SalishSea.yaml"))
+        m_frns.assert_called_once_with(m_lrd())
+        m_crr.assert_called_once_with("REBUILD_NEMO/rebuild_nemo", tmp_path)
+        assert combined == [tmp_path / "SalishSea_00174233_restart.nc"]
+        assert caplog.records[0].levelname == "INFO"
+        assert caplog.records[0].message == (
+            f"Combined per-processor restart files into "
+            f"{tmp_path}/SalishSea_00174233_restart.nc"
+        )
+
+    def test_no_rank_restarts(self, m_crr, m_lrd, m_frns, tmp_path, caplog):
+        m_crr.return_value = []
+        caplog.set_level(logging.DEBUG)
+
+        salishsea_cmd.combine_restarts.combine_restarts(
+            Path("SalishSea.yaml"), tmp_path
+        )
+
+        assert caplog.records[0].levelname == "INFO"
+        assert caplog.records[0].message == (
+            f"No per-processor restart files found in {tmp_path}"
+        )
+
+    def test_quiet(self, m_crr, m_lrd, m_frns, tmp_path, caplog):
+        m_crr.return_value = [tmp_path / "SalishSea_00174233_restart.nc"]
+        caplog.set_level(logging.DEBUG)
+
+        salishsea_cmd.combine_restarts.combine_restarts(
+            Path("SalishSea.yaml"), tmp_path, quiet=True
+        )
+
+        assert not caplog.records
+
+    def test_no_results_dir(self, m_crr, m_lrd, m_frns, tmp_path, caplog):
+        caplog.set_level(logging.DEBUG)
+
+        with pytest.raises(SystemExit):
+            salishsea_cmd.combine_restarts.combine_restarts(
+                Path("SalishSea.yaml"), tmp_path / "01jan16"
+            )
+
+        assert caplog.records[0].levelname == "ERROR"
+        assert caplog.records[0].message == (
+            f"results directory not found: {tmp_path}/01jan16"
+        )
+        assert not m_crr.called
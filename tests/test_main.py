@@ -0,0 +1,205 @@
+#  Copyright 2013 – present by the SalishSeaCast Project Contributors
+#  and The University of British Columbia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# SPDX-License-Identifier: Apache-2.0
+
+
+"""SalishSeaCmd application unit tests"""
+
+import argparse
+import importlib.metadata
+import json
+import os
+import pstats
+import subprocess
+import sys
+import textwrap
+from unittest.mock import Mock
+
+import pytest
+
+import salishsea_cmd.main
+from salishsea_cmd.run import Run
+
+# Seconds allowed to import salishsea_cmd.main and construct the app in a fresh
+# interpreter; override with the SALISHSEA_CMD_IMPORT_BUDGET envvar on slow machines
+IMPORT_TIME_BUDGET = float(os.getenv("SALISHSEA_CMD_IMPORT_BUDGET", "1.0"))
+
+
+@pytest.fixture
+def distribution():
+    dist = Mock(name="distribution")
+    dist.entry_points = importlib.metadata.EntryPoints(
+        (
+            importlib.metadata.EntryPoint(
+                name="run", value="salishsea_cmd.run:Run", group="salishsea"
+            ),
+        )
+    )
+    return dist
+
+
+class TestSalishSeaCommandManager:
+    """Unit tests for SalishSeaCommandManager class."""
+
+    def test_commands_from_distribution(self, distribution, monkeypatch):
+        def mock_entry_points(group):
+            raise AssertionError("unexpected scan of all entry points")
+
+        monkeypatch.setattr(
+            salishsea_cmd.main.importlib.metadata, "entry_points", mock_entry_points
+        )
+
+        cmd_mgr = salishsea_cmd.main.SalishSeaCommandManager("salishsea", distribution)
+
+        assert list(cmd_mgr.commands) == ["run"]
+        assert cmd_mgr.group_list == ["salishsea"]
+
+    def test_find_command(self, distribution):
+        cmd_mgr = salishsea_cmd.main.SalishSeaCommandManager("salishsea", distribution)
+
+        cmd_factory, cmd_name, sub_argv = cmd_mgr.find_command(["run", "foo", "bar"])
+
+        assert cmd_factory is Run
+        assert cmd_name == "run"
+        assert sub_argv == ["foo", "bar"]
+
+    def test_find_command_falls_back_to_all_entry_points(
+        self, distribution, monkeypatch
+    ):
+        def mock_entry_points(group):
+            return [
+                importlib.metadata.EntryPoint(
+                    name="foo", value="salishsea_cmd.run:Run", group=group
+                )
+            ]
+
+        monkeypatch.setattr(
+            salishsea_cmd.main.importlib.metadata, "entry_points", mock_entry_points
+        )
+        cmd_mgr = salishsea_cmd.main.SalishSeaCommandManager("salishsea", distribution)
+
+        cmd_factory, cmd_name, sub_argv = cmd_mgr.find_command(["foo"])
+
+        assert cmd_name == "foo"
+        assert sorted(cmd_mgr.commands) == ["foo", "run"]
+
+    def test_unknown_command(self, distribution, monkeypatch):
+        monkeypatch.setattr(
+            salishsea_cmd.main.importlib.metadata,
+            "entry_points",
+            lambda group: [],
+        )
+        cmd_mgr = salishsea_cmd.main.SalishSeaCommandManager("salishsea", distribution)
+
+        with pytest.raises(ValueError):
+            cmd_mgr.find_command(["foo"])
+
+
+class TestProfileOptions:
+    """Unit tests for SalishSeaApp --profile and --profile-memory options."""
+
+    def test_option_parser(self):
+        app = salishsea_cmd.main.SalishSeaApp()
+
+        options, remainder = app.parser.parse_known_args(
+            ["--profile", "run.prof", "--profile-memory", "run.mem", "run"]
+        )
+
+        assert options.profile == "run.prof"
+        assert options.profile_memory == "run.mem"
+        assert remainder == ["run"]
+
+    def test_no_profiling(self):
+        app = salishsea_cmd.main.SalishSeaApp()
+        app.options = argparse.Namespace(profile=None, profile_memory=None)
+        cmd = Mock(name="cmd")
+        take_action = cmd.take_action
+
+        app.prepare_to_run_command(cmd)
+
+        assert cmd.take_action is take_action
+
+    def test_profile(self, tmp_path):
+        app = salishsea_cmd.main.SalishSeaApp()
+        profile_path = tmp_path / "run.prof"
+        memory_path = tmp_path / "run.mem"
+        app.options = argparse.Namespace(
+            profile=os.fspath(profile_path), profile_memory=os.fspath(memory_path)
+        )
+        cmd = Mock(name="cmd")
+        cmd.take_action.return_value = 0
+
+        app.prepare_to_run_command(cmd)
+        result = cmd.take_action(argparse.Namespace())
+
+        assert result == 0
+        assert pstats.Stats(os.fspath(profile_path)).total_calls > 0
+        assert memory_path.read_text().startswith(
+            f"Top {salishsea_cmd.main.PROFILE_MEMORY_TOP} allocation sites"
+        )
+
+    def test_nested_subcommand_not_profiled_again(self, tmp_path):
+        app = salishsea_cmd.main.SalishSeaApp()
+        app.options = argparse.Namespace(
+            profile=os.fspath(tmp_path / "worker.prof"), profile_memory=None
+        )
+        worker_cmd, sub_cmd = Mock(name="worker_cmd"), Mock(name="sub_cmd")
+        sub_take_action = sub_cmd.take_action
+
+        def mock_worker_take_action(parsed_args):
+            app.prepare_to_run_command(sub_cmd)
+
+        worker_cmd.take_action.side_effect = mock_worker_take_action
+        app.prepare_to_run_command(worker_cmd)
+        worker_cmd.take_action(argparse.Namespace())
+
+        assert sub_cmd.take_action is sub_take_action
+
+
+class TestColdStart:
+    """Import-time benchmark for the `salishsea` command."""
+
+    def test_cold_start(self):
+        code = textwrap.dedent("""\
+            import json
+            import sys
+            import time
+
+            t0 = time.perf_counter()
+            import salishsea_cmd.main
+            salishsea_cmd.main.SalishSeaApp()
+            elapsed = time.perf_counter() - t0
+            print(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+            """)
+        proc = subprocess.run(
+            [sys.executable, "-c", code],
+            check=True,
+            capture_output=True,
+            universal_newlines=True,
+        )
+        cold_start = json.loads(proc.stdout.splitlines()[-1])
+
+        for module in (
+            "nemo_cmd.combine",
+            "nemo_cmd.deflate",
+            "nemo_cmd.gather",
+            "nemo_cmd.prepare",
+            "salishsea_cmd.run",
+            "salishsea_cmd.prepare",
+            "f90nml",
+        ):
+            assert module not in cold_start["modules"]
+        assert cold_start["elapsed"] < IMPORT_TIME_BUDGET
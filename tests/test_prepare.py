@@ -25,7 +25,9 @@ from unittest.mock import call, Mock, patch
 import cliff.app
 import nemo_cmd.prepare
 import pytest
+import salishsea_cmd.api
 import salishsea_cmd.prepare
+import salishsea_cmd.timing
 
 
 @pytest.fixture
@@ -45,14 +47,22 @@ class TestParser:
         parsed_args = parser.parse_args(["foo"])
         assert parsed_args.desc_file == Path("foo")
         assert not parsed_args.quiet
+        assert not parsed_args.timings
 
-    @pytest.mark.parametrize("flag, attr", [("-q", "quiet"), ("--quiet", "quiet")])
+    @pytest.mark.parametrize(
+        "flag, attr",
+        [("-q", "quiet"), ("--quiet", "quiet"), ("--timings", "timings")],
+    )
     def test_parsed_args_flags(self, flag, attr, prepare_cmd):
         parser = prepare_cmd.get_parser("salishsea prepare")
         parsed_args = parser.parse_args(["foo", flag])
         assert getattr(parsed_args, attr)
 
 
+@patch(
+    "salishsea_cmd.prepare._code_repos",
+    return_value=(Path("NEMO-3.6-code"), Path("XIOS")),
+)
 @patch("nemo_cmd.prepare.load_run_desc")
 @patch("nemo_cmd.prepare.check_nemo_exec", return_value="nemo_bin_dir")
 @patch("nemo_cmd.prepare.check_xios_exec", return_value="xios_bin_dir")
@@ -86,6 +96,7 @@ class TestPrepare:
         m_cxe,
         m_cne,
         m_lrd,
+        m_cr,
     ):
         run_dir = salishsea_cmd.prepare.prepare(
             Path("SalishSea.yaml"), nocheck_init=False
@@ -107,9 +118,120 @@ class TestPrepare:
         m_aaf.assert_called_once_with(
             m_lrd(), Path("SalishSea.yaml"), m_resolved_path().parent, m_mrd(), False
         )
-        m_rvr.assert_called_once_with(m_lrd(), m_mrd())
+        m_cr.assert_called_once_with(m_lrd())
+        m_rvr.assert_called_once_with(
+            m_lrd(), m_mrd(), code_repos=(Path("NEMO-3.6-code"), Path("XIOS"))
+        )
         assert run_dir == m_mrd()
 
+    def test_prepare_with_context(
+        self,
+        m_aaf,
+        m_rvr,
+        m_mrl,
+        m_mfl,
+        m_mgl,
+        m_mel,
+        m_crsf,
+        m_mnl,
+        m_mrd,
+        m_resolved_path,
+        m_frns,
+        m_cxe,
+        m_cne,
+        m_lrd,
+        m_cr,
+    ):
+        context = salishsea_cmd.prepare.PrepareContext(
+            nemo_bin_dir=Path("nemo_bin_dir"),
+            xios_bin_dir=Path("xios_bin_dir"),
+            nemo_code_repo=Path("NEMO-3.6-code"),
+            xios_code_repo=Path("XIOS"),
+        )
+
+        salishsea_cmd.prepare.prepare(
+            Path("SalishSea.yaml"), nocheck_init=False, context=context
+        )
+
+        assert not m_cne.called
+        assert not m_cxe.called
+        assert not m_frns.called
+        assert not m_cr.called
+        m_mel.assert_called_once_with(
+            Path("nemo_bin_dir"), m_mrd(), Path("xios_bin_dir")
+        )
+        m_rvr.assert_called_once_with(
+            m_lrd(), m_mrd(), code_repos=(Path("NEMO-3.6-code"), Path("XIOS"))
+        )
+
+    def test_prepare_loaded_run_desc(
+        self,
+        m_aaf,
+        m_rvr,
+        m_mrl,
+        m_mfl,
+        m_mgl,
+        m_mel,
+        m_crsf,
+        m_mnl,
+        m_mrd,
+        m_resolved_path,
+        m_frns,
+        m_cxe,
+        m_cne,
+        m_lrd,
+        m_cr,
+    ):
+        run_desc = {"run_id": "foo"}
+
+        salishsea_cmd.prepare.prepare(
+            Path("SalishSea.yaml"), nocheck_init=False, run_desc=run_desc
+        )
+
+        assert not m_lrd.called
+        m_cne.assert_called_once_with(run_desc)
+        m_mrd.assert_called_once_with(run_desc)
+
+    def test_prepare_timing_spans(
+        self,
+        m_aaf,
+        m_rvr,
+        m_mrl,
+        m_mfl,
+        m_mgl,
+        m_mel,
+        m_crsf,
+        m_mnl,
+        m_mrd,
+        m_resolved_path,
+        m_frns,
+        m_cxe,
+        m_cne,
+        m_lrd,
+        m_cr,
+    ):
+        timings = salishsea_cmd.timing.Timings()
+        salishsea_cmd.api.register_timing_callback(timings)
+        try:
+            salishsea_cmd.prepare.prepare(Path("SalishSea.yaml"), nocheck_init=False)
+        finally:
+            salishsea_cmd.api.unregister_timing_callback(timings)
+
+        assert [name for name, elapsed in timings.spans] == [
+            "prepare/load_run_desc",
+            "prepare/check_execs",
+            "prepare/make_run_dir",
+            "prepare/make_namelists",
+            "prepare/copy_run_set_files",
+            "prepare/make_executable_links",
+            "prepare/make_grid_links",
+            "prepare/make_forcing_links",
+            "prepare/make_restart_links",
+            "prepare/record_vcs_revisions",
+            "prepare/add_agrif_files",
+            "prepare",
+        ]
+
 
 class TestRecordVCSRevisions:
     """Unit tests for `salishsea prepare` _record_vcs_revisions() function."""
@@ -119,6 +241,23 @@ class TestRecordVCSRevisions:
         with pytest.raises(SystemExit):
             salishsea_cmd.prepare._record_vcs_revisions(run_desc, Path("run_dir"))
 
+    @patch("nemo_cmd.prepare.write_repo_rev_file")
+    def test_resolved_code_repos(self, m_write):
+        run_desc = {}
+        salishsea_cmd.prepare._record_vcs_revisions(
+            run_desc,
+            Path("run_dir"),
+            code_repos=(Path("NEMO-3.6-code"), Path("XIOS")),
+        )
+        assert m_write.call_args_list == [
+            call(
+                Path("NEMO-3.6-code"),
+                Path("run_dir"),
+                nemo_cmd.prepare.get_git_revision,
+            ),
+            call(Path("XIOS"), Path("run_dir"), nemo_cmd.prepare.get_git_revision),
+        ]
+
     @pytest.mark.parametrize(
         "config_name_key, nemo_code_config_key",
         [("config name", "NEMO code config"), ("config_name", "NEMO-code-config")],
@@ -18,17 +18,21 @@
 
 """SalishSeaCmd run sub-command plug-in unit tests"""
 
+import copy
 import logging
 import os
 import shlex
 import subprocess
 import tempfile
 import textwrap
+import time
 from importlib import reload
 from io import StringIO
 from pathlib import Path
 from unittest.mock import call, Mock, patch
 
+import arrow
+import attrs
 import cliff.app
 import f90nml
 import pytest
@@ -69,20 +73,38 @@ class TestParser:
         assert parsed_args.cores_per_node == ""
         assert parsed_args.cpu_arch == ""
         assert not parsed_args.deflate
+        assert not parsed_args.job_array
         assert parsed_args.max_deflate_jobs == 4
         assert not parsed_args.nocheck_init
         assert not parsed_args.no_submit
+        assert not parsed_args.per_rank_restarts
+        assert parsed_args.prepare_jobs == 1
+        assert parsed_args.recovery_attempt == 0
+        assert not parsed_args.restart_handoff
+        assert not parsed_args.resume
+        assert parsed_args.segments_per_job == 1
+        assert not parsed_args.self_chain
         assert not parsed_args.separate_deflate
+        assert parsed_args.start_segment is None
+        assert not parsed_args.timings
         assert parsed_args.waitjob == "0"
+        assert not parsed_args.worker
         assert not parsed_args.quiet
 
     @pytest.mark.parametrize(
         "flag, attr",
         [
             ("--deflate", "deflate"),
+            ("--job-array", "job_array"),
             ("--nocheck-initial-conditions", "nocheck_init"),
             ("--no-submit", "no_submit"),
+            ("--per-rank-restarts", "per_rank_restarts"),
+            ("--restart-handoff", "restart_handoff"),
+            ("--resume", "resume"),
+            ("--self-chain", "self_chain"),
             ("--separate-deflate", "separate_deflate"),
+            ("--timings", "timings"),
+            ("--worker", "worker"),
             ("-q", "quiet"),
             ("--quiet", "quiet"),
         ],
@@ -92,6 +114,26 @@ class TestParser:
         parsed_args = parser.parse_args(["foo", "baz", flag])
         assert getattr(parsed_args, attr)
 
+    def test_parsed_args_prepare_jobs(self, run_cmd):
+        parser = run_cmd.get_parser("salishsea run")
+        parsed_args = parser.parse_args(["foo", "baz", "--prepare-jobs", "8"])
+        assert parsed_args.prepare_jobs == 8
+
+    def test_parsed_args_recovery_attempt(self, run_cmd):
+        parser = run_cmd.get_parser("salishsea run")
+        parsed_args = parser.parse_args(["foo", "baz", "--recovery-attempt", "2"])
+        assert parsed_args.recovery_attempt == 2
+
+    def test_parsed_args_segments_per_job(self, run_cmd):
+        parser = run_cmd.get_parser("salishsea run")
+        parsed_args = parser.parse_args(["foo", "baz", "--segments-per-job", "3"])
+        assert parsed_args.segments_per_job == 3
+
+    def test_parsed_args_start_segment(self, run_cmd):
+        parser = run_cmd.get_parser("salishsea run")
+        parsed_args = parser.parse_args(["foo", "baz", "--start-segment", "3"])
+        assert parsed_args.start_segment == 3
+
 
 class TestTakeAction:
     """Unit tests for the `salishsea run` sub-command take_action() method."""
@@ -111,11 +153,22 @@ class TestTakeAction:
             cores_per_node="",
             cpu_arch="",
             deflate=False,
+            job_array=False,
             max_deflate_jobs=4,
             nocheck_init=False,
             no_submit=False,
+            per_rank_restarts=False,
+            prepare_jobs=1,
+            recovery_attempt=0,
+            restart_handoff=False,
+            resume=False,
+            segments_per_job=1,
+            self_chain=False,
             separate_deflate=False,
+            start_segment=None,
+            timings=False,
             waitjob=0,
+            worker=False,
             quiet=False,
         )
         caplog.set_level(logging.DEBUG)
@@ -125,20 +178,33 @@ class TestTakeAction:
         assert caplog.records[0].message == "job submitted message"
 
     def test_take_action_quiet(self, mock_run, run_cmd, caplog):
-        parsed_args = Mock(desc_file="desc file", results_dir="results dir", quiet=True)
+        parsed_args = Mock(
+            desc_file="desc file", results_dir="results dir", timings=False, quiet=True
+        )
         caplog.set_level(logging.DEBUG)
 
         run_cmd.run(parsed_args)
 
         assert not caplog.records
 
+    def test_take_action_timings(self, mock_run, run_cmd, caplog):
+        parsed_args = Mock(
+            desc_file="desc file", results_dir="results dir", timings=True, quiet=True
+        )
+        caplog.set_level(logging.DEBUG)
+
+        run_cmd.run(parsed_args)
+
+        assert caplog.records[0].message.startswith("step timings:")
 
+
+@patch("salishsea_cmd.run.api.prepare_context")
 @patch("salishsea_cmd.run._submit_separate_deflate_jobs")
 @patch("salishsea_cmd.run._submit_job")
 @patch("salishsea_cmd.run._build_tmp_run_dir")
 @patch("salishsea_cmd.run._calc_run_segments")
 @patch("salishsea_cmd.run._write_segment_namrun_namelist")
-@patch("salishsea_cmd.run._write_segment_desc_file", return_value=({}, ""))
+@patch("salishsea_cmd.run._write_segment_desc_file", return_value=({}, "", {}))
 class TestRun:
     """Unit tests for `salishsea run` run() function."""
 
@@ -153,7 +219,17 @@ class TestRun:
         )
 
     def test_unknown_system(
-        self, m_wsdf, m_wsnn, m_crs, m_btrd, m_sj, m_ssdj, caplog, tmp_path, monkeypatch
+        self,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        caplog,
+        tmp_path,
+        monkeypatch,
     ):
         monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "foo")
         p_results_dir = tmp_path / "results_dir"
@@ -206,6 +282,7 @@ class TestRun:
         m_btrd,
         m_sj,
         m_ssdj,
+        m_pc,
         sep_xios_server,
         xios_servers,
         system,
@@ -216,22 +293,18 @@ class TestRun:
     ):
         p_run_dir = tmp_path / "run_dir"
         p_results_dir = tmp_path / "results_dir"
-        m_crs.return_value = (
-            [
-                (
-                    {
-                        "output": {
-                            "separate XIOS server": sep_xios_server,
-                            "XIOS servers": xios_servers,
-                        }
-                    },
-                    Path("SalishSea.yaml"),
-                    p_run_dir,
-                    {},
-                )
-            ],
-            0,
-        )
+        m_crs.return_value = [
+            salishsea_cmd.run.RunSegment(
+                {
+                    "output": {
+                        "separate XIOS server": sep_xios_server,
+                        "XIOS servers": xios_servers,
+                    }
+                },
+                Path("SalishSea.yaml"),
+                p_run_dir,
+            )
+        ]
         m_btrd.return_value = (
             p_run_dir,
             p_run_dir / "SalishSeaNEMO.sh",
@@ -282,6 +355,7 @@ class TestRun:
         m_btrd,
         m_sj,
         m_ssdj,
+        m_pc,
         sep_xios_server,
         xios_servers,
         system,
@@ -292,22 +366,18 @@ class TestRun:
     ):
         p_run_dir = tmp_path / "run_dir"
         p_results_dir = tmp_path / "results_dir"
-        m_crs.return_value = (
-            [
-                (
-                    {
-                        "output": {
-                            "separate XIOS server": sep_xios_server,
-                            "XIOS servers": xios_servers,
-                        }
-                    },
-                    Path("SalishSea.yaml"),
-                    p_run_dir,
-                    {},
-                )
-            ],
-            0,
-        )
+        m_crs.return_value = [
+            salishsea_cmd.run.RunSegment(
+                {
+                    "output": {
+                        "separate XIOS server": sep_xios_server,
+                        "XIOS servers": xios_servers,
+                    }
+                },
+                Path("SalishSea.yaml"),
+                p_run_dir,
+            )
+        ]
         m_btrd.return_value = (
             p_run_dir,
             p_run_dir / "SalishSeaNEMO.sh",
@@ -333,6 +403,7 @@ class TestRun:
         m_btrd,
         m_sj,
         m_ssdj,
+        m_pc,
         sep_xios_server,
         xios_servers,
         tmp_path,
@@ -340,22 +411,18 @@ class TestRun:
     ):
         p_run_dir = tmp_path / "run_dir"
         p_results_dir = tmp_path / "results_dir"
-        m_crs.return_value = (
-            [
-                (
-                    {
-                        "output": {
-                            "separate XIOS server": sep_xios_server,
-                            "XIOS servers": xios_servers,
-                        }
-                    },
-                    Path("SalishSea.yaml"),
-                    p_run_dir,
-                    {},
-                )
-            ],
-            0,
-        )
+        m_crs.return_value = [
+            salishsea_cmd.run.RunSegment(
+                {
+                    "output": {
+                        "separate XIOS server": sep_xios_server,
+                        "XIOS servers": xios_servers,
+                    }
+                },
+                Path("SalishSea.yaml"),
+                p_run_dir,
+            )
+        ]
         m_btrd.return_value = (
             p_run_dir,
             p_run_dir / "SalishSeaNEMO.sh",
@@ -378,6 +445,7 @@ class TestRun:
         m_btrd,
         m_sj,
         m_ssdj,
+        m_pc,
         sep_xios_server,
         xios_servers,
         tmp_path,
@@ -385,22 +453,18 @@ class TestRun:
     ):
         p_run_dir = tmp_path / "run_dir"
         p_results_dir = tmp_path / "results_dir"
-        m_crs.return_value = (
-            [
-                (
-                    {
-                        "output": {
-                            "separate XIOS server": sep_xios_server,
-                            "XIOS servers": xios_servers,
-                        }
-                    },
-                    Path("SalishSea.yaml"),
-                    Path(str(p_run_dir)),
-                    {},
-                )
-            ],
-            0,
-        )
+        m_crs.return_value = [
+            salishsea_cmd.run.RunSegment(
+                {
+                    "output": {
+                        "separate XIOS server": sep_xios_server,
+                        "XIOS servers": xios_servers,
+                    }
+                },
+                Path("SalishSea.yaml"),
+                Path(str(p_run_dir)),
+            )
+        ]
         m_btrd.return_value = (
             Path(str(p_run_dir)),
             Path(str(p_run_dir), "SalishSeaNEMO.sh"),
@@ -453,6 +517,7 @@ class TestRun:
         m_btrd,
         m_sj,
         m_ssdj,
+        m_pc,
         sep_xios_server,
         xios_servers,
         system,
@@ -464,22 +529,18 @@ class TestRun:
         monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", system)
         p_run_dir = tmp_path / "run_dir"
         p_results_dir = tmp_path / "results_dir"
-        m_crs.return_value = (
-            [
-                (
-                    {
-                        "output": {
-                            "separate XIOS server": sep_xios_server,
-                            "XIOS servers": xios_servers,
-                        }
-                    },
-                    Path("SalishSea.yaml"),
-                    p_run_dir,
-                    {},
-                )
-            ],
-            0,
-        )
+        m_crs.return_value = [
+            salishsea_cmd.run.RunSegment(
+                {
+                    "output": {
+                        "separate XIOS server": sep_xios_server,
+                        "XIOS servers": xios_servers,
+                    }
+                },
+                Path("SalishSea.yaml"),
+                p_run_dir,
+            )
+        ]
         m_btrd.return_value = (
             p_run_dir,
             p_run_dir / "SalishSeaNEMO.sh",
@@ -644,6 +705,7 @@ class TestRun:
         m_btrd,
         m_sj,
         m_ssdj,
+        m_pc,
         sep_xios_server,
         xios_servers,
         system,
@@ -655,10 +717,9 @@ class TestRun:
     ):
         p_run_dir = tmp_path / "run_dir"
         p_results_dir = tmp_path / "results_dir"
-        m_crs.return_value = (
-            [
-                (
-                    yaml.safe_load(StringIO("""
+        m_crs.return_value = [
+            salishsea_cmd.run.RunSegment(
+                yaml.safe_load(StringIO("""
                         run_id: 1_sensitivity
 
                         segmented run:
@@ -672,18 +733,15 @@ class TestRun:
                                 namrun: ./namelist.time
                                 namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
                     """)),
-                    "SalishSea_1.yaml",
-                    Path("results_dir_1"),
-                    {
-                        "namrun": {
-                            "nn_it000": 152634,
-                            "nn_itend": 152634 + 2160 * 10 - 1,
-                            "nn_date0": 20141115,
-                        }
-                    },
-                ),
-                (
-                    yaml.safe_load(StringIO("""
+                "SalishSea_1.yaml",
+                Path("results_dir_1"),
+                seg_no=1,
+                nn_it000=152634,
+                nn_itend=152634 + 2160 * 10 - 1,
+                nn_date0=20141115,
+            ),
+            salishsea_cmd.run.RunSegment(
+                yaml.safe_load(StringIO("""
                         run_id: 2_sensitivity
 
                         segmented run:
@@ -697,19 +755,14 @@ class TestRun:
                                 namrun: ./namelist.time
                                 namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
                     """)),
-                    "SalishSea_2.yaml",
-                    Path("results_dir_2"),
-                    {
-                        "namrun": {
-                            "nn_it000": 152634 + 2160 * 10,
-                            "nn_itend": 152634 + 2160 * 17 - 1,
-                            "nn_date0": 20141125,
-                        }
-                    },
-                ),
-            ],
-            1,
-        )
+                "SalishSea_2.yaml",
+                Path("results_dir_2"),
+                seg_no=2,
+                nn_it000=152634 + 2160 * 10,
+                nn_itend=152634 + 2160 * 17 - 1,
+                nn_date0=20141125,
+            ),
+        ]
         m_btrd.return_value = (
             p_run_dir,
             p_run_dir / "SalishSeaNEMO.sh",
@@ -877,6 +930,7 @@ class TestRun:
         m_btrd,
         m_sj,
         m_ssdj,
+        m_pc,
         sep_xios_server,
         xios_servers,
         system,
@@ -888,10 +942,9 @@ class TestRun:
     ):
         p_run_dir = tmp_path / "run_dir"
         p_results_dir = tmp_path / "results_dir"
-        m_crs.return_value = (
-            [
-                (
-                    yaml.safe_load(StringIO("""
+        m_crs.return_value = [
+            salishsea_cmd.run.RunSegment(
+                yaml.safe_load(StringIO("""
                         run_id: 0_sensitivity
 
                         segmented run:
@@ -905,18 +958,15 @@ class TestRun:
                                 namrun: ./namelist.time
                                 namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
                     """)),
-                    "SalishSea_0.yaml",
-                    Path("results_dir_0"),
-                    {
-                        "namrun": {
-                            "nn_it000": 152634,
-                            "nn_itend": 152634 + 2160 * 10 - 1,
-                            "nn_date0": 20141115,
-                        }
-                    },
-                ),
-                (
-                    yaml.safe_load(StringIO("""
+                "SalishSea_0.yaml",
+                Path("results_dir_0"),
+                seg_no=0,
+                nn_it000=152634,
+                nn_itend=152634 + 2160 * 10 - 1,
+                nn_date0=20141115,
+            ),
+            salishsea_cmd.run.RunSegment(
+                yaml.safe_load(StringIO("""
                         run_id: 1_sensitivity
 
                         segmented run:
@@ -930,19 +980,14 @@ class TestRun:
                                 namrun: ./namelist.time
                                 namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
                     """)),
-                    "SalishSea_1.yaml",
-                    Path("results_dir_1"),
-                    {
-                        "namrun": {
-                            "nn_it000": 152634 + 2160 * 10,
-                            "nn_itend": 152634 + 2160 * 17 - 1,
-                            "nn_date0": 20141125,
-                        }
-                    },
-                ),
-            ],
-            0,
-        )
+                "SalishSea_1.yaml",
+                Path("results_dir_1"),
+                seg_no=1,
+                nn_it000=152634 + 2160 * 10,
+                nn_itend=152634 + 2160 * 17 - 1,
+                nn_date0=20141125,
+            ),
+        ]
         m_btrd.return_value = (
             p_run_dir,
             p_run_dir / "SalishSeaNEMO.sh",
@@ -964,103 +1009,970 @@ class TestRun:
         for job_msg in job_msgs:
             expected = " ".join((expected, job_msg.split()[-1]))
         assert submit_job_msg == expected
+        m_pc.assert_called_once_with(m_crs.return_value[0].run_desc)
+        for btrd_call in m_btrd.call_args_list:
+            assert btrd_call.kwargs["prepare_context"] == m_pc()
 
+    def test_job_array_not_sbatch(
+        self, m_wsdf, m_wsnn, m_crs, m_btrd, m_sj, m_ssdj, m_pc, caplog, monkeypatch
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "orcinus")
+        caplog.set_level(logging.DEBUG)
 
-class TestCalcRunSegments:
-    """Unit tests for _calc_run_segments() function."""
+        with pytest.raises(SystemExit) as excinfo:
+            salishsea_cmd.run.run(
+                Path("SalishSea.yaml"), Path("results_dir"), job_array=True
+            )
 
-    @staticmethod
-    @pytest.fixture
-    def mock_f90nml_read(monkeypatch):
-        """Mock the f90nml.read() function."""
+        assert excinfo.value.code == 2
+        assert caplog.records[0].levelname == "ERROR"
+        assert not m_crs.called
 
-        def _mock_f90nml_read(nml_path):
-            return {"namdom": {"rn_rdt": 40.0}}
+    def test_restart_handoff_no_scheduler(
+        self, m_wsdf, m_wsnn, m_crs, m_btrd, m_sj, m_ssdj, m_pc, caplog, monkeypatch
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "salish")
+        caplog.set_level(logging.DEBUG)
 
-        monkeypatch.setattr(salishsea_cmd.run.f90nml, "read", _mock_f90nml_read)
+        with pytest.raises(SystemExit) as excinfo:
+            salishsea_cmd.run.run(
+                Path("SalishSea.yaml"), Path("results_dir"), restart_handoff=True
+            )
 
-    def test_not_segmented_run(self, mock_f90nml_read, monkeypatch):
-        def mock_load_run_desc(run_desc_path):
-            return {}
+        assert excinfo.value.code == 2
+        assert caplog.records[0].levelname == "ERROR"
 
-        monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
+    @patch("salishsea_cmd.run._submit_post_job", return_value="Submitted batch job 44")
+    def test_restart_handoff(
+        self,
+        m_spj,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        tmp_path,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        m_crs.return_value = [
+            salishsea_cmd.run.RunSegment(
+                {"run_id": "sensitivity"}, Path("SalishSea.yaml"), tmp_path / "results"
+            )
+        ]
+        batch_file = tmp_path / "run_dir" / "SalishSeaNEMO.sh"
+        m_btrd.return_value = (batch_file.parent, batch_file)
+        m_sj.return_value = "Submitted batch job 43"
 
-        run_segments, first_seg_no = salishsea_cmd.run._calc_run_segments(
-            Path("SalishSea.yaml"), Path("results_dir")
+        salishsea_cmd.run.run(
+            Path("SalishSea.yaml"),
+            tmp_path / "results",
+            restart_handoff=True,
+            separate_deflate=True,
         )
 
-        assert run_segments == [({}, Path("SalishSea.yaml"), Path("results_dir"), {})]
-        assert first_seg_no == 0
+        assert m_btrd.call_args.kwargs["restart_handoff"]
+        m_spj.assert_called_once_with(batch_file, "Submitted batch job 43", "sbatch")
+        m_ssdj.assert_called_once_with(batch_file, "Submitted batch job 44", "sbatch")
 
-    def test_no_run_id(self, mock_f90nml_read, monkeypatch):
-        def mock_load_run_desc(run_desc_path):
-            return yaml.safe_load(StringIO(textwrap.dedent("""\
-                        segmented run:
-                            start date: 2014-11-15
-                            start time step: 152634
-                            end date: 2014-12-02
-                            days per segment: 10
-                            first segment number: 0
-                            segment walltime: 12:00:00
-                            namelists:
-                                namrun: ./namelist.time
-                                namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
-                            """)))
+    @pytest.mark.parametrize("per_rank_restarts", (True, False))
+    def test_per_rank_restarts(
+        self,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        per_rank_restarts,
+        tmp_path,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        m_crs.return_value = salishsea_cmd.run.RunSegments(
+            first_seg_no=0,
+            n_segments=3,
+            segments=lambda: iter(
+                [
+                    salishsea_cmd.run.RunSegment(
+                        {"run_id": f"{seg_no}_sensitivity"},
+                        f"SalishSea_{seg_no}.yaml",
+                        tmp_path / f"results_dir_{seg_no}",
+                        seg_no=seg_no,
+                        nn_it000=1 + seg_no * 10,
+                        nn_itend=10 + seg_no * 10,
+                        nn_date0=20141115,
+                    )
+                    for seg_no in range(3)
+                ]
+            ),
+        )
+        m_btrd.return_value = (
+            tmp_path / "run_dir",
+            tmp_path / "run_dir" / "SalishSeaNEMO.sh",
+        )
+        m_sj.return_value = "Submitted batch job 43"
 
-        monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
+        salishsea_cmd.run.run(
+            Path("SalishSea.yaml"),
+            tmp_path / "results_dir",
+            per_rank_restarts=per_rank_restarts,
+        )
 
-        with pytest.raises(SystemExit):
-            salishsea_cmd.run._calc_run_segments(
-                Path("SalishSea.yaml"), Path("results_dir")
+        assert [
+            wsdf_call.kwargs["per_rank_restarts"] for wsdf_call in m_wsdf.call_args_list
+        ] == [per_rank_restarts] * 3
+        # The restart files of the last segment are combined
+        assert [
+            btrd_call.kwargs["keep_rank_restarts"]
+            for btrd_call in m_btrd.call_args_list
+        ] == [per_rank_restarts, per_rank_restarts, False]
+
+    @patch("salishsea_cmd.run._write_segments_script")
+    def test_segments_per_job(
+        self,
+        m_wss,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        tmp_path,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        segments = [
+            salishsea_cmd.run.RunSegment(
+                {"run_id": f"{seg_no}_sensitivity"},
+                f"SalishSea_{seg_no}.yaml",
+                tmp_path / f"results_dir_{seg_no}",
+                seg_no=seg_no,
+                nn_it000=1 + seg_no * 10,
+                nn_itend=10 + seg_no * 10,
+                nn_date0=20141115,
             )
+            for seg_no in range(3)
+        ]
+        m_crs.return_value = salishsea_cmd.run.RunSegments(
+            first_seg_no=0, n_segments=3, segments=lambda: iter(segments)
+        )
+        m_wsdf.return_value = ({"walltime": "12:00:00"}, "SalishSea_n.yaml", {})
+        batch_files = [
+            tmp_path / f"run_dir_{seg_no}" / "SalishSeaNEMO.sh" for seg_no in range(3)
+        ]
+        m_btrd.side_effect = [
+            (batch_file.parent, batch_file) for batch_file in batch_files
+        ]
+        m_wss.return_value = tmp_path / "run_dir_0" / "SalishSeaNEMO_segments.sh"
+        m_sj.side_effect = ["Submitted batch job 43", "Submitted batch job 44"]
 
-    def test_no_start_date(self, mock_f90nml_read, monkeypatch):
-        def mock_load_run_desc(run_desc_path):
-            return yaml.safe_load(StringIO(textwrap.dedent("""\
-                        run_id: sensitivity
-
-                        segmented run:
+        submit_job_msg = salishsea_cmd.run.run(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", segments_per_job=2
+        )
 
-                            start time step: 152634
-                            end date: 2014-12-02
-                            days per segment: 10
-                            first segment number: 0
-                            segment walltime: 12:00:00
-                            namelists:
-                                namrun: ./namelist.time
-                                namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
-                        """)))
+        m_wss.assert_has_calls(
+            [
+                call([(segments[0], batch_files[0]), (segments[1], batch_files[1])]),
+                call([(segments[2], batch_files[2])]),
+            ]
+        )
+        assert m_sj.call_count == 2
+        assert m_sj.call_args_list[1] == call(
+            m_wss.return_value, "sbatch", waitjob="Submitted batch job 43"
+        )
+        walltimes = [
+            btrd_call.args[0]["walltime"] for btrd_call in m_btrd.call_args_list
+        ]
+        assert walltimes == [2 * 43200, "12:00:00", 43200]
+        assert submit_job_msg == "Submitted jobs 43 44"
 
-        monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
+    def test_segmented_run_self_chain(
+        self, m_wsdf, m_wsnn, m_crs, m_btrd, m_sj, m_ssdj, m_pc, tmp_path, monkeypatch
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        monkeypatch.setattr(salishsea_cmd.run.sys, "executable", "/env/bin/python")
+        monkeypatch.setattr(salishsea_cmd.run.os, "getcwd", lambda: "/run_sets")
+        m_crs.return_value = salishsea_cmd.run.RunSegments(
+            first_seg_no=1,
+            n_segments=2,
+            segments=lambda: iter(
+                [
+                    salishsea_cmd.run.RunSegment(
+                        {"run_id": f"{seg_no}_sensitivity"},
+                        f"SalishSea_{seg_no}.yaml",
+                        tmp_path / f"results_dir_{seg_no}",
+                        seg_no=seg_no,
+                        nn_it000=1 + seg_no * 10,
+                        nn_itend=10 + seg_no * 10,
+                        nn_date0=20141115,
+                    )
+                    for seg_no in (1, 2)
+                ]
+            ),
+        )
+        m_btrd.return_value = (
+            tmp_path / "run_dir",
+            tmp_path / "run_dir" / "SalishSeaNEMO.sh",
+        )
+        m_sj.return_value = "Submitted batch job 43"
 
-        with pytest.raises(SystemExit):
-            salishsea_cmd.run._calc_run_segments(
-                Path("SalishSea.yaml"), Path("results_dir")
-            )
+        salishsea_cmd.run.run(
+            Path("/run_sets/SalishSea.yaml"),
+            tmp_path / "results_dir",
+            self_chain=True,
+            start_segment=1,
+        )
 
-    def test_no_start_time_step(self, mock_f90nml_read, monkeypatch):
-        def mock_load_run_desc(run_desc_path):
-            return yaml.safe_load(StringIO(textwrap.dedent("""\
-                        run_id: sensitivity
+        m_crs.assert_called_once_with(
+            Path("/run_sets/SalishSea.yaml"), tmp_path / "results_dir", start_seg_no=1
+        )
+        m_sj.assert_called_once_with(
+            tmp_path / "run_dir" / "SalishSeaNEMO.sh", "sbatch", waitjob="0"
+        )
+        assert m_btrd.call_count == 1
+        assert m_btrd.call_args.kwargs["chain_cmd"] == (
+            f"cd /run_sets && /env/bin/salishsea run /run_sets/SalishSea.yaml "
+            f"{tmp_path}/results_dir --self-chain --max-deflate-jobs 4 "
+            f"--start-segment 2"
+        )
 
-                        segmented run:
-                            start date: 2014-11-15
+    def test_self_chain_last_segment(
+        self, m_wsdf, m_wsnn, m_crs, m_btrd, m_sj, m_ssdj, m_pc, tmp_path, monkeypatch
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        segment = salishsea_cmd.run.RunSegment(
+            {"run_id": "2_sensitivity"},
+            "SalishSea_2.yaml",
+            tmp_path / "results_dir_2",
+            seg_no=2,
+            nn_it000=21,
+            nn_itend=30,
+            nn_date0=20141115,
+        )
+        m_crs.return_value = salishsea_cmd.run.RunSegments(
+            first_seg_no=2, n_segments=1, segments=lambda: iter([segment])
+        )
+        m_btrd.return_value = (
+            tmp_path / "run_dir",
+            tmp_path / "run_dir" / "SalishSeaNEMO.sh",
+        )
+        m_sj.return_value = "Submitted batch job 43"
 
-                            end date: 2014-12-02
-                            days per segment: 10
-                            first segment number: 0
-                            segment walltime: 12:00:00
-                            namelists:
-                                namrun: ./namelist.time
-                                namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
-                        """)))
+        salishsea_cmd.run.run(
+            Path("SalishSea.yaml"),
+            tmp_path / "results_dir",
+            self_chain=True,
+            start_segment=2,
+        )
 
-        monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
+        assert m_btrd.call_args.kwargs["chain_cmd"] is None
 
-        with pytest.raises(SystemExit):
-            salishsea_cmd.run._calc_run_segments(
-                Path("SalishSea.yaml"), Path("results_dir")
-            )
+    @pytest.mark.parametrize(
+        "recovery_attempt, expected",
+        (
+            (
+                0,
+                "cd /run_sets && /env/bin/salishsea run /run_sets/SalishSea.yaml "
+                "{results_dir} --self-chain --max-deflate-jobs 4 "
+                "--start-segment 2 --recovery-attempt 1",
+            ),
+            (
+                1,
+                "cd /run_sets && /env/bin/salishsea run /run_sets/SalishSea.yaml "
+                "{results_dir} --self-chain --max-deflate-jobs 4 "
+                "--start-segment 2 --recovery-attempt 2",
+            ),
+            (2, None),
+        ),
+    )
+    @patch("salishsea_cmd.run._recover_first_segment", autospec=True)
+    def test_self_chain_recovery(
+        self,
+        m_rfs,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        recovery_attempt,
+        expected,
+        tmp_path,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        monkeypatch.setattr(salishsea_cmd.run.sys, "executable", "/env/bin/python")
+        monkeypatch.setattr(salishsea_cmd.run.os, "getcwd", lambda: "/run_sets")
+        segment = salishsea_cmd.run.RunSegment(
+            {
+                "run_id": "2_sensitivity",
+                "segmented run": {"failure recovery": {"max retries": 2}},
+            },
+            "SalishSea_2.yaml",
+            tmp_path / "results_dir_2",
+            seg_no=2,
+            nn_it000=21,
+            nn_itend=30,
+            nn_date0=20141115,
+        )
+        m_crs.return_value = m_rfs.return_value = salishsea_cmd.run.RunSegments(
+            first_seg_no=2, n_segments=1, segments=lambda: iter([segment])
+        )
+        m_btrd.return_value = (
+            tmp_path / "run_dir",
+            tmp_path / "run_dir" / "SalishSeaNEMO.sh",
+        )
+        m_sj.return_value = "Submitted batch job 43"
+
+        salishsea_cmd.run.run(
+            Path("/run_sets/SalishSea.yaml"),
+            tmp_path / "results_dir",
+            recovery_attempt=recovery_attempt,
+            self_chain=True,
+            start_segment=2,
+        )
+
+        if recovery_attempt:
+            m_rfs.assert_called_once_with(m_crs.return_value, recovery_attempt)
+        else:
+            assert not m_rfs.called
+        if expected is None:
+            assert m_btrd.call_args.kwargs["recovery_cmd"] is None
+        else:
+            assert m_btrd.call_args.kwargs["recovery_cmd"] == expected.format(
+                results_dir=tmp_path / "results_dir"
+            )
+
+    def test_failure_recovery_without_self_chain(
+        self,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        caplog,
+        tmp_path,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        segments = [
+            salishsea_cmd.run.RunSegment(
+                {
+                    "run_id": f"{seg_no}_sensitivity",
+                    "segmented run": {"failure recovery": {"max retries": 2}},
+                },
+                f"SalishSea_{seg_no}.yaml",
+                tmp_path / f"results_dir_{seg_no}",
+                seg_no=seg_no,
+                nn_it000=1 + (seg_no - 1) * 10,
+                nn_itend=seg_no * 10,
+                nn_date0=20141115,
+            )
+            for seg_no in (1, 2)
+        ]
+        m_crs.return_value = salishsea_cmd.run.RunSegments(
+            first_seg_no=1, n_segments=2, segments=lambda: iter(segments)
+        )
+        m_btrd.return_value = (
+            tmp_path / "run_dir",
+            tmp_path / "run_dir" / "SalishSeaNEMO.sh",
+        )
+        m_sj.return_value = "Submitted batch job 43"
+        caplog.set_level(logging.DEBUG)
+
+        salishsea_cmd.run.run(Path("SalishSea.yaml"), tmp_path / "results_dir")
+
+        assert caplog.records[0].levelname == "WARNING"
+        assert caplog.records[0].message.startswith(
+            "failure recovery requires --self-chain"
+        )
+        assert m_btrd.call_args.kwargs["recovery_cmd"] is None
+
+    @pytest.mark.parametrize(
+        "start_segment, self_chain",
+        (
+            (None, True),
+            (2, False),
+        ),
+    )
+    def test_recovery_attempt_without_self_chain_start_segment(
+        self,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        start_segment,
+        self_chain,
+        caplog,
+        tmp_path,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+
+        with pytest.raises(SystemExit) as excinfo:
+            salishsea_cmd.run.run(
+                Path("SalishSea.yaml"),
+                tmp_path / "results_dir",
+                recovery_attempt=1,
+                self_chain=self_chain,
+                start_segment=start_segment,
+            )
+
+        assert excinfo.value.code == 2
+        assert caplog.records[0].levelname == "ERROR"
+
+    @patch("salishsea_cmd.run._find_resume_segment", return_value=(2, "44", None))
+    def test_resume(
+        self,
+        m_frs,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        tmp_path,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        segment = salishsea_cmd.run.RunSegment(
+            {"run_id": "2_sensitivity"},
+            "SalishSea_2.yaml",
+            tmp_path / "results_dir_2",
+            seg_no=2,
+            nn_it000=21,
+            nn_itend=30,
+            nn_date0=20141115,
+            restart_dir=tmp_path / "results_dir_1",
+        )
+        m_crs.return_value = salishsea_cmd.run.RunSegments(
+            first_seg_no=2, n_segments=1, segments=lambda: iter([segment])
+        )
+        batch_file = tmp_path / "run_dir" / "SalishSeaNEMO.sh"
+        m_btrd.return_value = (batch_file.parent, batch_file)
+        m_sj.return_value = "Submitted batch job 45"
+
+        salishsea_cmd.run.run(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", resume=True
+        )
+
+        m_frs.assert_called_once_with(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", "sbatch"
+        )
+        m_crs.assert_called_once_with(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", start_seg_no=2
+        )
+        m_sj.assert_called_once_with(batch_file, "sbatch", waitjob="44")
+        manifest = yaml.safe_load((tmp_path / "results_dir_segments.yaml").read_text())
+        assert manifest == {2: {"job": "45", "nn_it000": 21, "nn_itend": 30}}
+
+    @patch(
+        "salishsea_cmd.run._find_resume_segment",
+        return_value=(None, None, "All segments of results_dir have completed"),
+    )
+    def test_resume_nothing_to_resume(
+        self,
+        m_frs,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        tmp_path,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+
+        submit_job_msg = salishsea_cmd.run.run(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", resume=True
+        )
+
+        assert submit_job_msg == "All segments of results_dir have completed"
+        assert not m_crs.called
+        assert not m_sj.called
+
+    def test_resume_start_segment(
+        self,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        caplog,
+        tmp_path,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        caplog.set_level(logging.DEBUG)
+
+        with pytest.raises(SystemExit) as excinfo:
+            salishsea_cmd.run.run(
+                Path("SalishSea.yaml"),
+                tmp_path / "results_dir",
+                resume=True,
+                start_segment=2,
+            )
+
+        assert excinfo.value.code == 2
+        assert caplog.records[0].levelname == "ERROR"
+
+    def test_max_segments(
+        self,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        tmp_path,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        segments = [
+            salishsea_cmd.run.RunSegment(
+                {"run_id": f"{seg_no}_sensitivity"},
+                f"SalishSea_{seg_no}.yaml",
+                tmp_path / f"results_dir_{seg_no}",
+                seg_no=seg_no,
+                nn_it000=10 * seg_no - 9,
+                nn_itend=10 * seg_no,
+                nn_date0=20141115,
+            )
+            for seg_no in range(1, 4)
+        ]
+        m_crs.return_value = salishsea_cmd.run.RunSegments(
+            first_seg_no=1, n_segments=3, segments=lambda: iter(segments)
+        )
+        batch_file = tmp_path / "run_dir" / "SalishSeaNEMO.sh"
+        m_btrd.return_value = (batch_file.parent, batch_file)
+        m_sj.side_effect = ["Submitted batch job 43", "Submitted batch job 44"]
+
+        submit_job_msg = salishsea_cmd.run.run(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", max_segments=2
+        )
+
+        assert submit_job_msg == "Submitted jobs 43 44"
+        assert m_sj.call_count == 2
+        manifest = yaml.safe_load((tmp_path / "results_dir_segments.yaml").read_text())
+        assert sorted(manifest) == [1, 2]
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        (
+            {"job_array": True},
+            {"self_chain": True},
+            {"segments_per_job": 2},
+        ),
+    )
+    def test_max_segments_with_multi_segment_jobs(
+        self,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        kwargs,
+        caplog,
+        tmp_path,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        caplog.set_level(logging.DEBUG)
+
+        with pytest.raises(SystemExit) as excinfo:
+            salishsea_cmd.run.run(
+                Path("SalishSea.yaml"),
+                tmp_path / "results_dir",
+                max_segments=2,
+                **kwargs,
+            )
+
+        assert excinfo.value.code == 2
+        assert caplog.records[0].levelname == "ERROR"
+
+    @pytest.mark.parametrize(
+        "run_desc, waitjob, expected",
+        (
+            ({"run_id": "sensitivity", "backfill": {"candidates": []}}, "0", True),
+            ({"run_id": "sensitivity", "backfill": {"candidates": []}}, "42", False),
+            ({"run_id": "sensitivity"}, "0", False),
+        ),
+    )
+    def test_backfill(
+        self,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        run_desc,
+        waitjob,
+        expected,
+        tmp_path,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        m_crs.return_value = [
+            salishsea_cmd.run.RunSegment(
+                run_desc, Path("SalishSea.yaml"), tmp_path / "results"
+            )
+        ]
+        m_btrd.return_value = (
+            tmp_path / "run_dir",
+            tmp_path / "run_dir" / "SalishSeaNEMO.sh",
+        )
+        m_sj.return_value = "Submitted batch job 43"
+
+        salishsea_cmd.run.run(
+            Path("SalishSea.yaml"), tmp_path / "results", waitjob=waitjob
+        )
+
+        assert m_btrd.call_args.kwargs["backfill"] is expected
+
+    def test_backfill_without_slurm(
+        self,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        caplog,
+        tmp_path,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "optimum")
+        m_crs.return_value = [
+            salishsea_cmd.run.RunSegment(
+                {"run_id": "sensitivity", "backfill": {"candidates": []}},
+                Path("SalishSea.yaml"),
+                tmp_path / "results",
+            )
+        ]
+        caplog.set_level(logging.DEBUG)
+
+        with pytest.raises(SystemExit) as excinfo:
+            salishsea_cmd.run.run(Path("SalishSea.yaml"), tmp_path / "results")
+
+        assert excinfo.value.code == 2
+        assert caplog.records[0].levelname == "ERROR"
+        assert not m_btrd.called
+
+    @pytest.mark.parametrize(
+        "segments_per_job, expected",
+        (
+            (1, True),
+            (2, False),
+        ),
+    )
+    @patch("salishsea_cmd.run._record_walltime_history", autospec=True)
+    def test_predict_walltime(
+        self,
+        m_rwh,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        segments_per_job,
+        expected,
+        tmp_path,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        run_desc = {"run_id": "sensitivity", "walltime prediction": {"margin": 0.1}}
+        segments = [
+            salishsea_cmd.run.RunSegment(
+                run_desc, Path("SalishSea.yaml"), tmp_path / "results"
+            )
+        ]
+        m_crs.return_value = salishsea_cmd.run.RunSegments(
+            first_seg_no=0, n_segments=1, segments=lambda: iter(segments)
+        )
+        m_btrd.return_value = (
+            tmp_path / "run_dir",
+            tmp_path / "run_dir" / "SalishSeaNEMO.sh",
+        )
+        m_sj.return_value = "Submitted batch job 43"
+
+        salishsea_cmd.run.run(
+            Path("SalishSea.yaml"),
+            tmp_path / "results",
+            segments_per_job=segments_per_job,
+        )
+
+        assert m_btrd.call_args.kwargs["predict_walltime"] is expected
+        m_rwh.assert_called_once_with(run_desc, [tmp_path / "results"])
+
+    @patch("salishsea_cmd.run._record_walltime_history", autospec=True)
+    def test_no_walltime_prediction(
+        self,
+        m_rwh,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        tmp_path,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        m_crs.return_value = [
+            salishsea_cmd.run.RunSegment(
+                {"run_id": "sensitivity"}, Path("SalishSea.yaml"), tmp_path / "results"
+            )
+        ]
+        m_btrd.return_value = (
+            tmp_path / "run_dir",
+            tmp_path / "run_dir" / "SalishSeaNEMO.sh",
+        )
+        m_sj.return_value = "Submitted batch job 43"
+
+        salishsea_cmd.run.run(Path("SalishSea.yaml"), tmp_path / "results")
+
+        assert m_btrd.call_args.kwargs["predict_walltime"] is False
+        assert not m_rwh.called
+
+    @patch(
+        "salishsea_cmd.run._submit_job_array",
+        return_value=("Submitted batch job 43", ["43_0", "43_1", "43_2"]),
+    )
+    def test_segmented_run_job_array(
+        self,
+        m_sja,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        tmp_path,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        m_crs.return_value = [
+            salishsea_cmd.run.RunSegment(
+                {"run_id": f"{seg_no}_sensitivity"},
+                f"SalishSea_{seg_no}.yaml",
+                tmp_path / f"results_dir_{seg_no}",
+                seg_no=seg_no,
+                nn_it000=1 + seg_no * 10,
+                nn_itend=10 + seg_no * 10,
+                nn_date0=20141115,
+            )
+            for seg_no in range(3)
+        ]
+        m_btrd.side_effect = [
+            (
+                tmp_path / f"run_dir_{seg_no}",
+                tmp_path / f"run_dir_{seg_no}" / "SalishSeaNEMO.sh",
+            )
+            for seg_no in range(3)
+        ]
+
+        submit_job_msg = salishsea_cmd.run.run(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", job_array=True
+        )
+
+        assert not m_sj.called
+        m_sja.assert_called_once_with(
+            [
+                (segment, tmp_path / f"run_dir_{seg_no}" / "SalishSeaNEMO.sh")
+                for seg_no, segment in enumerate(m_crs.return_value)
+            ],
+            "0",
+            False,
+        )
+        assert submit_job_msg == "Submitted batch job 43"
+
+    def test_job_array_manifest_task_ids(
+        self,
+        m_wsdf,
+        m_wsnn,
+        m_crs,
+        m_btrd,
+        m_sj,
+        m_ssdj,
+        m_pc,
+        tmp_path,
+        monkeypatch,
+    ):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        segments = [
+            salishsea_cmd.run.RunSegment(
+                {"run_id": f"{seg_no}_sensitivity"},
+                f"SalishSea_{seg_no}.yaml",
+                tmp_path / f"results_dir_{seg_no}",
+                seg_no=seg_no,
+                nn_it000=1 + seg_no * 10,
+                nn_itend=10 + seg_no * 10,
+                nn_date0=20141115,
+            )
+            for seg_no in (3, 4, 5)
+        ]
+        m_crs.return_value = salishsea_cmd.run.RunSegments(
+            first_seg_no=3, n_segments=3, segments=lambda: iter(segments)
+        )
+        batch_files = []
+        for seg_no in (3, 4, 5):
+            run_dir = tmp_path / f"run_dir_{seg_no}"
+            run_dir.mkdir()
+            batch_file = run_dir / "SalishSeaNEMO.sh"
+            batch_file.write_text(
+                "#!/bin/bash\n\n"
+                f"#SBATCH --job-name={seg_no}_sensitivity\n"
+                f"#SBATCH --output=results_dir_{seg_no}/stdout\n"
+                f"#SBATCH --error=results_dir_{seg_no}/stderr\n"
+            )
+            batch_files.append((run_dir, batch_file))
+        m_btrd.side_effect = batch_files
+        m_sj.return_value = "Submitted batch job 43"
+
+        salishsea_cmd.run.run(
+            Path("SalishSea.yaml"),
+            tmp_path / "results_dir",
+            job_array=True,
+            start_segment=3,
+        )
+
+        array_script = (tmp_path / "run_dir_3" / "SalishSeaNEMO_array.sh").read_text()
+        assert "#SBATCH --array=0-2%1\n" in array_script
+        manifest = yaml.safe_load((tmp_path / "results_dir_segments.yaml").read_text())
+        assert {seg_no: manifest[seg_no]["job"] for seg_no in manifest} == {
+            3: "43_0",
+            4: "43_1",
+            5: "43_2",
+        }
+
+
+class TestCalcRunSegments:
+    """Unit tests for _calc_run_segments() function."""
+
+    @staticmethod
+    @pytest.fixture
+    def mock_f90nml_read(monkeypatch):
+        """Mock the f90nml.read() function."""
+
+        def _mock_f90nml_read(nml_path):
+            return {"namdom": {"rn_rdt": 40.0}}
+
+        monkeypatch.setattr(salishsea_cmd.run.f90nml, "read", _mock_f90nml_read)
+
+    def test_not_segmented_run(self, mock_f90nml_read, monkeypatch):
+        def mock_load_run_desc(run_desc_path):
+            return {}
+
+        monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
+
+        run_segments = salishsea_cmd.run._calc_run_segments(
+            Path("SalishSea.yaml"), Path("results_dir")
+        )
+
+        assert list(run_segments) == [
+            salishsea_cmd.run.RunSegment(
+                {}, Path("SalishSea.yaml"), Path("results_dir")
+            )
+        ]
+        assert len(run_segments) == 1
+        assert run_segments.first_seg_no == 0
+        assert list(run_segments)[0].namelist_namrun_patch == {}
+
+    def test_no_run_id(self, mock_f90nml_read, monkeypatch):
+        def mock_load_run_desc(run_desc_path):
+            return yaml.safe_load(StringIO(textwrap.dedent("""\
+                        segmented run:
+                            start date: 2014-11-15
+                            start time step: 152634
+                            end date: 2014-12-02
+                            days per segment: 10
+                            first segment number: 0
+                            segment walltime: 12:00:00
+                            namelists:
+                                namrun: ./namelist.time
+                                namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+                            """)))
+
+        monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
+
+        with pytest.raises(SystemExit):
+            salishsea_cmd.run._calc_run_segments(
+                Path("SalishSea.yaml"), Path("results_dir")
+            )
+
+    def test_no_start_date(self, mock_f90nml_read, monkeypatch):
+        def mock_load_run_desc(run_desc_path):
+            return yaml.safe_load(StringIO(textwrap.dedent("""\
+                        run_id: sensitivity
+
+                        segmented run:
+
+                            start time step: 152634
+                            end date: 2014-12-02
+                            days per segment: 10
+                            first segment number: 0
+                            segment walltime: 12:00:00
+                            namelists:
+                                namrun: ./namelist.time
+                                namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+                        """)))
+
+        monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
+
+        with pytest.raises(SystemExit):
+            salishsea_cmd.run._calc_run_segments(
+                Path("SalishSea.yaml"), Path("results_dir")
+            )
+
+    def test_no_start_time_step(self, mock_f90nml_read, monkeypatch):
+        def mock_load_run_desc(run_desc_path):
+            return yaml.safe_load(StringIO(textwrap.dedent("""\
+                        run_id: sensitivity
+
+                        segmented run:
+                            start date: 2014-11-15
+
+                            end date: 2014-12-02
+                            days per segment: 10
+                            first segment number: 0
+                            segment walltime: 12:00:00
+                            namelists:
+                                namrun: ./namelist.time
+                                namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+                        """)))
+
+        monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
+
+        with pytest.raises(SystemExit):
+            salishsea_cmd.run._calc_run_segments(
+                Path("SalishSea.yaml"), Path("results_dir")
+            )
 
     def test_no_end_date(self, mock_f90nml_read, monkeypatch):
         def mock_load_run_desc(run_desc_path):
@@ -1177,12 +2089,12 @@ class TestCalcRunSegments:
 
         monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
 
-        run_segments, first_seg_no_ = salishsea_cmd.run._calc_run_segments(
+        run_segments = salishsea_cmd.run._calc_run_segments(
             Path("SalishSea.yaml"), Path("results_dir")
         )
 
         expected = [
-            (
+            salishsea_cmd.run.RunSegment(
                 yaml.safe_load(StringIO(textwrap.dedent(f"""\
                             run_id: {first_seg_no}_sensitivity
 
@@ -1199,42 +2111,367 @@ class TestCalcRunSegments:
                             """))),
                 f"SalishSea_{first_seg_no}.yaml",
                 Path(f"results_dir_{first_seg_no}"),
-                {
-                    "namrun": {
-                        "nn_it000": 152634,
-                        "nn_itend": 152634 + 2160 * 10 - 1,
-                        "nn_date0": 20141115,
-                    }
-                },
+                seg_no=first_seg_no,
+                nn_it000=152634,
+                nn_itend=152634 + 2160 * 10 - 1,
+                nn_date0=20141115,
             ),
-            (
+            salishsea_cmd.run.RunSegment(
                 yaml.safe_load(StringIO(textwrap.dedent(f"""\
                             run_id: {first_seg_no + 1}_sensitivity
 
-                            segmented run:
-                                start date: 2014-11-15
-                                start time step: 152634
-                                end date: 2014-12-02
-                                days per segment: 10
-                                first segment number: {first_seg_no}
-                                segment walltime: 12:00:00
-                                namelists:
-                                    namrun: ./namelist.time
-                                    namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
-                            """))),
-                f"SalishSea_{first_seg_no + 1}.yaml",
-                Path(f"results_dir_{first_seg_no + 1}"),
-                {
-                    "namrun": {
-                        "nn_it000": 152634 + 2160 * 10,
-                        "nn_itend": 152634 + 2160 * 18 - 1,
-                        "nn_date0": 20141125,
-                    }
-                },
-            ),
-        ]
-        assert run_segments == expected
-        assert first_seg_no_ == first_seg_no
+                            segmented run:
+                                start date: 2014-11-15
+                                start time step: 152634
+                                end date: 2014-12-02
+                                days per segment: 10
+                                first segment number: {first_seg_no}
+                                segment walltime: 12:00:00
+                                namelists:
+                                    namrun: ./namelist.time
+                                    namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+                            """))),
+                f"SalishSea_{first_seg_no + 1}.yaml",
+                Path(f"results_dir_{first_seg_no + 1}"),
+                seg_no=first_seg_no + 1,
+                nn_it000=152634 + 2160 * 10,
+                nn_itend=152634 + 2160 * 18 - 1,
+                nn_date0=20141125,
+                restart_dir=Path(f"results_dir_{first_seg_no}"),
+            ),
+        ]
+        assert list(run_segments) == expected
+        assert len(run_segments) == 2
+        assert run_segments.first_seg_no == first_seg_no
+
+    def test_start_segment(self, mock_f90nml_read, monkeypatch):
+        def mock_load_run_desc(run_desc_path):
+            return yaml.safe_load(StringIO(textwrap.dedent("""\
+                        run_id: SKOG_2016_BASE
+
+                        segmented run:
+                          start date: 2016-04-30
+                          start time step: 2730241
+                          end date: 2016-12-31
+                          days per segment: 30
+                          first segment number: 0
+                          segment walltime: 12:00:00
+                          namelists:
+                            namrun: ./namelist.time
+                            namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+                        """)))
+
+        monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
+
+        run_segments = salishsea_cmd.run._calc_run_segments(
+            Path("BR5_12SKOG2016.yaml"), Path("SKOG_C"), start_seg_no=7
+        )
+
+        assert run_segments.first_seg_no == 7
+        assert len(run_segments) == 2
+        segments = list(run_segments)
+        assert [segment.seg_no for segment in segments] == [7, 8]
+        assert segments[0].nn_it000 == 3248641 - 2160 * 30
+        assert segments[0].restart_dir == Path("SKOG_C_6")
+
+    @pytest.mark.parametrize("start_seg_no", (-1, 9))
+    def test_start_segment_out_of_range(
+        self, mock_f90nml_read, start_seg_no, caplog, monkeypatch
+    ):
+        def mock_load_run_desc(run_desc_path):
+            return yaml.safe_load(StringIO(textwrap.dedent("""\
+                        run_id: SKOG_2016_BASE
+
+                        segmented run:
+                          start date: 2016-04-30
+                          start time step: 2730241
+                          end date: 2016-12-31
+                          days per segment: 30
+                          first segment number: 0
+                          segment walltime: 12:00:00
+                          namelists:
+                            namrun: ./namelist.time
+                            namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+                        """)))
+
+        monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
+        caplog.set_level(logging.DEBUG)
+
+        with pytest.raises(SystemExit):
+            salishsea_cmd.run._calc_run_segments(
+                Path("BR5_12SKOG2016.yaml"), Path("SKOG_C"), start_seg_no=start_seg_no
+            )
+
+        assert caplog.records[0].levelname == "ERROR"
+
+    def test_hours_per_segment(self, mock_f90nml_read, monkeypatch):
+        def mock_load_run_desc(run_desc_path):
+            return yaml.safe_load(StringIO(textwrap.dedent("""\
+                        run_id: sensitivity
+
+                        segmented run:
+                            start date: 2014-11-15
+                            start time step: 152634
+                            end date: 2014-11-15
+                            hours per segment: 6
+                            first segment number: 0
+                            segment walltime: 03:00:00
+                            namelists:
+                                namrun: ./namelist.time
+                                namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+                        """)))
+
+        monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
+
+        run_segments = salishsea_cmd.run._calc_run_segments(
+            Path("SalishSea.yaml"), Path("results_dir")
+        )
+
+        assert len(run_segments) == 4
+        segments = list(run_segments)
+        assert segments[1].namelist_namrun_patch == {
+            "namrun": {
+                "nn_it000": 152634 + 540,
+                "nn_itend": 152634 + 540 * 2 - 1,
+                "nn_date0": 20141115,
+                "nn_time0": 600,
+            }
+        }
+        assert segments[1].restart_dir == Path("results_dir_0")
+        assert segments[-1].nn_time0 == 1800
+        assert segments[-1].nn_itend == 152634 + 2160 - 1
+
+    def test_hours_per_segment_final_segment(self, mock_f90nml_read, monkeypatch):
+        def mock_load_run_desc(run_desc_path):
+            return yaml.safe_load(StringIO(textwrap.dedent("""\
+                        run_id: sensitivity
+
+                        segmented run:
+                            start date: 2014-11-15
+                            start time step: 152634
+                            end date: 2014-11-16
+                            hours per segment: 18
+                            first segment number: 0
+                            segment walltime: 03:00:00
+                            namelists:
+                                namrun: ./namelist.time
+                                namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+                        """)))
+
+        monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
+
+        run_segments = salishsea_cmd.run._calc_run_segments(
+            Path("SalishSea.yaml"), Path("results_dir")
+        )
+
+        assert len(run_segments) == 3
+        segment = list(run_segments)[-1]
+        assert segment.nn_it000 == 152634 + 1620 * 2
+        assert segment.nn_itend == 152634 + 2160 * 2 - 1
+        assert segment.nn_date0 == 20141116
+        assert segment.nn_time0 == 1200
+
+    def test_failure_recovery(self, mock_f90nml_read, monkeypatch):
+        def mock_load_run_desc(run_desc_path):
+            return yaml.safe_load(StringIO(textwrap.dedent("""\
+                        run_id: sensitivity
+
+                        segmented run:
+                            start date: 2014-11-15
+                            start time step: 152634
+                            end date: 2014-12-02
+                            days per segment: 10
+                            first segment number: 0
+                            segment walltime: 12:00:00
+                            failure recovery:
+                                hours between restarts: 2
+                                max retries: 2
+                            namelists:
+                                namrun: ./namelist.time
+                                namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+                        """)))
+
+        monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
+
+        run_segments = salishsea_cmd.run._calc_run_segments(
+            Path("SalishSea.yaml"), Path("results_dir")
+        )
+
+        segment = list(run_segments)[0]
+        # 21600 time steps per 12 hour segment walltime;
+        # restart files every 3600 time steps = 40 model hours
+        assert segment.nn_stock == 3600
+        assert segment.namelist_namrun_patch["namrun"]["nn_stock"] == 3600
+
+    @staticmethod
+    @pytest.fixture
+    def completed_segments(tmp_path, monkeypatch):
+        """Results directories of 2 completed segments that each ran 30 days
+        in 10 hours, and a mock f90nml.read() function for their namelists."""
+
+        def _mock_f90nml_read(nml_path):
+            return {"namdom": {"rn_rdt": 40.0}}
+
+        monkeypatch.setattr(salishsea_cmd.run.f90nml, "read", _mock_f90nml_read)
+        for seg_no in range(2):
+            results_dir = tmp_path / f"SKOG_C_{seg_no}"
+            results_dir.mkdir()
+            restart_timestep = 2730240 + 2160 * 30 * (seg_no + 1)
+            (results_dir / f"SKOG_{restart_timestep:08d}_restart.nc").write_bytes(b"")
+            (results_dir / f"SKOG_{restart_timestep:08d}_restart_trc.nc").write_bytes(
+                b""
+            )
+            (results_dir / "stdout").write_text(
+                "working dir: /scratch/runs/SKOG_C\n"
+                "Starting run at Mon May 16 02:00:00 PDT 2016\n"
+                "Ended run at Mon May 16 12:00:00 PDT 2016\n"
+            )
+        return tmp_path
+
+    def test_adaptive_days_per_segment(self, completed_segments, monkeypatch):
+        def mock_load_run_desc(run_desc_path):
+            return yaml.safe_load(StringIO(textwrap.dedent("""\
+                        run_id: SKOG_2016_BASE
+
+                        segmented run:
+                          start date: 2016-04-30
+                          start time step: 2730241
+                          end date: 2016-12-31
+                          days per segment: 30
+                          adaptive days per segment: True
+                          first segment number: 0
+                          segment walltime: 12:00:00
+                          namelists:
+                            namrun: ./namelist.time
+                            namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+
+                        restart:
+                          restart.nc: $SCRATCHDIR/SKOG/SKOG_02730240_restart.nc
+                          restart_trc.nc: $SCRATCHDIR/SKOG/SKOG_02730240_restart_trc.nc
+                        """)))
+
+        monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
+
+        run_segments = salishsea_cmd.run._calc_run_segments(
+            Path("BR5_12SKOG2016.yaml"), completed_segments / "SKOG_C", start_seg_no=2
+        )
+
+        # 3 model days/hour * 12 hours * 0.9 safety factor
+        assert run_segments.first_seg_no == 2
+        assert len(run_segments) == 6
+        segments = list(run_segments)
+        assert segments[0].nn_it000 == 2859841
+        assert segments[0].nn_itend == 2859841 + 2160 * 32 - 1
+        assert segments[0].nn_date0 == 20160629
+        assert segments[0].restart_dir == completed_segments / "SKOG_C_1"
+        assert segments[1].nn_it000 == 2859841 + 2160 * 32
+        assert segments[-1].seg_no == 7
+        assert segments[-1].nn_date0 == 20161206
+        assert segments[-1].nn_itend == 3261600
+
+    def test_adaptive_days_per_segment_safety_factor(
+        self, completed_segments, monkeypatch
+    ):
+        def mock_load_run_desc(run_desc_path):
+            return yaml.safe_load(StringIO(textwrap.dedent("""\
+                        run_id: SKOG_2016_BASE
+
+                        segmented run:
+                          start date: 2016-04-30
+                          start time step: 2730241
+                          end date: 2016-12-31
+                          days per segment: 30
+                          adaptive days per segment: True
+                          walltime safety factor: 0.5
+                          first segment number: 0
+                          segment walltime: 12:00:00
+                          namelists:
+                            namrun: ./namelist.time
+                            namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+
+                        restart:
+                          restart.nc: $SCRATCHDIR/SKOG/SKOG_02730240_restart.nc
+                          restart_trc.nc: $SCRATCHDIR/SKOG/SKOG_02730240_restart_trc.nc
+                        """)))
+
+        monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
+
+        run_segments = salishsea_cmd.run._calc_run_segments(
+            Path("BR5_12SKOG2016.yaml"), completed_segments / "SKOG_C", start_seg_no=2
+        )
+
+        segments = list(run_segments)
+        assert segments[0].nn_itend == 2859841 + 2160 * 18 - 1
+
+    def test_adaptive_days_per_segment_no_measurements(
+        self, completed_segments, monkeypatch
+    ):
+        def mock_load_run_desc(run_desc_path):
+            return yaml.safe_load(StringIO(textwrap.dedent("""\
+                        run_id: SKOG_2016_BASE
+
+                        segmented run:
+                          start date: 2016-04-30
+                          start time step: 2730241
+                          end date: 2016-12-31
+                          days per segment: 30
+                          adaptive days per segment: True
+                          first segment number: 0
+                          segment walltime: 12:00:00
+                          namelists:
+                            namrun: ./namelist.time
+                            namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+
+                        restart:
+                          restart.nc: $SCRATCHDIR/SKOG/SKOG_02730240_restart.nc
+                          restart_trc.nc: $SCRATCHDIR/SKOG/SKOG_02730240_restart_trc.nc
+                        """)))
+
+        monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
+        for seg_no in range(2):
+            (completed_segments / f"SKOG_C_{seg_no}" / "stdout").unlink()
+
+        run_segments = salishsea_cmd.run._calc_run_segments(
+            Path("BR5_12SKOG2016.yaml"), completed_segments / "SKOG_C", start_seg_no=2
+        )
+
+        assert len(run_segments) == 7
+        assert list(run_segments)[0].nn_it000 == 2730241 + 2160 * 60
+
+    def test_adaptive_days_per_segment_no_restart_files(
+        self, completed_segments, caplog, monkeypatch
+    ):
+        def mock_load_run_desc(run_desc_path):
+            return yaml.safe_load(StringIO(textwrap.dedent("""\
+                        run_id: SKOG_2016_BASE
+
+                        segmented run:
+                          start date: 2016-04-30
+                          start time step: 2730241
+                          end date: 2016-12-31
+                          days per segment: 30
+                          adaptive days per segment: True
+                          first segment number: 0
+                          segment walltime: 12:00:00
+                          namelists:
+                            namrun: ./namelist.time
+                            namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+
+                        restart:
+                          restart.nc: $SCRATCHDIR/SKOG/SKOG_02730240_restart.nc
+                        """)))
+
+        monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
+        caplog.set_level(logging.DEBUG)
+
+        with pytest.raises(SystemExit):
+            salishsea_cmd.run._calc_run_segments(
+                Path("BR5_12SKOG2016.yaml"),
+                completed_segments / "SKOG_C",
+                start_seg_no=3,
+            )
+
+        assert caplog.records[0].levelname == "ERROR"
 
     def test_final_run_segment(self, mock_f90nml_read, monkeypatch):
         def mock_load_run_desc(run_desc_path):
@@ -1255,11 +2492,11 @@ class TestCalcRunSegments:
 
         monkeypatch.setattr(salishsea_cmd.run, "load_run_desc", mock_load_run_desc)
 
-        run_segments, first_seg_no = salishsea_cmd.run._calc_run_segments(
+        run_segments = salishsea_cmd.run._calc_run_segments(
             Path("BR5_12SKOG2016.yaml"), Path("SKOG_C")
         )
 
-        expected = (
+        expected = salishsea_cmd.run.RunSegment(
             yaml.safe_load(StringIO(textwrap.dedent("""\
                     run_id: 8_SKOG_2016_BASE
 
@@ -1276,15 +2513,576 @@ class TestCalcRunSegments:
                     """))),
             "BR5_12SKOG2016_8.yaml",
             Path("SKOG_C_8"),
-            {
-                "namrun": {
-                    "nn_it000": 3248641,
-                    "nn_itend": 3261600,
-                    "nn_date0": 20161226,
-                }
+            seg_no=8,
+            nn_it000=3248641,
+            nn_itend=3261600,
+            nn_date0=20161226,
+            restart_dir=Path("SKOG_C_7"),
+        )
+        assert list(run_segments)[-1] == expected
+
+
+class TestRestartTimestep:
+    """Unit tests for _restart_timestep() function."""
+
+    run_desc = {
+        "restart": {
+            "restart.nc": "$SCRATCHDIR/SKOG/SKOG_02730240_restart.nc",
+            "restart_trc.nc": "$SCRATCHDIR/SKOG/SKOG_02730240_restart_trc.nc",
+        }
+    }
+
+    def test_restart_timestep(self, tmp_path):
+        for timestep in (2773440, 2795040):
+            (tmp_path / f"SKOG_{timestep:08d}_restart.nc").write_bytes(b"")
+        (tmp_path / "SKOG_02816640_restart_trc.nc").write_bytes(b"")
+
+        timestep = salishsea_cmd.run._restart_timestep(self.run_desc, tmp_path)
+
+        assert timestep == 2795040
+
+    def test_per_rank_restart_files(self, tmp_path):
+        (tmp_path / "SKOG_02773440_restart.nc").write_bytes(b"")
+        for rank in range(2):
+            (tmp_path / f"SKOG_02795040_restart_{rank:04d}.nc").write_bytes(b"")
+
+        timestep = salishsea_cmd.run._restart_timestep(self.run_desc, tmp_path)
+
+        assert timestep == 2795040
+
+    def test_no_restart_files(self, tmp_path):
+        (tmp_path / "SKOG_02795040_restart_trc_0000.nc").write_bytes(b"")
+
+        assert salishsea_cmd.run._restart_timestep(self.run_desc, tmp_path) is None
+
+
+class TestSegmentRunHours:
+    """Unit tests for _segment_run_hours() function."""
+
+    def test_run_hours(self, tmp_path):
+        (tmp_path / "stdout").write_text(
+            "working dir: /scratch/runs/SKOG_C\n"
+            "Starting run at Sat Apr 30 22:00:00 PDT 2016\n"
+            "Ended run at Sun May  1 08:30:00 PDT 2016\n"
+        )
+
+        assert salishsea_cmd.run._segment_run_hours(tmp_path) == 10.5
+
+    def test_no_ended_run_line(self, tmp_path):
+        (tmp_path / "stdout").write_text(
+            "Starting run at Sat Apr 30 22:00:00 PDT 2016\n"
+        )
+
+        assert salishsea_cmd.run._segment_run_hours(tmp_path) is None
+
+    def test_no_stdout(self, tmp_path):
+        assert salishsea_cmd.run._segment_run_hours(tmp_path) is None
+
+
+class TestParseDateOutput:
+    """Unit tests for _parse_date_output() function."""
+
+    @pytest.mark.parametrize(
+        "date_output, expected",
+        (
+            ("Sat Apr 30 22:00:00 PDT 2016", "2016-04-30T22:00:00"),
+            ("Sun May  1 08:00:00 UTC 2016", "2016-05-01T08:00:00"),
+            ("Sun May 1 08:00:00 2016", "2016-05-01T08:00:00"),
+        ),
+    )
+    def test_parse_date_output(self, date_output, expected):
+        parsed = salishsea_cmd.run._parse_date_output(date_output)
+
+        assert parsed.format("YYYY-MM-DDTHH:mm:ss") == expected
+
+    def test_unparseable(self):
+        assert salishsea_cmd.run._parse_date_output("not a date") is None
+
+
+class TestFindResumeSegment:
+    """Unit tests for _find_resume_segment() function."""
+
+    @staticmethod
+    @pytest.fixture
+    def run_segments(tmp_path, monkeypatch):
+        """Mock _calc_run_segments() to plan 3 segments of 10 time steps each."""
+        run_desc = {
+            "run_id": "sensitivity",
+            "restart": {
+                "restart.nc": "$SCRATCH/SKOG/SKOG_00000000_restart.nc",
+                "restart_trc.nc": "$SCRATCH/SKOG/SKOG_00000000_restart_trc.nc",
+            },
+        }
+        segments = [
+            salishsea_cmd.run.RunSegment(
+                {**run_desc, "run_id": f"{seg_no}_sensitivity"},
+                f"SalishSea_{seg_no}.yaml",
+                tmp_path / f"results_dir_{seg_no}",
+                seg_no=seg_no,
+                nn_it000=1 + seg_no * 10,
+                nn_itend=10 + seg_no * 10,
+                nn_date0=20141115,
+            )
+            for seg_no in range(3)
+        ]
+
+        def mock_calc_run_segments(desc_file, results_dir, start_seg_no=None):
+            return salishsea_cmd.run.RunSegments(
+                first_seg_no=0, n_segments=3, segments=lambda: iter(segments)
+            )
+
+        monkeypatch.setattr(
+            salishsea_cmd.run, "_calc_run_segments", mock_calc_run_segments
+        )
+        return segments
+
+    @staticmethod
+    def write_restart_files(results_dir, timestep, names=("restart", "restart_trc")):
+        results_dir.mkdir(exist_ok=True)
+        for name in names:
+            (results_dir / f"SKOG_{timestep:08d}_{name}.nc").write_bytes(b"")
+
+    def test_resume_after_failed_segment(self, run_segments, tmp_path, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run, "_job_active", lambda *args: False)
+        self.write_restart_files(tmp_path / "results_dir_0", 10)
+        # Incomplete set of restart files
+        self.write_restart_files(tmp_path / "results_dir_1", 20, names=("restart",))
+
+        resume = salishsea_cmd.run._find_resume_segment(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", "sbatch"
+        )
+
+        assert resume == (1, None, None)
+
+    def test_resume_from_first_segment(self, run_segments, tmp_path, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run, "_job_active", lambda *args: False)
+
+        resume = salishsea_cmd.run._find_resume_segment(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", "sbatch"
+        )
+
+        assert resume == (0, None, None)
+
+    def test_all_segments_completed(self, run_segments, tmp_path):
+        for seg_no in range(3):
+            self.write_restart_files(
+                tmp_path / f"results_dir_{seg_no}", 10 + seg_no * 10
+            )
+
+        resume = salishsea_cmd.run._find_resume_segment(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", "sbatch"
+        )
+
+        assert resume == (None, None, "All segments of results_dir have completed")
+
+    def test_interrupted_submission(self, run_segments, tmp_path, monkeypatch):
+        monkeypatch.setattr(
+            salishsea_cmd.run, "_job_active", lambda job_id, cmd: job_id == "43"
+        )
+        self.write_restart_files(tmp_path / "results_dir_0", 10)
+        salishsea_cmd.run._record_submitted_segments(
+            tmp_path / "results_dir",
+            [(run_segments[0], "42"), (run_segments[1], "43")],
+        )
+
+        resume = salishsea_cmd.run._find_resume_segment(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", "sbatch"
+        )
+
+        assert resume == (2, "43", None)
+
+    def test_last_segment_active(self, run_segments, tmp_path, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run, "_job_active", lambda *args: True)
+        salishsea_cmd.run._record_submitted_segments(
+            tmp_path / "results_dir",
+            [(segment, f"{42 + i}") for i, segment in enumerate(run_segments)],
+        )
+
+        start_seg_no, waitjob, msg = salishsea_cmd.run._find_resume_segment(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", "sbatch"
+        )
+
+        assert (start_seg_no, waitjob) == (None, None)
+        assert msg == "Job 44 for the last segment of results_dir is queued or running"
+
+    def test_manifest_time_steps(self, run_segments, tmp_path, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run, "_job_active", lambda *args: False)
+        # Segment re-planned to 15 time steps when it was submitted
+        salishsea_cmd.run._record_submitted_segments(
+            tmp_path / "results_dir",
+            [(attrs.evolve(run_segments[0], nn_itend=15), "42")],
+        )
+        self.write_restart_files(tmp_path / "results_dir_0", 15)
+
+        resume = salishsea_cmd.run._find_resume_segment(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", "sbatch"
+        )
+
+        assert resume == (1, None, None)
+
+
+class TestRecordSubmittedSegments:
+    """Unit tests for _record_submitted_segments() & _read_segments_manifest()
+    functions.
+    """
+
+    def test_no_manifest(self, tmp_path):
+        manifest = salishsea_cmd.run._read_segments_manifest(tmp_path / "results_dir")
+
+        assert manifest == {}
+
+    def test_record_submitted_segments(self, tmp_path):
+        segments = [
+            salishsea_cmd.run.RunSegment(
+                {},
+                f"SalishSea_{seg_no}.yaml",
+                tmp_path / f"results_dir_{seg_no}",
+                seg_no=seg_no,
+                nn_it000=1 + seg_no * 10,
+                nn_itend=10 + seg_no * 10,
+                nn_date0=20141115,
+            )
+            for seg_no in range(2)
+        ]
+
+        salishsea_cmd.run._record_submitted_segments(
+            tmp_path / "results_dir", [(segments[0], "42")]
+        )
+        salishsea_cmd.run._record_submitted_segments(
+            tmp_path / "results_dir", [(segments[1], "43")]
+        )
+
+        manifest = salishsea_cmd.run._read_segments_manifest(tmp_path / "results_dir")
+        assert manifest == {
+            0: {"job": "42", "nn_it000": 1, "nn_itend": 10},
+            1: {"job": "43", "nn_it000": 11, "nn_itend": 20},
+        }
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "results_dir_segments.yaml"
+        ]
+
+
+class TestJobActive:
+    """Unit tests for _job_active() function."""
+
+    @pytest.mark.parametrize(
+        "queue_job_cmd, expected_cmd",
+        (
+            ("sbatch", ["squeue", "--noheader", "--format=%i", "--jobs=43"]),
+            ("qsub", ["qstat", "43"]),
+            ("qsub -q mpi", ["qstat", "43"]),
+        ),
+    )
+    def test_job_active(self, queue_job_cmd, expected_cmd, monkeypatch):
+        m_run = Mock(
+            name="subprocess.run",
+            return_value=subprocess.CompletedProcess([], 0, stdout="43\n"),
+        )
+        monkeypatch.setattr(salishsea_cmd.run.subprocess, "run", m_run)
+
+        assert salishsea_cmd.run._job_active("43", queue_job_cmd)
+        m_run.assert_called_once_with(expected_cmd, capture_output=True, text=True)
+
+    def test_job_not_active(self, monkeypatch):
+        m_run = Mock(
+            name="subprocess.run",
+            return_value=subprocess.CompletedProcess([], 1, stdout=""),
+        )
+        monkeypatch.setattr(salishsea_cmd.run.subprocess, "run", m_run)
+
+        assert not salishsea_cmd.run._job_active("43", "sbatch")
+
+    def test_bash(self):
+        assert not salishsea_cmd.run._job_active("started", "bash")
+
+
+class TestActiveJobs:
+    """Unit test for active_jobs() function."""
+
+    def test_active_jobs(self, monkeypatch):
+        monkeypatch.setattr(
+            salishsea_cmd.run, "_job_active", lambda job_id, cmd: job_id != "42"
+        )
+
+        assert salishsea_cmd.run.active_jobs(["41", "42", "43"], "sbatch") == [
+            "41",
+            "43",
+        ]
+
+
+@patch("salishsea_cmd.run._find_resume_segment", autospec=True)
+class TestPlanSubmission:
+    """Unit tests for plan_submission() function."""
+
+    def test_nothing_to_submit(self, m_frs, tmp_path):
+        m_frs.return_value = (None, None, "All segments of results_dir have completed")
+
+        plan = salishsea_cmd.run.plan_submission(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", "sbatch"
+        )
+
+        assert plan == salishsea_cmd.run.SubmissionPlan(
+            message="All segments of results_dir have completed"
+        )
+
+    def test_wait_for_job(self, m_frs, tmp_path):
+        m_frs.return_value = (3, "42", None)
+
+        plan = salishsea_cmd.run.plan_submission(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", "sbatch"
+        )
+
+        m_frs.assert_called_once_with(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", "sbatch"
+        )
+        assert plan == salishsea_cmd.run.SubmissionPlan(3, "42")
+
+    @pytest.mark.parametrize("submitted, failed_job", ((False, None), (True, "42")))
+    def test_segment_job_finished(self, m_frs, submitted, failed_job, tmp_path):
+        if submitted:
+            (tmp_path / "results_dir_segments.yaml").write_text(
+                yaml.safe_dump({2: {"job": "42", "nn_it000": 11, "nn_itend": 20}})
+            )
+        m_frs.return_value = (2, None, None)
+
+        plan = salishsea_cmd.run.plan_submission(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", "sbatch"
+        )
+
+        assert plan == salishsea_cmd.run.SubmissionPlan(2, failed_job=failed_job)
+
+    def test_default_queue_job_cmd(self, m_frs, tmp_path, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "optimum")
+        m_frs.return_value = (None, None, "msg")
+
+        salishsea_cmd.run.plan_submission(
+            Path("SalishSea.yaml"), tmp_path / "results_dir"
+        )
+
+        m_frs.assert_called_once_with(
+            Path("SalishSea.yaml"), tmp_path / "results_dir", "qsub -q mpi"
+        )
+
+
+class TestRestartIntervalTimesteps:
+    """Unit tests for _restart_interval_timesteps() function."""
+
+    @pytest.mark.parametrize(
+        "hours_between_restarts, rn_rdt, expected",
+        (
+            (2, 40.0, 3600),
+            # Rounded down to whole minutes of model time
+            (1, 40.0, 1800),
+            (0.25, 40.0, 450),
+            (0.1, 40.0, 180),
+            (0.001, 40.0, 3),
+            (1, 30.0, 1800),
+        ),
+    )
+    def test_restart_interval_timesteps(self, hours_between_restarts, rn_rdt, expected):
+        run_desc = {
+            "segmented run": {
+                "segment walltime": "12:00:00",
+                "failure recovery": {"hours between restarts": hours_between_restarts},
+            }
+        }
+
+        nn_stock = salishsea_cmd.run._restart_interval_timesteps(
+            run_desc, 21600, rn_rdt
+        )
+
+        assert nn_stock == expected
+
+
+class TestMaxRecoveryAttempts:
+    """Unit tests for _max_recovery_attempts() function."""
+
+    def test_max_retries(self):
+        run_desc = {"segmented run": {"failure recovery": {"max retries": 3}}}
+
+        assert salishsea_cmd.run._max_recovery_attempts(run_desc) == 3
+
+    @pytest.mark.parametrize(
+        "run_desc",
+        (
+            {"segmented run": {}},
+            {"segmented run": {"failure recovery": {"hours between restarts": 2}}},
+        ),
+    )
+    def test_no_failure_recovery(self, run_desc):
+        assert salishsea_cmd.run._max_recovery_attempts(run_desc) == 0
+
+
+class TestRecoverFirstSegment:
+    """Unit tests for _recover_first_segment() function."""
+
+    @staticmethod
+    @pytest.fixture
+    def run_segments(tmp_path, monkeypatch):
+        monkeypatch.setattr(
+            salishsea_cmd.run.f90nml,
+            "read",
+            lambda nml_path: {"namdom": {"rn_rdt": 40.0}},
+        )
+        run_desc = {
+            "run_id": "sensitivity",
+            "restart": {
+                "restart.nc": "$SCRATCH/SKOG/SKOG_00000000_restart.nc",
+                "restart_trc.nc": "$SCRATCH/SKOG/SKOG_00000000_restart_trc.nc",
             },
+            "segmented run": {
+                "namelists": {"namdom": "$PROJECT/SS-run-sets/namelist.domain"}
+            },
+        }
+        segments = [
+            salishsea_cmd.run.RunSegment(
+                {**run_desc, "run_id": f"{seg_no}_sensitivity"},
+                f"SalishSea_{seg_no}.yaml",
+                tmp_path / f"results_dir_{seg_no}",
+                seg_no=seg_no,
+                nn_it000=1 + seg_no * 21600,
+                nn_itend=(seg_no + 1) * 21600,
+                nn_date0=20141115 + seg_no * 10,
+                restart_dir=tmp_path / f"results_dir_{seg_no - 1}",
+                nn_stock=3600,
+            )
+            for seg_no in (1, 2)
+        ]
+        (tmp_path / "results_dir_1").mkdir()
+        return salishsea_cmd.run.RunSegments(
+            first_seg_no=1, n_segments=2, segments=lambda: iter(segments)
+        )
+
+    def test_recover_from_newest_complete_restart(self, run_segments, tmp_path):
+        results_dir = tmp_path / "results_dir_1"
+        for timestep in (25200, 28800):
+            (results_dir / f"SKOG_{timestep:08d}_restart.nc").write_bytes(b"")
+            (results_dir / f"SKOG_{timestep:08d}_restart_trc.nc").write_bytes(b"")
+        # Incomplete set of restart files
+        (results_dir / "SKOG_00032400_restart.nc").write_bytes(b"")
+
+        recovery_segments = salishsea_cmd.run._recover_first_segment(run_segments, 1)
+
+        segments = list(recovery_segments)
+        assert len(segments) == 2
+        assert segments[0].nn_it000 == 28801
+        assert segments[0].nn_itend == 43200
+        # 7200 time steps = 80 hours after 2014-11-25 00:00
+        assert segments[0].nn_date0 == 20141128
+        assert segments[0].nn_time0 == 800
+        assert segments[0].restart_dir == results_dir
+        assert segments[0].results_dir == results_dir
+        assert segments[1] == list(run_segments)[1]
+        assert len(recovery_segments) == 2
+        assert recovery_segments.first_seg_no == 1
+
+    def test_no_intermediate_restart(self, run_segments, caplog, tmp_path):
+        caplog.set_level(logging.DEBUG)
+
+        recovery_segments = salishsea_cmd.run._recover_first_segment(run_segments, 1)
+
+        assert list(recovery_segments) == list(run_segments)
+        assert caplog.records[0].levelname == "WARNING"
+
+    def test_rename_failed_attempt_output(self, run_segments, tmp_path):
+        results_dir = tmp_path / "results_dir_1"
+        (results_dir / "stdout").write_text("failed run stdout")
+        (results_dir / "stderr").write_text("failed run stderr")
+
+        salishsea_cmd.run._recover_first_segment(run_segments, 2)
+
+        assert not (results_dir / "stdout").exists()
+        assert (results_dir / "stdout_attempt_1").read_text() == "failed run stdout"
+        assert (results_dir / "stderr_attempt_1").read_text() == "failed run stderr"
+
+
+class TestPrepareSegments:
+    """Unit tests for _prepare_segments() function."""
+
+    @staticmethod
+    @pytest.fixture
+    def run_segments():
+        return [
+            salishsea_cmd.run.RunSegment(
+                {},
+                f"SalishSea_{seg_no}.yaml",
+                Path(f"results_dir_{seg_no}"),
+                seg_no=seg_no,
+                nn_it000=1 + seg_no * 2160,
+                nn_itend=(seg_no + 1) * 2160,
+                nn_date0=20141115,
+            )
+            for seg_no in range(4)
+        ]
+
+    @pytest.mark.parametrize("prepare_jobs", (1, 3))
+    def test_segment_order(self, prepare_jobs, run_segments):
+        def prepare_segment(segment, restart_dir, nocheck_init):
+            # Later segments finish preparing sooner
+            time.sleep(0.01 * (len(run_segments) - segment.seg_no))
+            return Path(f"run_dir_{segment.seg_no}", "SalishSeaNEMO.sh")
+
+        prepared_segments = list(
+            salishsea_cmd.run._prepare_segments(
+                run_segments, prepare_segment, False, prepare_jobs
+            )
+        )
+
+        assert prepared_segments == [
+            (segment, Path(f"run_dir_{segment.seg_no}", "SalishSeaNEMO.sh"))
+            for segment in run_segments
+        ]
+
+    @pytest.mark.parametrize("prepare_jobs", (1, 3))
+    def test_restart_dirs_and_nocheck_init(self, prepare_jobs, run_segments):
+        prepare_segment = Mock(name="prepare_segment")
+
+        list(
+            salishsea_cmd.run._prepare_segments(
+                run_segments, prepare_segment, False, prepare_jobs
+            )
         )
-        assert run_segments[-1] == expected
+
+        prepare_segment.assert_has_calls(
+            [
+                call(run_segments[0], None, False),
+                call(run_segments[1], Path("results_dir_0"), True),
+                call(run_segments[2], Path("results_dir_1"), True),
+                call(run_segments[3], Path("results_dir_2"), True),
+            ],
+            any_order=True,
+        )
+        assert prepare_segment.call_count == 4
+
+    def test_start_segment_restart_dir(self, run_segments):
+        run_segments = [
+            attrs.evolve(segment, restart_dir=Path(f"results_dir_{segment.seg_no - 1}"))
+            for segment in run_segments[2:]
+        ]
+        prepare_segment = Mock(name="prepare_segment")
+
+        list(
+            salishsea_cmd.run._prepare_segments(run_segments, prepare_segment, False, 1)
+        )
+
+        assert prepare_segment.call_args_list == [
+            call(run_segments[0], Path("results_dir_1"), False),
+            call(run_segments[1], Path("results_dir_2"), True),
+        ]
+
+    def test_prepare_error(self, run_segments):
+        def prepare_segment(segment, restart_dir, nocheck_init):
+            if segment.seg_no == 1:
+                raise SystemExit(2)
+            return Path(f"run_dir_{segment.seg_no}", "SalishSeaNEMO.sh")
+
+        prepared_segments = salishsea_cmd.run._prepare_segments(
+            run_segments, prepare_segment, False, 2
+        )
+
+        assert next(prepared_segments)[0] == run_segments[0]
+        with pytest.raises(SystemExit):
+            next(prepared_segments)
 
 
 class TestCalcNSegments:
@@ -1351,7 +3149,28 @@ class TestCalcNSegments:
                         "days per segment": 30,
                     }
                 },
-                9,
+                9,
+            ),
+            (
+                {
+                    "segmented run": {
+                        "start date": "2014-11-15",
+                        "end date": "2014-11-16",
+                        "hours per segment": 18,
+                    }
+                },
+                3,
+            ),
+            (
+                {
+                    "segmented run": {
+                        "start date": "2014-11-15",
+                        "end date": "2014-11-16",
+                        "days per segment": 10,
+                        "hours per segment": 6,
+                    }
+                },
+                8,
             ),
         ],
     )
@@ -1371,6 +3190,31 @@ class TestCalcNSegments:
             salishsea_cmd.run._calc_n_segments(run_desc)
 
 
+class TestSecondsToTimesteps:
+    """Unit tests for _seconds_to_timesteps() function."""
+
+    @pytest.mark.parametrize(
+        "seconds, rn_rdt, expected",
+        (
+            (24 * 60 * 60, 40.0, 2160),
+            (6 * 60 * 60, 40, 540),
+            (60 * 60, 20.0, 180),
+        ),
+    )
+    def test_seconds_to_timesteps(self, seconds, rn_rdt, expected):
+        timesteps = salishsea_cmd.run._seconds_to_timesteps(seconds, rn_rdt)
+
+        assert timesteps == expected
+
+    def test_not_whole_timesteps(self, caplog):
+        caplog.set_level(logging.DEBUG)
+
+        with pytest.raises(SystemExit):
+            salishsea_cmd.run._seconds_to_timesteps(60 * 60, 70.0)
+
+        assert caplog.records[0].levelname == "ERROR"
+
+
 class TestWriteSegmentNamerunNamelist:
     """Unit tests for _write_segment_namerun_namelist() function."""
 
@@ -1434,6 +3278,43 @@ class TestWriteSegmentNamerunNamelist:
             assert nml["namrun"]["nn_itend"] == 152634 + 2160 * 10 - 1
             assert nml["namrun"]["nn_date0"] == 20141115
 
+    def test_namrun_template_read_once(self, tmp_path):
+        namelist_time = tmp_path / "namelist.time"
+        namelist_time.write_text("""
+            ! run time parameters
+            &namrun
+                nn_it000 = 0
+                nn_itend = 0
+                nn_date0 = 0
+            &end
+            """)
+        run_desc = {
+            "segmented run": {"namelists": {"namrun": os.fspath(namelist_time)}}
+        }
+        namelist_texts = {}
+        tmp_run_desc_dir = tmp_path / "tmp_run_desc_dir"
+        tmp_run_desc_dir.mkdir()
+        salishsea_cmd.run._write_segment_namrun_namelist(
+            run_desc,
+            {"namrun": {"nn_it000": 1, "nn_itend": 2160, "nn_date0": 20141115}},
+            tmp_run_desc_dir,
+            namelist_texts=namelist_texts,
+        )
+        namelist_time.unlink()
+
+        segment_namrun = salishsea_cmd.run._write_segment_namrun_namelist(
+            run_desc,
+            {"namrun": {"nn_it000": 2161, "nn_itend": 4320, "nn_date0": 20141116}},
+            tmp_run_desc_dir,
+            namelist_texts=namelist_texts,
+        )
+
+        assert list(namelist_texts) == [namelist_time]
+        assert "! run time parameters" in segment_namrun.read_text()
+        nml = f90nml.read(segment_namrun)
+        assert nml["namrun"]["nn_it000"] == 2161
+        assert nml["namrun"]["nn_date0"] == 20141116
+
 
 class TestWriteSegmentDescFile:
     """Unit test for _write_segment_desc_file() function."""
@@ -1471,7 +3352,7 @@ class TestWriteSegmentDescFile:
                     nn_date0 = 20141125
                 &end
                 """)
-            run_desc, segment_desc_file = salishsea_cmd.run._write_segment_desc_file(
+            run_desc, segment_desc_file, _ = salishsea_cmd.run._write_segment_desc_file(
                 run_desc,
                 "SalishSea_1.yaml",
                 Path("results_dir_0"),
@@ -1514,7 +3395,7 @@ class TestWriteSegmentDescFile:
                     nn_date0 = 20141125
                 &end
                 """)
-            run_desc, segment_desc_file = salishsea_cmd.run._write_segment_desc_file(
+            run_desc, segment_desc_file, _ = salishsea_cmd.run._write_segment_desc_file(
                 run_desc,
                 "SalishSea_1.yaml",
                 Path("results_dir_0"),
@@ -1556,7 +3437,7 @@ class TestWriteSegmentDescFile:
                     nn_date0 = 20141125
                 &end
                 """)
-            run_desc, segment_desc_file = salishsea_cmd.run._write_segment_desc_file(
+            run_desc, segment_desc_file, _ = salishsea_cmd.run._write_segment_desc_file(
                 run_desc,
                 "SalishSea_1.yaml",
                 None,
@@ -1605,7 +3486,7 @@ class TestWriteSegmentDescFile:
                     nn_date0 = 20141125
                 &end
                 """)
-            run_desc, segment_desc_file = salishsea_cmd.run._write_segment_desc_file(
+            run_desc, segment_desc_file, _ = salishsea_cmd.run._write_segment_desc_file(
                 run_desc,
                 "SalishSea_1.yaml",
                 Path("$PROJECT/$USER/MEOPAR/results/results_dir_0"),
@@ -1617,6 +3498,145 @@ class TestWriteSegmentDescFile:
         expected = f"$PROJECT/$USER/MEOPAR/results/results_dir_0/{nemo_exp}_00174233_restart_trc.nc"
         assert run_desc["restart"]["restart_trc.nc"] == expected
 
+    def test_base_run_desc_not_modified(self, tmp_path):
+        base_run_desc = yaml.safe_load(StringIO("""
+            run_id: sensitivity
+            walltime: 24:00:00
+
+            segmented run:
+                segment walltime: 12:00:00
+                namelists:
+                    namrun: ./namelist.time
+                    namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+
+            namelists:
+                namelist_cfg:
+                    - ./namelist.time
+                namelist_top_cfg:
+                    - ./namelist_top_cfg
+
+            restart:
+                restart.nc: $PROJECT/$USER/MEOPAR/results/14nov14/SalishSea_00152633_restart.nc
+        """))
+        expected = copy.deepcopy(base_run_desc)
+        segment_run_desc = {**base_run_desc, "run_id": "1_sensitivity"}
+
+        run_desc, segment_desc_file, _ = salishsea_cmd.run._write_segment_desc_file(
+            segment_run_desc,
+            "SalishSea_1.yaml",
+            Path("results_dir_0"),
+            tmp_path / "namelist.time",
+            tmp_path,
+            restart_timestep=174233,
+        )
+
+        assert base_run_desc == expected
+        assert run_desc["namelists"]["namelist_cfg"] == [
+            os.fspath(tmp_path / "namelist.time")
+        ]
+        # Items that don't change for the segment are shared with the base run description
+        assert run_desc["segmented run"] is base_run_desc["segmented run"]
+        assert (
+            run_desc["namelists"]["namelist_top_cfg"]
+            is base_run_desc["namelists"]["namelist_top_cfg"]
+        )
+
+    def test_restart_timestep_arg(self, tmp_path):
+        run_desc = yaml.safe_load(StringIO("""
+            run_id: sensitivity
+            walltime: 24:00:00
+
+            segmented run:
+                start date: 2014-11-15
+                start time step: 152634
+                end date: 2014-12-02
+                days per segment: 10
+                segment walltime: 12:00:00
+                namelists:
+                    namrun: ./namelist.time
+                    namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+
+            namelists:
+                namelist_cfg:
+                    - ./namelist.time
+
+            restart:
+                restart.nc: $PROJECT/$USER/MEOPAR/results/14nov14/SalishSea_00152633_restart.nc
+        """))
+
+        # segment namrun namelist file is not read when restart_timestep is provided
+        run_desc, segment_desc_file, _ = salishsea_cmd.run._write_segment_desc_file(
+            run_desc,
+            "SalishSea_1.yaml",
+            Path("$PROJECT/$USER/MEOPAR/results/results_dir_0"),
+            tmp_path / "namelist.time",
+            tmp_path,
+            restart_timestep=174233,
+        )
+
+        expected = (
+            "$PROJECT/$USER/MEOPAR/results/results_dir_0/SalishSea_00174233_restart.nc"
+        )
+        assert run_desc["restart"]["restart.nc"] == expected
+
+    @pytest.mark.parametrize("combined", (True, False))
+    def test_per_rank_restarts(self, combined, tmp_path):
+        run_desc = yaml.safe_load(StringIO("""
+            run_id: sensitivity
+            walltime: 24:00:00
+            MPI decomposition: 2x2
+
+            segmented run:
+                start date: 2014-11-15
+                start time step: 152634
+                end date: 2014-12-02
+                days per segment: 10
+                segment walltime: 12:00:00
+                namelists:
+                    namrun: ./namelist.time
+                    namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+
+            namelists:
+                namelist_cfg:
+                    - ./namelist.time
+
+            restart:
+                restart.nc: $PROJECT/$USER/MEOPAR/results/14nov14/SalishSea_00152633_restart.nc
+                restart_trc.nc: $PROJECT/$USER/MEOPAR/results/14nov14/SalishSea_00152633_restart_trc.nc
+        """))
+        restart_dir = tmp_path / "results_dir_0"
+        restart_dir.mkdir()
+        if combined:
+            # Restart files from a segment whose restart files were combined
+            for name in ("restart", "restart_trc"):
+                (restart_dir / f"SalishSea_00174233_{name}.nc").write_bytes(b"")
+
+        run_desc, segment_desc_file, rank_restarts = (
+            salishsea_cmd.run._write_segment_desc_file(
+                run_desc,
+                "SalishSea_1.yaml",
+                restart_dir,
+                tmp_path / "namelist.time",
+                tmp_path,
+                restart_timestep=174233,
+                per_rank_restarts=True,
+            )
+        )
+
+        expected = {
+            "restart.nc": restart_dir / "SalishSea_00174233_restart.nc",
+            "restart_trc.nc": restart_dir / "SalishSea_00174233_restart_trc.nc",
+        }
+        if combined:
+            assert run_desc["restart"] == {
+                name: os.fspath(path) for name, path in expected.items()
+            }
+            assert rank_restarts == {}
+        else:
+            # The per-processor restart files are linked in the run directory
+            assert run_desc["restart"] == {}
+            assert rank_restarts == expected
+
     def test_no_segment_walltime(self, tmp_path):
         run_desc = yaml.safe_load(StringIO("""
             run_id: sensitivity
@@ -1628,76 +3648,248 @@ class TestWriteSegmentDescFile:
                 end date: 2014-12-02
                 days per segment: 10
 
-                namelists:
-                    namrun: ./namelist.time
-                    namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+                namelists:
+                    namrun: ./namelist.time
+                    namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+
+            namelists:
+                namelist_cfg:
+                    - ./namelist.time
+
+            restart:
+                restart.nc: $PROJECT/$USER/MEOPAR/results/14nov14/SalishSea_00152633_restart.nc
+                restart_trc.nc: $PROJECT/$USER/MEOPAR/results/14nov14/SalishSea_00152633_restart_trc.nc
+        """))
+        with tempfile.TemporaryDirectory() as tmp_run_desc_dir:
+            segment_namrun = Path(tmp_run_desc_dir, "namelist.time")
+            segment_namrun.write_text("""
+                &namrun
+                    nn_it000 = 174234
+                    nn_itend = 189353
+                    nn_date0 = 20141125
+                &end
+                """)
+            with pytest.raises(SystemExit):
+                salishsea_cmd.run._write_segment_desc_file(
+                    run_desc,
+                    "SalishSea_1.yaml",
+                    Path("$PROJECT/$USER/MEOPAR/results/results_dir_0"),
+                    segment_namrun,
+                    Path(tmp_run_desc_dir),
+                )
+
+    def test_segment_walltime(self, tmp_path):
+        run_desc = yaml.safe_load(StringIO("""
+            run_id: sensitivity
+            walltime: 24:00:00
+
+            segmented run:
+                start date: 2014-11-15
+                start time step: 152634
+                end date: 2014-12-02
+                days per segment: 10
+                segment walltime: 12:00:00
+                namelists:
+                    namrun: ./namelist.time
+                    namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+
+            namelists:
+                namelist_cfg:
+                    - ./namelist.time
+
+            restart:
+                restart.nc: $PROJECT/$USER/MEOPAR/results/14nov14/SalishSea_00152633_restart.nc
+                restart_trc.nc: $PROJECT/$USER/MEOPAR/results/14nov14/SalishSea_00152633_restart_trc.nc
+        """))
+        with tempfile.TemporaryDirectory() as tmp_run_desc_dir:
+            segment_namrun = Path(tmp_run_desc_dir, "namelist.time")
+            segment_namrun.write_text("""
+                &namrun
+                    nn_it000 = 174234
+                    nn_itend = 189353
+                    nn_date0 = 20141125
+                &end
+                """)
+            run_desc, segment_desc_file, _ = salishsea_cmd.run._write_segment_desc_file(
+                run_desc,
+                "SalishSea_1.yaml",
+                Path("$PROJECT/$USER/MEOPAR/results/results_dir_0"),
+                segment_namrun,
+                Path(tmp_run_desc_dir),
+            )
+        assert run_desc["walltime"] == 43200
+
+
+class TestSubmitPostJob:
+    """Unit test for _submit_post_job() function."""
+
+    @patch("salishsea_cmd.run._submit_job", return_value="Submitted batch job 44")
+    def test_submit_post_job(self, m_sj):
+        batch_file = Path("run_dir", "SalishSeaNEMO.sh")
+
+        post_job_msg = salishsea_cmd.run._submit_post_job(
+            batch_file, "Submitted batch job 43", "sbatch"
+        )
+
+        m_sj.assert_called_once_with(
+            Path("run_dir", "SalishSeaNEMO_post.sh"),
+            "sbatch",
+            waitjob="43",
+            dependency="afterany",
+        )
+        assert post_job_msg == "Submitted batch job 44"
+
+
+class TestBuildPostScript:
+    """Unit test for _build_post_script() function."""
+
+    def test_sbatch_post_script(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        monkeypatch.setattr(salishsea_cmd.run.sys, "executable", "/env/bin/python")
+        batch_file = tmp_path / "SalishSeaNEMO.sh"
+        batch_file.write_text(
+            "#!/bin/bash\n\n"
+            "#SBATCH --job-name=foo\n"
+            "#SBATCH --nodes=3\n"
+            "#SBATCH --ntasks-per-node=192\n"
+            "#SBATCH --mem=0\n"
+            "#SBATCH --time=1:02:03\n"
+            "#SBATCH --account=def-allen\n"
+            "# stdout and stderr file paths/names\n"
+            "#SBATCH --output=results_dir/stdout\n"
+            "#SBATCH --error=results_dir/stderr\n"
+        )
+
+        script = salishsea_cmd.run._build_post_script(
+            {"run_id": "foo"},
+            Path("SalishSea.yaml"),
+            batch_file,
+            Path("results_dir"),
+            Path("tmp_run_dir"),
+            deflate=False,
+            max_deflate_jobs=4,
+            separate_deflate=False,
+        )
+
+        expected = textwrap.dedent("""\
+            #!/bin/bash
+
+            #SBATCH --job-name=post_foo
+            #SBATCH --nodes=1
+            #SBATCH --ntasks-per-node=1
+            #SBATCH --mem=0
+            #SBATCH --time=1:02:03
+            #SBATCH --account=def-allen
+            # stdout and stderr file paths/names
+            #SBATCH --output=results_dir/stdout_post
+            #SBATCH --error=results_dir/stderr_post
+
+            RUN_ID="foo"
+            RUN_DESC="tmp_run_dir/SalishSea.yaml"
+            WORK_DIR="tmp_run_dir"
+            RESULTS_DIR="results_dir"
+            COMBINE="/env/bin/salishsea combine"
+            GATHER="/env/bin/salishsea gather"
+
+            module load StdEnv/2023
+            module load netcdf-fortran-mpi/4.6.1
+
+            cd ${WORK_DIR}
+            echo "working dir: $(pwd)"
+
+            # The exit code of the NEMO run is recorded by the NEMO job;
+            # it is missing if the NEMO job was killed before the run ended
+            MPIRUN_EXIT_CODE=$(cat mpirun_exit_code 2>/dev/null || echo 1)
+            rm -f mpirun_exit_code
+
+            echo "Results combining started at $(date)"
+            ${COMBINE} ${RUN_DESC} --debug
+            echo "Results combining ended at $(date)"
+
+            echo "Results gathering started at $(date)"
+            ${GATHER} ${RESULTS_DIR} --debug
+            echo "Results gathering ended at $(date)"
+
+            chmod go+rx ${RESULTS_DIR}
+            chmod g+rw ${RESULTS_DIR}/*
+            chmod o+r ${RESULTS_DIR}/*
+
+            echo "Deleting run directory" >>${RESULTS_DIR}/stdout
+            rmdir $(pwd)
+            echo "Finished at $(date)" >>${RESULTS_DIR}/stdout
+            exit ${MPIRUN_EXIT_CODE}
+            """)
+        assert script == expected
+
+
+class TestWriteSegmentsScript:
+    """Unit tests for _write_segments_script() function."""
+
+    def test_write_segments_script(self, tmp_path):
+        job_segments = []
+        for seg_no in (0, 1):
+            run_dir = tmp_path / f"run_dir_{seg_no}"
+            run_dir.mkdir()
+            batch_file = run_dir / "SalishSeaNEMO.sh"
+            batch_file.write_text(
+                "#!/bin/bash\n\n"
+                f"#SBATCH --job-name={seg_no}_sensitivity\n"
+                "#SBATCH --time=1-0:00:00\n"
+                "# stdout and stderr file paths/names\n"
+                f"#SBATCH --output=results_{seg_no}/stdout\n"
+                "\n"
+                'RUN_ID="sensitivity"\n'
+            )
+            segment = salishsea_cmd.run.RunSegment(
+                {}, f"SalishSea_{seg_no}.yaml", Path(f"results_{seg_no}"), seg_no=seg_no
+            )
+            job_segments.append((segment, batch_file))
+
+        segments_file = salishsea_cmd.run._write_segments_script(job_segments)
+
+        assert segments_file == tmp_path / "run_dir_0" / "SalishSeaNEMO_segments.sh"
+        expected = (
+            "#!/bin/bash\n"
+            "\n"
+            "#SBATCH --job-name=0_sensitivity\n"
+            "#SBATCH --time=1-0:00:00\n"
+            "#SBATCH --output=results_0/stdout\n"
+            "\n"
+            f'bash "{tmp_path}/run_dir_0/SalishSeaNEMO.sh" || exit $?\n'
+            f'bash "{tmp_path}/run_dir_1/SalishSeaNEMO.sh"'
+            ' >>"results_1/stdout" 2>>"results_1/stderr" || exit $?\n'
+        )
+        assert segments_file.read_text() == expected
 
-            namelists:
-                namelist_cfg:
-                    - ./namelist.time
 
-            restart:
-                restart.nc: $PROJECT/$USER/MEOPAR/results/14nov14/SalishSea_00152633_restart.nc
-                restart_trc.nc: $PROJECT/$USER/MEOPAR/results/14nov14/SalishSea_00152633_restart_trc.nc
-        """))
-        with tempfile.TemporaryDirectory() as tmp_run_desc_dir:
-            segment_namrun = Path(tmp_run_desc_dir, "namelist.time")
-            segment_namrun.write_text("""
-                &namrun
-                    nn_it000 = 174234
-                    nn_itend = 189353
-                    nn_date0 = 20141125
-                &end
-                """)
-            with pytest.raises(SystemExit):
-                salishsea_cmd.run._write_segment_desc_file(
-                    run_desc,
-                    "SalishSea_1.yaml",
-                    Path("$PROJECT/$USER/MEOPAR/results/results_dir_0"),
-                    segment_namrun,
-                    Path(tmp_run_desc_dir),
-                )
+class TestBatchScriptDirectives:
+    """Unit tests for _batch_script_directives() function."""
 
-    def test_segment_walltime(self, tmp_path):
-        run_desc = yaml.safe_load(StringIO("""
-            run_id: sensitivity
-            walltime: 24:00:00
+    def test_pbs_directives(self, tmp_path):
+        batch_file = tmp_path / "SalishSeaNEMO.sh"
+        batch_file.write_text(
+            "#!/bin/bash\n\n"
+            "#PBS -N 0_sensitivity\n"
+            "#PBS -l walltime=24:00:00\n"
+            "# stdout and stderr file paths/names\n"
+            "#PBS -o results_0/stdout\n"
+            "\n"
+            "mpirun -np 42 ./nemo.exe\n"
+        )
 
-            segmented run:
-                start date: 2014-11-15
-                start time step: 152634
-                end date: 2014-12-02
-                days per segment: 10
-                segment walltime: 12:00:00
-                namelists:
-                    namrun: ./namelist.time
-                    namdom: $PROJECT/SS-run-sets/v201812/namelist.domain
+        directives = salishsea_cmd.run._batch_script_directives(
+            batch_file, replaced=("-o ",)
+        )
 
-            namelists:
-                namelist_cfg:
-                    - ./namelist.time
+        assert directives == "#PBS -N 0_sensitivity\n#PBS -l walltime=24:00:00\n"
 
-            restart:
-                restart.nc: $PROJECT/$USER/MEOPAR/results/14nov14/SalishSea_00152633_restart.nc
-                restart_trc.nc: $PROJECT/$USER/MEOPAR/results/14nov14/SalishSea_00152633_restart_trc.nc
-        """))
-        with tempfile.TemporaryDirectory() as tmp_run_desc_dir:
-            segment_namrun = Path(tmp_run_desc_dir, "namelist.time")
-            segment_namrun.write_text("""
-                &namrun
-                    nn_it000 = 174234
-                    nn_itend = 189353
-                    nn_date0 = 20141125
-                &end
-                """)
-            run_desc, segment_desc_file = salishsea_cmd.run._write_segment_desc_file(
-                run_desc,
-                "SalishSea_1.yaml",
-                Path("$PROJECT/$USER/MEOPAR/results/results_dir_0"),
-                segment_namrun,
-                Path(tmp_run_desc_dir),
-            )
-        assert run_desc["walltime"] == 43200
+
+class TestWalltimeSeconds:
+    """Unit tests for _walltime_seconds() function."""
+
+    @pytest.mark.parametrize("walltime", (43200, "12:00:00"))
+    def test_walltime_seconds(self, walltime):
+        assert salishsea_cmd.run._walltime_seconds(walltime) == 43200
 
 
 @patch("salishsea_cmd.run._build_deflate_script", return_value="deflate script")
@@ -1831,6 +4023,256 @@ class TestBuildTmpRunDir:
         assert (p_run_dir / "deflate_dia.sh").is_file()
         assert run_dir == p_run_dir
 
+    @patch("salishsea_cmd.run._predict_walltime", autospec=True)
+    def test_predict_walltime(
+        self,
+        m_pw,
+        m_prepare,
+        m_gnp,
+        m_bbs,
+        m_bds,
+        sep_xios_server,
+        xios_servers,
+        tmp_path,
+    ):
+        p_run_dir = tmp_path / "run_dir"
+        p_run_dir.mkdir()
+        m_prepare.return_value = p_run_dir
+        run_desc = {
+            "output": {
+                "separate XIOS server": sep_xios_server,
+                "XIOS servers": xios_servers,
+            }
+        }
+        m_pw.return_value = {**run_desc, "walltime": 3600}
+
+        salishsea_cmd.run._build_tmp_run_dir(
+            run_desc,
+            Path("SalishSea.yaml"),
+            Path("results_dir"),
+            cores_per_node="",
+            cpu_arch="",
+            deflate=False,
+            max_deflate_jobs=4,
+            separate_deflate=False,
+            nocheck_init=False,
+            quiet=True,
+            predict_walltime=True,
+        )
+
+        m_pw.assert_called_once_with(run_desc, p_run_dir)
+        assert m_bbs.call_args.args[0] == {**run_desc, "walltime": 3600}
+
+    def test_rank_restarts_record(
+        self,
+        m_prepare,
+        m_gnp,
+        m_bbs,
+        m_bds,
+        sep_xios_server,
+        xios_servers,
+        tmp_path,
+    ):
+        p_run_dir = tmp_path / "run_dir"
+        p_run_dir.mkdir()
+        m_prepare.return_value = p_run_dir
+        run_desc = {
+            "MPI decomposition": "12x12",
+            "output": {
+                "separate XIOS server": sep_xios_server,
+                "XIOS servers": xios_servers,
+            },
+        }
+
+        salishsea_cmd.run._build_tmp_run_dir(
+            run_desc,
+            Path("SalishSea.yaml"),
+            Path("results_dir"),
+            cores_per_node="",
+            cpu_arch="",
+            deflate=False,
+            max_deflate_jobs=4,
+            separate_deflate=False,
+            nocheck_init=False,
+            quiet=True,
+            keep_rank_restarts=True,
+        )
+
+        m_gnp.assert_called_with(run_desc, p_run_dir)
+        record = yaml.safe_load((p_run_dir / "rank_restarts.yaml").read_text())
+        assert record == {"MPI decomposition": "12x12", "processors": 144}
+
+
+class TestLinkRankRestarts:
+    """Unit tests for _link_rank_restarts() function."""
+
+    @staticmethod
+    def _rank_restarts(restart_dir, n_processors):
+        for name in ("restart", "restart_trc"):
+            for rank in range(n_processors):
+                (restart_dir / f"SalishSea_00174233_{name}_{rank:04d}.nc").write_bytes(
+                    b""
+                )
+        return {
+            "restart.nc": restart_dir / "SalishSea_00174233_restart.nc",
+            "restart_trc.nc": restart_dir / "SalishSea_00174233_restart_trc.nc",
+        }
+
+    @pytest.mark.parametrize("record", (False, True))
+    def test_link_rank_restarts(self, record, tmp_path, monkeypatch):
+        monkeypatch.setattr(
+            salishsea_cmd.run, "get_n_processors", lambda run_desc, run_dir: 3
+        )
+        restart_dir = tmp_path / "results_dir_0"
+        restart_dir.mkdir()
+        rank_restarts = self._rank_restarts(restart_dir, 3)
+        if record:
+            (restart_dir / "rank_restarts.yaml").write_text(
+                "MPI decomposition: 2x2\nprocessors: 3\n"
+            )
+        run_dir = tmp_path / "run_dir"
+        run_dir.mkdir()
+
+        salishsea_cmd.run._link_rank_restarts(
+            {"MPI decomposition": "2x2"}, rank_restarts, run_dir, nocheck_init=False
+        )
+
+        assert sorted(path.name for path in run_dir.iterdir()) == [
+            *(f"restart_{rank:04d}.nc" for rank in range(3)),
+            *(f"restart_trc_{rank:04d}.nc" for rank in range(3)),
+        ]
+        assert (run_dir / "restart_trc_0002.nc").readlink() == (
+            restart_dir / "SalishSea_00174233_restart_trc_0002.nc"
+        )
+
+    def test_no_rank_restarts(self, tmp_path):
+        salishsea_cmd.run._link_rank_restarts(
+            {"MPI decomposition": "2x2"}, {}, tmp_path, nocheck_init=False
+        )
+
+        assert not list(tmp_path.iterdir())
+
+    def test_decomposition_changed(self, tmp_path, monkeypatch, caplog):
+        monkeypatch.setattr(
+            salishsea_cmd.run, "get_n_processors", lambda run_desc, run_dir: 6
+        )
+        m_crr = Mock(name="combine_rank_restarts")
+        monkeypatch.setattr(salishsea_cmd.run, "combine_rank_restarts", m_crr)
+        monkeypatch.setattr(
+            salishsea_cmd.run.nemo_cmd.api,
+            "find_rebuild_nemo_script",
+            lambda run_desc: "REBUILD_NEMO/rebuild_nemo",
+        )
+        restart_dir = tmp_path / "results_dir_0"
+        restart_dir.mkdir()
+        rank_restarts = self._rank_restarts(restart_dir, 3)
+        (restart_dir / "rank_restarts.yaml").write_text(
+            "MPI decomposition: 2x2\nprocessors: 3\n"
+        )
+        run_dir = tmp_path / "run_dir"
+        run_dir.mkdir()
+        caplog.set_level(logging.DEBUG)
+
+        salishsea_cmd.run._link_rank_restarts(
+            {"MPI decomposition": "2x3"}, rank_restarts, run_dir, nocheck_init=False
+        )
+
+        m_crr.assert_called_once_with("REBUILD_NEMO/rebuild_nemo", restart_dir)
+        assert caplog.records[0].levelname == "WARNING"
+        assert caplog.records[0].message == (
+            f"per-processor restart files in {restart_dir} are for 3 processors "
+            f"with MPI decomposition 2x2, so they are combined for 6 processors "
+            f"with MPI decomposition 2x3"
+        )
+        assert sorted(path.name for path in run_dir.iterdir()) == [
+            "restart.nc",
+            "restart_trc.nc",
+        ]
+        assert (run_dir / "restart.nc").readlink() == (
+            restart_dir / "SalishSea_00174233_restart.nc"
+        )
+
+    @pytest.mark.parametrize("nocheck_init", (False, True))
+    def test_missing_rank_restart(self, nocheck_init, tmp_path, monkeypatch, caplog):
+        monkeypatch.setattr(
+            salishsea_cmd.run, "get_n_processors", lambda run_desc, run_dir: 4
+        )
+        restart_dir = tmp_path / "results_dir_0"
+        restart_dir.mkdir()
+        rank_restarts = self._rank_restarts(restart_dir, 3)
+        run_dir = tmp_path / "run_dir"
+        run_dir.mkdir()
+        caplog.set_level(logging.DEBUG)
+
+        if nocheck_init:
+            salishsea_cmd.run._link_rank_restarts(
+                {"MPI decomposition": "2x2"}, rank_restarts, run_dir, nocheck_init
+            )
+            assert (run_dir / "restart_0003.nc").is_symlink()
+        else:
+            with pytest.raises(SystemExit):
+                salishsea_cmd.run._link_rank_restarts(
+                    {"MPI decomposition": "2x2"}, rank_restarts, run_dir, nocheck_init
+                )
+            assert caplog.records[0].levelname == "ERROR"
+            assert caplog.records[0].message == (
+                f"{restart_dir}/SalishSea_00174233_restart_0003.nc not found; "
+                f"did you mean to use the --nocheck-initial-conditions flag?"
+            )
+
+
+class TestCombineRankRestarts:
+    """Unit tests for combine_rank_restarts() function."""
+
+    def test_combine_rank_restarts(self, tmp_path, monkeypatch):
+        for name in ("restart", "restart_trc"):
+            for rank in range(3):
+                (tmp_path / f"SalishSea_00174233_{name}_{rank:04d}.nc").write_bytes(b"")
+        (tmp_path / "rank_restarts.yaml").write_text("MPI decomposition: 2x2\n")
+        m_run = Mock(name="subprocess.run")
+        monkeypatch.setattr(salishsea_cmd.run.subprocess, "run", m_run)
+
+        combined = salishsea_cmd.run.combine_rank_restarts(
+            "REBUILD_NEMO/rebuild_nemo", tmp_path
+        )
+
+        assert m_run.call_args_list == [
+            call(
+                ["REBUILD_NEMO/rebuild_nemo", f"SalishSea_00174233_{name}", "3"],
+                cwd=tmp_path,
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            for name in ("restart", "restart_trc")
+        ]
+        assert combined == [
+            tmp_path / "SalishSea_00174233_restart.nc",
+            tmp_path / "SalishSea_00174233_restart_trc.nc",
+        ]
+        assert not list(tmp_path.iterdir())
+
+    def test_rebuild_nemo_failure(self, tmp_path, monkeypatch, caplog):
+        (tmp_path / "SalishSea_00174233_restart_0000.nc").write_bytes(b"")
+
+        def mock_run(cmd, cwd, check, capture_output, text):
+            raise subprocess.CalledProcessError(1, cmd, stderr="rebuild failed\n")
+
+        monkeypatch.setattr(salishsea_cmd.run.subprocess, "run", mock_run)
+        caplog.set_level(logging.DEBUG)
+
+        with pytest.raises(SystemExit):
+            salishsea_cmd.run.combine_rank_restarts(
+                "REBUILD_NEMO/rebuild_nemo", tmp_path
+            )
+
+        assert caplog.records[0].levelname == "ERROR"
+        assert caplog.records[0].message == (
+            f"REBUILD_NEMO/rebuild_nemo SalishSea_00174233_restart 1 failed in "
+            f"{tmp_path}: rebuild failed"
+        )
+        assert (tmp_path / "SalishSea_00174233_restart_0000.nc").exists()
+
 
 class TestSubmitJob:
     """Unit tests for _submit_job() function."""
@@ -1906,6 +4348,33 @@ class TestSubmitJob:
 
         assert submit_job_msg == submit_job_msg
 
+    @pytest.mark.parametrize(
+        "queue_job_cmd, depend_opt",
+        [
+            ("sbatch", "-d afterany:43"),
+            ("qsub", "-W depend=afterany:43"),
+        ],
+    )
+    def test_submit_job_with_dependency(self, queue_job_cmd, depend_opt, monkeypatch):
+        cmds = []
+
+        def mock_subprocess_run(cmd, check, universal_newlines, stdout):
+            cmds.append(cmd)
+            return subprocess.CompletedProcess(cmd, 0, "44")
+
+        monkeypatch.setattr(subprocess, "run", mock_subprocess_run)
+
+        salishsea_cmd.run._submit_job(
+            Path("run_dir", "SalishSeaNEMO_post.sh"),
+            queue_job_cmd,
+            "43",
+            dependency="afterany",
+        )
+
+        assert cmds == [
+            [queue_job_cmd, *depend_opt.split(), "run_dir/SalishSeaNEMO_post.sh"]
+        ]
+
     def test_no_waitjob_for_bash_submit(self, caplog):
         caplog.set_level(logging.DEBUG)
 
@@ -1949,32 +4418,178 @@ class TestSubmitSeparateDeflateJobs:
         salishsea_cmd.run._submit_separate_deflate_jobs(
             Path(str(p_run_dir)) / "SalishSeaNEMO.sh", submit_job_msg, queue_job_cmd
         )
-        assert m_run.call_args_list == [
-            call(
-                shlex.split(
-                    f"{queue_job_cmd} {depend_flag} {depend_option}:{submit_job_msg.split()[-1]} {str(p_run_dir)}/deflate_grid.sh"
+        # Deflate jobs are submitted concurrently, so the order of the calls varies
+        assert m_run.call_count == 3
+        m_run.assert_has_calls(
+            [
+                call(
+                    shlex.split(
+                        f"{queue_job_cmd} {depend_flag} {depend_option}:{submit_job_msg.split()[-1]} {str(p_run_dir)}/deflate_grid.sh"
+                    ),
+                    check=True,
+                    universal_newlines=True,
+                    stdout=subprocess.PIPE,
                 ),
-                check=True,
-                universal_newlines=True,
-                stdout=subprocess.PIPE,
-            ),
-            call(
-                shlex.split(
-                    f"{queue_job_cmd} {depend_flag} {depend_option}:{submit_job_msg.split()[-1]} {str(p_run_dir)}/deflate_ptrc.sh"
+                call(
+                    shlex.split(
+                        f"{queue_job_cmd} {depend_flag} {depend_option}:{submit_job_msg.split()[-1]} {str(p_run_dir)}/deflate_ptrc.sh"
+                    ),
+                    check=True,
+                    universal_newlines=True,
+                    stdout=subprocess.PIPE,
                 ),
-                check=True,
-                universal_newlines=True,
-                stdout=subprocess.PIPE,
-            ),
-            call(
-                shlex.split(
-                    f"{queue_job_cmd} {depend_flag} {depend_option}:{submit_job_msg.split()[-1]} {str(p_run_dir)}/deflate_dia.sh"
+                call(
+                    shlex.split(
+                        f"{queue_job_cmd} {depend_flag} {depend_option}:{submit_job_msg.split()[-1]} {str(p_run_dir)}/deflate_dia.sh"
+                    ),
+                    check=True,
+                    universal_newlines=True,
+                    stdout=subprocess.PIPE,
                 ),
-                check=True,
-                universal_newlines=True,
-                stdout=subprocess.PIPE,
-            ),
-        ]
+            ],
+            any_order=True,
+        )
+
+
+class TestSubmitDeflateJobs:
+    """Unit test for _submit_deflate_jobs() function."""
+
+    @patch("salishsea_cmd.run.log", autospec=True)
+    @patch("salishsea_cmd.run.subprocess.run")
+    def test_submit_deflate_jobs(self, m_run, m_log):
+        m_run.return_value = subprocess.CompletedProcess(
+            [], 0, "Submitted batch job 50"
+        )
+
+        salishsea_cmd.run._submit_deflate_jobs(
+            [(Path("run_dir_3"), "43_0"), (Path("run_dir_4"), "43_1")], "sbatch"
+        )
+
+        # Deflate jobs are submitted concurrently, so the order of the calls varies
+        assert m_run.call_count == 6
+        m_run.assert_has_calls(
+            [
+                call(
+                    shlex.split(
+                        f"sbatch -d afterok:{job_no} {run_dir}/deflate_{deflate_job}.sh"
+                    ),
+                    check=True,
+                    universal_newlines=True,
+                    stdout=subprocess.PIPE,
+                )
+                for run_dir, job_no in (("run_dir_3", "43_0"), ("run_dir_4", "43_1"))
+                for deflate_job in ("grid", "ptrc", "dia")
+            ],
+            any_order=True,
+        )
+
+
+class TestSubmitJobArray:
+    """Unit tests for _submit_job_array() function."""
+
+    @staticmethod
+    @pytest.fixture
+    def array_segments(tmp_path):
+        array_segments = []
+        for seg_no in (3, 4):
+            run_dir = tmp_path / f"run_dir_{seg_no}"
+            run_dir.mkdir()
+            batch_file = run_dir / "SalishSeaNEMO.sh"
+            batch_file.write_text(
+                "#!/bin/bash\n\n"
+                f"#SBATCH --job-name={seg_no}_sensitivity\n"
+                "#SBATCH --nodes=2\n"
+                "#SBATCH --time=12:00:00\n"
+                "# stdout and stderr file paths/names\n"
+                f"#SBATCH --output=results_{seg_no}/stdout\n"
+                f"#SBATCH --error=results_{seg_no}/stderr\n"
+            )
+            segment = salishsea_cmd.run.RunSegment(
+                {"run_id": f"{seg_no}_sensitivity"},
+                f"SalishSea_{seg_no}.yaml",
+                tmp_path / f"results_{seg_no}",
+                seg_no=seg_no,
+                nn_it000=1,
+            )
+            array_segments.append((segment, batch_file))
+        return array_segments
+
+    @patch("salishsea_cmd.run._submit_separate_deflate_jobs")
+    @patch("salishsea_cmd.run._submit_job", return_value="Submitted batch job 43")
+    def test_submit_job_array(self, m_sj, m_ssdj, array_segments, tmp_path):
+        submit_job_msg, task_jobs = salishsea_cmd.run._submit_job_array(
+            array_segments, "0", separate_deflate=False
+        )
+
+        array_file = tmp_path / "run_dir_3" / "SalishSeaNEMO_array.sh"
+        assert array_file.is_file()
+        assert "#SBATCH --array=0-1%1\n" in array_file.read_text()
+        m_sj.assert_called_once_with(array_file, "sbatch", waitjob="0")
+        assert not m_ssdj.called
+        assert submit_job_msg == "Submitted batch job 43"
+        # Task job ids are array indices, not segment numbers
+        assert task_jobs == ["43_0", "43_1"]
+
+    @patch("salishsea_cmd.run._submit_deflate_jobs")
+    @patch("salishsea_cmd.run._submit_job", return_value="Submitted batch job 43")
+    def test_separate_deflate_task_dependencies(
+        self, m_sj, m_sdj, array_segments, tmp_path
+    ):
+        salishsea_cmd.run._submit_job_array(array_segments, "0", separate_deflate=True)
+
+        m_sdj.assert_called_once_with(
+            [(tmp_path / "run_dir_3", "43_0"), (tmp_path / "run_dir_4", "43_1")],
+            "sbatch",
+        )
+
+    def test_build_job_array_script(self, array_segments, tmp_path):
+        script = salishsea_cmd.run._build_job_array_script(array_segments)
+
+        expected = (
+            "#!/bin/bash\n"
+            "\n"
+            "#SBATCH --job-name=sensitivity\n"
+            "#SBATCH --array=0-1%1\n"
+            "#SBATCH --nodes=2\n"
+            "#SBATCH --time=12:00:00\n"
+            "# stdout and stderr file paths/names\n"
+            f"#SBATCH --output={tmp_path}/results_3/stdout_array_%a\n"
+            f"#SBATCH --error={tmp_path}/results_3/stderr_array_%a\n"
+            "\n"
+            "SEG_NOS=(3 4)\n"
+            "RUN_DIRS=(\n"
+            f'  "{tmp_path}/run_dir_3"\n'
+            f'  "{tmp_path}/run_dir_4"\n'
+            ")\n"
+            "RESULTS_DIRS=(\n"
+            f'  "{tmp_path}/results_3"\n'
+            f'  "{tmp_path}/results_4"\n'
+            ")\n"
+            "\n"
+            "INDEX=${SLURM_ARRAY_TASK_ID}\n"
+            "SEG_NO=${SEG_NOS[${INDEX}]}\n"
+            'STDOUT="${RESULTS_DIRS[${INDEX}]}/stdout"\n'
+            'STDERR="${RESULTS_DIRS[${INDEX}]}/stderr"\n'
+            "if [ ${INDEX} -gt 0 ]; then\n"
+            "  PREV_STATE=$(sacct --jobs ${SLURM_ARRAY_JOB_ID}_$((INDEX - 1)) \\\n"
+            "    --allocations --noheader --format State | xargs)\n"
+            '  if [ "${PREV_STATE}" != "COMPLETED" ]; then\n'
+            '    echo "Segment ${SEG_NOS[$((INDEX - 1))]} did not complete '
+            '(${PREV_STATE}); cancelling the rest of the job array" >>"${STDERR}"\n'
+            "    scancel ${SLURM_ARRAY_JOB_ID}\n"
+            "    exit 1\n"
+            "  fi\n"
+            "fi\n"
+            'bash "${RUN_DIRS[${INDEX}]}/SalishSeaNEMO.sh" >>"${STDOUT}" 2>>"${STDERR}"\n'
+            "SEGMENT_EXIT_CODE=$?\n"
+            "if [ ${SEGMENT_EXIT_CODE} -ne 0 ]; then\n"
+            '  echo "Segment ${SEG_NO} failed; '
+            'cancelling the rest of the job array" >>"${STDERR}"\n'
+            "  scancel ${SLURM_ARRAY_JOB_ID}\n"
+            "fi\n"
+            "exit ${SEGMENT_EXIT_CODE}\n"
+        )
+        assert script == expected
 
 
 class TestBuildBatchScript:
@@ -1982,14 +4597,15 @@ class TestBuildBatchScript:
 
     @staticmethod
     @pytest.fixture
-    def mock_path(monkeypatch):
-        def _mock_path(path):
-            return Path("$HOME/MEOPAR/SalishSeaCmd/salishsea_cmd/run.py")
-
-        monkeypatch.setattr(salishsea_cmd.run, "Path", _mock_path)
+    def mock_sys_executable(monkeypatch):
+        monkeypatch.setattr(
+            salishsea_cmd.run.sys,
+            "executable",
+            "$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/python",
+        )
 
     @pytest.mark.parametrize("deflate", [True, False])
-    def test_fir(self, mock_path, deflate, monkeypatch):
+    def test_fir(self, mock_sys_executable, deflate, monkeypatch):
         desc_file = StringIO(
             "run_id: foo\n" "walltime: 01:02:03\n" "email: me@example.com"
         )
@@ -2015,7 +4631,7 @@ class TestBuildBatchScript:
 
             #SBATCH --job-name=foo
             #SBATCH --nodes=1
-            #SBATCH --ntasks-per-node=192
+            #SBATCH --ntasks-per-node=43
             #SBATCH --mem=0
             #SBATCH --time=1:02:03
             #SBATCH --mail-user=me@example.com
@@ -2030,14 +4646,14 @@ class TestBuildBatchScript:
             RUN_DESC="tmp_run_dir/SalishSea.yaml"
             WORK_DIR="tmp_run_dir"
             RESULTS_DIR="results_dir"
-            COMBINE="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea combine"
+            COMBINE="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea combine"
             """)
         if deflate:
             expected += textwrap.dedent("""\
-                DEFLATE="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea deflate"
+                DEFLATE="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea deflate"
                 """)
         expected += textwrap.dedent("""\
-            GATHER="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea gather"
+            GATHER="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea gather"
 
             module load StdEnv/2023
             module load netcdf-fortran-mpi/4.6.1
@@ -2083,7 +4699,7 @@ class TestBuildBatchScript:
         assert script == expected
 
     @pytest.mark.parametrize("deflate", [True, False])
-    def test_narval(self, mock_path, deflate, monkeypatch):
+    def test_narval(self, mock_sys_executable, deflate, monkeypatch):
         desc_file = StringIO(
             "run_id: foo\n" "walltime: 01:02:03\n" "email: me@example.com"
         )
@@ -2109,7 +4725,7 @@ class TestBuildBatchScript:
 
             #SBATCH --job-name=foo
             #SBATCH --nodes=1
-            #SBATCH --ntasks-per-node=64
+            #SBATCH --ntasks-per-node=43
             #SBATCH --mem=0
             #SBATCH --time=1:02:03
             #SBATCH --mail-user=me@example.com
@@ -2124,14 +4740,14 @@ class TestBuildBatchScript:
             RUN_DESC="tmp_run_dir/SalishSea.yaml"
             WORK_DIR="tmp_run_dir"
             RESULTS_DIR="results_dir"
-            COMBINE="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea combine"
+            COMBINE="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea combine"
             """)
         if deflate:
             expected += textwrap.dedent("""\
-                DEFLATE="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea deflate"
+                DEFLATE="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea deflate"
                 """)
         expected += textwrap.dedent("""\
-            GATHER="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea gather"
+            GATHER="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea gather"
 
             module load StdEnv/2023
             module load netcdf-fortran-mpi/4.6.1
@@ -2177,7 +4793,7 @@ class TestBuildBatchScript:
         assert script == expected
 
     @pytest.mark.parametrize("deflate", [True, False])
-    def test_nibi(self, mock_path, deflate, monkeypatch):
+    def test_nibi(self, mock_sys_executable, deflate, monkeypatch):
         desc_file = StringIO(
             "run_id: foo\n" "walltime: 01:02:03\n" "email: me@example.com"
         )
@@ -2203,7 +4819,7 @@ class TestBuildBatchScript:
 
             #SBATCH --job-name=foo
             #SBATCH --nodes=1
-            #SBATCH --ntasks-per-node=192
+            #SBATCH --ntasks-per-node=43
             #SBATCH --mem=0
             #SBATCH --time=1:02:03
             #SBATCH --mail-user=me@example.com
@@ -2218,14 +4834,14 @@ class TestBuildBatchScript:
             RUN_DESC="tmp_run_dir/SalishSea.yaml"
             WORK_DIR="tmp_run_dir"
             RESULTS_DIR="results_dir"
-            COMBINE="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea combine"
+            COMBINE="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea combine"
             """)
         if deflate:
             expected += textwrap.dedent("""\
-                DEFLATE="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea deflate"
+                DEFLATE="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea deflate"
                 """)
         expected += textwrap.dedent("""\
-            GATHER="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea gather"
+            GATHER="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea gather"
 
             module load StdEnv/2023
             module load netcdf-fortran-mpi/4.6.1
@@ -2271,7 +4887,7 @@ class TestBuildBatchScript:
         assert script == expected
 
     @pytest.mark.parametrize("deflate", [True, False])
-    def test_rorqual(self, mock_path, deflate, monkeypatch):
+    def test_rorqual(self, mock_sys_executable, deflate, monkeypatch):
         desc_file = StringIO(
             "run_id: foo\n" "walltime: 01:02:03\n" "email: me@example.com"
         )
@@ -2297,7 +4913,7 @@ class TestBuildBatchScript:
 
             #SBATCH --job-name=foo
             #SBATCH --nodes=1
-            #SBATCH --ntasks-per-node=192
+            #SBATCH --ntasks-per-node=43
             #SBATCH --mem=0
             #SBATCH --time=1:02:03
             #SBATCH --mail-user=me@example.com
@@ -2312,14 +4928,14 @@ class TestBuildBatchScript:
             RUN_DESC="tmp_run_dir/SalishSea.yaml"
             WORK_DIR="tmp_run_dir"
             RESULTS_DIR="results_dir"
-            COMBINE="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea combine"
+            COMBINE="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea combine"
             """)
         if deflate:
             expected += textwrap.dedent("""\
-                DEFLATE="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea deflate"
+                DEFLATE="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea deflate"
                 """)
         expected += textwrap.dedent("""\
-            GATHER="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea gather"
+            GATHER="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea gather"
 
             module load StdEnv/2023
             module load netcdf-fortran-mpi/4.6.1
@@ -2365,7 +4981,7 @@ class TestBuildBatchScript:
         assert script == expected
 
     @pytest.mark.parametrize("deflate", [True, False])
-    def test_trillium(self, mock_path, deflate, monkeypatch):
+    def test_trillium(self, mock_sys_executable, deflate, monkeypatch):
         desc_file = StringIO(
             "run_id: foo\n" "walltime: 01:02:03\n" "email: me@example.com"
         )
@@ -2391,7 +5007,7 @@ class TestBuildBatchScript:
 
             #SBATCH --job-name=foo
             #SBATCH --nodes=1
-            #SBATCH --ntasks-per-node=192
+            #SBATCH --ntasks-per-node=43
             #SBATCH --time=1:02:03
             #SBATCH --mail-user=me@example.com
             #SBATCH --mail-type=ALL
@@ -2405,14 +5021,14 @@ class TestBuildBatchScript:
             RUN_DESC=\"tmp_run_dir/SalishSea.yaml\"
             WORK_DIR=\"tmp_run_dir\"
             RESULTS_DIR=\"results_dir\"
-            COMBINE=\"pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea combine\"
+            COMBINE=\"$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea combine\"
             """)
         if deflate:
             expected += textwrap.dedent("""\
-                DEFLATE=\"pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea deflate\"
+                DEFLATE=\"$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea deflate\"
                 """)
         expected += textwrap.dedent("""\
-            GATHER=\"pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea gather\"
+            GATHER=\"$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea gather\"
 
             module load StdEnv/2023
             module load gcc/12.3
@@ -2459,7 +5075,7 @@ class TestBuildBatchScript:
         assert script == expected
 
     @pytest.mark.parametrize("deflate", (True, False))
-    def test_optimum(self, mock_path, deflate, monkeypatch):
+    def test_optimum(self, mock_sys_executable, deflate, monkeypatch):
         desc_file = StringIO(
             "run_id: foo\n" "walltime: 01:02:03\n" "email: me@example.com"
         )
@@ -2501,14 +5117,14 @@ class TestBuildBatchScript:
             RUN_DESC="tmp_run_dir/SalishSea.yaml"
             WORK_DIR="tmp_run_dir"
             RESULTS_DIR="results_dir"
-            COMBINE="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea combine"
+            COMBINE="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea combine"
             """)
         if deflate:
             expected += textwrap.dedent("""\
-                DEFLATE="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea deflate"
+                DEFLATE="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea deflate"
                 """)
         expected += textwrap.dedent("""\
-            GATHER="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea gather"
+            GATHER="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea gather"
 
             module load OpenMPI/2.1.6/GCC/SYSTEM
 
@@ -2557,11 +5173,41 @@ class TestBuildBatchScript:
             """)
         assert script == expected
 
+    @patch("salishsea_cmd.run._memory_resources", return_value=(700, True))
+    def test_optimum_shared_nodes(self, m_mr, mock_sys_executable, monkeypatch):
+        desc_file = StringIO(
+            "run_id: foo\n" "walltime: 01:02:03\n" "email: me@example.com"
+        )
+        run_desc = yaml.safe_load(desc_file)
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "optimum")
+
+        script = salishsea_cmd.run._build_batch_script(
+            run_desc,
+            Path("SalishSea.yaml"),
+            nemo_processors=42,
+            xios_processors=1,
+            max_deflate_jobs=4,
+            results_dir=Path("results_dir"),
+            run_dir=Path("tmp_run_dir"),
+            deflate=False,
+            separate_deflate=False,
+            cores_per_node="",
+            cpu_arch="",
+        )
+
+        m_mr.assert_called_once_with(run_desc, Path("tmp_run_dir"), 42, 1)
+        expected = textwrap.dedent("""\
+            #PBS -l procs=43
+            # memory per processor
+            #PBS -l pmem=700mb
+            """)
+        assert expected in script
+
     @pytest.mark.parametrize(
         "deflate",
         (True, False),
     )
-    def test_orcinus(self, mock_path, deflate, monkeypatch):
+    def test_orcinus(self, mock_sys_executable, deflate, monkeypatch):
         desc_file = StringIO(
             "run_id: foo\n" "walltime: 01:02:03\n" "email: me@example.com"
         )
@@ -2592,7 +5238,7 @@ class TestBuildBatchScript:
             #PBS -m bea
             #PBS -M me@example.com
             #PBS -l partition=QDR
-            #PBS -l nodes=4:ppn=12
+            #PBS -l nodes=4:ppn=11
             # memory per processor
             #PBS -l pmem=2000mb
             # stdout and stderr file paths/names
@@ -2604,14 +5250,14 @@ class TestBuildBatchScript:
             RUN_DESC="tmp_run_dir/SalishSea.yaml"
             WORK_DIR="tmp_run_dir"
             RESULTS_DIR="results_dir"
-            COMBINE="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea combine"
+            COMBINE="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea combine"
             """)
         if deflate:
             expected += textwrap.dedent("""\
-                DEFLATE="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea deflate"
+                DEFLATE="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea deflate"
                 """)
         expected += textwrap.dedent("""\
-            GATHER="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea gather"
+            GATHER="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea gather"
 
             module load intel
             module load intel/14.0/netcdf-4.3.3.1_mpi
@@ -2661,7 +5307,7 @@ class TestBuildBatchScript:
         assert script == expected
 
     @pytest.mark.parametrize("deflate", [True, False])
-    def test_salish(self, mock_path, deflate, monkeypatch):
+    def test_salish(self, mock_sys_executable, deflate, monkeypatch):
         run_desc = yaml.safe_load(StringIO(textwrap.dedent("""\
                     run_id: foo
                     walltime: 01:02:03
@@ -2690,14 +5336,14 @@ class TestBuildBatchScript:
             RUN_DESC="tmp_run_dir/SalishSea.yaml"
             WORK_DIR="tmp_run_dir"
             RESULTS_DIR="results_dir"
-            COMBINE="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea combine"
+            COMBINE="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea combine"
             """)
         if deflate:
             expected += textwrap.dedent("""\
-                DEFLATE="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea deflate"
+                DEFLATE="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea deflate"
                 """)
         expected += textwrap.dedent("""\
-            GATHER="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea gather"
+            GATHER="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea gather"
 
 
             mkdir -p ${RESULTS_DIR}
@@ -2749,7 +5395,13 @@ class TestBuildBatchScript:
         ],
     )
     def test_sockeye(
-        self, mock_path, node_name, cores_per_node, cpu_arch, deflate, monkeypatch
+        self,
+        mock_sys_executable,
+        node_name,
+        cores_per_node,
+        cpu_arch,
+        deflate,
+        monkeypatch,
     ):
         desc_file = StringIO(
             "run_id: foo\n" "walltime: 01:02:03\n" "email: me@example.com"
@@ -2771,7 +5423,6 @@ class TestBuildBatchScript:
             cpu_arch=cpu_arch,
         )
 
-        procs = 40 if not cores_per_node else cores_per_node
         expected = textwrap.dedent(f"""\
             #!/bin/bash
 
@@ -2783,7 +5434,7 @@ class TestBuildBatchScript:
                 """)
         expected += textwrap.dedent(f"""\
             #SBATCH --nodes=2
-            #SBATCH --ntasks-per-node={procs}
+            #SBATCH --ntasks-per-node=22
             #SBATCH --mem=186gb
             #SBATCH --time=1:02:03
             #SBATCH --mail-user=me@example.com
@@ -2798,14 +5449,14 @@ class TestBuildBatchScript:
             RUN_DESC="tmp_run_dir/SalishSea.yaml"
             WORK_DIR="tmp_run_dir"
             RESULTS_DIR="results_dir"
-            COMBINE="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea combine"
+            COMBINE="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea combine"
             """)
         if deflate:
             expected += textwrap.dedent("""\
-                DEFLATE="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea deflate"
+                DEFLATE="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea deflate"
                 """)
         expected += textwrap.dedent("""\
-            GATHER="pixi run -m $HOME/MEOPAR/SalishSeaCmd salishsea gather"
+            GATHER="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea gather"
 
             module load gcc/9.4.0
             module load openmpi/4.1.1-cuda11-3
@@ -2879,9 +5530,580 @@ class TestBuildBatchScript:
         assert caplog.records[0].message == "unknown system: mythical"
 
 
+class TestSelectBackfillResources:
+    """Unit tests for _select_backfill_resources() function."""
+
+    run_desc = {
+        "run_id": "foo",
+        "walltime": "12:00:00",
+        "account": "def-sverdrup",
+        "backfill": {
+            "candidates": [
+                {"cores per node": 96},
+                {"walltime": "06:00:00", "partition": "compute_short"},
+            ]
+        },
+    }
+
+    class MockAdapter:
+        def __init__(self, start_times):
+            self.start_times = start_times
+            self.options = []
+
+        def start_time(self, options):
+            self.options.append(options)
+            return self.start_times.pop(0)
+
+    def test_earliest_completion(self, monkeypatch):
+        now = arrow.get("2026-10-17T10:00:00")
+        adapter = self.MockAdapter(
+            [now.shift(hours=+8), now.shift(hours=+1), now.shift(hours=+4)]
+        )
+        monkeypatch.setitem(salishsea_cmd.run.backfill._adapters, "sbatch", adapter)
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+
+        run_desc, procs_per_node = salishsea_cmd.run._select_backfill_resources(
+            self.run_desc, 384, 192
+        )
+
+        assert adapter.options == [
+            {
+                "nodes": "2",
+                "ntasks-per-node": "192",
+                "mem": "0",
+                "time": "12:00:00",
+                "account": "def-sverdrup",
+            },
+            {
+                "nodes": "4",
+                "ntasks-per-node": "96",
+                "mem": "0",
+                "time": "12:00:00",
+                "account": "def-sverdrup",
+            },
+            {
+                "partition": "compute_short",
+                "nodes": "2",
+                "ntasks-per-node": "192",
+                "mem": "0",
+                "time": "6:00:00",
+                "account": "def-sverdrup",
+            },
+        ]
+        assert run_desc["walltime"] == "06:00:00"
+        assert run_desc["partition"] == "compute_short"
+        assert procs_per_node == 192
+        assert "partition" not in self.run_desc
+
+    def test_cores_per_node_candidate(self, monkeypatch):
+        now = arrow.get("2026-10-17T10:00:00")
+        adapter = self.MockAdapter(
+            [now.shift(hours=+8), now.shift(hours=+1), now.shift(hours=+8)]
+        )
+        monkeypatch.setitem(salishsea_cmd.run.backfill._adapters, "sbatch", adapter)
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "sockeye")
+
+        run_desc, procs_per_node = salishsea_cmd.run._select_backfill_resources(
+            self.run_desc, 384, 192, "cascade"
+        )
+
+        assert run_desc["walltime"] == "12:00:00"
+        assert procs_per_node == 96
+        assert all(options["constraint"] == "cascade" for options in adapter.options)
+
+    def test_memory_options(self, monkeypatch):
+        now = arrow.get("2026-10-17T10:00:00")
+        adapter = self.MockAdapter([now, now, now])
+        monkeypatch.setitem(salishsea_cmd.run.backfill._adapters, "sbatch", adapter)
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+
+        salishsea_cmd.run._select_backfill_resources(
+            self.run_desc, 384, 192, mem_per_cpu=1204, shared_nodes=True
+        )
+
+        assert adapter.options[0] == {
+            "ntasks": "384",
+            "mem-per-cpu": "1204M",
+            "time": "12:00:00",
+            "account": "def-sverdrup",
+        }
+
+    def test_longer_candidate_walltime_not_used(self, monkeypatch):
+        now = arrow.get("2026-10-17T10:00:00")
+        adapter = self.MockAdapter([now.shift(hours=+8), now])
+        monkeypatch.setitem(salishsea_cmd.run.backfill._adapters, "sbatch", adapter)
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        run_desc = {
+            **self.run_desc,
+            # e.g. a predicted walltime
+            "walltime": "02:00:00",
+            "backfill": {
+                "candidates": [{"walltime": "06:00:00", "partition": "compute_short"}]
+            },
+        }
+
+        run_desc, procs_per_node = salishsea_cmd.run._select_backfill_resources(
+            run_desc, 384, 192
+        )
+
+        assert adapter.options[1]["time"] == "2:00:00"
+        assert run_desc["walltime"] == "02:00:00"
+        assert run_desc["partition"] == "compute_short"
+
+    def test_tie_keeps_run_desc_resources(self, monkeypatch):
+        now = arrow.get("2026-10-17T10:00:00")
+        adapter = self.MockAdapter([now, now, now.shift(hours=+6)])
+        monkeypatch.setitem(salishsea_cmd.run.backfill._adapters, "sbatch", adapter)
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+
+        run_desc, procs_per_node = salishsea_cmd.run._select_backfill_resources(
+            self.run_desc, 384, 192
+        )
+
+        assert run_desc is not self.run_desc
+        assert run_desc == self.run_desc
+        assert procs_per_node == 192
+
+    def test_no_start_time_estimates(self, caplog, monkeypatch):
+        adapter = self.MockAdapter([None, None, None])
+        monkeypatch.setitem(salishsea_cmd.run.backfill._adapters, "sbatch", adapter)
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        caplog.set_level(logging.DEBUG)
+
+        run_desc, procs_per_node = salishsea_cmd.run._select_backfill_resources(
+            self.run_desc, 384, 192
+        )
+
+        assert run_desc is self.run_desc
+        assert procs_per_node == 192
+        assert caplog.records[0].levelname == "WARNING"
+
+    def test_no_adapter(self, caplog, monkeypatch):
+        monkeypatch.delitem(salishsea_cmd.run.backfill._adapters, "sbatch")
+        caplog.set_level(logging.DEBUG)
+
+        run_desc, procs_per_node = salishsea_cmd.run._select_backfill_resources(
+            self.run_desc, 384, 20
+        )
+
+        assert run_desc is self.run_desc
+        assert procs_per_node == 20
+        assert caplog.records[0].levelname == "WARNING"
+
+
+class TestPredictWalltime:
+    """Unit tests for _predict_walltime() function."""
+
+    @staticmethod
+    def run_desc(history_file):
+        return {
+            "run_id": "sensitivity",
+            "config_name": "SalishSeaCast",
+            "MPI decomposition": "8x18",
+            "walltime": "12:00:00",
+            "walltime prediction": {"margin": 0.1, "history file": history_file},
+        }
+
+    @staticmethod
+    @pytest.fixture
+    def run_dir(tmp_path):
+        run_dir = tmp_path / "run_dir"
+        run_dir.mkdir()
+        # 5 days of 40 s time steps
+        (run_dir / "namelist_cfg").write_text(
+            "&namrun\n  nn_it000 = 1\n  nn_itend = 10800\n/\n"
+            "&namdom\n  rn_rdt = 40.\n/\n"
+        )
+        return run_dir
+
+    @staticmethod
+    def history_entry(**items):
+        return {
+            "config": "SalishSeaCast",
+            "decomposition": "8x18",
+            "system": "fir",
+            "results dir": "/scratch/runs/SKOG_A",
+            "submitted": "2026-10-01T10:00:00-07:00",
+            **items,
+        }
+
+    def test_predicted_walltime(self, run_dir, tmp_path, caplog, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        history_file = tmp_path / "walltime_history.yaml"
+        history_file.write_text(
+            yaml.safe_dump(
+                [
+                    self.history_entry(
+                        **{"model days": 10.0, "run hours": 8.0, "job hours": 8.5}
+                    ),
+                    self.history_entry(
+                        **{"model days": 10.0, "run hours": 9.0, "job hours": 9.25}
+                    ),
+                    # Different decomposition
+                    self.history_entry(
+                        decomposition="16x34",
+                        **{"model days": 10.0, "run hours": 4.0, "job hours": 4.5},
+                    ),
+                ]
+            )
+        )
+        run_desc = self.run_desc(history_file)
+        caplog.set_level(logging.DEBUG)
+
+        predicted = salishsea_cmd.run._predict_walltime(run_desc, run_dir)
+
+        # (0.9 h/day * 5 days + 0.5 h) * 1.1 = 5.5 h
+        assert predicted == {**run_desc, "walltime": 5.5 * 60 * 60}
+        assert caplog.records[0].levelname == "INFO"
+        assert caplog.messages[0] == (
+            "sensitivity walltime predicted from 2 recorded runs: 5:30:00"
+        )
+
+    def test_no_recorded_runs(self, run_dir, tmp_path, caplog, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        run_desc = self.run_desc(tmp_path / "walltime_history.yaml")
+        caplog.set_level(logging.DEBUG)
+
+        predicted = salishsea_cmd.run._predict_walltime(run_desc, run_dir)
+
+        assert predicted is run_desc
+        assert caplog.records[0].levelname == "INFO"
+
+    def test_prediction_not_shorter(self, run_dir, tmp_path, caplog, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        history_file = tmp_path / "walltime_history.yaml"
+        history_file.write_text(
+            yaml.safe_dump(
+                [
+                    self.history_entry(
+                        **{"model days": 5.0, "run hours": 12.0, "job hours": 12.5}
+                    )
+                ]
+            )
+        )
+        run_desc = self.run_desc(history_file)
+        caplog.set_level(logging.DEBUG)
+
+        predicted = salishsea_cmd.run._predict_walltime(run_desc, run_dir)
+
+        assert predicted is run_desc
+        assert caplog.records[0].levelname == "WARNING"
+
+
+class TestWalltimeHistoryPath:
+    """Unit tests for _walltime_history_path() function."""
+
+    def test_history_file(self, tmp_path):
+        run_desc = {"walltime prediction": {"history file": tmp_path / "history.yaml"}}
+
+        history_file = salishsea_cmd.run._walltime_history_path(run_desc)
+
+        assert history_file == tmp_path / "history.yaml"
+
+    def test_default_history_file(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("HOME", os.fspath(tmp_path))
+        run_desc = {"walltime prediction": {"margin": 0.1}}
+
+        history_file = salishsea_cmd.run._walltime_history_path(run_desc)
+
+        assert history_file == (
+            tmp_path / ".local/state/salishsea-cmd/walltime_history.yaml"
+        )
+
+
+class TestRecordWalltimeHistory:
+    """Unit tests for _record_walltime_history() function."""
+
+    def test_record_walltime_history(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        history_file = tmp_path / "state" / "walltime_history.yaml"
+        run_desc = {
+            "config_name": "SalishSeaCast",
+            "MPI decomposition": "8x18",
+            "walltime prediction": {"margin": 0.1, "history file": history_file},
+        }
+
+        salishsea_cmd.run._record_walltime_history(
+            run_desc, [Path("/scratch/runs/SKOG_A"), Path("/scratch/runs/SKOG_B")]
+        )
+        salishsea_cmd.run._record_walltime_history(
+            run_desc, [Path("/scratch/runs/SKOG_C")]
+        )
+
+        history = yaml.safe_load(history_file.read_text())
+        assert [entry["results dir"] for entry in history] == [
+            "/scratch/runs/SKOG_A",
+            "/scratch/runs/SKOG_B",
+            "/scratch/runs/SKOG_C",
+        ]
+        assert {
+            key: history[0][key] for key in ("config", "decomposition", "system")
+        } == {
+            "config": "SalishSeaCast",
+            "decomposition": "8x18",
+            "system": "fir",
+        }
+        assert "submitted" in history[0]
+        assert not history_file.with_suffix(".yaml.tmp").exists()
+
+
+class TestMeasureWalltimeHistory:
+    """Unit tests for _measure_walltime_history() function."""
+
+    @staticmethod
+    def finished_run(results_dir, last_timestep=2160):
+        results_dir.mkdir()
+        (results_dir / "stdout").write_text(
+            "working dir: /scratch/runs/SKOG_A\n"
+            "Starting run at Sat Apr 30 22:00:00 PDT 2016\n"
+            "Ended run at Sun May  1 06:00:00 PDT 2016\n"
+            "Results combining started at Sun May  1 06:00:00 PDT 2016\n"
+            "Results gathering ended at Sun May  1 06:30:00 PDT 2016\n"
+        )
+        (results_dir / "namelist_cfg").write_text(
+            "&namrun\n  nn_it000 = 1\n  nn_itend = 2160\n/\n"
+            "&namdom\n  rn_rdt = 40.\n/\n"
+        )
+        (results_dir / "time.step").write_text(f"    {last_timestep}\n")
+
+    def test_measure_finished_run(self, tmp_path):
+        self.finished_run(tmp_path / "SKOG_A")
+        history = [
+            {
+                "results dir": os.fspath(tmp_path / "SKOG_A"),
+                "submitted": arrow.now().format("YYYY-MM-DDTHH:mm:ssZZ"),
+            }
+        ]
+
+        changed = salishsea_cmd.run._measure_walltime_history(history)
+
+        assert changed
+        assert history[0]["model days"] == 1.0
+        assert history[0]["run hours"] == 8.0
+        assert history[0]["job hours"] == 8.5
+
+    def test_incomplete_run(self, tmp_path):
+        self.finished_run(tmp_path / "SKOG_A", last_timestep=1000)
+        history = [
+            {
+                "results dir": os.fspath(tmp_path / "SKOG_A"),
+                "submitted": arrow.now().format("YYYY-MM-DDTHH:mm:ssZZ"),
+            }
+        ]
+
+        changed = salishsea_cmd.run._measure_walltime_history(history)
+
+        assert not changed
+        assert "model days" not in history[0]
+
+    def test_drop_expired_unmeasured_run(self, tmp_path):
+        history = [
+            {
+                "results dir": os.fspath(tmp_path / "SKOG_A"),
+                "submitted": arrow.now()
+                .shift(days=-31)
+                .format("YYYY-MM-DDTHH:mm:ssZZ"),
+            },
+            {
+                "results dir": os.fspath(tmp_path / "SKOG_B"),
+                "submitted": arrow.now().format("YYYY-MM-DDTHH:mm:ssZZ"),
+            },
+        ]
+
+        changed = salishsea_cmd.run._measure_walltime_history(history)
+
+        assert changed
+        assert [entry["results dir"] for entry in history] == [
+            os.fspath(tmp_path / "SKOG_B")
+        ]
+
+    def test_measured_run_unchanged(self):
+        history = [{"model days": 1.0, "run hours": 8.0, "job hours": 8.5}]
+
+        changed = salishsea_cmd.run._measure_walltime_history(history)
+
+        assert not changed
+
+
+class TestJobHours:
+    """Unit tests for _job_hours() function."""
+
+    def test_job_hours(self, tmp_path):
+        (tmp_path / "stdout").write_text(
+            "working dir: /scratch/runs/SKOG_A\n"
+            "Starting run at Sat Apr 30 22:00:00 PDT 2016\n"
+            "Ended run at Sun May  1 06:00:00 PDT 2016\n"
+            "Results gathering ended at Sun May  1 06:45:00 PDT 2016\n"
+        )
+
+        assert salishsea_cmd.run._job_hours(tmp_path) == 8.75
+
+    def test_no_date_lines(self, tmp_path):
+        (tmp_path / "stdout").write_text("working dir: /scratch/runs/SKOG_A\n")
+
+        assert salishsea_cmd.run._job_hours(tmp_path) is None
+
+    def test_no_stdout(self, tmp_path):
+        assert salishsea_cmd.run._job_hours(tmp_path) is None
+
+
+class TestMemoryResources:
+    """Unit tests for _memory_resources() function."""
+
+    def test_no_memory_section(self, tmp_path):
+        run_desc = {"run_id": "foo"}
+
+        memory = salishsea_cmd.run._memory_resources(run_desc, tmp_path, 42, 1)
+
+        assert memory == (None, False)
+
+    @pytest.mark.parametrize(
+        "memory_desc, expected",
+        (
+            ({}, (1204, False)),
+            ({"margin": 0, "shared nodes": True}, (964, True)),
+        ),
+    )
+    @patch("salishsea_cmd.run._estimate_nemo_memory", return_value=950)
+    def test_memory_resources(self, m_enm, memory_desc, expected, tmp_path):
+        run_desc = {"run_id": "foo", "memory": memory_desc}
+
+        memory = salishsea_cmd.run._memory_resources(run_desc, tmp_path, 79, 1)
+
+        m_enm.assert_called_once_with(run_desc, tmp_path)
+        assert memory == expected
+
+    @patch("salishsea_cmd.run._estimate_nemo_memory", return_value=None)
+    def test_no_estimate(self, m_enm, tmp_path):
+        run_desc = {"run_id": "foo", "memory": {"shared nodes": True}}
+
+        memory = salishsea_cmd.run._memory_resources(run_desc, tmp_path, 42, 1)
+
+        assert memory == (None, False)
+
+    def test_salishsea_cast_calibration(self, tmp_path):
+        # SalishSeaCast runs on 8x18 processors and 1 XIOS server were submitted with
+        # a fixed pmem=2000mb per processor on the TORQUE clusters before memory
+        # estimates were added, so the estimate with the default margin has to fit
+        # in that
+        (tmp_path / "namelist_cfg").write_text(
+            "&namcfg\n   jpidta = 398\n   jpjdta = 898\n   jpkdta = 40\n/\n"
+        )
+        run_desc = {
+            "run_id": "SalishSeaCast",
+            "MPI decomposition": "8x18",
+            "memory": {},
+        }
+
+        mem_per_cpu, shared_nodes = salishsea_cmd.run._memory_resources(
+            run_desc, tmp_path, 144, 1
+        )
+
+        assert mem_per_cpu == 544
+        assert mem_per_cpu <= 2000
+        assert not shared_nodes
+
+
+class TestEstimateNemoMemory:
+    """Unit tests for _estimate_nemo_memory() function."""
+
+    @pytest.mark.parametrize(
+        "namelist_top, expected",
+        (
+            (None, 424),
+            (
+                "&namtrc\n"
+                "   sn_tracer(1) = 'NO3', 'Nitrate', 'mmol/m3', .true., .true.\n"
+                "   sn_tracer(2) = 'NH4', 'Ammonium', 'mmol/m3', .true., .true.\n"
+                "/\n",
+                437,
+            ),
+        ),
+    )
+    def test_estimate_nemo_memory(self, namelist_top, expected, tmp_path):
+        (tmp_path / "namelist_cfg").write_text(
+            "&namcfg\n   jpidta = 398\n   jpjdta = 898\n   jpkdta = 40\n/\n"
+        )
+        if namelist_top is not None:
+            (tmp_path / "namelist_top_cfg").write_text(namelist_top)
+        run_desc = {"MPI decomposition": "8x18"}
+
+        nemo_mib = salishsea_cmd.run._estimate_nemo_memory(run_desc, tmp_path)
+
+        assert nemo_mib == expected
+
+    def test_no_grid_size(self, caplog, tmp_path):
+        (tmp_path / "namelist_cfg").write_text("&namrun\n   nn_it000 = 1\n/\n")
+        run_desc = {"MPI decomposition": "8x18"}
+        caplog.set_level(logging.DEBUG)
+
+        nemo_mib = salishsea_cmd.run._estimate_nemo_memory(run_desc, tmp_path)
+
+        assert nemo_mib is None
+        assert caplog.records[0].levelname == "WARNING"
+
+
+class TestNodeLayout:
+    """Unit tests for _node_layout() function."""
+
+    @pytest.mark.parametrize(
+        "n_processors, procs_per_node, expected",
+        (
+            (43, 192, (1, 43)),
+            (192, 192, (1, 192)),
+            (197, 192, (2, 99)),
+            (43, 40, (2, 22)),
+            (280, 20, (14, 20)),
+        ),
+    )
+    def test_node_layout(self, n_processors, procs_per_node, expected):
+        layout = salishsea_cmd.run._node_layout(n_processors, procs_per_node)
+        assert layout == expected
+
+
 class TestSbatchDirectives:
     """Unit tests for _sbatch_directives() function."""
 
+    @pytest.mark.parametrize(
+        "shared_nodes, expected_resources",
+        (
+            (
+                False,
+                "#SBATCH --nodes=1\n"
+                "#SBATCH --ntasks-per-node=43\n"
+                "#SBATCH --mem=30100M\n",
+            ),
+            (True, "#SBATCH --ntasks=43\n" "#SBATCH --mem-per-cpu=700M\n"),
+        ),
+    )
+    def test_estimated_memory(self, shared_nodes, expected_resources, monkeypatch):
+        run_desc = {"run_id": "foo", "walltime": "01:02:03", "account": "def-allen"}
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+
+        slurm_directives = salishsea_cmd.run._sbatch_directives(
+            run_desc,
+            n_processors=43,
+            procs_per_node=192,
+            cpu_arch="",
+            email="me@example.com",
+            results_dir=Path("foo"),
+            mem_per_cpu=700,
+            shared_nodes=shared_nodes,
+        )
+
+        expected = (
+            "#SBATCH --job-name=foo\n"
+            f"{expected_resources}"
+            "#SBATCH --time=1:02:03\n"
+            "#SBATCH --mail-user=me@example.com\n"
+            "#SBATCH --mail-type=ALL\n"
+            "#SBATCH --account=def-allen\n"
+            "# stdout and stderr file paths/names\n"
+            "#SBATCH --output=foo/stdout\n"
+            "#SBATCH --error=foo/stderr\n"
+        )
+        assert slurm_directives == expected
+
     def test_fir_sbatch_directives(self, caplog, monkeypatch):
         desc_file = StringIO("run_id: foo\n" "walltime: 01:02:03\n")
         run_desc = yaml.safe_load(desc_file)
@@ -2907,7 +6129,7 @@ class TestSbatchDirectives:
         expected = (
             "#SBATCH --job-name=foo\n"
             "#SBATCH --nodes=1\n"
-            "#SBATCH --ntasks-per-node=192\n"
+            "#SBATCH --ntasks-per-node=43\n"
             "#SBATCH --mem=0\n"
             "#SBATCH --time=1:02:03\n"
             "#SBATCH --mail-user=me@example.com\n"
@@ -2944,7 +6166,7 @@ class TestSbatchDirectives:
         expected = (
             "#SBATCH --job-name=foo\n"
             "#SBATCH --nodes=1\n"
-            "#SBATCH --ntasks-per-node=64\n"
+            "#SBATCH --ntasks-per-node=43\n"
             "#SBATCH --mem=0\n"
             "#SBATCH --time=1:02:03\n"
             "#SBATCH --mail-user=me@example.com\n"
@@ -2981,7 +6203,7 @@ class TestSbatchDirectives:
         expected = (
             "#SBATCH --job-name=foo\n"
             "#SBATCH --nodes=1\n"
-            "#SBATCH --ntasks-per-node=192\n"
+            "#SBATCH --ntasks-per-node=43\n"
             "#SBATCH --mem=0\n"
             "#SBATCH --time=1:02:03\n"
             "#SBATCH --mail-user=me@example.com\n"
@@ -3018,7 +6240,7 @@ class TestSbatchDirectives:
         expected = (
             "#SBATCH --job-name=foo\n"
             "#SBATCH --nodes=1\n"
-            "#SBATCH --ntasks-per-node=192\n"
+            "#SBATCH --ntasks-per-node=43\n"
             "#SBATCH --mem=0\n"
             "#SBATCH --time=1:02:03\n"
             "#SBATCH --mail-user=me@example.com\n"
@@ -3055,7 +6277,7 @@ class TestSbatchDirectives:
         expected = (
             "#SBATCH --job-name=foo\n"
             "#SBATCH --nodes=1\n"
-            "#SBATCH --ntasks-per-node=192\n"
+            "#SBATCH --ntasks-per-node=43\n"
             "#SBATCH --time=1:02:03\n"
             "#SBATCH --mail-user=me@example.com\n"
             "#SBATCH --mail-type=ALL\n"
@@ -3091,7 +6313,7 @@ class TestSbatchDirectives:
         expected = (
             "#SBATCH --job-name=foo\n"
             "#SBATCH --nodes=2\n"
-            "#SBATCH --ntasks-per-node=40\n"
+            "#SBATCH --ntasks-per-node=22\n"
             "#SBATCH --mem=186gb\n"
             "#SBATCH --time=1:02:03\n"
             "#SBATCH --mail-user=me@example.com\n"
@@ -3123,14 +6345,36 @@ class TestSbatchDirectives:
         slurm_directives = salishsea_cmd.run._sbatch_directives(
             run_desc,
             43,
-            procs_per_node=procs_per_node,
+            procs_per_node=procs_per_node,
+            cpu_arch="",
+            email="me@example.com",
+            results_dir=Path("foo"),
+        )
+
+        assert not caplog.records
+        assert "#SBATCH --account=def-sverdrup\n" in slurm_directives
+
+    def test_partition_directive(self, monkeypatch):
+        run_desc = {
+            "run_id": "foo",
+            "walltime": "01:02:03",
+            "account": "def-sverdrup",
+            "partition": "compute_short",
+        }
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+
+        slurm_directives = salishsea_cmd.run._sbatch_directives(
+            run_desc,
+            43,
+            procs_per_node=192,
             cpu_arch="",
             email="me@example.com",
             results_dir=Path("foo"),
         )
 
-        assert not caplog.records
-        assert "#SBATCH --account=def-sverdrup\n" in slurm_directives
+        assert slurm_directives.startswith(
+            "#SBATCH --job-name=foo\n" "#SBATCH --partition=compute_short\n"
+        )
 
 
 class TestPbsDirectives:
@@ -3151,7 +6395,7 @@ class TestPbsDirectives:
                 "optimum",
                 20,
                 "",
-                "#PBS -l nodes=3:ppn=20\n# memory per processor\n#PBS -l pmem=2000mb",
+                "#PBS -l nodes=3:ppn=14\n# memory per processor\n#PBS -l pmem=2000mb",
             ),
         ),
     )
@@ -3197,7 +6441,7 @@ class TestPbsDirectives:
                 "optimum",
                 20,
                 "",
-                "#PBS -l nodes=3:ppn=20\n# memory per processor\n#PBS -l pmem=2000mb",
+                "#PBS -l nodes=3:ppn=14\n# memory per processor\n#PBS -l pmem=2000mb",
             ),
         ),
     )
@@ -3296,10 +6540,11 @@ class TestDefinitions:
         ],
     )
     def test_definitions(self, home, deflate, monkeypatch):
-        def mock_path(path):
-            return Path(f"{home}/MEOPAR/SalishSeaCmd/salishsea_cmd/run.py")
-
-        monkeypatch.setattr(salishsea_cmd.run, "Path", mock_path)
+        monkeypatch.setattr(
+            salishsea_cmd.run.sys,
+            "executable",
+            f"{home}/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/python",
+        )
 
         desc_file = StringIO("run_id: foo\n")
         run_desc = yaml.safe_load(desc_file)
@@ -3317,15 +6562,42 @@ class TestDefinitions:
             f'RUN_DESC="tmp_run_dir/SalishSea.yaml"\n'
             f'WORK_DIR="tmp_run_dir"\n'
             f'RESULTS_DIR="results_dir"\n'
-            f'COMBINE="pixi run -m {home}/MEOPAR/SalishSeaCmd salishsea combine"\n'
+            f'COMBINE="{home}/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea combine"\n'
         )
         if deflate:
-            expected += (
-                f'DEFLATE="pixi run -m {home}/MEOPAR/SalishSeaCmd salishsea deflate"\n'
-            )
-        expected += (
-            f'GATHER="pixi run -m {home}/MEOPAR/SalishSeaCmd salishsea gather"\n'
+            expected += f'DEFLATE="{home}/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea deflate"\n'
+        expected += f'GATHER="{home}/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea gather"\n'
+        assert defns == expected
+
+    def test_definitions_worker(self, monkeypatch):
+        monkeypatch.setattr(
+            salishsea_cmd.run.sys,
+            "executable",
+            "$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/python",
+        )
+        run_desc = yaml.safe_load(StringIO("run_id: foo\n"))
+
+        defns = salishsea_cmd.run._definitions(
+            run_desc,
+            Path("SS-run-sets", "SalishSea.yaml"),
+            Path("tmp_run_dir"),
+            Path("results_dir"),
+            deflate=True,
+            worker=True,
         )
+
+        expected = textwrap.dedent("""\
+            RUN_ID="foo"
+            RUN_DESC="tmp_run_dir/SalishSea.yaml"
+            WORK_DIR="tmp_run_dir"
+            RESULTS_DIR="results_dir"
+            WORKER="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea worker"
+            WORKER_SOCKET="${TMPDIR:-/tmp}/salishsea_worker_${RUN_ID}_$$.sock"
+            WORKER_CLIENT="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/python -m salishsea_cmd.worker_client ${WORKER_SOCKET}"
+            COMBINE="${WORKER_CLIENT} combine"
+            DEFLATE="${WORKER_CLIENT} deflate"
+            GATHER="${WORKER_CLIENT} gather"
+            """)
         assert defns == expected
 
 
@@ -3410,9 +6682,102 @@ class TestModules:
         assert modules == expected
 
 
+class TestMpiPlacement:
+    """Unit tests for _mpi_placement() function."""
+
+    @pytest.mark.parametrize(
+        "system, expected",
+        (
+            ("fir", {"nemo": {}, "xios": {}}),
+            ("salish", {"nemo": {"bind to": "none"}, "xios": {"bind to": "none"}}),
+            ("optimum", {"nemo": {"bind to": "core"}, "xios": {"bind to": "core"}}),
+        ),
+    )
+    def test_system_defaults(self, system, expected, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", system)
+
+        mpi_placement = salishsea_cmd.run._mpi_placement({})
+
+        assert mpi_placement == expected
+
+    def test_run_desc_profiles(self, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "optimum")
+        run_desc = {
+            "mpi placement": {
+                "fir": {"nemo": {"ranks per socket": 96}},
+                "optimum": {"nemo": {"map by": "socket", "bind to": "socket"}},
+            }
+        }
+
+        mpi_placement = salishsea_cmd.run._mpi_placement(run_desc)
+
+        assert mpi_placement == {
+            "nemo": {"map by": "socket", "bind to": "socket"},
+            "xios": {"bind to": "core"},
+        }
+
+
+class TestMpirunPlacementOptions:
+    """Unit tests for _mpirun_placement_options() function."""
+
+    @pytest.mark.parametrize(
+        "profile, expected",
+        (
+            ({}, ""),
+            ({"bind to": "none"}, "--bind-to none "),
+            (
+                {"ranks per socket": 96, "bind to": "core"},
+                "--map-by ppr:96:socket --bind-to core ",
+            ),
+            (
+                {"map by": "node", "hardware threads": True},
+                "--map-by node --use-hwthread-cpus ",
+            ),
+        ),
+    )
+    def test_mpirun_placement_options(self, profile, expected):
+        options = salishsea_cmd.run._mpirun_placement_options(profile)
+
+        assert options == expected
+
+    def test_ranks_per_socket_and_map_by(self, caplog):
+        caplog.set_level(logging.DEBUG)
+
+        with pytest.raises(SystemExit) as excinfo:
+            salishsea_cmd.run._mpirun_placement_options(
+                {"ranks per socket": 96, "map by": "node"}
+            )
+
+        assert excinfo.value.code == 2
+        assert caplog.records[0].levelname == "ERROR"
+
+
 class TestExecute:
     """Unit test for _execute function."""
 
+    def test_execute_mpi_placement(self, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        mpi_placement = {
+            "nemo": {"ranks per socket": 96, "bind to": "core"},
+            "xios": {"bind to": "none"},
+        }
+
+        script = salishsea_cmd.run._execute(
+            nemo_processors=191,
+            xios_processors=1,
+            deflate=False,
+            max_deflate_jobs=4,
+            separate_deflate=False,
+            redirect_stdout_stderr=False,
+            mpi_placement=mpi_placement,
+        )
+
+        expected = (
+            "mpirun --map-by ppr:96:socket --bind-to core -np 191 ./nemo.exe : "
+            "--bind-to none -np 1 ./xios_server.exe\n"
+        )
+        assert expected in script
+
     @pytest.mark.parametrize(
         "system, mpirun_cmd",
         [
@@ -3710,6 +7075,311 @@ class TestExecute:
             """)
         assert script == expected
 
+    def test_execute_worker(self, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "nibi")
+
+        script = salishsea_cmd.run._execute(
+            nemo_processors=42,
+            xios_processors=1,
+            deflate=False,
+            max_deflate_jobs=4,
+            separate_deflate=False,
+            redirect_stdout_stderr=False,
+            worker=True,
+        )
+
+        expected = textwrap.dedent("""\
+            mkdir -p ${RESULTS_DIR}
+            cd ${WORK_DIR}
+            echo "working dir: $(pwd)"
+
+            ${WORKER} ${WORKER_SOCKET} --debug &
+            WORKER_PID=$!
+
+            echo "Starting run at $(date)"
+            mpirun -np 42 ./nemo.exe : -np 1 ./xios_server.exe
+            MPIRUN_EXIT_CODE=$?
+            echo "Ended run at $(date)"
+
+            echo "Results combining started at $(date)"
+            ${COMBINE} ${RUN_DESC} --debug
+            echo "Results combining ended at $(date)"
+
+            echo "Results gathering started at $(date)"
+            ${GATHER} ${RESULTS_DIR} --debug
+            echo "Results gathering ended at $(date)"
+            ${WORKER_CLIENT} --shutdown
+            wait ${WORKER_PID}
+            """)
+        assert script == expected
+
+
+class TestRestartHandoff:
+    """Unit tests for restart hand-off sections of _execute() and
+    _build_batch_script() functions.
+    """
+
+    def test_execute_restart_handoff(self, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+
+        script = salishsea_cmd.run._execute(
+            nemo_processors=42,
+            xios_processors=1,
+            deflate=True,
+            max_deflate_jobs=4,
+            separate_deflate=False,
+            redirect_stdout_stderr=False,
+            restart_handoff=True,
+        )
+
+        assert script.endswith(textwrap.dedent("""\
+                echo "Ended run at $(date)"
+
+                echo "Restart hand-off started at $(date)"
+                echo ${MPIRUN_EXIT_CODE} >mpirun_exit_code
+                for RANK_0 in *_restart*_0000.nc; do
+                  [ -e "${RANK_0}" ] || continue
+                  RESTART=${RANK_0%_0000.nc}
+                  N_RANKS=$(ls ${RESTART}_[0-9][0-9][0-9][0-9].nc | wc -l)
+                  ${REBUILD_NEMO} ${RESTART} ${N_RANKS} \\
+                    && rm ${RESTART}_[0-9][0-9][0-9][0-9].nc
+                done
+                mv *_restart*.nc ${RESULTS_DIR}/
+                echo "Restart hand-off ended at $(date)"
+                """))
+        assert "${COMBINE}" not in script
+        assert "${DEFLATE}" not in script
+        assert "${GATHER}" not in script
+
+    def test_execute_restart_handoff_keep_rank_restarts(self, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+
+        script = salishsea_cmd.run._execute(
+            nemo_processors=42,
+            xios_processors=1,
+            deflate=False,
+            max_deflate_jobs=4,
+            separate_deflate=False,
+            redirect_stdout_stderr=False,
+            keep_rank_restarts=True,
+            restart_handoff=True,
+        )
+
+        assert script.endswith(textwrap.dedent("""\
+                echo "Restart hand-off started at $(date)"
+                echo ${MPIRUN_EXIT_CODE} >mpirun_exit_code
+                mv *_restart*_[0-9][0-9][0-9][0-9].nc rank_restarts.yaml ${RESULTS_DIR}/
+                echo "Restart hand-off ended at $(date)"
+                """))
+        assert "${REBUILD_NEMO}" not in script
+
+    def test_execute_keep_rank_restarts(self, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+
+        script = salishsea_cmd.run._execute(
+            nemo_processors=42,
+            xios_processors=1,
+            deflate=False,
+            max_deflate_jobs=4,
+            separate_deflate=False,
+            redirect_stdout_stderr=False,
+            keep_rank_restarts=True,
+        )
+
+        assert textwrap.dedent("""\
+            echo "Results combining started at $(date)"
+            mv *_restart*_[0-9][0-9][0-9][0-9].nc rank_restarts.yaml ${RESULTS_DIR}/
+            ${COMBINE} ${RUN_DESC} --debug
+            """) in script
+
+    def test_batch_script_restart_handoff(self, monkeypatch):
+        run_desc = {"run_id": "foo", "walltime": "01:02:03", "email": "me@example.com"}
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+        monkeypatch.setattr(
+            salishsea_cmd.run.nemo_cmd.api,
+            "find_rebuild_nemo_script",
+            lambda run_desc: Path("/NEMO-3.6/TOOLS/REBUILD_NEMO/rebuild_nemo"),
+        )
+
+        script = salishsea_cmd.run._build_batch_script(
+            run_desc,
+            Path("SalishSea.yaml"),
+            nemo_processors=42,
+            xios_processors=1,
+            max_deflate_jobs=4,
+            results_dir=Path("results_dir"),
+            run_dir=Path("tmp_run_dir"),
+            deflate=False,
+            separate_deflate=False,
+            cores_per_node="",
+            cpu_arch="",
+            restart_handoff=True,
+        )
+
+        assert script.endswith(
+            'echo "Restart hand-off ended at $(date)"\n\nexit ${MPIRUN_EXIT_CODE}\n'
+        )
+        assert 'REBUILD_NEMO="/NEMO-3.6/TOOLS/REBUILD_NEMO/rebuild_nemo"\n' in script
+        assert "rmdir" not in script
+
+
+class TestSelfChain:
+    """Unit tests for _self_chain_args() and _self_chain() functions."""
+
+    def test_self_chain_args(self, monkeypatch):
+        monkeypatch.setattr(salishsea_cmd.run.sys, "executable", "/env/bin/python")
+        monkeypatch.setattr(salishsea_cmd.run.os, "getcwd", lambda: "/run sets")
+
+        chain_args = salishsea_cmd.run._self_chain_args(
+            Path("/run sets/SalishSea.yaml"),
+            Path("/results/sensitivity"),
+            cores_per_node="",
+            cpu_arch="",
+            deflate=True,
+            max_deflate_jobs=4,
+            nocheck_init=False,
+            per_rank_restarts=True,
+            restart_handoff=False,
+            separate_deflate=False,
+            worker=True,
+            quiet=False,
+        )
+
+        assert chain_args == (
+            "cd '/run sets' && /env/bin/salishsea run '/run sets/SalishSea.yaml' "
+            "/results/sensitivity --self-chain --deflate --max-deflate-jobs 4 "
+            "--per-rank-restarts --worker"
+        )
+
+    @pytest.mark.parametrize(
+        "redirect_stdout_stderr, redirect",
+        [
+            (False, ""),
+            (True, " >>${RESULTS_DIR}/stdout 2>>${RESULTS_DIR}/stderr"),
+        ],
+    )
+    def test_self_chain(self, redirect_stdout_stderr, redirect):
+        script = salishsea_cmd.run._self_chain(
+            "cd /run_sets && salishsea run --start-segment 2", redirect_stdout_stderr
+        )
+        expected = textwrap.dedent(f"""\
+            if [ ${{MPIRUN_EXIT_CODE}} -eq 0 ]; then
+              echo "Submitting next segment at $(date)"{redirect}
+              (cd /run_sets && salishsea run --start-segment 2){redirect}
+            fi
+
+            """)
+        assert script == expected
+
+    def test_batch_script_self_chain(self, monkeypatch):
+        run_desc = {
+            "run_id": "1_foo",
+            "walltime": "01:02:03",
+            "email": "me@example.com",
+        }
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+
+        script = salishsea_cmd.run._build_batch_script(
+            run_desc,
+            Path("SalishSea_1.yaml"),
+            nemo_processors=42,
+            xios_processors=1,
+            max_deflate_jobs=4,
+            results_dir=Path("results_dir_1"),
+            run_dir=Path("tmp_run_dir"),
+            deflate=False,
+            separate_deflate=False,
+            cores_per_node="",
+            cpu_arch="",
+            chain_cmd="salishsea run SalishSea.yaml results_dir --start-segment 2",
+        )
+
+        assert script.endswith(
+            "(salishsea run SalishSea.yaml results_dir --start-segment 2)\n"
+            "fi\n"
+            "\n"
+            f"{salishsea_cmd.run._cleanup()}"
+        )
+
+
+class TestRecovery:
+    """Unit tests for _recovery() function."""
+
+    @pytest.mark.parametrize(
+        "redirect_stdout_stderr, redirect",
+        [
+            (False, ""),
+            (
+                True,
+                " >>${RESULTS_DIR}/stdout_attempt_1 2>>${RESULTS_DIR}/stderr_attempt_1",
+            ),
+        ],
+    )
+    def test_recovery(self, redirect_stdout_stderr, redirect):
+        script = salishsea_cmd.run._recovery(
+            "cd /run_sets && salishsea run --start-segment 1 --recovery-attempt 2",
+            redirect_stdout_stderr,
+            recovery_attempt=1,
+        )
+        expected = textwrap.dedent(f"""\
+            if [ ${{MPIRUN_EXIT_CODE}} -ne 0 ]; then
+              mv ${{RESULTS_DIR}}/stdout ${{RESULTS_DIR}}/stdout_attempt_1
+              mv ${{RESULTS_DIR}}/stderr ${{RESULTS_DIR}}/stderr_attempt_1
+              echo "Submitting segment recovery at $(date)"{redirect}
+              (cd /run_sets && salishsea run --start-segment 1 --recovery-attempt 2){redirect}
+            fi
+
+            """)
+        assert script == expected
+
+    def test_batch_script_recovery(self, monkeypatch):
+        run_desc = {
+            "run_id": "1_foo",
+            "walltime": "01:02:03",
+            "email": "me@example.com",
+        }
+        monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "fir")
+
+        script = salishsea_cmd.run._build_batch_script(
+            run_desc,
+            Path("SalishSea_1.yaml"),
+            nemo_processors=42,
+            xios_processors=1,
+            max_deflate_jobs=4,
+            results_dir=Path("results_dir_1"),
+            run_dir=Path("tmp_run_dir"),
+            deflate=False,
+            separate_deflate=False,
+            cores_per_node="",
+            cpu_arch="",
+            chain_cmd="salishsea run SalishSea.yaml results_dir --start-segment 2",
+            recovery_cmd=(
+                "salishsea run SalishSea.yaml results_dir --start-segment 1 "
+                "--recovery-attempt 1"
+            ),
+        )
+
+        assert script.endswith(
+            f"{salishsea_cmd.run._fix_permissions()}\n"
+            "if [ ${MPIRUN_EXIT_CODE} -eq 0 ]; then\n"
+            '  echo "Submitting next segment at $(date)"\n'
+            "  (salishsea run SalishSea.yaml results_dir --start-segment 2)\n"
+            "fi\n"
+            "\n"
+            'echo "Deleting run directory" >>${RESULTS_DIR}/stdout\n'
+            "rmdir $(pwd)\n"
+            'echo "Finished at $(date)" >>${RESULTS_DIR}/stdout\n'
+            "if [ ${MPIRUN_EXIT_CODE} -ne 0 ]; then\n"
+            "  mv ${RESULTS_DIR}/stdout ${RESULTS_DIR}/stdout_attempt_0\n"
+            "  mv ${RESULTS_DIR}/stderr ${RESULTS_DIR}/stderr_attempt_0\n"
+            '  echo "Submitting segment recovery at $(date)"\n'
+            "  (salishsea run SalishSea.yaml results_dir --start-segment 1 "
+            "--recovery-attempt 1)\n"
+            "fi\n"
+            "\n"
+            "exit ${MPIRUN_EXIT_CODE}\n"
+        )
+
 
 class TestCleanup:
     """Unit test for _cleanup() function."""
@@ -3740,6 +7410,11 @@ class TestBuildDeflateScript:
         self, pattern, result_type, pmem, tmpdir, monkeypatch
     ):
         monkeypatch.setattr(salishsea_cmd.run, "SYSTEM", "orcinus")
+        monkeypatch.setattr(
+            salishsea_cmd.run.sys,
+            "executable",
+            "$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/python",
+        )
         run_desc = {
             "run_id": "19sep14_hindcast",
             "walltime": "3:00:00",
@@ -3768,7 +7443,7 @@ class TestBuildDeflateScript:
         #PBS -e {str(p_results_dir)}/stderr_deflate_{result_type}
 
         RESULTS_DIR="{str(p_results_dir)}"
-        DEFLATE="${{PBS_O_HOME}}/.local/bin/salishsea deflate"
+        DEFLATE="$HOME/MEOPAR/SalishSeaCmd/.pixi/envs/default/bin/salishsea deflate"
 
         module load intel
         module load intel/14.0/netcdf-4.3.3.1_mpi
@@ -0,0 +1,91 @@
+#  Copyright 2013 – present by the SalishSeaCast Project Contributors
+#  and The University of British Columbia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# SPDX-License-Identifier: Apache-2.0
+
+
+"""SalishSeaCmd timing spans unit tests"""
+
+import logging
+
+import pytest
+
+import salishsea_cmd.api
+import salishsea_cmd.timing
+
+
+@pytest.fixture
+def timings():
+    timings = salishsea_cmd.timing.Timings()
+    salishsea_cmd.api.register_timing_callback(timings)
+    yield timings
+    salishsea_cmd.api.unregister_timing_callback(timings)
+
+
+class TestSpan:
+    """Unit tests for span() context manager."""
+
+    def test_nested_span_names(self, timings):
+        with salishsea_cmd.timing.span("run"):
+            with salishsea_cmd.timing.span("submit_job"):
+                pass
+
+        assert [name for name, elapsed in timings.spans] == ["run/submit_job", "run"]
+        assert all(elapsed >= 0 for name, elapsed in timings.spans)
+
+    def test_span_reported_on_exception(self, timings):
+        with pytest.raises(RuntimeError):
+            with salishsea_cmd.timing.span("prepare"):
+                raise RuntimeError
+
+        assert [name for name, elapsed in timings.spans] == ["prepare"]
+
+    def test_callback_exception_logged(self, timings, caplog):
+        def bad_callback(name, elapsed):
+            raise ValueError
+
+        salishsea_cmd.api.register_timing_callback(bad_callback)
+        caplog.set_level(logging.DEBUG)
+        try:
+            with salishsea_cmd.timing.span("prepare"):
+                pass
+        finally:
+            salishsea_cmd.api.unregister_timing_callback(bad_callback)
+
+        assert caplog.records[0].levelname == "ERROR"
+        assert [name for name, elapsed in timings.spans] == ["prepare"]
+
+
+class TestCollectTimings:
+    """Unit tests for collect_timings() context manager."""
+
+    def test_report_logged(self, caplog):
+        caplog.set_level(logging.DEBUG)
+
+        with salishsea_cmd.timing.collect_timings():
+            with salishsea_cmd.timing.span("prepare"):
+                pass
+
+        assert caplog.records[0].message.startswith("step timings:\nprepare ")
+        assert not salishsea_cmd.timing._callbacks
+
+    def test_disabled(self, caplog):
+        caplog.set_level(logging.DEBUG)
+
+        with salishsea_cmd.timing.collect_timings(enabled=False):
+            with salishsea_cmd.timing.span("prepare"):
+                pass
+
+        assert not caplog.records
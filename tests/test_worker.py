@@ -0,0 +1,200 @@
+#  Copyright 2013 – present by the SalishSeaCast Project Contributors
+#  and The University of British Columbia
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# SPDX-License-Identifier: Apache-2.0
+
+
+"""SalishSeaCmd worker sub-command plug-in and worker client unit tests"""
+
+import argparse
+import logging
+import os
+import socket
+import threading
+from pathlib import Path
+from unittest.mock import Mock
+
+import cliff.app
+import pytest
+
+import salishsea_cmd.worker
+import salishsea_cmd.worker_client
+
+
+@pytest.fixture
+def worker_cmd():
+    return salishsea_cmd.worker.Worker(Mock(spec=cliff.app.App), None)
+
+
+@pytest.fixture
+def mock_app():
+    app = Mock(name="app")
+    app_parser = argparse.ArgumentParser()
+    app_parser.add_argument("--debug", action="store_true")
+    app.parser = app_parser
+    app.run_subcommand.return_value = 0
+    return app
+
+
+class TestParser:
+    """Unit tests for `salishsea worker` sub-command command-line parser."""
+
+    def test_get_parser(self, worker_cmd):
+        parser = worker_cmd.get_parser("salishsea worker")
+        assert parser.prog == "salishsea worker"
+
+    def test_parsed_args(self, worker_cmd):
+        parser = worker_cmd.get_parser("salishsea worker")
+        parsed_args = parser.parse_args(["/tmp/worker.sock"])
+        assert parsed_args.socket_path == Path("/tmp/worker.sock")
+
+
+class TestRunRequest:
+    """Unit tests for _run_request() function."""
+
+    def test_run_subcommand(self, mock_app, tmp_path):
+        returncode = salishsea_cmd.worker._run_request(
+            mock_app,
+            ["gather", "results_dir", "--debug"],
+            os.fspath(tmp_path),
+            {"PATH": "/opt/nco/bin"},
+        )
+
+        mock_app.run_subcommand.assert_called_once_with(["gather", "results_dir"])
+        assert returncode == 0
+
+    def test_client_cwd_and_env(self, mock_app, tmp_path):
+        cwd, env = os.getcwd(), os.environ.copy()
+
+        def mock_run_subcommand(argv):
+            assert os.getcwd() == os.fspath(tmp_path)
+            assert os.environ["PATH"] == "/opt/nco/bin"
+            return 1
+
+        mock_app.run_subcommand.side_effect = mock_run_subcommand
+
+        returncode = salishsea_cmd.worker._run_request(
+            mock_app,
+            ["combine", "SalishSea.yaml"],
+            os.fspath(tmp_path),
+            {"PATH": "/opt/nco/bin"},
+        )
+
+        assert returncode == 1
+        assert os.getcwd() == cwd
+        assert os.environ == env
+
+    def test_disallowed_subcommand(self, mock_app, tmp_path, caplog):
+        caplog.set_level(logging.DEBUG)
+
+        returncode = salishsea_cmd.worker._run_request(
+            mock_app, ["run", "SalishSea.yaml", "results"], os.fspath(tmp_path), {}
+        )
+
+        assert not mock_app.run_subcommand.called
+        assert caplog.records[0].levelname == "ERROR"
+        assert returncode == 2
+
+    def test_subcommand_argument_error(self, mock_app, tmp_path):
+        mock_app.run_subcommand.side_effect = SystemExit(2)
+
+        returncode = salishsea_cmd.worker._run_request(
+            mock_app, ["deflate", "--jobs"], os.fspath(tmp_path), {}
+        )
+
+        assert returncode == 2
+
+
+class TestServe:
+    """Unit tests for worker serve() function and worker client."""
+
+    def test_requests_and_shutdown(self, mock_app, tmp_path):
+        socket_path = tmp_path / "worker.sock"
+        server = threading.Thread(
+            target=salishsea_cmd.worker.serve, args=(socket_path, mock_app)
+        )
+        server.start()
+
+        returncode = salishsea_cmd.worker_client.send(
+            socket_path,
+            {"argv": ["gather", "results_dir"], "cwd": os.getcwd(), "env": {}},
+        )
+        salishsea_cmd.worker_client.send(socket_path, {"shutdown": True})
+        server.join(timeout=10)
+
+        assert returncode == 0
+        mock_app.run_subcommand.assert_called_once_with(["gather", "results_dir"])
+        assert not server.is_alive()
+        assert not socket_path.exists()
+
+
+class TestWorkerClient:
+    """Unit tests for worker client main() function."""
+
+    def test_fallback_to_salishsea_command(self, tmp_path, monkeypatch):
+        def mock_send(socket_path, request, connect_timeout=0):
+            raise ConnectionRefusedError
+
+        monkeypatch.setattr(salishsea_cmd.worker_client, "send", mock_send)
+        m_call = Mock(name="subprocess.call", return_value=0)
+        monkeypatch.setattr(salishsea_cmd.worker_client.subprocess, "call", m_call)
+        monkeypatch.setattr(
+            salishsea_cmd.worker_client.sys, "executable", "/env/bin/python"
+        )
+
+        returncode = salishsea_cmd.worker_client.main(
+            [os.fspath(tmp_path / "worker.sock"), "gather", "results_dir"]
+        )
+
+        m_call.assert_called_once_with(["/env/bin/salishsea", "gather", "results_dir"])
+        assert returncode == 0
+
+    def test_no_reply_from_worker(self, tmp_path, monkeypatch, capsys):
+        socket_path = tmp_path / "worker.sock"
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(os.fspath(socket_path))
+        listener.listen()
+
+        def die_without_reply():
+            # Accept the request and close the connection as a worker that
+            # dies part way through a sub-command does
+            conn, _ = listener.accept()
+            with conn, conn.makefile("rb") as stream:
+                stream.readline()
+
+        server = threading.Thread(target=die_without_reply)
+        server.start()
+        m_call = Mock(name="subprocess.call", return_value=0)
+        monkeypatch.setattr(salishsea_cmd.worker_client.subprocess, "call", m_call)
+
+        returncode = salishsea_cmd.worker_client.main(
+            [os.fspath(socket_path), "gather", "results_dir"]
+        )
+        server.join(timeout=10)
+        listener.close()
+
+        assert returncode == 1
+        assert not m_call.called
+        assert capsys.readouterr().err == (
+            f"salishsea worker failed during gather results_dir: "
+            f"no reply from worker on {socket_path}\n"
+        )
+
+    def test_shutdown_no_worker(self, tmp_path):
+        returncode = salishsea_cmd.worker_client.main(
+            [os.fspath(tmp_path / "worker.sock"), "--shutdown"]
+        )
+
+        assert returncode == 0